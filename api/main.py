@@ -1,18 +1,74 @@
 import os
+import json
 import time
-from typing import Optional, List
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Optional, List, Dict, Any
 
 import httpx
-from fastapi import FastAPI, UploadFile, File, HTTPException, Query
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+
+from api.upstream import Upstream, UpstreamUnavailable
+from modules.observability.metrics import install as install_metrics, REGISTRY
+from modules.observability.profiling import install as install_profiling
+from modules.runtime.singleflight import AsyncSingleFlight, canonical_key
+from modules.runtime.compression import CompressionMiddleware
+from modules.runtime.admission import AdmissionController, AdmissionRejected, ClientIdMiddleware
 
 
 CORE_URL = os.getenv("CORE_LOGIC_SERVER_URL", "http://localhost:8001")
 DATA_URL = os.getenv("DATA_TOOLS_SERVER_URL", "http://localhost:8002")
 
-app = FastAPI(title="AI Agent API Gateway", description="Front-end API gateway that proxies to MCP servers.")
+# 업스트림별 공유 커넥션 풀 (lifespan에서 열고 닫음)
+CORE = Upstream("core", CORE_URL, max_connections=int(os.getenv("GATEWAY_CORE_MAX_CONN", "100")))
+DATA = Upstream("data_tools", DATA_URL, max_connections=int(os.getenv("GATEWAY_DATA_MAX_CONN", "100")))
+UPSTREAMS = (CORE, DATA)
+
+# 라우트별 타임아웃(초)과 재시도 횟수. 재시도는 멱등(읽기 전용) 호출에만 둡니다.
+# 재시도는 연결 단계 오류와 502/503에서만 일어나므로 (Upstream._request) 계산 라우트가 ReadTimeout 뒤 중복 실행되지 않음
+# coalesce: 같은 본문의 동시 요청은 업스트림 호출 1건을 공유 (single-flight)
+# class: 승인 제어 우선순위 (interactive > analysis > bulk), max_concurrency: 라우트 동시 실행 한도
+ROUTE_POLICY: Dict[str, Dict[str, Any]] = {
+    "health":             {"timeout": 2.0,   "retries": 0},
+    "chat":               {"timeout": 60.0,  "retries": 0, "class": "interactive"},
+    "sessions":           {"timeout": 10.0,  "retries": 0, "class": "interactive"},
+    "eda_profile":        {"timeout": 60.0,  "retries": 2, "coalesce": True, "class": "analysis", "max_concurrency": 8},
+    "eda_duplicates":     {"timeout": 60.0,  "retries": 2, "coalesce": True, "class": "analysis"},
+    "data_downsample":    {"timeout": 60.0,  "retries": 2, "coalesce": True, "class": "interactive"},
+    "data_slice":         {"timeout": 60.0,  "retries": 2, "coalesce": True, "class": "interactive"},
+    "data_aggregate":     {"timeout": 60.0,  "retries": 2, "coalesce": True, "class": "interactive"},
+    "anomaly_detect":     {"timeout": 120.0, "retries": 1, "coalesce": True, "class": "analysis", "max_concurrency": 4},
+    "anomaly_stream":     {"timeout": 60.0,  "retries": 0, "class": "interactive"},
+    "rag_search":         {"timeout": 30.0,  "retries": 2, "coalesce": True, "class": "interactive"},
+    "upload_csv":         {"timeout": 60.0,  "retries": 0, "class": "analysis"},
+    "upload_dataset":     {"timeout": 180.0, "retries": 0, "class": "bulk", "max_concurrency": 2},
+    "upload_pdf":         {"timeout": 120.0, "retries": 0, "class": "bulk", "max_concurrency": 2},
+    "rag_index":          {"timeout": 300.0, "retries": 0, "coalesce": True, "class": "bulk", "max_concurrency": 2},
+}
+FLIGHTS = AsyncSingleFlight("gateway")
+# 업스트림 호출 승인 제어: 총량/클래스 몫/라우트/클라이언트 한도 + 우선순위 대기열. 포화 시 429 + Retry-After
+ADMISSION = AdmissionController()
+# 컬럼형 응답(Arrow IPC). modules.processing.columnar.ARROW_STREAM_MIME과 같은 값 (게이트웨이는 pyarrow 불필요)
+COLUMNAR_MIME = "application/vnd.apache.arrow.stream"
+PASSTHROUGH_HEADERS = ("content-type", "content-encoding", "x-cached")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    for u in UPSTREAMS:
+        await u.start()
+    try:
+        yield
+    finally:
+        for u in UPSTREAMS:
+            await u.close()
+
+
+app = FastAPI(title="AI Agent API Gateway", description="Front-end API gateway that proxies to MCP servers.",
+              lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,7 +76,106 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "Server-Timing"],
 )
+install_metrics(app, "gateway")
+install_profiling(app, "gateway")   # PROFILING_TOKEN이 있을 때만 (X-Profile 헤더 → 업스트림에도 전달)
+# 브라우저 응답 압축(zstd/gzip, Accept-Encoding 협상) + 압축된 요청 본문 해제. SSE는 제외됩니다.
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(ClientIdMiddleware)   # X-Client-ID(없으면 IP) → 클라이언트별 동시 실행 한도
+
+
+def _upstream_metrics() -> List[str]:
+    samples = [line for u in UPSTREAMS for line in u.prometheus()]
+    lines: List[str] = []
+    for family, kind in (("agent_upstream_request_duration_seconds", "histogram"),
+                         ("agent_upstream_errors_total", "counter"),
+                         ("agent_upstream_retries_total", "counter"),
+                         ("agent_upstream_circuit_open", "gauge")):
+        lines.append(f"# TYPE {family} {kind}")
+        lines.extend(x for x in samples if x.split("{", 1)[0].startswith(family))
+    return lines
+
+
+REGISTRY.register_collector(_upstream_metrics)
+
+
+def _request_key(route: str, kwargs: Dict[str, Any]) -> str:
+    files = kwargs.get("files") or []
+    items = files.items() if isinstance(files, dict) else files
+    file_parts = [(field, name, len(data), canonical_key(data)) for field, (name, data, _) in items]
+    content = kwargs.get("content")
+    return canonical_key(route, kwargs.get("json"), kwargs.get("params"), kwargs.get("headers"), file_parts,
+                         content if isinstance(content, (bytes, bytearray)) else None)
+
+
+def _columnar_headers(request: Optional[Request]) -> Optional[Dict[str, str]]:
+    """클라이언트가 Arrow IPC를 요청했으면 업스트림에 그대로 넘길 협상 헤더 (Accept, Accept-Encoding)."""
+    accept = request.headers.get("accept") if request is not None else None
+    if not accept or COLUMNAR_MIME not in accept:
+        return None
+    return {"Accept": accept, "Accept-Encoding": request.headers.get("accept-encoding") or "identity"}
+
+
+async def _proxy(upstream: Upstream, route: str, path: str, request: Optional[Request] = None, **kwargs) -> Any:
+    """
+    업스트림 POST 호출 후 JSON을 반환. 오류는 HTTPException으로 변환합니다.
+    request의 Accept가 Arrow IPC면 업스트림 응답 바이트(압축 포함)를 디코드하지 않고 그대로 중계합니다.
+    """
+    policy = ROUTE_POLICY[route]
+    columnar = _columnar_headers(request)
+    if columnar:
+        kwargs["headers"] = {**(kwargs.get("headers") or {}), **columnar}
+        call = lambda: _call_raw(upstream, policy, path, **kwargs)
+    else:
+        call = lambda: _call(upstream, policy, path, **kwargs)
+    admitted = lambda: _admitted(route, policy, call)
+    if policy.get("coalesce"):
+        # 합류한 요청은 업스트림을 쓰지 않으므로 선두 요청만 승인 대기
+        result, _ = await FLIGHTS.do(_request_key(route, kwargs), admitted)
+    else:
+        result = await admitted()
+    if columnar:
+        status, headers, body = result
+        return Response(content=body, status_code=status, headers=headers)
+    return result
+
+
+def _rejected(e: AdmissionRejected) -> HTTPException:
+    return HTTPException(status_code=429, detail=f"Gateway busy ({e})",
+                         headers={"Retry-After": str(max(1, int(e.retry_after)))})
+
+
+async def _admitted(route: str, policy: Dict[str, Any], call):
+    try:
+        async with ADMISSION.slot(route, policy["class"], policy.get("max_concurrency")):
+            return await call()
+    except AdmissionRejected as e:
+        raise _rejected(e)
+
+
+async def _call_raw(upstream: Upstream, policy: Dict[str, Any], path: str, **kwargs):
+    try:
+        r, body = await upstream.request_raw("POST", path, timeout=policy["timeout"], retries=policy["retries"],
+                                             **kwargs)
+    except UpstreamUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(max(1, int(e.retry_after)))})
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Upstream error: {e}")
+    return r.status_code, {k: v for k, v in r.headers.items() if k.lower() in PASSTHROUGH_HEADERS}, body
+
+
+async def _call(upstream: Upstream, policy: Dict[str, Any], path: str, method: str = "POST", **kwargs) -> Any:
+    try:
+        r = await upstream.request(method, path, timeout=policy["timeout"], retries=policy["retries"], **kwargs)
+        r.raise_for_status()
+        return r.json()
+    except UpstreamUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(max(1, int(e.retry_after)))})
+    except httpx.HTTPStatusError as e:
+        raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Upstream error: {e}")
 
 
 class ChatBody(BaseModel):
@@ -29,77 +184,168 @@ class ChatBody(BaseModel):
     rag_index_exists: bool = False
     index_dir: Optional[str] = None
     eda_context: Optional[str] = None
+    session_id: Optional[str] = None   # 대화 기록을 이어 갈 세션 id (클라이언트가 생성, 예: UUID)
+    dataset_id: Optional[str] = None   # 업로드로 받은 id. 있으면 집계 질문을 data_tools 캐시 데이터셋으로 정확히 계산
 
 
 class EDAProfileBody(BaseModel):
-    csv_b64: str
+    csv_b64: Optional[str] = None
+    dataset_id: Optional[str] = None
     max_pca_points: int = 1500
 
 
+class DuplicatesBody(BaseModel):
+    csv_b64: Optional[str] = None
+    dataset_id: Optional[str] = None
+    columns: Optional[List[str]] = None
+    decimals: Optional[int] = None
+    max_groups: int = 20
+
+
 @app.get("/api/health")
 async def health():
-    async with httpx.AsyncClient(timeout=2.0) as client:
-        t0 = time.time()
-        core_ok = False
-        data_ok = False
+    async def _ok(u: Upstream) -> bool:
         try:
-            r1 = await client.get(f"{CORE_URL}/health")
-            core_ok = r1.status_code == 200 and bool(r1.json().get("ok"))
+            r = await u.request("GET", "/health", timeout=ROUTE_POLICY["health"]["timeout"])
+            return r.status_code == 200 and bool(r.json().get("ok"))
         except Exception:
-            core_ok = False
+            return False
+
+    t0 = time.time()
+    core_ok, data_ok = await asyncio.gather(_ok(CORE), _ok(DATA))
+    return {"gateway_ok": True, "core_ok": core_ok, "data_tools_ok": data_ok, "ttfb_ms": int((time.time()-t0)*1000)}
+
+
+@app.get("/api/ready")
+async def ready():
+    """readiness: 업스트림이 모두 warm-up을 마쳤을 때(/ready 200)만 200, 아니면 503. liveness는 /api/health."""
+    async def _ready(u: Upstream) -> bool:
         try:
-            r2 = await client.get(f"{DATA_URL}/health")
-            data_ok = r2.status_code == 200 and bool(r2.json().get("ok"))
+            # warm-up 중 503은 장애가 아니므로 breaker를 거치지 않고 풀 클라이언트로 직접 조회
+            r = await u.client.get("/ready", timeout=ROUTE_POLICY["health"]["timeout"])
+            return r.status_code == 200
         except Exception:
-            data_ok = False
-        return {"gateway_ok": True, "core_ok": core_ok, "data_tools_ok": data_ok, "ttfb_ms": int((time.time()-t0)*1000)}
+            return False
+
+    core_ready, data_ready = await asyncio.gather(_ready(CORE), _ready(DATA))
+    body = {"ready": core_ready and data_ready, "core_ready": core_ready, "data_tools_ready": data_ready}
+    return JSONResponse(body, status_code=200 if body["ready"] else 503)
+
+
+@app.get("/api/admission")
+async def admission_stats():
+    """승인 제어 상태: 클래스별 실행/대기 수, 라우트별 실행 수."""
+    return ADMISSION.stats()
+
+
+@app.get("/api/upstreams")
+async def upstream_stats():
+    """업스트림별 커넥션 풀/breaker 상태와 지연 히스토그램."""
+    return {u.name: u.stats() for u in UPSTREAMS}
 
 
 @app.post("/api/chat")
 async def api_chat(body: ChatBody):
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        try:
-            r = await client.post(f"{CORE_URL}/tools/chat_with_context", json=body.dict())
-            r.raise_for_status()
-            return r.json()
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
-        except Exception as e:
-            raise HTTPException(status_code=502, detail=f"Upstream error: {e}")
+    return await _proxy(CORE, "chat", "/tools/chat_with_context", json=body.dict())
 
 
-@app.get("/api/chat/stream")
-async def api_chat_stream(q: str = Query(..., alias="q")):
-    async def gen():
-        # 현재 core는 스트리밍을 지원하지 않으므로, 전체 응답을 받아 단일 이벤트로 전달
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            try:
-                r = await client.post(f"{CORE_URL}/tools/chat_with_context", json={"user_query": q})
-                r.raise_for_status()
-                data = r.json()
-                text = data.get("answer", "")
-            except Exception as e:
-                text = f"오류: {e}"
-        yield f"data: {text}\n\n"
+def _sse_error(message: str) -> str:
+    return f"event: error\ndata: {json.dumps({'message': message}, ensure_ascii=False)}\n\n"
 
-    return StreamingResponse(gen(), media_type="text/event-stream")
 
+class _SlotStreamingResponse(StreamingResponse):
+    """전송이 끝나거나 연결이 끊기면(본문 시작 전 포함) 승인 슬롯을 반납하는 StreamingResponse."""
 
-@app.post("/api/eda/profile")
-async def api_eda_profile(body: EDAProfileBody):
-    async with httpx.AsyncClient(timeout=60.0) as client:
+    def __init__(self, content, release, **kwargs):
+        super().__init__(content, **kwargs)
+        self._release = release
+
+    async def __call__(self, scope, receive, send):
         try:
-            r = await client.post(f"{DATA_URL}/tools/eda_summary")  # Keep legacy endpoint? ensure new
-        except Exception:
-            r = None
+            await super().__call__(scope, receive, send)
+        finally:
+            await self._release()
+
+
+async def _chat_stream_response(payload: Dict[str, Any]) -> StreamingResponse:
+    """core의 SSE 스트림을 청크 단위로 그대로 중계합니다 (버퍼링 없음)."""
+    policy = ROUTE_POLICY["chat"]
+    # 헤더를 보내기 전에 승인받아야 429를 돌려줄 수 있음. 자리는 응답 전송이 끝나거나 끊길 때 반납
+    slot = ADMISSION.slot("chat", policy["class"], policy.get("max_concurrency"))
+    try:
+        await slot.__aenter__()
+    except AdmissionRejected as e:
+        raise _rejected(e)
+
+    async def gen():
         try:
-            r = await client.post(f"{DATA_URL}/tools/eda_profile", json=body.dict())
-            r.raise_for_status()
-            return r.json()
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
+            async with CORE.stream("POST", "/tools/chat_with_context/stream", json=payload,
+                                   timeout=ROUTE_POLICY["chat"]["timeout"]) as r:
+                if r.status_code != 200:
+                    detail = (await r.aread()).decode("utf-8", errors="replace")
+                    yield _sse_error(f"Upstream {r.status_code}: {detail}")
+                    return
+                async for chunk in r.aiter_raw():
+                    yield chunk
         except Exception as e:
-            raise HTTPException(status_code=502, detail=f"Upstream error: {e}")
+            yield _sse_error(f"Upstream error: {e}")
+
+    return _SlotStreamingResponse(gen(), release=lambda: slot.__aexit__(None, None, None),
+                                  media_type="text/event-stream",
+                                  headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.post("/api/chat/stream")
+async def api_chat_stream(body: ChatBody):
+    return await _chat_stream_response(body.dict())
+
+
+@app.get("/api/chat/stream")
+async def api_chat_stream_get(q: str = Query(..., alias="q"), index_dir: Optional[str] = None,
+                              rag_index_exists: bool = False, eda_context: Optional[str] = None,
+                              session_id: Optional[str] = None, dataset_id: Optional[str] = None):
+    # EventSource(GET) 호환용. CSV 본문이 필요한 경우 POST를 사용하세요 (업로드한 데이터셋은 dataset_id로 참조 가능).
+    body = ChatBody(user_query=q, index_dir=index_dir, rag_index_exists=rag_index_exists, eda_context=eda_context,
+                    session_id=session_id, dataset_id=dataset_id)
+    return await _chat_stream_response(body.dict())
+
+
+@app.post("/api/eda/profile")
+async def api_eda_profile(body: EDAProfileBody, request: Request):
+    return await _proxy(DATA, "eda_profile", "/tools/eda_profile", request, json=body.dict())
+
+
+@app.post("/api/eda/duplicates")
+async def api_eda_duplicates(body: DuplicatesBody):
+    return await _proxy(DATA, "eda_duplicates", "/tools/duplicates", json=body.dict())
+
+
+class DownsampleBody(BaseModel):
+    csv_b64: Optional[str] = None
+    dataset_id: Optional[str] = None
+    columns: Optional[List[str]] = None
+    tags: Optional[List[str]] = None
+    start: Optional[str] = None
+    end: Optional[str] = None
+    max_points: int = 2000
+    method: str = "lttb"
+    time_col: str = "STD_DT"
+    tag_col: str = "TAG"
+
+
+@app.post("/api/data/downsample")
+async def api_data_downsample(body: DownsampleBody):
+    return await _proxy(DATA, "data_downsample", "/tools/downsample", json=body.dict())
+
+
+@app.post("/api/anomaly/detect")
+async def api_anomaly_detect(body: Dict[str, Any]):
+    return await _proxy(DATA, "anomaly_detect", "/tools/anomaly_detect", json=body)
+
+
+@app.post("/api/anomaly/stream")
+async def api_anomaly_stream(body: Dict[str, Any]):
+    return await _proxy(DATA, "anomaly_stream", "/tools/anomaly_stream", json=body)
 
 
 class RagSearchBody(BaseModel):
@@ -108,34 +354,106 @@ class RagSearchBody(BaseModel):
     rag_index_exists: bool = False
 
 
+# raw-body CSV 변형: 본문(CSV 바이트)과 query string을 그대로 data tools /tools/{tool}/csv 로 전달
+CSV_TOOL_ROUTES = {
+    "eda_summary": "eda_profile",
+    "eda_profile": "eda_profile",
+    "duplicates": "eda_duplicates",
+    "downsample": "data_downsample",
+    "anomaly_detect": "anomaly_detect",
+}
+
+
+@app.post("/api/data/{tool}/csv")
+async def api_data_csv(tool: str, request: Request):
+    route = CSV_TOOL_ROUTES.get(tool)
+    if route is None:
+        raise HTTPException(status_code=404, detail=f"raw CSV 변형이 없는 툴입니다: {tool}")
+    return await _proxy(DATA, route, f"/tools/{tool}/csv", request, content=await request.body(),
+                        params=list(request.query_params.multi_items()), headers={"Content-Type": "text/csv"})
+
+
+@app.post("/api/chat/csv")
+async def api_chat_csv(request: Request):
+    return await _proxy(CORE, "chat", "/tools/chat_with_context/csv", content=await request.body(),
+                        params=list(request.query_params.multi_items()), headers={"Content-Type": "text/csv"})
+
+
+@app.get("/api/sessions/{session_id}")
+async def api_get_session(session_id: str):
+    return await _proxy(CORE, "sessions", f"/sessions/{session_id}", method="GET")
+
+
+@app.delete("/api/sessions/{session_id}")
+async def api_delete_session(session_id: str):
+    return await _proxy(CORE, "sessions", f"/sessions/{session_id}", method="DELETE")
+
+
 @app.post("/api/rag/search")
 async def api_rag_search(body: RagSearchBody):
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        try:
-            r = await client.post(f"{CORE_URL}/tools/rag_search", json=body.dict())
-            r.raise_for_status()
-            return r.json()
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
-        except Exception as e:
-            raise HTTPException(status_code=502, detail=f"Upstream error: {e}")
+    return await _proxy(CORE, "rag_search", "/tools/rag_search", json=body.dict())
 
 
 @app.post("/api/upload/csv")
-async def upload_csv(file: UploadFile = File(...)):
+async def upload_csv(request: Request, file: UploadFile = File(...)):
     if not file.filename.lower().endswith(".csv"):
         raise HTTPException(status_code=400, detail="CSV 파일만 업로드 가능합니다.")
     bytes_ = await file.read()
     files = {"file": (file.filename, bytes_, "text/csv")}
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        try:
-            r = await client.post(f"{DATA_URL}/upload/csv", files=files)
-            r.raise_for_status()
-            return r.json()
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
-        except Exception as e:
-            raise HTTPException(status_code=502, detail=f"Upstream error: {e}")
+    return await _proxy(DATA, "upload_csv", "/upload/csv", request, files=files)
+
+
+DATASET_MIME = {".csv": "text/csv", ".parquet": "application/vnd.apache.parquet", ".pq": "application/vnd.apache.parquet",
+                ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                ".xlsm": "application/vnd.ms-excel.sheet.macroEnabled.12", ".xls": "application/vnd.ms-excel"}
+
+
+@app.post("/api/upload/dataset")
+async def upload_dataset(request: Request, file: UploadFile = File(...)):
+    """CSV / Parquet / Excel 업로드. 응답의 dataset_id로 data/chat 툴을 호출하면 Parquet/Excel은 필요한 부분만 읽습니다."""
+    ext = os.path.splitext(file.filename.lower())[1]
+    if ext not in DATASET_MIME:
+        raise HTTPException(status_code=400, detail="CSV, Parquet(.parquet), Excel(.xlsx/.xls) 파일만 업로드 가능합니다.")
+    bytes_ = await file.read()
+    files = {"file": (file.filename, bytes_, DATASET_MIME[ext])}
+    return await _proxy(DATA, "upload_dataset", "/upload/dataset", request, files=files)
+
+
+class DatasetSliceBody(BaseModel):
+    dataset_id: str
+    offset: int = 0
+    limit: int = 1000
+    columns: Optional[List[str]] = None
+
+
+@app.post("/api/data/slice")
+async def api_data_slice(body: DatasetSliceBody, request: Request):
+    return await _proxy(DATA, "data_slice", "/tools/dataset_slice", request, json=body.dict())
+
+
+class AggregateBody(BaseModel):
+    csv_b64: Optional[str] = None
+    dataset_id: Optional[str] = None
+    question: Optional[str] = None
+    metrics: Optional[List[Dict[str, Any]]] = None
+    group_by: Optional[List[str]] = None
+    resample: Optional[str] = None
+    filters: Optional[List[Dict[str, Any]]] = None
+    start: Optional[str] = None
+    end: Optional[str] = None
+    last: Optional[str] = None
+    rolling: Optional[Dict[str, Any]] = None
+    corr: Optional[List[str]] = None
+    sort_by: Optional[str] = None
+    descending: bool = True
+    limit: int = 100
+    time_col: str = "STD_DT"
+    tag_col: str = "TAG"
+
+
+@app.post("/api/data/aggregate")
+async def api_data_aggregate(body: AggregateBody, request: Request):
+    return await _proxy(DATA, "data_aggregate", "/tools/aggregate", request, json=body.dict())
 
 
 @app.post("/api/upload/pdf")
@@ -144,15 +462,7 @@ async def upload_pdf(file: UploadFile = File(...)):
         raise HTTPException(status_code=400, detail="PDF 파일만 업로드 가능합니다.")
     bytes_ = await file.read()
     files = {"file": (file.filename, bytes_, "application/pdf")}
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        try:
-            r = await client.post(f"{DATA_URL}/upload/pdf", files=files)
-            r.raise_for_status()
-            return r.json()
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
-        except Exception as e:
-            raise HTTPException(status_code=502, detail=f"Upstream error: {e}")
+    return await _proxy(DATA, "upload_pdf", "/upload/pdf", files=files)
 
 
 @app.post("/api/rag/index")
@@ -162,12 +472,4 @@ async def api_rag_index(files: List[UploadFile] = File(...)):
     for f in files:
         b = await f.read()
         form.append(("files", (f.filename, b, "application/pdf")))
-    async with httpx.AsyncClient(timeout=300.0) as client:
-        try:
-            r = await client.post(f"{DATA_URL}/tools/rag_index", files=form)
-            r.raise_for_status()
-            return r.json()
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(status_code=e.response.status_code, detail=e.response.text)
-        except Exception as e:
-            raise HTTPException(status_code=502, detail=f"Upstream error: {e}")
+    return await _proxy(DATA, "rag_index", "/tools/rag_index", files=form)
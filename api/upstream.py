@@ -0,0 +1,332 @@
+import asyncio
+import bisect
+import json
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from modules.observability.metrics import (REQUEST_ID_HEADER, current_request_id, parse_server_timing,
+                                           record_stage)
+from modules.observability.profiling import forward_headers
+from modules.runtime.compression import COMPRESS_MIN_BYTES, choose_encoding, compress
+from modules.runtime.retry import RETRY_STATUSES, retryable_error
+
+
+# 지연 히스토그램 버킷 상한(ms). 마지막은 +Inf.
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, float("inf")]
+
+
+class UpstreamUnavailable(Exception):
+    """Circuit breaker가 열려 있어 호출을 시도하지 않고 즉시 실패."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} upstream is unavailable (circuit open)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class LatencyHistogram:
+    """누적 버킷 히스토그램 (Prometheus histogram과 같은 의미)."""
+
+    def __init__(self, buckets: List[float] = LATENCY_BUCKETS_MS):
+        self.buckets = list(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum_ms = 0.0
+
+    def observe(self, ms: float):
+        self.counts[bisect.bisect_left(self.buckets, ms)] += 1
+        self.count += 1
+        self.sum_ms += ms
+
+    def quantile(self, q: float) -> Optional[float]:
+        """버킷 상한 기준 근사 분위수(ms)."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for ub, c in zip(self.buckets, self.counts):
+            seen += c
+            if seen >= target:
+                return ub
+        return self.buckets[-1]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum_ms": round(self.sum_ms, 2),
+            "buckets": {("+Inf" if b == float("inf") else str(b)): c for b, c in zip(self.buckets, self.counts)},
+            "p50_ms": self.quantile(0.50),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+        }
+
+
+class CircuitBreaker:
+    """
+    연속 실패가 failure_threshold에 도달하면 reset_timeout 동안 open(즉시 실패),
+    이후 half-open에서 시험 호출 1건이 성공하면 closed로 복귀합니다.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        st = self.state
+        if st == "closed":
+            return True
+        if st == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def release_probe(self):
+        """시험 호출이 결과 없이 끝났을 때 (취소 등) 다음 호출이 다시 시험할 수 있게 반납."""
+        self._probe_in_flight = False
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class Upstream:
+    """
+    업스트림 서버 1개에 대한 공유 httpx.AsyncClient (keep-alive 커넥션 풀) + 재시도 + circuit breaker.
+    start()/close()는 게이트웨이 lifespan에서 호출합니다.
+    """
+
+    def __init__(self, name: str, base_url: str, max_connections: int = 100,
+                 max_keepalive: int = 20, keepalive_expiry: float = 30.0,
+                 connect_timeout: float = 2.0, breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive,
+                                   keepalive_expiry=keepalive_expiry)
+        self.connect_timeout = connect_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyHistogram()
+        self.errors = 0
+        self.retries = 0
+        # 서버가 응답의 Accept-Encoding(RFC 7694)으로 알려준 요청 본문 인코딩. 확인 전에는 압축하지 않음.
+        self.request_encoding: Optional[str] = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.base_url, limits=self.limits,
+                                             timeout=httpx.Timeout(60.0, connect=self.connect_timeout))
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError(f"{self.name} upstream client is not started")
+        return self._client
+
+    def _timeout(self, timeout: Optional[float]) -> httpx.Timeout:
+        return httpx.Timeout(timeout or 60.0, connect=self.connect_timeout)
+
+    async def request(self, method: str, path: str, *, timeout: Optional[float] = None,
+                      retries: int = 0, **kwargs) -> httpx.Response:
+        """
+        retries는 멱등 호출에만 지정하세요. 응답 헤더를 받기 전의 연결 오류(ConnectError/ConnectTimeout/
+        RemoteProtocolError)와 502/503에서만 지수 백오프(+지터)로 재시도합니다 (ReadTimeout/504는 재시도 안 함).
+        4xx는 업스트림 정상 응답으로 보고 breaker 실패로 세지 않습니다.
+        """
+        r, _ = await self._request(method, path, timeout, retries, False, kwargs)
+        return r
+
+    async def request_raw(self, method: str, path: str, *, timeout: Optional[float] = None,
+                          retries: int = 0, **kwargs) -> Tuple[httpx.Response, bytes]:
+        """request()와 같지만 본문을 디코드하지 않은 전송 바이트 그대로 돌려줍니다 (Content-Encoding 유지, 중계용)."""
+        r, body = await self._request(method, path, timeout, retries, True, kwargs)
+        return r, body
+
+    async def _send(self, method: str, path: str, timeout: Optional[float], raw: bool,
+                    kwargs: Dict[str, Any], progress: Dict[str, bool]) -> Tuple[httpx.Response, Optional[bytes]]:
+        req = self.client.build_request(method, path, timeout=self._timeout(timeout), **kwargs)
+        r = await self.client.send(req, stream=True)
+        progress["response"] = True   # 헤더 수신 이후의 오류는 업스트림이 처리했을 수 있으므로 재시도 안 함
+        try:
+            if raw:
+                return r, b"".join([chunk async for chunk in r.aiter_raw()])
+            await r.aread()
+            return r, None
+        finally:
+            await r.aclose()
+
+    def _observe(self, r: httpx.Response, ms: float):
+        self.latency.observe(ms)
+        self._learn_encoding(r)
+        # 업스트림 단계 시간을 "core.rag_search"처럼 접두어를 붙여 게이트웨이 Server-Timing에 합칩니다.
+        record_stage(self.name, ms)
+        for name, dur in parse_server_timing(r.headers.get("server-timing")):
+            if name != "total":
+                record_stage(f"{self.name}.{name}", dur)
+
+    def _failed(self, t0: float):
+        ms = (time.perf_counter() - t0) * 1000
+        record_stage(self.name, ms)
+        self.latency.observe(ms)
+        self.errors += 1
+        self.breaker.record_failure()
+
+    def _abandoned(self, e: BaseException, t0: float, probe: bool):
+        """전송 오류가 아닌 예외로 끝난 호출: 일반 오류는 실패로 세고, 취소는 시험 호출 자리만 반납."""
+        if isinstance(e, Exception):
+            self._failed(t0)
+        elif probe:
+            self.breaker.release_probe()
+
+    async def _request(self, method: str, path: str, timeout: Optional[float], retries: int, raw: bool,
+                       kwargs: Dict[str, Any]) -> Tuple[httpx.Response, Optional[bytes]]:
+        kwargs = self._encode_body(kwargs)
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise UpstreamUnavailable(self.name, self.breaker.retry_after())
+            probe = self.breaker.state == "half_open"
+            progress = {"response": False}
+            t0 = time.perf_counter()
+            try:
+                r, body = await self._send(method, path, timeout, raw, kwargs, progress)
+            except httpx.TransportError as e:
+                self._failed(t0)
+                if attempt >= retries or not retryable_error(e, progress["response"]):
+                    raise
+            except BaseException as e:
+                self._abandoned(e, t0, probe)
+                raise
+            else:
+                self._observe(r, (time.perf_counter() - t0) * 1000)
+                if r.status_code < 500:
+                    self.breaker.record_success()
+                    return r, body
+                self.errors += 1
+                self.breaker.record_failure()
+                if attempt >= retries or r.status_code not in RETRY_STATUSES:
+                    return r, body
+            attempt += 1
+            self.retries += 1
+            await asyncio.sleep(min(0.1 * (2 ** (attempt - 1)), 1.0) * (0.5 + random.random()))
+
+    @asynccontextmanager
+    async def stream(self, method: str, path: str, *, timeout: Optional[float] = None, **kwargs):
+        """
+        스트리밍 응답용 컨텍스트 매니저 (재시도 없음). breaker가 열려 있으면 UpstreamUnavailable.
+        breaker 성공/실패는 응답 헤더 기준으로 기록합니다 (스트리밍 도중 오류는 세지 않음).
+        """
+        if not self.breaker.allow():
+            raise UpstreamUnavailable(self.name, self.breaker.retry_after())
+        probe = self.breaker.state == "half_open"
+        kwargs = self._encode_body(kwargs)
+        t0 = time.perf_counter()
+        settled = False
+        try:
+            async with self.client.stream(method, path, timeout=self._timeout(timeout), **kwargs) as r:
+                self._observe(r, (time.perf_counter() - t0) * 1000)
+                settled = True
+                if r.status_code < 500:
+                    self.breaker.record_success()
+                else:
+                    self.errors += 1
+                    self.breaker.record_failure()
+                yield r
+        except BaseException as e:
+            if not settled:
+                self._abandoned(e, t0, probe)
+            raise
+
+    def _learn_encoding(self, r: httpx.Response):
+        advertised = r.headers.get("accept-encoding")
+        if advertised:
+            self.request_encoding = choose_encoding(advertised)
+
+    def _encode_body(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """JSON/raw 본문이 COMPRESS_MIN_BYTES 이상이고 서버가 지원하면 압축해 content로 보냅니다 (multipart는 그대로)."""
+        kwargs = dict(kwargs)
+        headers = self._headers(kwargs.get("headers"))
+        enc = self.request_encoding
+        if enc and ("json" in kwargs or isinstance(kwargs.get("content"), (bytes, bytearray))):
+            if "json" in kwargs:
+                body = json.dumps(kwargs.pop("json"), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                headers.setdefault("Content-Type", "application/json")
+            else:
+                body = bytes(kwargs.pop("content"))
+            if len(body) >= COMPRESS_MIN_BYTES:
+                t0 = time.perf_counter()
+                body = compress(body, enc)
+                record_stage(f"{self.name}.request_compress", (time.perf_counter() - t0) * 1000)
+                headers["Content-Encoding"] = enc
+            kwargs["content"] = body
+        kwargs["headers"] = headers
+        return kwargs
+
+    @staticmethod
+    def _headers(headers: Optional[Dict[str, str]]) -> Dict[str, str]:
+        """현재 요청의 request id(와 프로파일 중이면 프로파일 헤더)를 업스트림으로 전달."""
+        out = dict(headers or {})
+        rid = current_request_id()
+        if rid and REQUEST_ID_HEADER not in out:
+            out[REQUEST_ID_HEADER] = rid
+        out.update(forward_headers())
+        return out
+
+    def prometheus(self) -> List[str]:
+        """업스트림 지연 히스토그램/오류/breaker 상태를 Prometheus 텍스트 줄로."""
+        lab = f'upstream="{self.name}"'
+        out = []
+        acc = 0
+        for ub, c in zip(self.latency.buckets, self.latency.counts):
+            acc += c
+            le = "+Inf" if ub == float("inf") else repr(ub / 1000.0)
+            out.append(f'agent_upstream_request_duration_seconds_bucket{{{lab},le="{le}"}} {acc}')
+        out.append(f"agent_upstream_request_duration_seconds_sum{{{lab}}} {self.latency.sum_ms / 1000.0}")
+        out.append(f"agent_upstream_request_duration_seconds_count{{{lab}}} {self.latency.count}")
+        out.append(f"agent_upstream_errors_total{{{lab}}} {self.errors}")
+        out.append(f"agent_upstream_retries_total{{{lab}}} {self.retries}")
+        out.append(f"agent_upstream_circuit_open{{{lab}}} {int(self.breaker.state != 'closed')}")
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "base_url": self.base_url,
+            "breaker": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "errors": self.errors,
+            "retries": self.retries,
+            "request_encoding": self.request_encoding,
+            "latency": self.latency.snapshot(),
+        }
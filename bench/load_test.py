@@ -0,0 +1,362 @@
+"""
+게이트웨이(9000) → core/data tools 경로 부하 테스트.
+
+LLM/임베딩 없이 돌리려면 서버를 가짜 공급자로 띄우세요:
+    make run-fake            # GOOGLE_MODEL=fake, EMBEDDING_PROVIDER=fake
+    python bench/load_test.py --concurrency 16 --requests 200
+    python bench/load_test.py --compare bench/results/<이전 결과>.json
+    python bench/load_test.py --accept-encoding identity         # 압축 없이 전송량 비교
+    python bench/load_test.py --raw-csv --request-encoding zstd  # raw CSV 본문 + 요청 압축
+
+시나리오별로 지연/단계 시간 외에 요청·응답 바이트(전송/해제 후)와 서비스별 요청당 CPU ms를 기록합니다.
+결과는 bench/results/<timestamp>.json 으로 저장되며, --compare로 이전 결과와 비교해
+p95 증가/처리량 감소가 --tolerance를 넘으면 종료 코드 1을 반환합니다.
+"""
+import argparse
+import asyncio
+import base64
+import gzip
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+import pandas as pd
+
+SCENARIOS = ("rag_index", "rag_search", "eda_profile", "chat")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+QUERIES = [
+    "TAG별 평균 온도 차이를 알려줘",
+    "이상치가 많은 컬럼은?",
+    "용해 공정에서 전력과 온도의 상관은?",
+    "최근 구간 추세를 요약해줘",
+]
+
+
+# ---------- 입력 데이터 ----------
+def synthetic_csv(rows: int, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "STD_DT": pd.date_range("2024-01-01", periods=rows, freq="s").astype(str),
+        "TAG": rng.choice(["A", "B", "C", "D"], size=rows),
+    })
+    for i in range(8):
+        df[f"V{i}"] = rng.normal(100 + i, 5 + i, size=rows).round(4)
+    buf = io.StringIO()
+    df.to_csv(buf, index=False)
+    return buf.getvalue().encode("utf-8")
+
+
+def synthetic_pdf(pages: int = 3, lines: int = 30) -> bytes:
+    """외부 의존성 없이 텍스트만 있는 최소 PDF를 만듭니다 (pypdf로 추출 가능)."""
+    objs: List[bytes] = []
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(pages))
+    objs.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objs.append(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+    font_id = 3 + 2 * pages
+    for p in range(pages):
+        text = "BT /F1 10 Tf 40 800 Td 12 TL " + " ".join(
+            f"(Page {p} line {i}: melting furnace sensor temperature power current trend.) '"
+            for i in range(lines)) + " ET"
+        stream = text.encode("latin-1")
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                    f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {4 + 2 * p} 0 R >>".encode())
+        objs.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objs.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objs, start=1):
+        offsets.append(out.tell())
+        out.write(f"{i} 0 obj\n".encode() + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode())
+    for off in offsets:
+        out.write(f"{off:010d} 00000 n \n".encode())
+    out.write(f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return out.getvalue()
+
+
+# ---------- 측정 ----------
+def parse_server_timing(header: Optional[str]) -> Dict[str, float]:
+    """Server-Timing: stage;dur=12.3, other;dur=4 → {stage: 12.3, other: 4.0}"""
+    out: Dict[str, float] = {}
+    if not header:
+        return out
+    for part in header.split(","):
+        name, _, rest = part.strip().partition(";")
+        for kv in rest.split(";"):
+            k, _, v = kv.strip().partition("=")
+            if k == "dur":
+                try:
+                    out[name.strip()] = float(v)
+                except ValueError:
+                    pass
+    return out
+
+
+def summarize(latencies: List[float]) -> Dict[str, Any]:
+    if not latencies:
+        return {"count": 0}
+    a = np.asarray(latencies, dtype=np.float64)
+    return {
+        "count": int(a.size),
+        "mean_ms": round(float(a.mean()), 2),
+        "p50_ms": round(float(np.percentile(a, 50)), 2),
+        "p95_ms": round(float(np.percentile(a, 95)), 2),
+        "p99_ms": round(float(np.percentile(a, 99)), 2),
+        "max_ms": round(float(a.max()), 2),
+    }
+
+
+def _request_bytes(r: httpx.Response) -> Optional[int]:
+    try:
+        return len(r.request.content)
+    except httpx.RequestNotRead:   # multipart 스트림 본문
+        length = r.request.headers.get("content-length")
+        return int(length) if length else None
+
+
+async def cpu_seconds(client: httpx.AsyncClient, url: str) -> Optional[float]:
+    """서비스 /metrics의 process_cpu_seconds_total (없거나 실패하면 None)."""
+    try:
+        r = await client.get(url.rstrip("/") + "/metrics", timeout=5)
+        for line in r.text.splitlines():
+            if line.startswith("process_cpu_seconds_total "):
+                return float(line.split()[1])
+    except Exception:
+        pass
+    return None
+
+
+async def run_scenario(client: httpx.AsyncClient, name: str, make_request, n: int, concurrency: int,
+                       services: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    latencies: List[float] = []
+    stages: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    sent: List[int] = []
+    received: List[int] = []
+    received_raw: List[int] = []
+    sem = asyncio.Semaphore(concurrency)
+    services = services or {}
+
+    async def one(i: int):
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                r = await make_request(client, i)
+                ms = (time.perf_counter() - t0) * 1000
+                if r.status_code >= 400:
+                    errors[str(r.status_code)] = errors.get(str(r.status_code), 0) + 1
+                    return
+                latencies.append(ms)
+                req_bytes = _request_bytes(r)
+                if req_bytes is not None:
+                    sent.append(req_bytes)
+                received.append(r.num_bytes_downloaded)
+                received_raw.append(len(r.content))
+                for stage, dur in parse_server_timing(r.headers.get("server-timing")).items():
+                    stages.setdefault(stage, []).append(dur)
+            except Exception as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+
+    # 시나리오는 순차 실행되므로 전후 CPU 차이를 그 라우트의 비용으로 봅니다.
+    cpu_before = {svc: await cpu_seconds(client, url) for svc, url in services.items()}
+    client_cpu0 = time.process_time()
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    wall = time.perf_counter() - t0
+    client_cpu = time.process_time() - client_cpu0
+    cpu_ms: Dict[str, Optional[float]] = {"client": round(client_cpu * 1000 / n, 3) if n else None}
+    for svc, url in services.items():
+        after = await cpu_seconds(client, url)
+        before = cpu_before.get(svc)
+        cpu_ms[svc] = round((after - before) * 1000 / n, 3) if (after is not None and before is not None and n) else None
+    res = {
+        "requests": n,
+        "concurrency": concurrency,
+        "ok": len(latencies),
+        "errors": errors,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall > 0 else None,
+        "latency": summarize(latencies),
+        "stages": {k: summarize(v) for k, v in sorted(stages.items())},
+        # 요청/응답 본문 바이트(평균). response_wire는 압축된 전송량, response_raw는 해제 후 크기.
+        "bytes": {
+            "request": int(np.mean(sent)) if sent else None,
+            "response_wire": int(np.mean(received)) if received else None,
+            "response_raw": int(np.mean(received_raw)) if received_raw else None,
+        },
+        "cpu_ms_per_request": cpu_ms,
+    }
+    print(f"[BENCH] {name:12s} ok={res['ok']}/{n} rps={res['throughput_rps']} "
+          f"p50={res['latency'].get('p50_ms')} p95={res['latency'].get('p95_ms')} "
+          f"p99={res['latency'].get('p99_ms')} errors={errors or '-'}")
+    print(f"[BENCH] {'':12s} bytes req={res['bytes']['request']} resp={res['bytes']['response_wire']}"
+          f"/{res['bytes']['response_raw']} cpu_ms/req={cpu_ms}")
+    return res
+
+
+async def main_async(args) -> Dict[str, Any]:
+    csv_bytes = synthetic_csv(args.csv_rows) if not args.csv else open(args.csv, "rb").read()
+    csv_b64 = base64.b64encode(csv_bytes).decode()
+    pdf_bytes = synthetic_pdf(args.pdf_pages) if not args.pdf else open(args.pdf, "rb").read()
+    state: Dict[str, Any] = {"index_dir": None}
+    # --request-encoding: 요청 본문을 압축해 보냄 (게이트웨이가 해제)
+    req_headers = {"Content-Encoding": args.request_encoding} if args.request_encoding != "identity" else {}
+
+    def encode(body: bytes) -> bytes:
+        if args.request_encoding == "gzip":
+            return gzip.compress(body, compresslevel=5)
+        if args.request_encoding == "zstd":
+            import zstandard
+            return zstandard.ZstdCompressor(level=3).compress(body)
+        return body
+
+    def query(i: int) -> str:
+        q = QUERIES[i % len(QUERIES)]
+        # --unique: 응답 캐시를 우회하도록 질의마다 꼬리표를 붙임
+        return f"{q} (#{i})" if args.unique else q
+
+    async def rag_index(c, i):
+        r = await c.post("/api/rag/index", files=[("files", (f"bench_{i}.pdf", pdf_bytes, "application/pdf"))])
+        if r.status_code == 200:
+            state["index_dir"] = r.json().get("index_dir")
+        return r
+
+    async def rag_search(c, i):
+        return await c.post("/api/rag/search", json={"query": query(i), "index_dir": state["index_dir"],
+                                                     "rag_index_exists": bool(state["index_dir"])})
+
+    async def eda_profile(c, i):
+        if args.raw_csv:
+            return await c.post("/api/data/eda_profile/csv", params={"max_pca_points": 1500},
+                                content=encode(csv_bytes),
+                                headers={"Content-Type": "text/csv", **req_headers})
+        return await c.post("/api/eda/profile", content=encode(json.dumps({"csv_b64": csv_b64}).encode()),
+                            headers={"Content-Type": "application/json", **req_headers})
+
+    async def chat(c, i):
+        body = {"user_query": query(i), "index_dir": state["index_dir"],
+                "rag_index_exists": bool(state["index_dir"])}
+        if args.chat_csv and args.raw_csv:
+            params = {k: v for k, v in body.items() if v is not None}
+            return await c.post("/api/chat/csv", params=params, content=encode(csv_bytes),
+                                headers={"Content-Type": "text/csv", **req_headers})
+        if args.chat_csv:
+            body["csv_data_b64"] = csv_b64
+        return await c.post("/api/chat", content=encode(json.dumps(body, ensure_ascii=False).encode()),
+                            headers={"Content-Type": "application/json", **req_headers})
+
+    makers = {"rag_index": rag_index, "rag_search": rag_search, "eda_profile": eda_profile, "chat": chat}
+    selected = [s for s in SCENARIOS if s in args.scenarios]
+
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    services = {"gateway": args.base_url, "core": args.core_url, "data_tools": args.data_url}
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits,
+                                 headers={"Accept-Encoding": args.accept_encoding}) as client:
+        try:
+            (await client.get("/api/health")).raise_for_status()
+        except Exception as e:
+            print(f"[BENCH] gateway unreachable at {args.base_url}: {e}")
+            sys.exit(2)
+        results = {}
+        for name in selected:
+            # 인덱싱은 무거운 쓰기 작업이므로 요청 수를 줄여 순차에 가깝게 실행
+            n = args.index_requests if name == "rag_index" else args.requests
+            conc = min(args.concurrency, args.index_concurrency) if name == "rag_index" else args.concurrency
+            for i in range(args.warmup if name != "rag_index" else 0):
+                try:
+                    await makers[name](client, -1 - i)
+                except Exception:
+                    pass
+            results[name] = await run_scenario(client, name, makers[name], n, conc, services)
+    return results
+
+
+def _git_sha() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except Exception:
+        return None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> bool:
+    """p95가 (1+tolerance)배 넘게 늘거나 처리량이 (1-tolerance)배 밑으로 떨어지면 회귀로 판단."""
+    ok = True
+    for name, cur in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base or not cur["latency"].get("count") or not base["latency"].get("count"):
+            continue
+        p95_c, p95_b = cur["latency"]["p95_ms"], base["latency"]["p95_ms"]
+        rps_c, rps_b = cur["throughput_rps"] or 0, base["throughput_rps"] or 0
+        p95_delta = (p95_c - p95_b) / p95_b if p95_b else 0.0
+        rps_delta = (rps_c - rps_b) / rps_b if rps_b else 0.0
+        regressed = p95_delta > tolerance or rps_delta < -tolerance
+        ok &= not regressed
+        print(f"[COMPARE] {name:12s} p95 {p95_b} → {p95_c} ({p95_delta:+.1%})  "
+              f"rps {rps_b} → {rps_c} ({rps_delta:+.1%}){'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+def main():
+    ap = argparse.ArgumentParser(description="API gateway end-to-end load test")
+    ap.add_argument("--base-url", default=os.getenv("BENCH_BASE_URL", "http://localhost:9000"))
+    ap.add_argument("--scenarios", default=",".join(SCENARIOS), type=lambda s: s.split(","))
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--requests", type=int, default=100, help="시나리오당 요청 수")
+    ap.add_argument("--warmup", type=int, default=2)
+    ap.add_argument("--index-requests", type=int, default=3)
+    ap.add_argument("--index-concurrency", type=int, default=1)
+    ap.add_argument("--timeout", type=float, default=120.0)
+    ap.add_argument("--csv", help="CSV 파일 경로 (없으면 합성 데이터)")
+    ap.add_argument("--csv-rows", type=int, default=20000)
+    ap.add_argument("--pdf", help="PDF 파일 경로 (없으면 합성 PDF)")
+    ap.add_argument("--pdf-pages", type=int, default=3)
+    ap.add_argument("--chat-csv", action="store_true", help="chat 요청에 CSV 컨텍스트 포함")
+    ap.add_argument("--unique", action="store_true", help="질의마다 꼬리표를 붙여 응답 캐시 우회")
+    ap.add_argument("--accept-encoding", default="zstd, gzip", help="응답 압축 협상 (identity로 비교)")
+    ap.add_argument("--request-encoding", default="identity", choices=("identity", "gzip", "zstd"))
+    ap.add_argument("--raw-csv", action="store_true", help="CSV를 base64 JSON 대신 raw-body 변형으로 전송")
+    ap.add_argument("--core-url", default=os.getenv("CORE_LOGIC_SERVER_URL", "http://localhost:8001"))
+    ap.add_argument("--data-url", default=os.getenv("DATA_TOOLS_SERVER_URL", "http://localhost:8002"))
+    ap.add_argument("--out", help="결과 JSON 경로 (기본 bench/results/<timestamp>.json)")
+    ap.add_argument("--compare", help="비교할 이전 결과 JSON")
+    ap.add_argument("--tolerance", type=float, default=0.15)
+    args = ap.parse_args()
+
+    scenarios = asyncio.run(main_async(args))
+    result = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_sha": _git_sha(),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("compare", "out")},
+        "env": {k: os.getenv(k) for k in ("GOOGLE_MODEL", "EMBEDDING_PROVIDER", "FAKE_LLM_LATENCY_MS",
+                                          "FAKE_LLM_TOKENS_PER_S", "FAKE_EMBED_LATENCY_MS")},
+        "scenarios": scenarios,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"[BENCH] saved {out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if not compare(result, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+서비스 콜드 스타트 측정: 모듈 import 시간(python -X importtime)과 기동 후 /health·/ready 응답까지 걸린 시간.
+
+    python bench/startup.py                                   # import 시간만 (서버 불필요)
+    python bench/startup.py --serve                           # 각 서비스를 임시 포트로 띄워 /health, /ready 시간까지
+    python bench/startup.py --compare bench/baselines/startup.json
+
+import 시간은 --repeat 회 중 최솟값(디스크 캐시가 데워진 상태 기준)입니다. 무거운 import 상위 --top 개를 함께 기록해
+어떤 의존성이 콜드 스타트를 차지하는지 보여 줍니다. --compare는 import 시간이 --tolerance 넘게 늘면 종료 코드 1.
+결과는 bench/results/startup-<timestamp>.json. 기준선은 bench/baselines/startup.json (lazy import 적용 전 측정값).
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "bench", "results")
+# 서비스 → (모듈, liveness 경로, readiness 경로)
+SERVICES = {
+    "gateway": ("api.main", "/api/health", "/api/ready"),
+    "core": ("modules.mcp.servers.core_logic_server", "/health", "/ready"),
+    "data_tools": ("modules.mcp.servers.data_tools_server", "/health", "/ready"),
+}
+# 측정 시 외부 API 키 없이 import/기동되도록
+FAKE_ENV = {"GOOGLE_MODEL": "fake", "EMBEDDING_PROVIDER": "fake"}
+
+
+def _env() -> Dict[str, str]:
+    return {**os.environ, **FAKE_ENV, "PYTHONPATH": ROOT}
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """'import time: self [us] | cumulative | imported package' 줄을 (module, depth, self_ms, cumulative_ms)로."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        head, cum, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        rows.append({"module": name.strip(), "depth": depth,
+                     "self_ms": round(int(head) / 1000, 1), "cumulative_ms": round(int(cum) / 1000, 1)})
+    return rows
+
+
+def import_profile(module: str, repeat: int, top: int) -> Dict[str, Any]:
+    best: Optional[Dict[str, Any]] = None
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT, env=_env(),
+                              capture_output=True, text=True)
+        if proc.returncode != 0:
+            return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed"}
+        rows = parse_importtime(proc.stderr)
+        target = next((r for r in rows if r["module"] == module), None)
+        total = target["cumulative_ms"] if target else sum(r["self_ms"] for r in rows)
+        if best is None or total < best["total_ms"]:
+            # 서비스 모듈이 직접 불러온 것 중 무거운 순 (중복 없이 depth 1 기준)
+            direct = sorted((r for r in rows if r["depth"] == 1), key=lambda r: -r["cumulative_ms"])
+            best = {"total_ms": total, "modules": len(rows),
+                    "top": [{"module": r["module"], "cumulative_ms": r["cumulative_ms"]} for r in direct[:top]]}
+    return best or {}
+
+
+def serve_profile(module: str, health: str, ready: str, port: int, timeout: float) -> Dict[str, Any]:
+    """uvicorn을 띄워 프로세스 시작 → /health 200, → /ready 200(있을 때)까지 시간을 잽니다."""
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", f"{module}:app", "--port", str(port),
+                             "--log-level", "warning"], cwd=ROOT, env=_env(),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    out: Dict[str, Any] = {"health_ms": None, "ready_ms": None}
+    try:
+        with httpx.Client(timeout=1.0) as c:
+            while time.perf_counter() - t0 < timeout and proc.poll() is None:
+                for key, path in (("health_ms", health), ("ready_ms", ready)):
+                    if out[key] is not None:
+                        continue
+                    try:
+                        r = c.get(f"http://127.0.0.1:{port}{path}")
+                    except httpx.TransportError:
+                        break
+                    if r.status_code in (404, 405):
+                        out[key] = "n/a"   # 엔드포인트 없음 (readiness 도입 전 기준선)
+                    elif r.status_code == 200:
+                        out[key] = round((time.perf_counter() - t0) * 1000, 1)
+                if all(v is not None for v in out.values()):
+                    break
+                time.sleep(0.02)
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    return out
+
+
+def _git_sha() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=ROOT).decode().strip()
+    except Exception:
+        return None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> bool:
+    ok = True
+    for name, cur in current["services"].items():
+        base = baseline.get("services", {}).get(name)
+        c, b = cur.get("import", {}).get("total_ms"), (base or {}).get("import", {}).get("total_ms")
+        if not c or not b:
+            continue
+        delta = (c - b) / b
+        regressed = delta > tolerance
+        ok &= not regressed
+        print(f"[COMPARE] {name:10s} import {b} → {c} ms ({delta:+.1%}){'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Service import / cold-start profile")
+    ap.add_argument("--services", default=",".join(SERVICES), type=lambda s: s.split(","))
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--top", type=int, default=10, help="기록할 무거운 직접 import 수")
+    ap.add_argument("--serve", action="store_true", help="uvicorn 기동 후 /health, /ready 시간도 측정")
+    ap.add_argument("--port", type=int, default=18100, help="--serve 시작 포트 (서비스마다 +1)")
+    ap.add_argument("--timeout", type=float, default=60.0)
+    ap.add_argument("--out", help="결과 JSON 경로 (기본 bench/results/startup-<timestamp>.json)")
+    ap.add_argument("--compare", help="비교할 이전 결과 JSON")
+    ap.add_argument("--tolerance", type=float, default=0.15)
+    args = ap.parse_args()
+
+    services: Dict[str, Any] = {}
+    for i, name in enumerate(args.services):
+        module, health, ready = SERVICES[name]
+        entry: Dict[str, Any] = {"module": module, "import": import_profile(module, args.repeat, args.top)}
+        if args.serve:
+            entry["serve"] = serve_profile(module, health, ready, args.port + i, args.timeout)
+        services[name] = entry
+        imp = entry["import"]
+        print(f"[STARTUP] {name:10s} import {imp.get('total_ms')} ms  "
+              f"top: {', '.join(t['module'] + '=' + str(t['cumulative_ms']) for t in imp.get('top', [])[:3])}"
+              + (f"  serve {entry['serve']}" if args.serve else ""))
+
+    result = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_sha": _git_sha(),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "services": services,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, "startup-" + time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"[BENCH] saved {out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if not compare(result, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,7 @@ import { Card, CardContent } from "./ui/card"
 import { Avatar, AvatarFallback } from "./ui/avatar"
 import { Badge } from "./ui/badge"
 import { Alert, AlertDescription } from "./ui/alert"
-import { chat } from "../lib/api"
+import { chatStream } from "../lib/api"
 
 interface Message {
   id: string
@@ -41,6 +41,7 @@ ${pdfDocuments.length > 0 ? `📚 ${pdfDocuments.length}개의 PDF 문서가 인
   ])
   const [inputValue, setInputValue] = useState("")
   const [isLoading, setIsLoading] = useState(false)
+  const [isStreaming, setIsStreaming] = useState(false)
   const scrollAreaRef = useRef<React.ElementRef<typeof ScrollArea>>(null)
   const messagesEndRef = useRef<HTMLDivElement>(null)
 
@@ -59,35 +60,38 @@ ${pdfDocuments.length > 0 ? `📚 ${pdfDocuments.length}개의 PDF 문서가 인
       timestamp: new Date()
     }
 
+    const query = inputValue
     setMessages(prev => [...prev, userMessage])
     setInputValue("")
     setIsLoading(true)
 
+    // 첫 토큰이 오면 AI 메시지를 추가하고, 이후 토큰은 같은 메시지에 이어 붙임
+    const aiId = (Date.now() + 1).toString()
+    let started = false
+    const append = (text: string) => {
+      if (!text) return
+      if (!started) {
+        started = true
+        setIsStreaming(true)
+        setMessages(prev => [...prev, { id: aiId, type: 'ai', content: text, timestamp: new Date(), analysisType: undefined }])
+      } else {
+        setMessages(prev => prev.map(m => m.id === aiId ? { ...m, content: m.content + text } : m))
+      }
+    }
+    const appendError = (message: string) => append(`${started ? "\n\n" : ""}오류: ${message}`)
+
     try {
-      const resp = await chat(inputValue, {
+      await chatStream(query, { onToken: append, onError: appendError }, {
         uploadedData: data,
         index_dir: ragIndexDir,
         rag_index_exists: Boolean(ragIndexDir),
-      });
-      const aiMessage: Message = {
-        id: (Date.now() + 1).toString(),
-        type: 'ai',
-        content: String(resp?.answer ?? "응답이 없습니다."),
-        timestamp: new Date(),
-        analysisType: undefined,
-      }
-      setMessages(prev => [...prev, aiMessage])
+      })
+      if (!started) append("응답이 없습니다.")
     } catch (e: any) {
-      const aiMessage: Message = {
-        id: (Date.now() + 1).toString(),
-        type: 'ai',
-        content: `오류: ${String(e)}`,
-        timestamp: new Date(),
-        analysisType: undefined,
-      }
-      setMessages(prev => [...prev, aiMessage])
+      appendError(String(e))
     } finally {
       setIsLoading(false)
+      setIsStreaming(false)
     }
   }
 
@@ -334,7 +338,7 @@ ${pdfDocuments.length > 0 ? '• 문서 기반 질의응답' : ''}
             </div>
           ))}
           
-          {isLoading && (
+          {isLoading && !isStreaming && (
             <div className="flex items-start gap-3">
               <Avatar className="h-8 w-8 flex-shrink-0">
                 <AvatarFallback>
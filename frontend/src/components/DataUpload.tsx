@@ -4,7 +4,7 @@ import { Button } from "./ui/button"
 import { Card, CardContent } from "./ui/card"
 import { Badge } from "./ui/badge"
 import { Alert, AlertDescription } from "./ui/alert"
-import { uploadCsv } from "../lib/api"
+import { uploadCsv, uploadDataset } from "../lib/api"
 
 interface DataUploadProps {
   onDataUploaded: (data: any) => void
@@ -29,6 +29,26 @@ export function DataUpload({ onDataUploaded, uploadedData }: DataUploadProps) {
     setUploading(true)
     
     try {
+      const lower = file.name.toLowerCase()
+      // Excel/Parquet은 브라우저에서 파싱하지 않고 서버 미리보기(preview)와 dataset_id를 사용
+      if (/\.(xlsx|xlsm|xls|parquet)$/.test(lower)) {
+        const res = await uploadDataset(file)
+        const headers: string[] = res.preview?.length ? Object.keys(res.preview[0]) : []
+        onDataUploaded({
+          filename: file.name,
+          size: file.size,
+          type: lower.endsWith('.parquet') ? 'parquet' : 'excel',
+          dataset_id: res.dataset_id,
+          headers,
+          rows: res.preview ?? [],
+          totalRows: res.shape?.rows ?? 0,
+          uploadedAt: new Date().toISOString()
+        })
+        setUploading(false)
+        setDragOver(false)
+        return
+      }
+
       const text = await file.text()
       
       // CSV 파싱 시뮬레이션
@@ -188,12 +208,12 @@ export function DataUpload({ onDataUploaded, uploadedData }: DataUploadProps) {
             <div className="space-y-2">
               <h3>데이터 파일을 업로드하세요</h3>
               <p className="text-sm text-muted-foreground">
-                CSV, JSON, Excel 파일을 드래그 앤 드롭하거나 클릭하여 선택하세요
+                CSV, JSON, Excel, Parquet 파일을 드래그 앤 드롭하거나 클릭하여 선택하세요
               </p>
             </div>
             <input
               type="file"
-              accept=".csv,.json,.xlsx,.xls"
+              accept=".csv,.json,.xlsx,.xls,.parquet"
               onChange={handleFileSelect}
               className="hidden"
               id="file-upload"
@@ -209,7 +229,7 @@ export function DataUpload({ onDataUploaded, uploadedData }: DataUploadProps) {
       </Card>
       
       <div className="text-sm text-muted-foreground">
-        <p>지원 형식: CSV, JSON, Excel (.xlsx, .xls)</p>
+        <p>지원 형식: CSV, JSON, Excel (.xlsx, .xls), Parquet</p>
         <p>최대 파일 크기: 10MB</p>
       </div>
     </div>
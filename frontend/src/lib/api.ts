@@ -16,16 +16,22 @@ function toCSV(headers: string[], rows: Record<string, any>[]): string {
   return `${head}\n${body}`;
 }
 
-export async function chat(user_query: string, opts: ChatOpts = {}) {
-  let csv_data_b64: string | undefined = undefined;
-  if (opts.uploadedData?.headers && opts.uploadedData?.rows) {
+// 서버에 등록된 데이터셋(Excel/Parquet 업로드)은 dataset_id로 참조하고, 그 외에는 파싱한 행을 CSV로 보냅니다.
+// (Excel/Parquet의 rows는 서버 미리보기 몇 행뿐이므로 CSV로 만들면 전체가 아닌 미리보기만 분석됨)
+function attachData(body: any, uploadedData: any) {
+  if (uploadedData?.dataset_id) {
+    body.dataset_id = uploadedData.dataset_id;
+  } else if (uploadedData?.headers && uploadedData?.rows) {
     try {
-      const csv = toCSV(opts.uploadedData.headers, opts.uploadedData.rows);
-      csv_data_b64 = btoa(unescape(encodeURIComponent(csv)));
+      const csv = toCSV(uploadedData.headers, uploadedData.rows);
+      body.csv_data_b64 = btoa(unescape(encodeURIComponent(csv)));
     } catch {}
   }
+}
+
+export async function chat(user_query: string, opts: ChatOpts = {}) {
   const body: any = { user_query };
-  if (csv_data_b64) body.csv_data_b64 = csv_data_b64;
+  attachData(body, opts.uploadedData);
   if (opts.index_dir) body.index_dir = opts.index_dir;
   if (typeof opts.rag_index_exists === "boolean") body.rag_index_exists = opts.rag_index_exists;
   if (opts.eda_context) body.eda_context = opts.eda_context;
@@ -46,6 +52,15 @@ export async function uploadCsv(file: File) {
   return r.json();
 }
 
+// CSV / Parquet / Excel → dataset_id (Parquet/Excel은 서버가 필요한 컬럼·row group만 읽음)
+export async function uploadDataset(file: File) {
+  const fd = new FormData();
+  fd.append("file", file);
+  const r = await fetch(`${BASE}/api/upload/dataset`, { method: "POST", body: fd });
+  if (!r.ok) throw new Error(await r.text());
+  return r.json();
+}
+
 export async function uploadPdf(file: File) {
   const fd = new FormData();
   fd.append("file", file);
@@ -63,13 +78,23 @@ export async function ragIndex(files: File[]) {
 }
 
 export async function edaProfileFromParsed(uploadedData: any, maxPcaPoints = 800) {
+  if (uploadedData?.dataset_id) {
+    // 서버에 보관된 데이터셋 전체로 프로파일 (미리보기 행을 CSV로 다시 보내지 않음)
+    const r = await fetch(`${BASE}/api/eda/profile`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ dataset_id: uploadedData.dataset_id, max_pca_points: maxPcaPoints }),
+    });
+    if (!r.ok) throw new Error(await r.text());
+    return r.json();
+  }
   if (!uploadedData?.headers || !uploadedData?.rows) throw new Error("invalid uploaded data");
   const csv = toCSV(uploadedData.headers, uploadedData.rows);
-  const b64 = btoa(unescape(encodeURIComponent(csv)));
-  const r = await fetch(`${BASE}/api/eda/profile`, {
+  // raw-body 변형: base64(+33%) 없이 CSV 텍스트를 그대로 전송
+  const r = await fetch(`${BASE}/api/data/eda_profile/csv?max_pca_points=${maxPcaPoints}`, {
     method: "POST",
-    headers: { "Content-Type": "application/json" },
-    body: JSON.stringify({ csv_b64: b64, max_pca_points: maxPcaPoints }),
+    headers: { "Content-Type": "text/csv; charset=utf-8" },
+    body: csv,
   });
   if (!r.ok) throw new Error(await r.text());
   return r.json();
@@ -87,3 +112,83 @@ export async function ragSearch(query: string, opts: { index_dir?: string | null
   if (!r.ok) throw new Error(await r.text());
   return r.json();
 }
+
+export type DownsampleOpts = {
+  dataset_id?: string;
+  csv_b64?: string;
+  columns?: string[];
+  tags?: string[];
+  start?: string;
+  end?: string;
+  max_points?: number;
+  method?: "lttb" | "minmax";
+};
+
+// 서버에서 TAG별 시계열을 픽셀 예산(max_points)으로 줄여 받습니다. t는 epoch ms.
+export async function downsample(opts: DownsampleOpts) {
+  const r = await fetch(`${BASE}/api/data/downsample`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(opts),
+  });
+  if (!r.ok) throw new Error(await r.text());
+  return r.json();
+}
+
+type ChatStreamHandlers = {
+  onContext?: (meta: any) => void;
+  onToken: (text: string) => void;
+  onSources?: (sources: string) => void;
+  onError?: (message: string) => void;
+};
+
+// SSE 스트리밍 채팅: context → token* → sources → done 이벤트를 순서대로 전달합니다.
+// 응답이 text/event-stream이 아니면 (스트리밍 미지원 게이트웨이/프록시) chat()으로 한 번에 받아 같은 핸들러로 전달합니다.
+export async function chatStream(user_query: string, handlers: ChatStreamHandlers, opts: ChatOpts = {}) {
+  const body: any = { user_query };
+  attachData(body, opts.uploadedData);
+  if (opts.index_dir) body.index_dir = opts.index_dir;
+  if (typeof opts.rag_index_exists === "boolean") body.rag_index_exists = opts.rag_index_exists;
+  if (opts.eda_context) body.eda_context = opts.eda_context;
+  const r = await fetch(`${BASE}/api/chat/stream`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(body),
+  });
+  const isSSE = (r.headers.get("content-type") || "").includes("text/event-stream");
+  if (!isSSE && (r.ok || r.status === 404 || r.status === 405)) {
+    await r.body?.cancel();
+    const resp = await chat(user_query, opts);
+    handlers.onToken(String(resp?.answer ?? ""));
+    if (resp?.sources) handlers.onSources?.(resp.sources);
+    return { fallback: true };
+  }
+  if (!r.ok || !r.body) throw new Error(await r.text());
+  const reader = r.body.getReader();
+  const decoder = new TextDecoder();
+  let buf = "";
+  let done_: any = null;
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buf += decoder.decode(value, { stream: true });
+    let sep: number;
+    while ((sep = buf.indexOf("\n\n")) >= 0) {
+      const raw = buf.slice(0, sep);
+      buf = buf.slice(sep + 2);
+      let event = "message";
+      let data = "";
+      for (const line of raw.split("\n")) {
+        if (line.startsWith("event:")) event = line.slice(6).trim();
+        else if (line.startsWith("data:")) data += line.slice(5).trim();
+      }
+      const payload = data ? JSON.parse(data) : {};
+      if (event === "context") handlers.onContext?.(payload);
+      else if (event === "token") handlers.onToken(payload.text ?? "");
+      else if (event === "sources") handlers.onSources?.(payload.sources ?? "");
+      else if (event === "error") handlers.onError?.(payload.message ?? "");
+      else if (event === "done") done_ = payload;
+    }
+  }
+  return done_;
+}
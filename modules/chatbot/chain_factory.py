@@ -1,39 +1,95 @@
 import os
-from typing import Optional
-import pandas as pd
-import streamlit as st
+import asyncio
+import threading
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
 
-# 프롬프트는 별도 파일에서 가져옵니다 (중복 정의 X)
-try:
-    from .prompt_templates import SYSTEM_BASE  # 프로젝트에 이미 존재
-except Exception:
-    SYSTEM_BASE = (
-        "당신은 한국어로 답변하는 데이터 분석 어시스턴트입니다. "
-        "데이터프레임 컨텍스트(행/열 수, dtypes, 미리보기)를 활용해 간결하고 논리적으로 답하세요."
-    )
+if TYPE_CHECKING:   # Gemini SDK(langchain_google_genai)는 실제 클라이언트를 만들 때 import (서버 기동 시간 절감)
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+from .response_cache import RESPONSE_CACHE
+from .fake_llm import FakeChatModel, is_fake_model
+from .response_cache import prompt_key
+from ..runtime.singleflight import AsyncSingleFlight
 
 REQUIRED_KEYS = ["GOOGLE_API_KEY"]
 
+load_dotenv()
+
+# (model, temperature) → 모델 클라이언트. 호출마다 새로 만들지 않고 프로세스 내에서 재사용합니다.
+_LLM_CLIENTS: Dict[Tuple[str, Optional[float]], "ChatGoogleGenerativeAI"] = {}
+_LLM_LOCK = threading.Lock()
+# 같은 프롬프트의 동시 LLM 호출은 1건만 보내고 결과 공유
+_LLM_FLIGHTS = AsyncSingleFlight("llm")
 
-def create_gemini_chat_chain(model: Optional[str] = None, temperature: Optional[float] = None) -> ChatGoogleGenerativeAI: # ✨ 변경된 부분: temperature 매개변수 추가
+
+def create_gemini_chat_chain(model: Optional[str] = None, temperature: Optional[float] = None) -> "ChatGoogleGenerativeAI":
     """
-    .env에서 GOOGLE_API_KEY를 불러와 Gemini Chat 모델을 생성합니다.
-    model: 환경변수 GOOGLE_MODEL 우선, 기본값 'gemini-1.5-flash'
+    GOOGLE_API_KEY로 Gemini Chat 모델 클라이언트를 반환합니다. (model, temperature)별로 한 번만 생성해 재사용.
+    model: 환경변수 GOOGLE_MODEL 우선, 기본값 'gemini-1.5-flash'. 'fake'로 시작하면 부하 테스트용 FakeChatModel.
     """
-    load_dotenv()  # 안전하게 호출 (중복 호출 무해)
+    model_name = model or os.getenv("GOOGLE_MODEL") or "gemini-1.5-flash"
+    fake = is_fake_model(model_name)
     google_api_key = os.getenv("GOOGLE_API_KEY")
-    if not google_api_key:
+    if not google_api_key and not fake:
         raise ValueError("GOOGLE_API_KEY가 설정되지 않았습니다. .env에 키를 넣어주세요.")
+    key = (model_name, temperature)
+    with _LLM_LOCK:
+        llm = _LLM_CLIENTS.get(key)
+        if llm is None:
+            if fake:
+                llm = FakeChatModel(model_name, temperature)
+            else:
+                from langchain_google_genai import ChatGoogleGenerativeAI
+                kwargs = {}
+                if temperature is not None:
+                    kwargs["temperature"] = temperature
+                llm = ChatGoogleGenerativeAI(model=model_name, google_api_key=google_api_key, **kwargs)
+            _LLM_CLIENTS[key] = llm
+        return llm
+
+
+def invoke_cached(prompt: str, model: Optional[str] = None, temperature: Optional[float] = None,
+                  query: Optional[str] = None, context_fp: Optional[str] = None) -> Tuple[str, Optional[str]]:
+    """
+    응답 캐시를 거쳐 LLM을 호출합니다. (answer, cache_tier) 반환 — 캐시 미스면 tier는 None.
+    query/context_fp를 주면 의미 유사 캐시(LLM_SEMANTIC_CACHE=1)도 사용합니다. LLM 예외는 그대로 전파.
+    """
+    model_name = model or os.getenv("GOOGLE_MODEL") or "gemini-1.5-flash"
+    cached, tier = RESPONSE_CACHE.get(prompt, model_name, temperature, query=query, context_fp=context_fp)
+    if cached is not None:
+        return cached, tier
+    llm = create_gemini_chat_chain(model=model_name, temperature=temperature)
+    resp = llm.invoke(prompt)
+    text = getattr(resp, "content", "") or str(resp)
+    if text:
+        RESPONSE_CACHE.put(prompt, model_name, text, temperature, query=query, context_fp=context_fp)
+    return text, None
+
+
+async def ainvoke_cached(prompt: str, model: Optional[str] = None, temperature: Optional[float] = None,
+                         query: Optional[str] = None, context_fp: Optional[str] = None,
+                         hedge: bool = True) -> Tuple[str, Optional[str]]:
+    """
+    invoke_cached의 async 버전. LLM은 hedged 스트림(HEDGER)으로 받고, 캐시 조회/저장(임베딩 포함)은 스레드에서 실행.
+    같은 프롬프트가 이미 호출 중이면 그 응답을 공유합니다 (tier "inflight").
+    hedge=False면 fallback 모델로 hedge하지 않습니다 (지연에 민감하지 않은 백그라운드 호출).
+    fallback이 답해도 요청한 모델 키로 캐시합니다 (같은 프롬프트 재요청 시 재호출하지 않도록).
+    """
+    from .hedged_llm import HEDGER
     model_name = model or os.getenv("GOOGLE_MODEL") or "gemini-1.5-flash"
-    
-    # temperature 매개변수 추가
-    kwargs = {}
-    if temperature is not None:
-        kwargs["temperature"] = temperature
-        
-    return ChatGoogleGenerativeAI(model=model_name, google_api_key=google_api_key, **kwargs) # ✨ 변경된 부분: kwargs 전달
+    cached, tier = await asyncio.to_thread(RESPONSE_CACHE.get, prompt, model_name, temperature, query, context_fp)
+    if cached is not None:
+        return cached, tier
+
+    async def _call() -> str:
+        text, _ = await HEDGER.text(prompt, model=model_name, temperature=temperature, hedge=hedge)
+        if text:
+            await asyncio.to_thread(RESPONSE_CACHE.put, prompt, model_name, text, temperature, query, context_fp)
+        return text
+
+    text, shared = await _LLM_FLIGHTS.do(prompt_key(prompt, model_name, temperature), _call)
+    return text, ("inflight" if shared else None)
 
 
 def get_model_names():
@@ -43,72 +99,6 @@ def get_model_names():
     return primary, fallback
 
 
-def _build_data_context(df: Optional[pd.DataFrame], max_rows: int = 5) -> str:
-    """업로드된 DataFrame을 LLM이 이해하기 쉽게 경량 문자열로 직렬화."""
-    if df is None or not isinstance(df, pd.DataFrame) or df.empty:
-        return "NO_DATAFRAME"
-    head_csv = df.head(max_rows).to_csv(index=False)
-    dtypes_line = ", ".join([f"{c}:{str(t)}" for c, t in df.dtypes.items()])
-    return f"rows={len(df):,}, cols={len(df.columns):,}\ndtypes={dtypes_line}\npreview_csv=\n{head_csv}"
-
-
-def _ask_llm(user_msg: str) -> str:
-    """
-    Chat 탭에서 호출하는 헬퍼.
-    - 세션의 공유 데이터셋(st.session_state.dataset.df)을 우선 활용
-    - 키가 없거나 LLM 에러면 quick_summary로 우회 응답
-    """
-    # 공유 데이터셋 우선, 없으면 last_df (하위호환)
-    ds = st.session_state.get("dataset", {})
-    df = ds.get("df")
-    if df is None:
-        df = st.session_state.get("last_df")
-
-    # LLM 생성 (키 미설정 시 예외 발생)
-    try:
-        llm = create_gemini_chat_chain()
-    except Exception as e:
-        # 우회: 로컬 요약으로 친절히 응답
-        if isinstance(df, pd.DataFrame) and not df.empty:
-            try:
-                from modules.processing.eda import quick_summary
-                s = quick_summary(df)
-                null_total = sum(s.get("nulls", {}).values()) if s.get("nulls") else 0
-                return (
-                    f"[LLM 미연결] {e}\n"
-                    f"- 행/열: {s['shape']['rows']:,}/{s['shape']['cols']:,}\n"
-                    f"- 결측치 합계: {null_total}\n"
-                    "환경설정에 GOOGLE_API_KEY를 설정하면 상세 분석이 가능합니다."
-                )
-            except Exception:
-                return f"[LLM 미연결] {e}\n데이터셋 요약에도 실패했습니다."
-        return f"[LLM 미연결] {e}\n데이터셋이 없거나 비어 있습니다."
-
-    # 프롬프트 구성 (외부 템플릿 + 데이터 컨텍스트 + 사용자 질문)
-    data_ctx = _build_data_context(df)
-    prompt = f"{SYSTEM_BASE}\n\nDATAFRAME_CONTEXT:\n{data_ctx}\n\nUSER:\n{user_msg}"
-
-    try:
-        resp = llm.invoke(prompt)
-        text = getattr(resp, "content", "") or str(resp)
-        return text.strip() if text else "[LLM 오류] 응답이 비어 있습니다."
-    except Exception as e:
-        # LLM 호출 실패 시에도 친절한 우회
-        if isinstance(df, pd.DataFrame) and not df.empty:
-            try:
-                from modules.processing.eda import quick_summary
-                s = quick_summary(df)
-                null_total = sum(s.get("nulls", {}).values()) if s.get("nulls") else 0
-                return (
-                    f"[LLM 오류] {e}\n"
-                    f"- 행/열: {s['shape']['rows']:,}/{s['shape']['cols']:,}\n"
-                    f"- 결측치 합계: {null_total}\n"
-                    "키/네트워크를 확인하거나, 질문을 구체화해 주세요."
-                )
-            except Exception:
-                return f"[LLM 오류] {e}\n로컬 요약에도 실패했습니다."
-        return f"[LLM 오류] {e}\n데이터셋이 없거나 비어 있습니다."
-
 # 단독 실행 테스트 (옵션)
 if __name__ == "__main__":
     try:
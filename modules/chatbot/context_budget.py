@@ -0,0 +1,166 @@
+from __future__ import annotations
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import tiktoken
+    _HAS_TIKTOKEN = True
+except ImportError:
+    tiktoken = None
+    _HAS_TIKTOKEN = False
+
+# --- CONFIGS ---
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))   # 컨텍스트 섹션 합계 상한
+TIKTOKEN_ENCODING = os.getenv("TIKTOKEN_ENCODING", "cl100k_base")
+# 섹션별 기본 비율. 덜 쓰는 섹션의 남는 몫은 나머지 섹션에 비율대로 재분배됩니다.
+SECTION_SHARES = {"rag": 0.5, "csv": 0.35, "eda": 0.15}
+RAG_CHUNK_SEP = "\n\n---\n\n"
+TRUNCATION_MARK = " …(생략)"
+
+_ENC = None
+_ENC_FAILED = False
+_ENC_LOCK = threading.Lock()
+
+
+def _encoding():
+    """tiktoken 인코딩을 한 번만 로드. 오프라인 등으로 실패하면 근사 카운트로 대체합니다."""
+    global _ENC, _ENC_FAILED
+    if _ENC is not None or _ENC_FAILED or not _HAS_TIKTOKEN:
+        return _ENC
+    with _ENC_LOCK:
+        if _ENC is None and not _ENC_FAILED:
+            try:
+                _ENC = tiktoken.get_encoding(TIKTOKEN_ENCODING)
+            except Exception as e:
+                _ENC_FAILED = True
+                print(f"[BUDGET] tiktoken '{TIKTOKEN_ENCODING}' unavailable, using byte-length estimate: {e}")
+    return _ENC
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    enc = _encoding()
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    # 근사: cl100k 기준 영문 ~4바이트/토큰, 한글 ~3바이트/토큰
+    return max(1, len(text.encode("utf-8", errors="ignore")) // 3)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> Tuple[str, bool]:
+    """text를 max_tokens 이하로 자릅니다. (결과, 잘렸는지) 반환."""
+    if max_tokens <= 0:
+        return "", bool(text)
+    if count_tokens(text) <= max_tokens:
+        return text, False
+    enc = _encoding()
+    budget = max(0, max_tokens - count_tokens(TRUNCATION_MARK))
+    if enc is not None:
+        cut = enc.decode(enc.encode(text, disallowed_special=())[:budget])
+    else:
+        raw = text.encode("utf-8", errors="ignore")[: budget * 3]
+        cut = raw.decode("utf-8", errors="ignore")
+    # 줄 중간에서 끊기면 마지막 완전한 줄까지만
+    if "\n" in cut:
+        cut = cut[: cut.rfind("\n")]
+    return cut + TRUNCATION_MARK, True
+
+
+def allocate(needs: Dict[str, int], total: int, shares: Dict[str, float] = SECTION_SHARES) -> Dict[str, int]:
+    """
+    water-filling 배분: 비율 몫보다 적게 필요한 섹션은 필요한 만큼만 받고,
+    남는 토큰은 아직 모자란 섹션들에 비율대로 다시 나눕니다.
+    """
+    alloc = {k: 0 for k in needs}
+    pending = [k for k, n in needs.items() if n > 0]
+    remaining = total
+    while pending and remaining > 0:
+        weight = sum(shares.get(k, 0.1) for k in pending)
+        fair = {k: remaining * shares.get(k, 0.1) / weight for k in pending}
+        done = [k for k in pending if needs[k] <= fair[k]]
+        if not done:
+            for k in pending:
+                alloc[k] = int(fair[k])
+            break
+        for k in done:
+            alloc[k] = needs[k]
+            remaining -= needs[k]
+            pending.remove(k)
+    return alloc
+
+
+def rank_columns(columns: Sequence[str], query: str, nulls: Optional[Dict[str, int]] = None) -> List[str]:
+    """질의에 이름이 언급된 컬럼 → 결측이 있는 컬럼 → 나머지(원래 순서) 순으로 정렬."""
+    q = query or ""
+    nulls = nulls or {}
+
+    def _mentioned(c: str) -> bool:
+        # 영숫자/밑줄 경계로 매칭 (SENSOR_2가 SENSOR_250에 걸리지 않도록). 한글 조사는 경계로 취급.
+        return re.search(r"(?<![A-Za-z0-9_])" + re.escape(str(c)) + r"(?![A-Za-z0-9_])", q, re.IGNORECASE) is not None
+
+    def score(item: Tuple[int, str]) -> Tuple[int, int, int]:
+        i, c = item
+        mentioned = 1 if _mentioned(c) else 0
+        has_null = 1 if nulls.get(c, 0) > 0 else 0
+        return (-mentioned, -has_null, i)
+
+    return [c for _, c in sorted(enumerate(columns), key=score)]
+
+
+class ContextBudgeter:
+    """
+    프롬프트 컨텍스트(RAG 청크 / CSV 요약 / EDA 요약)를 총 토큰 예산 안에 맞춥니다.
+    RAG는 청크 단위로(순서 = MMR 순) 넣을 수 있는 만큼 넣고, 나머지 섹션은 토큰 기준으로 자릅니다.
+    fit()은 맞춘 섹션과 무엇을 얼마나 잘랐는지에 대한 report를 돌려줍니다.
+    """
+
+    def __init__(self, total_tokens: int = PROMPT_TOKEN_BUDGET, shares: Dict[str, float] = SECTION_SHARES):
+        self.total_tokens = total_tokens
+        self.shares = shares
+
+    def fit(self, rag_chunks: Sequence[str], csv_text: str, eda_text: str) -> Tuple[Dict[str, str], Dict[str, Any]]:
+        sep_tokens = count_tokens(RAG_CHUNK_SEP)
+        chunk_tokens = [count_tokens(c) for c in rag_chunks]
+        needs = {
+            "rag": sum(chunk_tokens) + sep_tokens * max(0, len(rag_chunks) - 1),
+            "csv": count_tokens(csv_text),
+            "eda": count_tokens(eda_text),
+        }
+        alloc = allocate(needs, self.total_tokens, self.shares)
+
+        kept: List[str] = []
+        used = 0
+        rag_truncated = False
+        for text, n in zip(rag_chunks, chunk_tokens):
+            cost = n + (sep_tokens if kept else 0)
+            if used + cost <= alloc["rag"]:
+                kept.append(text)
+                used += cost
+            elif not kept:
+                # 첫 청크조차 크면 잘라서라도 넣음
+                cut, rag_truncated = truncate_to_tokens(text, alloc["rag"])
+                if cut:
+                    kept.append(cut)
+                break
+            else:
+                break
+        csv_fit, csv_cut = truncate_to_tokens(csv_text, alloc["csv"])
+        eda_fit, eda_cut = truncate_to_tokens(eda_text, alloc["eda"])
+
+        sections = {"rag": RAG_CHUNK_SEP.join(kept), "csv": csv_fit, "eda": eda_fit}
+        report = {
+            "budget": self.total_tokens,
+            "tokenizer": TIKTOKEN_ENCODING if _encoding() is not None else "estimate",
+            "needed": needs,
+            "allocated": alloc,
+            "used": {k: count_tokens(v) for k, v in sections.items()},
+            "trimmed": {
+                "rag_chunks_dropped": len(rag_chunks) - len(kept),
+                "rag_chunk_truncated": rag_truncated,
+                "csv_truncated": csv_cut,
+                "eda_truncated": eda_cut,
+            },
+        }
+        return sections, report
@@ -0,0 +1,282 @@
+from __future__ import annotations
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set
+
+from .context_budget import count_tokens, truncate_to_tokens
+from ..observability.metrics import REGISTRY, record_stage
+
+# --- CONFIGS ---
+CHAT_MEMORY_DB = os.getenv("CHAT_MEMORY_DB", "data/chat_memory.sqlite3")
+RECENT_TURNS = int(os.getenv("CHAT_MEMORY_RECENT_TURNS", "4"))          # 원문 그대로 유지하는 최근 턴 수
+SUMMARIZE_BATCH = int(os.getenv("CHAT_MEMORY_SUMMARIZE_BATCH", "4"))    # 창 밖으로 밀린 턴이 이만큼 쌓이면 요약에 접어 넣음
+SUMMARY_TOKENS = int(os.getenv("CHAT_MEMORY_SUMMARY_TOKENS", "400"))    # 누적 요약 상한
+TURN_TOKENS = int(os.getenv("CHAT_MEMORY_TURN_TOKENS", "300"))          # 턴 하나(질문+답) 상한
+HISTORY_TOKENS = int(os.getenv("CHAT_MEMORY_HISTORY_TOKENS", "1500"))   # 프롬프트에 싣는 최근 턴 합계 상한
+
+SUMMARY_PROMPT = """
+다음은 사용자와 데이터 분석 어시스턴트의 대화 일부입니다. 기존 요약에 새 대화를 합쳐 요약을 갱신하세요.
+- 사용자의 목표, 다룬 데이터셋/컬럼/조건, 확인된 수치와 결론, 아직 남은 질문을 유지하세요.
+- 인사말/반복 설명은 생략하고 {max_tokens} 토큰 이내의 한국어 글머리표로 쓰세요.
+
+### 기존 요약:
+{summary}
+
+### 새 대화:
+{turns}
+
+갱신된 요약:
+"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_sessions (
+    session_id TEXT PRIMARY KEY,
+    summary TEXT NOT NULL DEFAULT '',
+    summarized_upto INTEGER NOT NULL DEFAULT 0,
+    turns INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chat_turns (
+    session_id TEXT NOT NULL,
+    turn INTEGER NOT NULL,
+    user_text TEXT NOT NULL,
+    assistant_text TEXT NOT NULL,
+    prompt_text TEXT NOT NULL,
+    tokens INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (session_id, turn)
+);
+"""
+
+SUMMARY_EVENTS = REGISTRY.counter("agent_chat_memory_summaries_total", "Rolling summary updates by outcome",
+                                  ("outcome",))
+
+
+def format_turn(user_text: str, assistant_text: str) -> str:
+    """프롬프트에 싣는 턴 한 개. TURN_TOKENS를 넘으면 답변 쪽을 자릅니다."""
+    text = f"사용자: {user_text.strip()}\n어시스턴트: {assistant_text.strip()}"
+    return truncate_to_tokens(text, TURN_TOKENS)[0]
+
+
+@dataclass
+class MemoryContext:
+    """프롬프트용 대화 기록: 누적 요약 + 예산 안에 들어가는 최근 턴(오래된 순)."""
+    session_id: str
+    summary: str = ""
+    turns: List[str] = field(default_factory=list)
+    last_turn: int = 0
+    summarized_upto: int = 0
+    tokens: int = 0
+
+    def report(self) -> Dict[str, Any]:
+        return {"session_id": self.session_id, "turn": self.last_turn, "summarized_upto": self.summarized_upto,
+                "recent_turns": len(self.turns), "tokens": self.tokens}
+
+
+class ConversationStore:
+    """
+    세션별 대화 기록 SQLite 저장소 (WAL). core 서버 워커 여러 개가 같은 파일을 써도 됩니다.
+    연결은 스레드마다 하나 (호출은 스레드풀에서).
+    """
+
+    def __init__(self, path: str = CHAT_MEMORY_DB):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def append(self, session_id: str, user_text: str, assistant_text: str) -> Dict[str, int]:
+        """턴을 추가하고 {"turn", "summarized_upto"}를 반환합니다."""
+        prompt_text = format_turn(user_text, assistant_text)
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("INSERT OR IGNORE INTO chat_sessions (session_id, created_at, updated_at) VALUES (?, ?, ?)",
+                         (session_id, now, now))
+            turns, upto = conn.execute("SELECT turns, summarized_upto FROM chat_sessions WHERE session_id = ?",
+                                       (session_id,)).fetchone()
+            turn = turns + 1
+            conn.execute("INSERT INTO chat_turns VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (session_id, turn, user_text, assistant_text, prompt_text, count_tokens(prompt_text), now))
+            conn.execute("UPDATE chat_sessions SET turns = ?, updated_at = ? WHERE session_id = ?",
+                         (turn, now, session_id))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return {"turn": turn, "summarized_upto": upto}
+
+    def load(self, session_id: str) -> MemoryContext:
+        """
+        요약 + 아직 요약에 들어가지 않은 턴 중 최근 것부터 HISTORY_TOKENS 안에서.
+        요약이 늦어져도 최대 RECENT_TURNS + SUMMARIZE_BATCH 턴만 읽으므로 프롬프트 크기는 세션 길이와 무관합니다.
+        """
+        conn = self._conn()
+        row = conn.execute("SELECT summary, summarized_upto, turns FROM chat_sessions WHERE session_id = ?",
+                           (session_id,)).fetchone()
+        if row is None:
+            return MemoryContext(session_id)
+        summary, upto, last = row
+        rows = conn.execute("SELECT prompt_text, tokens FROM chat_turns WHERE session_id = ? AND turn > ? "
+                            "ORDER BY turn DESC LIMIT ?", (session_id, upto, RECENT_TURNS + SUMMARIZE_BATCH))
+        kept: List[str] = []
+        used = count_tokens(summary)
+        budget = HISTORY_TOKENS
+        for text, tokens in rows:
+            if tokens > budget:
+                break
+            kept.append(text)
+            budget -= tokens
+            used += tokens
+        kept.reverse()
+        return MemoryContext(session_id, summary, kept, last, upto, used)
+
+    def pending(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """요약에 접어 넣을 턴이 SUMMARIZE_BATCH 이상이면 {summary, upto, turns[(turn, text)]}, 아니면 None."""
+        conn = self._conn()
+        row = conn.execute("SELECT summary, summarized_upto, turns FROM chat_sessions WHERE session_id = ?",
+                           (session_id,)).fetchone()
+        if row is None:
+            return None
+        summary, upto, last = row
+        fold_to = last - RECENT_TURNS
+        if fold_to - upto < SUMMARIZE_BATCH:
+            return None
+        turns = conn.execute("SELECT turn, prompt_text FROM chat_turns WHERE session_id = ? AND turn > ? AND turn <= ? "
+                             "ORDER BY turn", (session_id, upto, fold_to)).fetchall()
+        return {"summary": summary, "upto": upto, "fold_to": fold_to, "turns": turns}
+
+    def save_summary(self, session_id: str, summary: str, expected_upto: int, new_upto: int) -> bool:
+        """다른 워커가 먼저 갱신했으면(summarized_upto가 바뀜) 버리고 False."""
+        cur = self._conn().execute(
+            "UPDATE chat_sessions SET summary = ?, summarized_upto = ?, updated_at = ? "
+            "WHERE session_id = ? AND summarized_upto = ?", (summary, new_upto, time.time(), session_id, expected_upto))
+        return cur.rowcount == 1
+
+    def session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        row = self._conn().execute("SELECT summary, summarized_upto, turns, created_at, updated_at FROM chat_sessions "
+                                   "WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        keys = ("summary", "summarized_upto", "turns", "created_at", "updated_at")
+        return {"session_id": session_id, **dict(zip(keys, row))}
+
+    def delete(self, session_id: str) -> bool:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM chat_turns WHERE session_id = ?", (session_id,))
+            n = conn.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,)).rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return n == 1
+
+
+def _fallback_summary(summary: str, turns: List[str]) -> str:
+    """LLM 요약 실패 시: 턴마다 한 줄씩 덧붙이고 예산을 넘으면 오래된 줄부터 버립니다."""
+    lines = [ln for ln in summary.splitlines() if ln.strip()]
+    for text in turns:
+        q, _, a = text.partition("\n")
+        lines.append(f"- {q.removeprefix('사용자: ')[:120]} → {a.removeprefix('어시스턴트: ')[:160]}")
+    while len(lines) > 1 and count_tokens("\n".join(lines)) > SUMMARY_TOKENS:
+        lines.pop(0)
+    return truncate_to_tokens("\n".join(lines), SUMMARY_TOKENS)[0]
+
+
+async def _llm_summary(summary: str, turns: List[str]) -> str:
+    from .chain_factory import ainvoke_cached
+    prompt = SUMMARY_PROMPT.format(max_tokens=SUMMARY_TOKENS, summary=summary or "(없음)",
+                                   turns="\n\n".join(turns))
+    text, _ = await ainvoke_cached(prompt, hedge=False)   # 백그라운드 요약은 hedge 예산을 쓰지 않음
+    return truncate_to_tokens(text.strip(), SUMMARY_TOKENS)[0]
+
+
+class ConversationMemory:
+    """
+    세션 대화 기록: 최근 턴은 원문, 그보다 오래된 턴은 누적 요약으로.
+    - record(): 턴 저장 후, 창 밖으로 밀린 턴이 SUMMARIZE_BATCH 이상이면 백그라운드에서 요약에 접어 넣음 (응답을 기다리게 하지 않음)
+    - context(): 요약 + 최근 턴 (토큰 상한 고정) → 긴 세션에서도 프롬프트 크기/지연이 일정
+    요약은 세션당 한 번에 하나만 실행하고, 여러 워커가 동시에 요약하면 먼저 저장한 쪽만 반영합니다.
+    """
+
+    def __init__(self, store: Optional[ConversationStore] = None, summarize=_llm_summary):
+        self.store = store or ConversationStore()
+        self.summarize = summarize
+        self._running: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def context(self, session_id: Optional[str]) -> Optional[MemoryContext]:
+        if not session_id:
+            return None
+        t0 = time.perf_counter()
+        ctx = await asyncio.to_thread(self.store.load, session_id)
+        record_stage("memory_load", (time.perf_counter() - t0) * 1000)
+        return ctx
+
+    async def record(self, session_id: Optional[str], user_text: str, assistant_text: str) -> Optional[int]:
+        """턴을 저장하고 턴 번호를 반환. 요약이 필요하면 백그라운드 태스크로 시작합니다."""
+        if not session_id or not assistant_text:
+            return None
+        info = await asyncio.to_thread(self.store.append, session_id, user_text, assistant_text)
+        if info["turn"] - RECENT_TURNS - info["summarized_upto"] >= SUMMARIZE_BATCH and session_id not in self._running:
+            self._running.add(session_id)
+            task = asyncio.create_task(self._fold(session_id))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return info["turn"]
+
+    async def _fold(self, session_id: str):
+        try:
+            # 요약 중에 턴이 더 쌓였으면 이어서 한 번 더
+            while True:
+                job = await asyncio.to_thread(self.store.pending, session_id)
+                if job is None:
+                    return
+                texts = [t for _, t in job["turns"]]
+                t0 = time.perf_counter()
+                try:
+                    summary, outcome = await self.summarize(job["summary"], texts), "ok"
+                except Exception as e:
+                    print(f"[MEMORY] summary failed for {session_id}, using extractive fallback: {e}")
+                    summary, outcome = _fallback_summary(job["summary"], texts), "fallback"
+                record_stage("memory_summarize", (time.perf_counter() - t0) * 1000)
+                saved = await asyncio.to_thread(self.store.save_summary, session_id, summary, job["upto"],
+                                                job["fold_to"])
+                SUMMARY_EVENTS.inc(outcome=outcome if saved else "superseded")
+                if not saved:
+                    return
+        except Exception as e:
+            print(f"[MEMORY] summarization aborted for {session_id}: {e}")
+        finally:
+            self._running.discard(session_id)
+
+    async def drain(self):
+        """진행 중인 요약 태스크를 기다립니다 (종료 시)."""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.store.session, session_id)
+
+    async def delete(self, session_id: str) -> bool:
+        return await asyncio.to_thread(self.store.delete, session_id)
+
+
+MEMORY = ConversationMemory()
@@ -0,0 +1,92 @@
+from __future__ import annotations
+import asyncio
+import hashlib
+import os
+import random
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+try:
+    from langchain_core.messages import AIMessage, AIMessageChunk
+    _HAS_LC_CORE = True
+except ImportError:
+    AIMessage = AIMessageChunk = None
+    _HAS_LC_CORE = False
+
+# --- CONFIGS ---
+# GOOGLE_MODEL=fake (또는 fake-*) 이면 chain_factory가 Gemini 대신 이 모델을 사용합니다.
+FAKE_PREFIX = "fake"
+FAKE_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "300"))        # 첫 토큰까지 지연
+FAKE_TOKENS_PER_S = float(os.getenv("FAKE_LLM_TOKENS_PER_S", "50"))     # 이후 토큰 생성 속도 (0이면 즉시)
+FAKE_TOKENS = int(os.getenv("FAKE_LLM_TOKENS", "60"))                   # 응답 토큰 수
+FAKE_STALL_RATE = float(os.getenv("FAKE_LLM_STALL_RATE", "0"))          # 이 확률로 첫 토큰이 FAKE_LLM_STALL_MS 더 늦음 (꼬리 지연)
+FAKE_STALL_MS = float(os.getenv("FAKE_LLM_STALL_MS", "5000"))
+
+_WORDS = (
+    "데이터", "분석", "결과", "평균", "분포", "이상치", "상관", "추세", "TAG", "구간",
+    "값", "증가", "감소", "안정", "확인", "필요", "요약", "기준", "비교", "센서",
+)
+
+
+def is_fake_model(model_name: Optional[str]) -> bool:
+    return bool(model_name) and model_name.lower().startswith(FAKE_PREFIX)
+
+
+def _message(text: str, chunk: bool = False) -> Any:
+    if _HAS_LC_CORE:
+        return AIMessageChunk(content=text) if chunk else AIMessage(content=text)
+    return type("FakeMessage", (), {"content": text})()
+
+
+class FakeChatModel:
+    """
+    부하 테스트용 결정적 LLM 대역. 같은 프롬프트에는 항상 같은 답을 내며,
+    지연(FAKE_LLM_LATENCY_MS)과 토큰 속도(FAKE_LLM_TOKENS_PER_S)를 흉내냅니다.
+    FAKE_LLM_STALL_RATE > 0이면 호출마다 무작위로 첫 토큰이 멈칫합니다 (hedging 검증용 꼬리 지연).
+    invoke/ainvoke/stream/astream만 제공합니다 (이 저장소에서 쓰는 범위).
+    """
+
+    def __init__(self, model: str = FAKE_PREFIX, temperature: Optional[float] = None,
+                 latency_ms: float = FAKE_LATENCY_MS, tokens_per_s: float = FAKE_TOKENS_PER_S,
+                 n_tokens: int = FAKE_TOKENS, stall_rate: float = FAKE_STALL_RATE, stall_ms: float = FAKE_STALL_MS):
+        self.model = model
+        self.temperature = temperature
+        self.latency_s = latency_ms / 1000.0
+        self.token_s = (1.0 / tokens_per_s) if tokens_per_s > 0 else 0.0
+        self.n_tokens = n_tokens
+        self.stall_rate = stall_rate
+        self.stall_s = stall_ms / 1000.0
+
+    def _first_delay(self) -> float:
+        if self.stall_rate > 0 and random.random() < self.stall_rate:
+            return self.latency_s + self.stall_s
+        return self.latency_s
+
+    def _tokens(self, prompt: Any) -> List[str]:
+        digest = hashlib.sha256(str(prompt).encode("utf-8", errors="ignore")).digest()
+        words = [_WORDS[digest[i % len(digest)] % len(_WORDS)] for i in range(self.n_tokens)]
+        return ["[fake] "] + [w + " " for w in words[:-1]] + [words[-1] + "."]
+
+    def invoke(self, prompt: Any, *args, **kwargs) -> Any:
+        tokens = self._tokens(prompt)
+        time.sleep(self._first_delay() + self.token_s * (len(tokens) - 1))
+        return _message("".join(tokens))
+
+    async def ainvoke(self, prompt: Any, *args, **kwargs) -> Any:
+        tokens = self._tokens(prompt)
+        await asyncio.sleep(self._first_delay() + self.token_s * (len(tokens) - 1))
+        return _message("".join(tokens))
+
+    def stream(self, prompt: Any, *args, **kwargs) -> Iterator[Any]:
+        time.sleep(self._first_delay())
+        for i, tok in enumerate(self._tokens(prompt)):
+            if i and self.token_s:
+                time.sleep(self.token_s)
+            yield _message(tok, chunk=True)
+
+    async def astream(self, prompt: Any, *args, **kwargs) -> AsyncIterator[Any]:
+        await asyncio.sleep(self._first_delay())
+        for i, tok in enumerate(self._tokens(prompt)):
+            if i and self.token_s:
+                await asyncio.sleep(self.token_s)
+            yield _message(tok, chunk=True)
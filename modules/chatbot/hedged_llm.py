@@ -0,0 +1,292 @@
+from __future__ import annotations
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Tuple
+
+from ..observability.metrics import REGISTRY, record_stage
+
+# --- CONFIGS ---
+HEDGE_ENABLED = os.getenv("LLM_HEDGE", "1").lower() not in ("0", "false", "no")
+HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", "0.9"))        # 주 모델 첫 토큰 지연의 이 분위수를 넘기면 hedge
+HEDGE_MIN_MS = float(os.getenv("LLM_HEDGE_MIN_MS", "500"))             # 임계값 하한/상한
+HEDGE_MAX_MS = float(os.getenv("LLM_HEDGE_MAX_MS", "10000"))
+HEDGE_DEFAULT_MS = float(os.getenv("LLM_HEDGE_DEFAULT_MS", "3000"))    # 표본이 HEDGE_MIN_SAMPLES개 모이기 전
+HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+HEDGE_WINDOW = int(os.getenv("LLM_HEDGE_WINDOW", "200"))               # 모델별 최근 첫 토큰 지연 표본 수
+HEDGE_MAX_RATE = float(os.getenv("LLM_HEDGE_MAX_RATE", "0.1"))         # 주 호출 대비 hedge 비율 상한 (토큰 버킷)
+HEDGE_BURST = float(os.getenv("LLM_HEDGE_BURST", "3"))                 # 버킷 최대치 (연속 hedge 허용 수)
+TTFT_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0, 30.0, 60.0, float("inf"))
+
+LLM_TTFT = REGISTRY.histogram("agent_llm_ttft_seconds", "Time to first LLM token by model (hedged calls)", ("model",),
+                              buckets=TTFT_BUCKETS)
+HEDGE_EVENTS = REGISTRY.counter("agent_llm_hedge_total",
+                                "Hedged LLM calls by outcome (primary|fallback|hedged_primary|budget|failover|error)",
+                                ("outcome",))
+HEDGE_ATTEMPT_ERRORS = REGISTRY.counter("agent_llm_hedge_attempt_errors_total",
+                                        "LLM attempts that failed before the first token (start|first_token)",
+                                        ("model", "stage"))
+HEDGE_THRESHOLD = REGISTRY.gauge("agent_llm_hedge_threshold_seconds", "Current hedge threshold by primary model",
+                                 ("model",))
+
+
+class LatencyTracker:
+    """모델별 최근 HEDGE_WINDOW개 첫 토큰 지연(ms). 취소된 호출은 취소 시점까지의 경과 시간(하한)을 넣습니다."""
+
+    def __init__(self, window: int = HEDGE_WINDOW):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, model: str, ms: float):
+        with self._lock:
+            self._samples.setdefault(model, deque(maxlen=self.window)).append(ms)
+
+    def quantile(self, model: str, q: float) -> Optional[float]:
+        with self._lock:
+            values = sorted(self._samples.get(model, ()))
+        if len(values) < HEDGE_MIN_SAMPLES:
+            return None
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            snap = {m: sorted(v) for m, v in self._samples.items()}
+        return {m: {"n": len(v), "p50_ms": round(v[len(v) // 2], 1), "p90_ms": round(v[int(0.9 * len(v))], 1),
+                    "max_ms": round(v[-1], 1)} for m, v in snap.items() if v}
+
+
+class HedgeBudget:
+    """주 호출마다 max_rate만큼 적립, hedge 1회에 1 소모 (retry budget과 같은 토큰 버킷). 장애 시 호출량 폭증 방지."""
+
+    def __init__(self, max_rate: float = HEDGE_MAX_RATE, burst: float = HEDGE_BURST):
+        self.max_rate = max_rate
+        self.burst = burst
+        self._tokens = burst
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.max_rate)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+    @property
+    def tokens(self) -> float:
+        return self._tokens
+
+
+_LOGGED: set = set()
+_LOGGED_LOCK = threading.Lock()
+
+
+def _attempt_failed(model: str, stage: str, error: Exception):
+    """실패는 메트릭으로 세고, 로그는 (모델, 단계)별 처음 한 번만 (장애 중 요청마다 찍히지 않도록)."""
+    HEDGE_ATTEMPT_ERRORS.inc(model=model, stage=stage)
+    with _LOGGED_LOCK:
+        first = (model, stage) not in _LOGGED
+        _LOGGED.add((model, stage))
+    if first:
+        print(f"[HEDGE] {model} failed at {stage} (further failures only counted in "
+              f"agent_llm_hedge_attempt_errors_total): {error}")
+
+
+def _text(chunk: Any) -> str:
+    text = getattr(chunk, "content", None)
+    return str(chunk) if text is None else text
+
+
+class _Attempt:
+    """모델 1개의 스트림. first()로 첫 (비어 있지 않은) 조각을 기다리고, 이후 rest()로 나머지를 읽습니다."""
+
+    def __init__(self, model: str, llm: Any, prompt: str):
+        self.model = model
+        self.t0 = time.perf_counter()
+        self._agen = llm.astream(prompt).__aiter__()
+        self.first_task: asyncio.Task = asyncio.ensure_future(self._first())
+
+    async def _first(self) -> str:
+        async for chunk in self._agen:
+            text = _text(chunk)
+            if text:
+                return text
+        return ""
+
+    async def rest(self) -> AsyncIterator[str]:
+        async for chunk in self._agen:
+            text = _text(chunk)
+            if text:
+                yield text
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.t0) * 1000
+
+    async def cancel(self):
+        self.first_task.cancel()
+        try:
+            await self.first_task
+        except BaseException:
+            pass
+        try:
+            await self._agen.aclose()
+        except BaseException:
+            pass
+
+
+class HedgedCall:
+    """
+    한 프롬프트의 hedged 스트리밍 호출. `async for text in call.stream()` 후 call.report()로 결과 확인.
+    주 모델이 임계값 안에 첫 토큰을 못 내면(그리고 예산이 있으면) 같은 프롬프트를 fallback 모델로 보내고,
+    먼저 첫 토큰을 낸 쪽으로 끝까지 스트리밍하며 다른 쪽은 취소합니다. 첫 토큰 전 오류는 다른 모델로 넘깁니다.
+    """
+
+    def __init__(self, hedger: "Hedger", prompt: str, primary: str, fallback: Optional[str],
+                 temperature: Optional[float], hedge: bool):
+        self.hedger = hedger
+        self.prompt = prompt
+        self.primary = primary
+        # hedge=False이거나 fallback이 주 모델과 같으면 주 모델 단독 호출 (같은 모델로 hedge/failover해도 이득 없음)
+        self.hedge = hedge and bool(fallback) and fallback != primary
+        self.fallback = fallback if self.hedge else None
+        self.temperature = temperature
+        self.threshold_ms = hedger.threshold_ms(primary)
+        self.model: Optional[str] = None       # 응답한 모델
+        # primary | fallback | hedged_primary(hedge 후 주 모델이 이김) | budget(예산 부족으로 hedge 못 함) | failover
+        self.outcome: Optional[str] = None
+        self.hedged_at_ms: Optional[float] = None
+        self.ttft_ms: Optional[float] = None
+
+    def _start(self, model: str) -> _Attempt:
+        from .chain_factory import create_gemini_chat_chain
+        return _Attempt(model, create_gemini_chat_chain(model=model, temperature=self.temperature), self.prompt)
+
+    def _start_fallback(self) -> Optional[_Attempt]:
+        try:
+            return self._start(self.fallback)
+        except Exception as e:   # 예: fallback이 Gemini인데 API 키 없음 → 주 모델만 계속
+            _attempt_failed(self.fallback, "start", e)
+            self.hedge, self.fallback = False, None
+            return None
+
+    async def stream(self) -> AsyncIterator[str]:
+        t0 = time.perf_counter()
+        self.hedger.budget.deposit()
+        attempts = [self._start(self.primary)]
+        winner, first, budget_denied, last_error = None, None, False, None
+        try:
+            while winner is None and attempts:
+                can_hedge = self.hedge and len(attempts) == 1 and attempts[0].model == self.primary \
+                    and self.hedged_at_ms is None
+                timeout = None
+                if can_hedge and not budget_denied:
+                    timeout = max(self.threshold_ms - (time.perf_counter() - t0) * 1000, 0) / 1000
+                done, _ = await asyncio.wait([a.first_task for a in attempts], timeout=timeout,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # 임계값 초과: 예산이 있으면 fallback 시작, 없으면 주 모델만 계속 기다림
+                    if self.hedger.budget.try_spend():
+                        backup = self._start_fallback()
+                        if backup is not None:
+                            self.hedged_at_ms = round((time.perf_counter() - t0) * 1000, 1)
+                            attempts.append(backup)
+                    else:
+                        budget_denied = True
+                    continue
+                for a in list(attempts):
+                    if a.first_task not in done:
+                        continue
+                    try:
+                        first = a.first_task.result()
+                        winner = a
+                        break
+                    except Exception as e:
+                        last_error = e
+                        attempts.remove(a)
+                        self.hedger.tracker.observe(a.model, a.elapsed_ms())
+                        _attempt_failed(a.model, "first_token", e)
+                        # 첫 토큰 전 실패: 아직 fallback을 안 띄웠으면 예산과 무관하게 바로 넘김
+                        if not attempts and self.fallback and self.hedged_at_ms is None and a.model == self.primary:
+                            backup = self._start_fallback()
+                            if backup is not None:
+                                self.hedged_at_ms = round((time.perf_counter() - t0) * 1000, 1)
+                                attempts.append(backup)
+                                self.outcome = "failover"
+            if winner is None:
+                HEDGE_EVENTS.inc(outcome="error")
+                raise last_error or RuntimeError("LLM stream ended without a response")
+
+            self.model = winner.model
+            self.ttft_ms = round((time.perf_counter() - t0) * 1000, 1)
+            self.hedger.tracker.observe(winner.model, winner.elapsed_ms())
+            LLM_TTFT.observe(winner.elapsed_ms() / 1000, model=winner.model)
+            record_stage("llm_ttft", self.ttft_ms)
+            for a in attempts:
+                if a is not winner:
+                    # 진 쪽은 취소 시점까지 경과 시간을 하한 표본으로 (느린 주 모델의 분위수가 낮게 유지되지 않도록)
+                    self.hedger.tracker.observe(a.model, a.elapsed_ms())
+                    await a.cancel()
+            attempts = [winner]
+            if self.outcome is None:
+                if budget_denied:
+                    self.outcome = "budget"
+                elif self.hedged_at_ms is None:
+                    self.outcome = "primary"
+                else:
+                    self.outcome = "fallback" if winner.model != self.primary else "hedged_primary"
+            HEDGE_EVENTS.inc(outcome=self.outcome)
+            if first:
+                yield first
+            async for text in winner.rest():
+                yield text
+        finally:
+            for a in attempts:
+                if a is not winner:
+                    await a.cancel()
+            if winner is not None:
+                await winner.cancel()
+
+    def report(self) -> Dict[str, Any]:
+        return {"model": self.model, "outcome": self.outcome, "threshold_ms": round(self.threshold_ms, 1),
+                "hedged_at_ms": self.hedged_at_ms, "ttft_ms": self.ttft_ms}
+
+
+class Hedger:
+    """모델별 첫 토큰 지연 추적 + hedge 예산. core의 채팅 LLM 호출이 공유 (프로세스 단위)."""
+
+    def __init__(self, enabled: bool = HEDGE_ENABLED):
+        self.enabled = enabled
+        self.tracker = LatencyTracker()
+        self.budget = HedgeBudget()
+
+    def threshold_ms(self, model: str) -> float:
+        q = self.tracker.quantile(model, HEDGE_QUANTILE)
+        ms = HEDGE_DEFAULT_MS if q is None else min(max(q, HEDGE_MIN_MS), HEDGE_MAX_MS)
+        HEDGE_THRESHOLD.set(ms / 1000, model=model)
+        return ms
+
+    def call(self, prompt: str, model: Optional[str] = None, temperature: Optional[float] = None,
+             hedge: bool = True) -> HedgedCall:
+        from .chain_factory import get_model_names
+        primary, fallback = get_model_names()
+        return HedgedCall(self, prompt, model or primary, fallback, temperature, hedge and self.enabled)
+
+    async def text(self, prompt: str, model: Optional[str] = None, temperature: Optional[float] = None,
+                   hedge: bool = True) -> Tuple[str, Dict[str, Any]]:
+        """스트림을 끝까지 모아 (답변, report) 반환 — 비스트리밍 경로도 첫 토큰 기준으로 hedge."""
+        call = self.call(prompt, model, temperature, hedge)
+        parts = [t async for t in call.stream()]
+        return "".join(parts), call.report()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "budget_tokens": round(self.budget.tokens, 2),
+                "models": self.tracker.stats()}
+
+
+HEDGER = Hedger()
@@ -1,5 +1,5 @@
 # Prompt templates for the chatbot (no API calls here)
-# These are imported by chain_factory.py
+# These are imported by streamlit_chat.py
 
 SYSTEM_BASE = (
     "당신은 한국어로 답변하는 데이터 분석 어시스턴트입니다. "
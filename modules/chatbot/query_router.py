@@ -0,0 +1,235 @@
+from __future__ import annotations
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter as _Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from ..observability.metrics import REGISTRY
+
+# --- CONFIGS ---
+ROUTER_ENABLED = os.getenv("QUERY_ROUTER", "1").lower() not in ("0", "false", "no")   # 0이면 가능한 컨텍스트 전부 계산(이전 동작)
+ROUTER_LOG = os.getenv("QUERY_ROUTER_LOG", "1").lower() not in ("0", "false", "no")
+ROUTER_MIN_CONFIDENCE = float(os.getenv("QUERY_ROUTER_MIN_CONFIDENCE", "0.6"))   # 분류기 확신이 낮으면 전부 계산
+ROUTER_EXAMPLES = os.getenv("QUERY_ROUTER_EXAMPLES")   # 추가 학습 예시 JSONL ({"label": ..., "text": ...}), 선택
+NGRAM_RANGE = (2, 3)
+CLASSIFIER_SCALE = 5.0   # n-gram당 평균 로그우도 × scale로 softmax (질의 길이와 무관한 확신도)
+STAGE_EWMA_ALPHA = 0.2
+
+# 의도 → 계산할 컨텍스트 (mixed: 규칙/분류기로 정하지 못했거나 데이터+문서 둘 다)
+STAGES_BY_INTENT = {
+    "general": (),
+    "dataset": ("csv", "eda"),
+    "document": ("rag",),
+    "mixed": ("rag", "csv", "eda"),
+}
+
+# 키워드 규칙 (부분 문자열, 소문자 비교). "설명/어떤/방법"처럼 데이터 질문에도 흔한 말은 일반 규칙에 넣지 않음
+GENERAL_KWS = (
+    "차트 엔진", "엔진 차이", "인터렉티브", "인터랙티브", "정적", "altair", "matplotlib", "plotly",
+    "시각화 차이", "차이점", "뜻", "개념", "what is", "difference",
+)
+DATASET_KWS = (
+    "csv", "컬럼", "평균", "최댓값", "최솟값", "최대", "최소", "합계", "개수", "시간", "분포", "상관", "이상치",
+    "태그", "tag", "std_dt", "데이터셋", "이 데이터", "결측", "추세", "표준편차", "column", "mean", "average",
+)
+# 한 글자 키워드는 단어 전체(+조사)일 때만: "열 평균", "행이 몇 개" O / "배열", "행렬", "여행" X
+DATASET_TOKEN_RE = re.compile(r"(?<![가-힣a-z0-9])(열|행)(?:은|는|이|가|을|를|의|에|별|과|와|도|수)?(?![가-힣a-z0-9])")
+DOCUMENT_KWS = (
+    "문서", "매뉴얼", "메뉴얼", "pdf", "규정", "절차", "사양", "스펙", "가이드", "지침", "보고서에", "manual", "spec",
+)
+
+# 분류기 기본 학습 예시 (키워드 규칙이 결정하지 못한 질의용)
+SEED_EXAMPLES: Dict[str, Sequence[str]] = {
+    "general": (
+        "파이썬에서 리스트와 튜플의 차이가 뭐야", "회귀 분석이 뭔지 알려줘", "z-score가 무엇인가요",
+        "머신러닝과 딥러닝의 차이", "좋은 시각화를 만드는 팁", "안녕하세요", "고마워요",
+        "isolation forest 원리 설명해줘", "PCA는 어떻게 동작해", "what is a moving average",
+        "how does k-means work", "정규화와 표준화 차이", "p-value 해석하는 법", "데이터 분석 공부 순서 추천",
+    ),
+    "dataset": (
+        "SENSOR_1 평균 알려줘", "TAG별 평균값 비교해줘", "가장 높은 온도는 언제였어", "온도가 급격히 오른 구간 찾아줘",
+        "이상치가 많은 센서는", "지난주 압력 추이 어때", "결측치가 있는 컬럼", "두 센서의 상관관계는",
+        "업로드한 파일에서 최댓값", "몇 개의 행이 있어", "TAG_A의 최근 값", "온도 분포가 어떻게 돼",
+        "which tag has the highest pressure", "show the trend of temperature last week",
+    ),
+    "document": (
+        "탱크 운전 절차 알려줘", "매뉴얼에 나온 경보 기준은", "안전 규정에서 온도 한계는", "장비 점검 주기는 어떻게 되나요",
+        "보고서에 적힌 결론은", "밸브 교체 방법이 문서에 있어", "운전 지침의 비상 정지 조건", "설비 사양서의 최대 압력",
+        "정비 가이드의 윤활 주기", "what does the manual say about shutdown", "according to the document, the limit is",
+    ),
+}
+
+ROUTE_DECISIONS = REGISTRY.counter("agent_router_decisions_total", "Query routing decisions by intent and source",
+                                   ("intent", "source"))
+ROUTE_SAVED = REGISTRY.counter("agent_router_saved_seconds_total",
+                               "Estimated context-stage time skipped by routing (EWMA stage cost)", ("stage",))
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", (text or "").lower()).strip()
+
+
+def _ngrams(text: str) -> List[str]:
+    t = f" {_normalize(text)} "
+    return [t[i:i + n] for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1) for i in range(len(t) - n + 1)]
+
+
+class NgramClassifier:
+    """
+    문자 n-gram 다항 나이브 베이즈 (한국어/영어 혼용 질의용, 순수 파이썬). 학습/예측 모두 1ms 미만.
+    predict()는 (label, 확률)을 돌려줍니다. n-gram 수만큼 곱해지면 확률이 0/1로 쏠리므로 n-gram당 평균으로 보정합니다.
+    """
+
+    def __init__(self, examples: Dict[str, Sequence[str]], alpha: float = 0.5):
+        self.alpha = alpha
+        self.labels = list(examples)
+        self._counts: Dict[str, _Counter] = {}
+        self._totals: Dict[str, int] = {}
+        self._priors: Dict[str, float] = {}
+        vocab = set()
+        n_docs = sum(len(v) for v in examples.values())
+        for label, texts in examples.items():
+            c = _Counter(g for t in texts for g in _ngrams(t))
+            self._counts[label] = c
+            self._totals[label] = sum(c.values())
+            self._priors[label] = math.log(len(texts) / n_docs)
+            vocab.update(c)
+        self._vocab = len(vocab)
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        grams = _ngrams(text) or [" "]
+        scores = {}
+        for label in self.labels:
+            c, denom = self._counts[label], self._totals[label] + self.alpha * self._vocab
+            loglik = sum(math.log((c.get(g, 0) + self.alpha) / denom) for g in grams) / len(grams)
+            scores[label] = CLASSIFIER_SCALE * (loglik + self._priors[label] / len(grams))
+        top = max(scores.values())
+        exp = {k: math.exp(v - top) for k, v in scores.items()}
+        z = sum(exp.values())
+        label = max(exp, key=exp.get)
+        return label, exp[label] / z
+
+
+def _load_examples() -> Dict[str, List[str]]:
+    examples = {k: list(v) for k, v in SEED_EXAMPLES.items()}
+    if ROUTER_EXAMPLES and os.path.exists(ROUTER_EXAMPLES):
+        with open(ROUTER_EXAMPLES, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    if row.get("label") in examples:
+                        examples[row["label"]].append(row["text"])
+    return examples
+
+
+@dataclass
+class RouteDecision:
+    intent: str                       # general | dataset | document | mixed
+    source: str                       # rule | classifier | default | disabled
+    stages: Tuple[str, ...]           # 계산할 컨텍스트 (rag/csv/eda 중 실제로 쓸 수 있는 것)
+    skipped: Tuple[str, ...] = ()     # 쓸 수 있었지만 건너뛴 컨텍스트
+    confidence: Optional[float] = None
+    matched: List[str] = field(default_factory=list)
+    saved_ms: float = 0.0             # 건너뛴 단계의 최근 평균 소요 시간 합 (추정)
+    route_ms: float = 0.0
+
+    def use(self, stage: str) -> bool:
+        return stage in self.stages
+
+    def report(self) -> Dict[str, Any]:
+        return {"intent": self.intent, "source": self.source, "stages": list(self.stages),
+                "skipped": list(self.skipped), "confidence": self.confidence, "matched": self.matched[:5],
+                "saved_ms": round(self.saved_ms, 1), "route_ms": round(self.route_ms, 3)}
+
+
+class QueryRouter:
+    """
+    LLM 호출 전에 어떤 컨텍스트(RAG/CSV 요약/EDA)를 계산할지 정합니다.
+    1) 키워드 규칙: 문서/데이터/일반 키워드 중 한쪽만 걸리면 그대로 결정 (데이터+문서가 함께면 mixed)
+       단, 일반 규칙은 컨텍스트를 모두 건너뛰므로 분류기도 general이라고 할 때만 따르고,
+       아니면 CSV/인덱스가 있을 때 mixed로 둡니다 (데이터 질문에 데이터 없이 답하지 않도록)
+    2) 규칙이 못 정하면 문자 n-gram 분류기, 확신이 ROUTER_MIN_CONFIDENCE 미만이면 mixed(가능한 것 전부)
+    건너뛴 단계의 절약 시간은 단계별 최근 소요 시간(EWMA, observe()로 갱신)으로 추정해 메트릭/로그에 남깁니다.
+    """
+
+    def __init__(self, enabled: bool = ROUTER_ENABLED, min_confidence: float = ROUTER_MIN_CONFIDENCE):
+        self.enabled = enabled
+        self.min_confidence = min_confidence
+        self._clf: Optional[NgramClassifier] = None
+        self._lock = threading.Lock()
+        self._stage_ms: Dict[str, float] = {}
+
+    @property
+    def classifier(self) -> NgramClassifier:
+        if self._clf is None:
+            with self._lock:
+                if self._clf is None:
+                    self._clf = NgramClassifier(_load_examples())
+        return self._clf
+
+    def observe(self, stage: str, ms: float):
+        """실제로 계산한 단계의 소요 시간 (절약 시간 추정용)."""
+        prev = self._stage_ms.get(stage)
+        self._stage_ms[stage] = ms if prev is None else (1 - STAGE_EWMA_ALPHA) * prev + STAGE_EWMA_ALPHA * ms
+
+    def _rules(self, query: str) -> Tuple[Optional[str], List[str]]:
+        q = _normalize(query)
+        hits = {name: [k for k in kws if k in q]
+                for name, kws in (("general", GENERAL_KWS), ("dataset", DATASET_KWS), ("document", DOCUMENT_KWS))}
+        hits["dataset"] += [m.group(1) for m in DATASET_TOKEN_RE.finditer(q)]
+        matched = [k for v in hits.values() for k in v]
+        if hits["dataset"] and hits["document"]:
+            return "mixed", matched
+        if hits["document"]:
+            return "document", matched
+        if hits["dataset"]:
+            return "dataset", matched
+        if hits["general"]:
+            return "general", matched
+        return None, matched
+
+    def route(self, query: str, available: Sequence[str]) -> RouteDecision:
+        """available: 요청에 실제로 있는 컨텍스트 (예: index_dir 없으면 rag 제외)."""
+        t0 = time.perf_counter()
+        avail = tuple(available)
+        if not self.enabled:
+            decision = RouteDecision("mixed", "disabled", avail)
+        else:
+            intent, matched = self._rules(query)
+            source, confidence = "rule", None
+            if intent is None:
+                label, confidence = self.classifier.predict(query)
+                source = "classifier"
+                if confidence < self.min_confidence:
+                    intent, source = "mixed", "default"
+                else:
+                    intent = label
+            elif intent == "general":
+                label, confidence = self.classifier.predict(query)
+                agreed = label == "general" and confidence >= self.min_confidence
+                if not agreed and any(s in avail for s in ("csv", "rag")):
+                    intent, source = "mixed", "default"
+            wanted = STAGES_BY_INTENT[intent]
+            stages = tuple(s for s in avail if s in wanted)
+            # 데이터 질문인데 CSV/EDA가 없으면 문서라도, 문서 질문인데 인덱스가 없으면 데이터라도 사용
+            if not stages and intent in ("dataset", "document"):
+                stages = avail
+            decision = RouteDecision(intent, source, stages, tuple(s for s in avail if s not in stages),
+                                     None if confidence is None else round(confidence, 3), matched)
+        decision.saved_ms = sum(self._stage_ms.get(s, 0.0) for s in decision.skipped)
+        decision.route_ms = (time.perf_counter() - t0) * 1000
+        ROUTE_DECISIONS.inc(intent=decision.intent, source=decision.source)
+        for s in decision.skipped:
+            ROUTE_SAVED.inc(self._stage_ms.get(s, 0.0) / 1000, stage=s)
+        if ROUTER_LOG:
+            print(f"[ROUTER] intent={decision.intent} source={decision.source} stages={','.join(decision.stages) or '-'} "
+                  f"skipped={','.join(decision.skipped) or '-'} saved≈{decision.saved_ms:.0f}ms")
+        return decision
+
+
+ROUTER = QueryRouter()
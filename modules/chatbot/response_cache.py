@@ -0,0 +1,161 @@
+from __future__ import annotations
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..observability.metrics import cache_event
+
+# --- CONFIGS ---
+CACHE_TTL_S = float(os.getenv("LLM_CACHE_TTL", "3600"))             # 항목 유효 시간(초)
+CACHE_MAX_ITEMS = int(os.getenv("LLM_CACHE_MAX_ITEMS", "512"))      # 정확 일치 계층 최대 항목 수
+SEMANTIC_ENABLED = os.getenv("LLM_SEMANTIC_CACHE", "0") == "1"      # 의미 유사 계층 (질의 임베딩 1회 비용)
+SEMANTIC_THRESHOLD = float(os.getenv("LLM_SEMANTIC_THRESHOLD", "0.95"))
+SEMANTIC_MAX_ITEMS = int(os.getenv("LLM_SEMANTIC_MAX_ITEMS", "256"))
+
+
+def prompt_key(prompt: str, model: str, temperature: Optional[float]) -> str:
+    h = hashlib.sha256()
+    h.update(f"{model}\x00{temperature}\x00".encode("utf-8"))
+    h.update(prompt.encode("utf-8", errors="ignore"))
+    return h.hexdigest()
+
+
+def context_fingerprint(*parts: Any) -> str:
+    """데이터셋/인덱스 버전/EDA 요약 등 답변을 좌우하는 컨텍스트 식별자를 하나의 해시로 묶습니다."""
+    h = hashlib.sha1()
+    for p in parts:
+        h.update(repr(p).encode("utf-8", errors="ignore"))
+        h.update(b"\x00")
+    return h.hexdigest()[:16]
+
+
+def _embed_query(text: str) -> np.ndarray:
+    from ..rag.embedder import embed_texts
+    v = np.asarray(embed_texts([text], is_query=True)[0], dtype=np.float32)
+    return v / (np.linalg.norm(v) + 1e-12)
+
+
+class ResponseCache:
+    """
+    LLM 응답 캐시.
+    - exact: (model, temperature, prompt) 해시 → 답변. LRU + TTL.
+    - semantic(옵션): 같은 model/context_fp 안에서 질의 임베딩 코사인 유사도 >= threshold면 재사용.
+    오류 응답은 저장하지 않습니다 (호출 측 책임).
+    """
+
+    def __init__(self, ttl_s: float = CACHE_TTL_S, max_items: int = CACHE_MAX_ITEMS,
+                 semantic: bool = SEMANTIC_ENABLED, threshold: float = SEMANTIC_THRESHOLD,
+                 semantic_max_items: int = SEMANTIC_MAX_ITEMS):
+        self.ttl_s = ttl_s
+        self.max_items = max_items
+        self.semantic = semantic
+        self.threshold = threshold
+        self.semantic_max_items = semantic_max_items
+        self._exact: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        # (context_fp, model) → [(created, query_vec, answer)]
+        self._semantic: "OrderedDict[Tuple[str, str], List[Tuple[float, np.ndarray, str]]]" = OrderedDict()
+        self._semantic_count = 0
+        self._lock = threading.Lock()
+        self.hits = {"exact": 0, "semantic": 0}
+        self.misses = 0
+
+    def _alive(self, created: float) -> bool:
+        return (time.time() - created) < self.ttl_s
+
+    def get(self, prompt: str, model: str, temperature: Optional[float] = None,
+            query: Optional[str] = None, context_fp: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+        """(answer, tier) 반환. tier는 "exact" | "semantic" | None."""
+        key = prompt_key(prompt, model, temperature)
+        with self._lock:
+            item = self._exact.get(key)
+            if item is not None:
+                if self._alive(item[0]):
+                    self._exact.move_to_end(key)
+                    self.hits["exact"] += 1
+                    cache_event("llm_exact", True)
+                    return item[1], "exact"
+                del self._exact[key]
+        cache_event("llm_exact", False)
+
+        if self.semantic and query and context_fp:
+            bucket_key = (context_fp, model)
+            with self._lock:
+                bucket = [e for e in self._semantic.get(bucket_key, []) if self._alive(e[0])]
+            if bucket:
+                try:
+                    q = _embed_query(query)
+                    sims = np.stack([e[1] for e in bucket]) @ q
+                    best = int(np.argmax(sims))
+                    if float(sims[best]) >= self.threshold:
+                        with self._lock:
+                            self.hits["semantic"] += 1
+                        cache_event("llm_semantic", True)
+                        return bucket[best][2], "semantic"
+                    cache_event("llm_semantic", False)
+                except Exception as e:
+                    print(f"[LLM_CACHE] semantic lookup failed: {e}")
+
+        with self._lock:
+            self.misses += 1
+        return None, None
+
+    def put(self, prompt: str, model: str, answer: str, temperature: Optional[float] = None,
+            query: Optional[str] = None, context_fp: Optional[str] = None):
+        if not answer:
+            return
+        now = time.time()
+        key = prompt_key(prompt, model, temperature)
+        with self._lock:
+            self._exact[key] = (now, answer)
+            self._exact.move_to_end(key)
+            while len(self._exact) > self.max_items:
+                self._exact.popitem(last=False)
+
+        if self.semantic and query and context_fp:
+            try:
+                vec = _embed_query(query)
+            except Exception as e:
+                print(f"[LLM_CACHE] semantic put skipped: {e}")
+                return
+            bucket_key = (context_fp, model)
+            with self._lock:
+                bucket = [e for e in self._semantic.pop(bucket_key, []) if self._alive(e[0])]
+                bucket.append((now, vec, answer))
+                self._semantic[bucket_key] = bucket
+                self._semantic_count = sum(len(b) for b in self._semantic.values())
+                # 오래된 버킷부터 비우고, 남으면 버킷 내 오래된 항목부터 제거
+                while self._semantic_count > self.semantic_max_items and self._semantic:
+                    oldest_key = next(iter(self._semantic))
+                    oldest = self._semantic[oldest_key]
+                    oldest.pop(0)
+                    self._semantic_count -= 1
+                    if not oldest:
+                        del self._semantic[oldest_key]
+
+    def clear(self):
+        with self._lock:
+            self._exact.clear()
+            self._semantic.clear()
+            self._semantic_count = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.misses + sum(self.hits.values())
+            return {
+                "exact_items": len(self._exact),
+                "semantic_items": self._semantic_count,
+                "semantic_enabled": self.semantic,
+                "ttl_s": self.ttl_s,
+                "hits": dict(self.hits),
+                "misses": self.misses,
+                "hit_rate": round(sum(self.hits.values()) / total, 4) if total else None,
+            }
+
+
+# 프로세스 공용 캐시
+RESPONSE_CACHE = ResponseCache()
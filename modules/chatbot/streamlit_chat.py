@@ -0,0 +1,84 @@
+"""
+Streamlit Chat 탭 전용 헬퍼 (st.session_state 사용).
+서버(core_logic_server)가 import하는 chain_factory에서 분리해, 서버 프로세스는 streamlit을 불러오지 않습니다.
+"""
+from typing import Optional
+import pandas as pd
+import streamlit as st
+
+from .chain_factory import create_gemini_chat_chain, invoke_cached
+
+# 프롬프트는 별도 파일에서 가져옵니다 (중복 정의 X)
+try:
+    from .prompt_templates import SYSTEM_BASE  # 프로젝트에 이미 존재
+except Exception:
+    SYSTEM_BASE = (
+        "당신은 한국어로 답변하는 데이터 분석 어시스턴트입니다. "
+        "데이터프레임 컨텍스트(행/열 수, dtypes, 미리보기)를 활용해 간결하고 논리적으로 답하세요."
+    )
+
+
+def _build_data_context(df: Optional[pd.DataFrame], max_rows: int = 5) -> str:
+    """업로드된 DataFrame을 LLM이 이해하기 쉽게 경량 문자열로 직렬화."""
+    if df is None or not isinstance(df, pd.DataFrame) or df.empty:
+        return "NO_DATAFRAME"
+    head_csv = df.head(max_rows).to_csv(index=False)
+    dtypes_line = ", ".join([f"{c}:{str(t)}" for c, t in df.dtypes.items()])
+    return f"rows={len(df):,}, cols={len(df.columns):,}\ndtypes={dtypes_line}\npreview_csv=\n{head_csv}"
+
+
+def _ask_llm(user_msg: str) -> str:
+    """
+    Chat 탭에서 호출하는 헬퍼.
+    - 세션의 공유 데이터셋(st.session_state.dataset.df)을 우선 활용
+    - 키가 없거나 LLM 에러면 quick_summary로 우회 응답
+    """
+    # 공유 데이터셋 우선, 없으면 last_df (하위호환)
+    ds = st.session_state.get("dataset", {})
+    df = ds.get("df")
+    if df is None:
+        df = st.session_state.get("last_df")
+
+    # LLM 생성 (키 미설정 시 예외 발생)
+    try:
+        llm = create_gemini_chat_chain()
+    except Exception as e:
+        # 우회: 로컬 요약으로 친절히 응답
+        if isinstance(df, pd.DataFrame) and not df.empty:
+            try:
+                from modules.processing.eda import quick_summary
+                s = quick_summary(df)
+                null_total = sum(s.get("nulls", {}).values()) if s.get("nulls") else 0
+                return (
+                    f"[LLM 미연결] {e}\n"
+                    f"- 행/열: {s['shape']['rows']:,}/{s['shape']['cols']:,}\n"
+                    f"- 결측치 합계: {null_total}\n"
+                    "환경설정에 GOOGLE_API_KEY를 설정하면 상세 분석이 가능합니다."
+                )
+            except Exception:
+                return f"[LLM 미연결] {e}\n데이터셋 요약에도 실패했습니다."
+        return f"[LLM 미연결] {e}\n데이터셋이 없거나 비어 있습니다."
+
+    # 프롬프트 구성 (외부 템플릿 + 데이터 컨텍스트 + 사용자 질문)
+    data_ctx = _build_data_context(df)
+    prompt = f"{SYSTEM_BASE}\n\nDATAFRAME_CONTEXT:\n{data_ctx}\n\nUSER:\n{user_msg}"
+
+    try:
+        text, _ = invoke_cached(prompt)
+        return text.strip() if text else "[LLM 오류] 응답이 비어 있습니다."
+    except Exception as e:
+        # LLM 호출 실패 시에도 친절한 우회
+        if isinstance(df, pd.DataFrame) and not df.empty:
+            try:
+                from modules.processing.eda import quick_summary
+                s = quick_summary(df)
+                null_total = sum(s.get("nulls", {}).values()) if s.get("nulls") else 0
+                return (
+                    f"[LLM 오류] {e}\n"
+                    f"- 행/열: {s['shape']['rows']:,}/{s['shape']['cols']:,}\n"
+                    f"- 결측치 합계: {null_total}\n"
+                    "키/네트워크를 확인하거나, 질문을 구체화해 주세요."
+                )
+            except Exception:
+                return f"[LLM 오류] {e}\n로컬 요약에도 실패했습니다."
+        return f"[LLM 오류] {e}\n데이터셋이 없거나 비어 있습니다."
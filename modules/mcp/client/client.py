@@ -1,5 +1,15 @@
-import httpx
+import asyncio
 import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import httpx
+
+from modules.observability.metrics import REQUEST_ID_HEADER, current_request_id, record_stage
+from modules.observability.profiling import forward_headers
+from modules.runtime.retry import RETRY_STATUSES, retryable_error
 
 # 서버 주소를 환경 변수에서 읽거나 기본값을 사용합니다.
 CORE_LOGIC_SERVER_URL = os.getenv("CORE_LOGIC_SERVER_URL", "http://localhost:8001")
@@ -11,10 +21,59 @@ SERVER_MAP = {
     "ai.agent.data_tools": DATA_TOOLS_SERVER_URL,
 }
 
+# --- CONFIGS ---
+MCP_MAX_CONNECTIONS = int(os.getenv("MCP_MAX_CONNECTIONS", "50"))     # 서버당 커넥션 풀 크기
+MCP_MAX_KEEPALIVE = int(os.getenv("MCP_MAX_KEEPALIVE", "10"))
+MCP_CONNECT_TIMEOUT = float(os.getenv("MCP_CONNECT_TIMEOUT", "2"))
+MCP_RETRIES = int(os.getenv("MCP_RETRIES", "2"))                      # 연결 단계 오류/502/503 재시도 횟수
+MCP_TOOLS_TTL = float(os.getenv("MCP_TOOLS_TTL", "300"))              # 툴 목록 캐시 유효 시간(초)
+
+CallSpec = Union[Tuple[str, dict], Dict[str, Any]]
+
+
+def _resolve(tool_fqn: str) -> Tuple[str, str, str]:
+    """'ai.agent.core_logic/rag_search' → (server_name, base_url, endpoint)."""
+    server_name, _, endpoint = tool_fqn.partition("/")
+    base_url = SERVER_MAP.get(server_name)
+    if not base_url or not endpoint:
+        raise ValueError(f"Unknown MCP server: {server_name}")
+    return server_name, base_url.rstrip("/"), endpoint
+
+
+def _headers() -> Dict[str, str]:
+    """현재 요청의 request id를 MCP 서버로 전달 (게이트웨이/서버 로그 연결용). 프로파일 중이면 프로파일 헤더도."""
+    rid = current_request_id()
+    return {**({REQUEST_ID_HEADER: rid} if rid else {}), **forward_headers()}
+
+
+def _backoff(attempt: int) -> float:
+    return min(0.1 * (2 ** (attempt - 1)), 1.0) * (0.5 + random.random())
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(max_connections=MCP_MAX_CONNECTIONS, max_keepalive_connections=MCP_MAX_KEEPALIVE)
+
+
+# ---------- 동기 호출 (기존 API) ----------
+_SYNC_CLIENTS: Dict[str, httpx.Client] = {}
+_SYNC_LOCK = threading.Lock()
+
+
+def _sync_client(base_url: str) -> httpx.Client:
+    """서버별 keep-alive 커넥션 풀을 프로세스에서 공유합니다 (호출마다 Client를 만들지 않음)."""
+    client = _SYNC_CLIENTS.get(base_url)
+    if client is None:
+        with _SYNC_LOCK:
+            client = _SYNC_CLIENTS.get(base_url)
+            if client is None:
+                client = _SYNC_CLIENTS[base_url] = httpx.Client(base_url=base_url, limits=_limits())
+    return client
+
+
 def call(tool_fqn: str, args: dict, timeout: int = 60):
     """
     Calls an MCP tool using standard HTTP requests.
-    
+
     Args:
         tool_fqn: The fully-qualified name of the tool, e.g., 'ai.agent.core_logic/chat_with_context'.
         args: A dictionary of arguments for the tool.
@@ -24,18 +83,12 @@ def call(tool_fqn: str, args: dict, timeout: int = 60):
         The JSON response from the server.
     """
     try:
-        server_name, endpoint = tool_fqn.split('/')
-        base_url = SERVER_MAP.get(server_name)
-
-        if not base_url:
-            raise ValueError(f"Unknown MCP server: {server_name}")
-
-        url = f"{base_url}/tools/{endpoint}"
-        
-        with httpx.Client(timeout=timeout) as client:
-            response = client.post(url, json=args)
-            response.raise_for_status()  # HTTP 4xx/5xx 에러 발생 시 예외 처리
-            return response.json()
+        _, base_url, endpoint = _resolve(tool_fqn)
+        client = _sync_client(base_url)
+        response = client.post(f"/tools/{endpoint}", json=args, headers=_headers(),
+                               timeout=httpx.Timeout(timeout, connect=MCP_CONNECT_TIMEOUT))
+        response.raise_for_status()  # HTTP 4xx/5xx 에러 발생 시 예외 처리
+        return response.json()
 
     except httpx.RequestError as e:
         # 네트워크 관련 예외 처리
@@ -43,3 +96,152 @@ def call(tool_fqn: str, args: dict, timeout: int = 60):
     except (ValueError, httpx.HTTPStatusError) as e:
         # 설정 또는 서버 상태 관련 예외 처리
         raise RuntimeError(f"MCP call failed for {tool_fqn}: {e}") from e
+
+
+# ---------- 비동기 클라이언트 ----------
+class AsyncMCPClient:
+    """
+    SERVER_MAP의 서버마다 httpx.AsyncClient(keep-alive 풀) 하나를 유지하는 비동기 MCP 클라이언트.
+    - call: 응답 전 연결 오류(ConnectError/ConnectTimeout/RemoteProtocolError)와 502/503만 지수 백오프(+지터)로
+      재시도. ReadTimeout/504는 서버가 이미 툴을 실행했을 수 있으므로 재시도하지 않음, 4xx는 바로 실패
+    - call_many: 서로 독립적인 툴 호출을 동시에 실행 → 전체 시간 ≈ 가장 느린 호출
+    - list_tools: 서버의 /openapi.json에서 /tools/* 목록을 읽어 TTL 동안 캐시
+
+        async with AsyncMCPClient() as mcp:
+            eda, docs = await mcp.call_many([
+                ("ai.agent.data_tools/eda_profile", {"dataset_id": ds_id}),
+                ("ai.agent.core_logic/rag_search", {"query": q}),
+            ])
+    """
+
+    def __init__(self, servers: Optional[Dict[str, str]] = None, retries: int = MCP_RETRIES,
+                 tools_ttl: float = MCP_TOOLS_TTL):
+        self.servers = dict(servers or SERVER_MAP)
+        self.retries = retries
+        self.tools_ttl = tools_ttl
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._tools: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+    async def __aenter__(self) -> "AsyncMCPClient":
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    def _client(self, server_name: str) -> httpx.AsyncClient:
+        client = self._clients.get(server_name)
+        if client is None:
+            base_url = self.servers.get(server_name)
+            if not base_url:
+                raise ValueError(f"Unknown MCP server: {server_name}")
+            client = self._clients[server_name] = httpx.AsyncClient(base_url=base_url.rstrip("/"), limits=_limits())
+        return client
+
+    async def aclose(self):
+        clients, self._clients = list(self._clients.values()), {}
+        for c in clients:
+            await c.aclose()
+
+    async def call(self, tool_fqn: str, args: Optional[dict] = None, timeout: float = 60,
+                   retries: Optional[int] = None) -> Any:
+        """툴 1개 호출. timeout은 재시도를 포함한 전체 상한(초)입니다."""
+        server_name, _, endpoint = tool_fqn.partition("/")
+        if not endpoint:
+            raise RuntimeError(f"MCP call failed for {tool_fqn}: tool name must be '<server>/<tool>'")
+        try:
+            return await asyncio.wait_for(self._call(server_name, endpoint, args or {}, timeout,
+                                                     self.retries if retries is None else retries), timeout)
+        except asyncio.TimeoutError as e:
+            raise RuntimeError(f"MCP call timed out for {tool_fqn} after {timeout}s") from e
+        except httpx.RequestError as e:
+            raise RuntimeError(f"MCP network error calling {tool_fqn}: {e}") from e
+        except (ValueError, httpx.HTTPStatusError) as e:
+            raise RuntimeError(f"MCP call failed for {tool_fqn}: {e}") from e
+
+    async def _call(self, server_name: str, endpoint: str, args: dict, timeout: float, retries: int) -> Any:
+        client = self._client(server_name)
+        attempt = 0
+        while True:
+            t0 = time.perf_counter()
+            started = False
+            try:
+                req = client.build_request("POST", f"/tools/{endpoint}", json=args, headers=_headers(),
+                                           timeout=httpx.Timeout(timeout, connect=MCP_CONNECT_TIMEOUT))
+                r = await client.send(req, stream=True)
+                started = True
+                try:
+                    await r.aread()
+                finally:
+                    await r.aclose()
+            except httpx.TransportError as e:
+                if attempt >= retries or not retryable_error(e, started):
+                    raise
+            else:
+                record_stage(f"mcp.{endpoint}", (time.perf_counter() - t0) * 1000)
+                if r.status_code not in RETRY_STATUSES or attempt >= retries:
+                    r.raise_for_status()
+                    return r.json()
+            attempt += 1
+            await asyncio.sleep(_backoff(attempt))
+
+    async def call_many(self, calls: Sequence[CallSpec], timeout: float = 60,
+                        return_exceptions: bool = False) -> List[Any]:
+        """
+        독립적인 호출들을 동시에 실행하고 입력 순서대로 결과를 돌려줍니다.
+        calls 항목: (tool_fqn, args) 또는 {"tool": ..., "args": ..., "timeout": ..., "retries": ...}.
+        return_exceptions=True면 실패한 자리에 예외 객체를 넣고 나머지 결과는 그대로 반환합니다.
+        """
+        coros = []
+        for spec in calls:
+            if isinstance(spec, dict):
+                coros.append(self.call(spec["tool"], spec.get("args"), spec.get("timeout", timeout),
+                                       spec.get("retries")))
+            else:
+                tool_fqn, args = spec
+                coros.append(self.call(tool_fqn, args, timeout))
+        return list(await asyncio.gather(*coros, return_exceptions=return_exceptions))
+
+    async def list_tools(self, server_name: Optional[str] = None, refresh: bool = False) -> Dict[str, Any]:
+        """
+        {tool_fqn: {"summary", "input_schema"}}. server_name을 생략하면 모든 서버를 동시에 조회합니다.
+        조회에 실패한 서버는 빈 목록으로 두고 캐시하지 않습니다.
+        """
+        names = [server_name] if server_name else list(self.servers)
+        results = await asyncio.gather(*(self._server_tools(n, refresh) for n in names))
+        out: Dict[str, Any] = {}
+        for tools in results:
+            out.update(tools)
+        return out
+
+    async def _server_tools(self, server_name: str, refresh: bool) -> Dict[str, Any]:
+        cached = self._tools.get(server_name)
+        if cached and not refresh and (time.monotonic() - cached[0]) < self.tools_ttl:
+            return cached[1]
+        try:
+            r = await self._client(server_name).get("/openapi.json", timeout=10)
+            r.raise_for_status()
+            spec = r.json()
+        except (httpx.HTTPError, ValueError) as e:
+            print(f"[MCP] tool discovery failed for {server_name}: {e}")
+            return {}
+        tools = _tools_from_openapi(server_name, spec)
+        self._tools[server_name] = (time.monotonic(), tools)
+        return tools
+
+
+def _tools_from_openapi(server_name: str, spec: Dict[str, Any]) -> Dict[str, Any]:
+    schemas = (spec.get("components") or {}).get("schemas") or {}
+    tools: Dict[str, Any] = {}
+    for path, ops in (spec.get("paths") or {}).items():
+        if not path.startswith("/tools/") or "post" not in ops:
+            continue
+        op = ops["post"]
+        body = (((op.get("requestBody") or {}).get("content") or {}).get("application/json") or {}).get("schema")
+        ref = (body or {}).get("$ref", "")
+        if ref.startswith("#/components/schemas/"):
+            body = schemas.get(ref.rsplit("/", 1)[-1], body)
+        tools[f"{server_name}/{path[len('/tools/'):]}"] = {
+            "summary": op.get("summary") or op.get("description") or "",
+            "input_schema": body,
+        }
+    return tools
@@ -2,18 +2,33 @@
 import sys, os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
 
-import base64, io
-from typing import Optional, List, Dict
-import pandas as pd
-
-from fastapi import FastAPI
+import asyncio, base64, hashlib, json, time
+from contextlib import asynccontextmanager
+from typing import Optional, List, Dict, Any, Tuple, Union
+
+import httpx
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 from dotenv import load_dotenv
 
-from ...rag.retriever import retrieve, CustomEmbeddings
-from ...chatbot.chain_factory import create_gemini_chat_chain
-from langchain_community.vectorstores import FAISS
+from ...rag.embedder import embed_texts, warm_embedder
+from ...rag.shared_index import open_index, INDEXES
+from ...chatbot.chain_factory import create_gemini_chat_chain, ainvoke_cached, get_model_names
+from ...chatbot.hedged_llm import HEDGER
+from ...chatbot.response_cache import RESPONSE_CACHE, context_fingerprint
+from ...chatbot.context_budget import ContextBudgeter, rank_columns, count_tokens
+from ...chatbot.conversation_memory import MEMORY, MemoryContext
+from ...chatbot.query_router import ROUTER
+from ...processing.aggregate_plan import is_aggregate_question, describe_spec, format_table
+from ..client.client import AsyncMCPClient
+from ...runtime.singleflight import SingleFlight
+from ...runtime.compression import CompressionMiddleware
+from ...runtime.warmup import Warmup
+from ...observability.metrics import install as install_metrics, stage, record_stage, current_stages, server_timing
+from ...observability.profiling import install as install_profiling
 
 # ---------- Schemas ----------
 class ChatWithContextParams(BaseModel):
@@ -22,11 +37,18 @@ class ChatWithContextParams(BaseModel):
     rag_index_exists: bool = False
     index_dir: Optional[str] = None
     eda_context: Optional[str] = None
+    session_id: Optional[str] = None   # 있으면 대화 기록(요약 + 최근 턴)을 프롬프트에 싣고 이번 턴을 저장
+    dataset_id: Optional[str] = None   # data_tools 캐시 데이터셋 (집계 질문은 이 데이터셋에서 정확히 계산)
+    _csv_raw: Optional[bytes] = PrivateAttr(default=None)   # raw-body 변형(/csv)으로 받은 CSV 바이트
+
+    def csv_payload(self) -> Optional[Union[str, bytes]]:
+        return self._csv_raw or self.csv_data_b64
 
 class RAGQueryResponse(BaseModel):
     answer: str
     sources: str
     query: str
+    session_id: Optional[str] = None
 
 class RagSearchParams(BaseModel):
     query: str
@@ -42,11 +64,18 @@ PROMPT_TEMPLATE = """
 - 의도가 '데이터셋 관련 분석'이면: 제공된 CSV/EDA/RAG 컨텍스트를 우선적으로 활용해 간결하고 근거 있는 답변을 하세요.
 - 정보가 부족하면 필요한 추가 정보를 1문장 질문으로 요청하세요.
 - CSV 요약이 있을 때는 핵심 지표(TAG 분포, 주요 수치형 평균/최솟값/최댓값, 시간 범위)를 최대 3~5줄로 간단히 먼저 정리하고 답변을 이어가세요.
+- 이전 대화가 있으면 후속 질문의 지시어('그 컬럼', '앞의 결과' 등)를 이전 대화 기준으로 해석하세요.
 
 {rag_notice}
 의도: {user_intent}
 --- 컨텍스트 시작 ---
 
+### 이전 대화 요약:
+{history_summary}
+
+### 최근 대화:
+{history_recent}
+
 ### 문서 발췌(RAG):
 {rag_context}
 
@@ -63,9 +92,81 @@ PROMPT_TEMPLATE = """
 답변:
 """
 
+# 컨텍스트 단계별 마감 시간(초). 넘기면 해당 컨텍스트 없이 답변합니다.
+RAG_DEADLINE_S = float(os.getenv("CHAT_RAG_DEADLINE_S", "5"))
+CSV_DEADLINE_S = float(os.getenv("CHAT_CSV_DEADLINE_S", "10"))
+AGG_DEADLINE_S = float(os.getenv("CHAT_AGG_DEADLINE_S", "3"))   # 집계 질문의 정확 계산 (data_tools /tools/aggregate)
+# RAG: 후보 FETCH_K개 중 MMR로 K개 선택 → 토큰 예산 안에서 앞에서부터 사용
+RAG_K = int(os.getenv("CHAT_RAG_K", "5"))
+RAG_FETCH_K = int(os.getenv("CHAT_RAG_FETCH_K", "20"))
+# CSV 요약에서 컬럼별 목록(dtype/수치 요약/샘플)에 싣는 최대 컬럼 수 (질의 관련도 순)
+CSV_MAX_COLUMNS = int(os.getenv("CHAT_CSV_MAX_COLUMNS", "20"))
+CSV_NUMERIC_SUMMARY_COLS = 6
+CSV_SAMPLE_COLS = 8
+
 # ---------- FastAPI app ----------
 load_dotenv()  # Load .env for this server process (embeddings/LLM keys)
-app = FastAPI(title="ai.agent.core_logic", description="Core logic server for orchestrating AI capabilities.")
+
+# data_tools 호출용 (서버별 keep-alive 풀, lifespan 종료 시 닫음)
+MCP = AsyncMCPClient()
+
+# ---------- Warm-up (readiness) ----------
+WARMUP = Warmup("core")
+
+@WARMUP.step("imports")
+def _warm_imports():
+    # 요청 경로에서 lazy import되는 모듈들: CSV 요약(pandas/pyarrow), 인덱스 검색 결과(LangChain Document/MMR)
+    import pandas  # noqa: F401
+    from ...processing import ingest  # noqa: F401
+    from langchain_core.documents import Document  # noqa: F401
+    from langchain_community.vectorstores.utils import maximal_marginal_relevance  # noqa: F401
+
+@WARMUP.step("rag_index")
+def _warm_rag_index():
+    # 기본 인덱스를 mmap으로 열고 페이지 캐시에 올림 (--workers N이면 워커마다 실행, 페이지는 공유)
+    return INDEXES.preload()
+
+@WARMUP.step("embedder")
+def _warm_embedder():
+    return warm_embedder()
+
+@WARMUP.step("llm_client")
+def _warm_llm_client():
+    primary, fallback = get_model_names()
+    create_gemini_chat_chain(model=primary)
+    if HEDGER.enabled and fallback and fallback != primary:
+        try:   # hedge 시점에 fallback 클라이언트 생성 비용이 붙지 않도록
+            create_gemini_chat_chain(model=fallback)
+        except ValueError as e:
+            print(f"[WARMUP] fallback {fallback} unavailable: {e}")
+    return primary
+
+@WARMUP.step("tokenizer")
+def _warm_tokenizer():
+    return count_tokens("warm-up")
+
+@WARMUP.step("query_router")
+def _warm_query_router():
+    return len(ROUTER.classifier.labels)
+
+@WARMUP.step("mcp_client")
+def _warm_mcp_client():
+    # data_tools용 httpx 클라이언트 생성(SSL 컨텍스트 로드 ~200ms)을 첫 집계 질문 경로에서 제거
+    MCP._client("ai.agent.data_tools")
+    return "ai.agent.data_tools"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    WARMUP.start()   # 백그라운드 실행: /health는 즉시, /ready는 warm-up 완료 후 200
+    try:
+        yield
+    finally:
+        await WARMUP.stop()
+        await MEMORY.drain()   # 진행 중인 대화 요약 저장
+        await MCP.aclose()
+
+app = FastAPI(title="ai.agent.core_logic", description="Core logic server for orchestrating AI capabilities.",
+              lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -76,24 +177,53 @@ app.add_middleware(
     expose_headers=["*"],
     max_age=600,
 )
+install_metrics(app, "core")
+install_profiling(app, "core")   # PROFILING_TOKEN이 있을 때만
+app.add_middleware(CompressionMiddleware)   # 계측 미들웨어 바깥: 압축 시간도 Server-Timing에 덧붙임
+
+# ---------- Context helpers ----------
+# 프롬프트의 '의도' 줄 (의도 판단은 query_router가 컨텍스트 계산 전에 수행)
+INTENT_LABELS = {"general": "일반/개념 설명", "dataset": "데이터셋 관련 분석", "document": "문서 관련 질문",
+                 "mixed": "데이터셋 관련 분석"}
+
+def _index_version(idx_dir: Optional[str]) -> Optional[float]:
+    """FAISS 인덱스 파일 수정 시각. 재인덱싱되면 캐시 컨텍스트가 달라집니다."""
+    if not idx_dir:
+        return None
+    try:
+        return os.path.getmtime(os.path.join(idx_dir, "index.faiss"))
+    except OSError:
+        return None
+
+def _chat_context_fp(params: ChatWithContextParams, memory: Optional[MemoryContext] = None) -> str:
+    csv_digest = params.dataset_id
+    payload = params.csv_payload()
+    if payload:
+        raw = payload if isinstance(payload, bytes) else payload.encode("ascii", errors="ignore")
+        csv_digest = hashlib.sha1(raw).hexdigest()
+    # 대화 기록이 있으면 같은 질문이라도 턴마다 다른 컨텍스트 (의미 캐시가 이전 턴 답을 재사용하지 않도록)
+    history = (memory.session_id, memory.last_turn, memory.summarized_upto) if memory else None
+    return context_fingerprint(csv_digest, params.index_dir, _index_version(params.index_dir),
+                               params.rag_index_exists, params.eda_context, history)
+
+def _rag_attempted(params: ChatWithContextParams) -> bool:
+    idx_dir = getattr(params, "index_dir", None)
+    return bool(idx_dir and os.path.isdir(idx_dir)) or params.rag_index_exists
 
-# ---------- Endpoints ----------
-@app.post("/tools/chat_with_context", response_model=RAGQueryResponse)
-def chat_with_context(params: ChatWithContextParams) -> RAGQueryResponse:
-    user_query = params.user_query
-    csv_data_b64 = params.csv_data_b64
-
+def _rag_context(params: ChatWithContextParams) -> List[str]:
+    """RAG 검색(인덱스 로드 → 질의 임베딩 → MMR 검색) 결과 청크 목록(MMR 순). 실패 시 빈 목록."""
     # 기본: RAG 컨텍스트는 비워서 LLM이 사과/거절을 생성하지 않도록 한다
-    rag_context = ""
-    attempted_rag = False
+    chunks: List[str] = []
     # 우선순위: 클라이언트에서 전달된 index_dir 사용 (LangChain FAISS 포맷)
     idx_dir = getattr(params, "index_dir", None)
     if idx_dir and os.path.isdir(idx_dir):
-        attempted_rag = True
         try:
-            embeddings = CustomEmbeddings()
-            store = FAISS.load_local(idx_dir, embeddings=embeddings, allow_dangerous_deserialization=True)
-            hits = store.similarity_search(user_query, k=5)
+            with stage("rag_index_load"):
+                store = open_index(idx_dir)   # 워커 간 공유 mmap 인덱스 (프로세스당 한 번 열고 재사용)
+            with stage("rag_embed"):
+                qvec = embed_texts([params.user_query], is_query=True)[0]
+            with stage("rag_search"):
+                hits = store.max_marginal_relevance_search_by_vector(qvec, k=RAG_K, fetch_k=RAG_FETCH_K)
             texts: List[str] = []
             for h in hits:
                 if hasattr(h, "page_content"):
@@ -102,140 +232,307 @@ def chat_with_context(params: ChatWithContextParams) -> RAGQueryResponse:
                     texts.append(h.get("text") or h.get("page_content") or "")
                 else:
                     texts.append(str(h))
-            if texts:
-                rag_context = "\n\n---\n\n".join(texts)
+            chunks = [t for t in texts if t]
         except Exception as e:
             # 서버 로그로만 남기고 프롬프트에는 노출하지 않음
             print(f"[RAG] load/search failed for index_dir={idx_dir}: {e}")
-            rag_context = ""
+            chunks = []
     elif params.rag_index_exists:
         # 호환성: index_dir를 받지 못했지만 서버 기본 검색기가 설정되어 있는 경우
-        attempted_rag = True
         try:
-            hits = retrieve(user_query, k=5)
+            from ...rag.retriever import retrieve   # LangChain Embeddings 기반 모듈 (import가 무거워 필요할 때만)
+            with stage("rag_retrieve"):
+                hits = retrieve(params.user_query, k=RAG_K, fetch_k=RAG_FETCH_K)
             items: List[str] = []
             for h in hits:
                 if hasattr(h, "page_content"):
                     items.append(h.page_content)
                 elif isinstance(h, dict):
                     items.append(h.get("text") or h.get("page_content") or "")
-            if items:
-                rag_context = "\n\n---\n\n".join(items)
+            chunks = [t for t in items if t]
         except Exception as e:
             print(f"[RAG] fallback retrieve failed: {e}")
-            rag_context = ""
-
-    csv_context = "(해당 없음)"
-    if csv_data_b64:
-        try:
-            decoded = base64.b64decode(csv_data_b64)
-            df = pd.read_csv(io.BytesIO(decoded))
-
-            n_rows, n_cols = map(int, df.shape)
-            cols = df.columns.tolist()
-            dtypes: Dict[str, str] = df.dtypes.astype(str).to_dict()
-            nulls: Dict[str, int] = df.isna().sum().astype(int).to_dict()
-
-            # 숫자형 요약(상위 6개만)
-            num_cols = df.select_dtypes(include=["number"]).columns.tolist()
-            num_cols_show = num_cols[:6]
-            num_summ_lines = []
-            for c in num_cols_show:
-                s = df[c]
+            chunks = []
+    return chunks
+
+def _csv_context(csv_data: Union[str, bytes], query: str = "") -> str:
+    """
+    업로드 CSV(base64 문자열 또는 원본 바이트)를 디코드/파싱해 LLM용 요약 문자열로 만듭니다.
+    컬럼별 목록은 질의 관련도 순 상위 CSV_MAX_COLUMNS개만 싣고, 나머지는 개수로만 표기합니다.
+    """
+    import pandas as pd   # CSV 경로에서만 필요 (warm-up이 미리 import)
+    from ...processing.ingest import read_csv_fast
+    try:
+        if isinstance(csv_data, bytes):
+            decoded = csv_data
+        else:
+            with stage("csv_decode"):
+                decoded = base64.b64decode(csv_data)
+        with stage("csv_parse"):
+            df, _ = read_csv_fast(decoded)
+        t_summary = time.perf_counter()
+
+        n_rows, n_cols = map(int, df.shape)
+        nulls_all: Dict[str, int] = df.isna().sum().astype(int).to_dict()
+        ranked = rank_columns(df.columns.tolist(), query, nulls_all)
+        cols = ranked[:CSV_MAX_COLUMNS]
+        omitted = n_cols - len(cols)
+        dtypes: Dict[str, str] = df[cols].dtypes.astype(str).to_dict()
+        dtype_counts = df.dtypes.astype(str).value_counts().to_dict()
+        # 결측은 있는 컬럼만 (많은 순)
+        nulls = {c: n for c, n in sorted(nulls_all.items(), key=lambda kv: -kv[1]) if n > 0}
+        null_free = n_cols - len(nulls)
+        nulls = dict(list(nulls.items())[:CSV_MAX_COLUMNS])
+
+        # 숫자형 요약(질의 관련도 순 상위 6개만)
+        num_set = set(df.select_dtypes(include=["number"]).columns)
+        num_cols_show = [c for c in ranked if c in num_set][:CSV_NUMERIC_SUMMARY_COLS]
+        num_summ_lines = []
+        for c in num_cols_show:
+            s = df[c]
+            try:
+                num_summ_lines.append(
+                    f"{c}: mean={s.mean():.3f}, std={s.std():.3f}, min={s.min():.3f}, max={s.max():.3f}"
+                )
+            except Exception:
+                continue
+
+        # TAG/범주 요약
+        cat_lines = []
+        cat_target = None
+        if "TAG" in df.columns:
+            cat_target = "TAG"
+        else:
+            for c in df.select_dtypes(include=["object", "category"]).columns:
                 try:
-                    num_summ_lines.append(
-                        f"{c}: mean={s.mean():.3f}, std={s.std():.3f}, min={s.min():.3f}, max={s.max():.3f}"
-                    )
+                    if df[c].nunique(dropna=True) <= 20:
+                        cat_target = c
+                        break
                 except Exception:
                     continue
-
-            # TAG/범주 요약
-            cat_lines = []
-            cat_target = None
-            if "TAG" in df.columns:
-                cat_target = "TAG"
-            else:
-                for c in df.select_dtypes(include=["object", "category"]).columns:
-                    try:
-                        if df[c].nunique(dropna=True) <= 20:
-                            cat_target = c
-                            break
-                    except Exception:
-                        continue
-            if cat_target is not None:
-                try:
-                    vc = df[cat_target].value_counts(dropna=False).head(10)
-                    cat_lines.append(f"{cat_target} 분포(상위10): " + ", ".join([f"{k}:{int(v)}" for k, v in vc.items()]))
-                except Exception:
-                    pass
-
-            # 시간 범위(있으면)
-            time_line = None
-            if "STD_DT" in df.columns:
-                try:
-                    ts = pd.to_datetime(df["STD_DT"], errors="coerce")
-                    tmin, tmax = ts.min(), ts.max()
-                    if pd.notna(tmin) and pd.notna(tmax):
-                        time_line = f"STD_DT 범위: {tmin} → {tmax}"
-                except Exception:
-                    pass
-
-            sample_str = df.head(3).to_string()
-            parts = [
-                f"파일: user_upload.csv | shape: {n_rows} x {n_cols}",
-                f"컬럼: {cols}",
-                f"dtypes: {dtypes}",
-                f"nulls: {nulls}",
-            ]
-            if time_line:
-                parts.append(time_line)
-            if num_summ_lines:
-                parts.append("수치 요약: " + " | ".join(num_summ_lines))
-            if cat_lines:
-                parts.extend(cat_lines)
-            parts.append("샘플(상위 3행):\n" + sample_str)
-            csv_context = "\n".join(parts)
-        except Exception as e:
-            csv_context = f"(CSV 데이터 처리 중 오류 발생: {e})"
-
-    # 의도 감지: 일반/개념 질문이면 RAG 안내문구를 숨기고 일반 지식으로도 답변 허용
-    def _is_general_question(q: str) -> bool:
-        if not q:
-            return False
-        ql = q.lower()
-        general_kws = [
-            "차트 엔진", "엔진 차이", "인터렉티브", "인터랙티브", "정적", "altair", "matplotlib", "plotly",
-            "시각화 차이", "비교", "무엇", "어떤", "차이점", "설명", "방법",
+        if cat_target is not None:
+            try:
+                vc = df[cat_target].value_counts(dropna=False).head(10)
+                cat_lines.append(f"{cat_target} 분포(상위10): " + ", ".join([f"{k}:{int(v)}" for k, v in vc.items()]))
+            except Exception:
+                pass
+
+        # 시간 범위(있으면)
+        time_line = None
+        if "STD_DT" in df.columns:
+            try:
+                ts = pd.to_datetime(df["STD_DT"], errors="coerce")
+                tmin, tmax = ts.min(), ts.max()
+                if pd.notna(tmin) and pd.notna(tmax):
+                    time_line = f"STD_DT 범위: {tmin} → {tmax}"
+            except Exception:
+                pass
+
+        sample_str = df[cols[:CSV_SAMPLE_COLS]].head(3).to_string()
+        parts = [
+            f"파일: user_upload.csv | shape: {n_rows} x {n_cols}",
+            f"컬럼: {cols}" + (f" (외 {omitted}개 생략)" if omitted else ""),
+            f"dtypes: {dtypes}" + (f" | 전체 dtype 분포: {dtype_counts}" if omitted else ""),
+            f"nulls: {nulls}" + (f" | 결측 없는 컬럼 {null_free}개" if null_free else ""),
         ]
-        dataset_kws = [
-            "csv", "컬럼", "열", "행", "평균", "최댓값", "최솟값", "시간", "분포", "상관", "이상치", "태그", "std_dt",
-        ]
-        if any(k in q for k in general_kws) and not any(k in ql for k in dataset_kws):
-            return True
-        return False
+        if time_line:
+            parts.append(time_line)
+        if num_summ_lines:
+            parts.append("수치 요약: " + " | ".join(num_summ_lines))
+        if cat_lines:
+            parts.extend(cat_lines)
+        parts.append("샘플(상위 3행):\n" + sample_str)
+        record_stage("csv_summarize", (time.perf_counter() - t_summary) * 1000)
+        return "\n".join(parts)
+    except Exception as e:
+        return f"(CSV 데이터 처리 중 오류 발생: {e})"
+
+async def _aggregate_context(params: ChatWithContextParams, csv_data: Optional[Union[str, bytes]]) -> Tuple[str, Dict[str, Any]]:
+    """
+    집계 질문(평균/최대/합계/상관 …)을 data_tools /tools/aggregate로 정확히 계산해 프롬프트용 표로 만듭니다.
+    캐시된 dataset_id로 먼저 부르고(CSV 재전송 없음), 캐시에 없으면(404) CSV를 함께 보내 한 번 등록합니다.
+    실패/계획 없음이면 빈 문자열 — 기존 CSV 요약만으로 답합니다.
+    """
+    raw = None
+    if csv_data:
+        raw = csv_data if isinstance(csv_data, bytes) else base64.b64decode(csv_data)
+    dataset_id = params.dataset_id or (hashlib.sha1(raw).hexdigest()[:16] if raw else None)
+    args: Dict[str, Any] = {"dataset_id": dataset_id, "question": params.user_query}
+    deadline = time.perf_counter() + AGG_DEADLINE_S
+    try:
+        try:
+            out = await MCP.call("ai.agent.data_tools/aggregate", args, timeout=AGG_DEADLINE_S, retries=0)
+        except RuntimeError as e:
+            cause = e.__cause__
+            if raw is None or not (isinstance(cause, httpx.HTTPStatusError) and cause.response.status_code == 404):
+                raise
+            out = await MCP.call("ai.agent.data_tools/aggregate",
+                                 {**args, "csv_b64": base64.b64encode(raw).decode("ascii")},
+                                 timeout=max(deadline - time.perf_counter(), 0.1), retries=0)
+    except Exception as e:
+        print(f"[CHAT] aggregate failed; falling back to CSV summary: {e}")
+        return "", {"ok": False, "error": str(e)[:200]}
+    if not out.get("columns"):
+        return "", {"ok": False, "planned": out.get("planned", False)}
+    table = format_table(out)
+    text = f"### 정확한 집계 결과 ({describe_spec(out.get('spec') or {})}, 대상 {out.get('filtered_rows')}행):\n{table}"
+    return text, {"ok": True, "dataset_id": out.get("dataset_id"), "rows": out.get("row_count"),
+                  "cached": out.get("cached"), "elapsed_ms": out.get("elapsed_ms")}
+
+async def _with_deadline(name: str, deadline_s: float, fallback: Any, fn, *args) -> Tuple[Any, bool]:
+    """블로킹 fn을 스레드풀에서 실행하되 deadline을 넘기면 fallback으로 대체. (값, 시간초과 여부) 반환."""
+    t0 = time.perf_counter()
+    try:
+        value = await asyncio.wait_for(run_in_threadpool(fn, *args), timeout=deadline_s)
+        ROUTER.observe(name, (time.perf_counter() - t0) * 1000)   # 라우팅으로 건너뛸 때 절약 시간 추정용
+        return value, False
+    except asyncio.TimeoutError:
+        # 스레드는 끝까지 돌지만 답변은 기다리지 않습니다.
+        print(f"[CHAT] {name} exceeded {deadline_s}s deadline; continuing without it")
+        return fallback, True
+
+async def _build_chat_prompt(params: ChatWithContextParams) -> Tuple[str, str, Dict[str, Any]]:
+    """
+    RAG/CSV/EDA 컨텍스트와 대화 기록을 동시에 모아 최종 프롬프트를 만듭니다. (prompt, rag_context, meta) 반환.
+    각 단계는 독립적이므로 gather로 병렬 실행하고, 마감 시간을 넘긴 단계는 빈 컨텍스트로 대체합니다.
+    대화 기록은 누적 요약 + 최근 턴만 실으므로 세션이 길어져도 크기가 일정합니다.
+    먼저 query_router가 질의에 필요한 컨텍스트만 고르고, 일반 질문은 데이터 작업 없이 바로 모델로 보냅니다.
+    """
+    user_query = params.user_query
+    csv_data = params.csv_payload()
+    has_data = bool(csv_data or params.dataset_id)
+    available = [name for name, ok in (("rag", _rag_attempted(params)), ("csv", has_data),
+                                       ("eda", bool(params.eda_context))) if ok]
+    route = ROUTER.route(user_query, available)
+    attempted_rag = route.use("rag")
+    # 집계 질문은 요약 통계로 추정하지 않고 데이터셋 전체에서 정확히 계산해 CSV 요약 앞에 싣습니다
+    wants_aggregate = route.use("csv") and is_aggregate_question(user_query)
+
+    async def _noop(value):
+        return value, False
+
+    (rag_chunks, rag_late), (csv_context, csv_late), (agg_context, agg_meta), memory = await asyncio.gather(
+        _with_deadline("rag", RAG_DEADLINE_S, [], _rag_context, params) if attempted_rag else _noop([]),
+        _with_deadline("csv", CSV_DEADLINE_S, "(CSV 요약 시간 초과)", _csv_context, csv_data, user_query)
+        if route.use("csv") and csv_data else _noop("(해당 없음)"),
+        _aggregate_context(params, csv_data) if wants_aggregate else _noop(None),   # (표, meta) / (None, False)
+        MEMORY.context(params.session_id),
+    )
+    if agg_context:
+        csv_context = agg_context + ("\n\n" + csv_context if csv_data else "")
 
-    is_general = _is_general_question(user_query)
+    # 섹션별 토큰 예산에 맞춰 자르기 (데이터가 커져도 프롬프트 크기는 고정 상한)
+    with stage("context_budget"):
+        sections, budget_report = ContextBudgeter().fit(rag_chunks, csv_context,
+                                                        (params.eda_context or "") if route.use("eda") else "")
+    rag_context, csv_context = sections["rag"], sections["csv"]
 
     rag_notice = ""
-    if not is_general and attempted_rag and not rag_context:
+    if attempted_rag and not rag_context:
         rag_notice = "참고: RAG 검색 결과가 없어 CSV 위주로 답합니다.\n"
 
+    t_prompt = time.perf_counter()
     final_prompt = PROMPT_TEMPLATE.format(
         rag_notice=rag_notice,
+        history_summary=(memory.summary if memory and memory.summary else "(없음)"),
+        history_recent=("\n\n".join(memory.turns) if memory and memory.turns else "(없음)"),
         rag_context=rag_context,
         csv_context=csv_context,
-        eda_context=(params.eda_context or ""),
-        user_intent=("일반/개념 설명" if is_general else "데이터셋 관련 분석"),
+        eda_context=sections["eda"],
+        user_intent=INTENT_LABELS[route.intent],
         user_query=user_query,
     )
+    meta = {
+        "intent": route.intent,
+        "route": route.report(),
+        "rag_attempted": attempted_rag,
+        "rag_hits": bool(rag_context),
+        "csv": route.use("csv"),
+        "context_fp": _chat_context_fp(params, memory),
+        "timed_out": [n for n, late in (("rag", rag_late), ("csv", csv_late)) if late],
+        "budget": budget_report,
+        "memory": memory.report() if memory else None,
+        "aggregate": agg_meta if wants_aggregate else None,
+    }
+    record_stage("prompt_build", (time.perf_counter() - t_prompt) * 1000)
+    return final_prompt, rag_context, meta
 
+# ---------- Endpoints ----------
+@app.post("/tools/chat_with_context", response_model=RAGQueryResponse)
+async def chat_with_context(params: ChatWithContextParams) -> RAGQueryResponse:
+    user_query = params.user_query
+    final_prompt, rag_context, meta = await _build_chat_prompt(params)
     try:
-        llm = create_gemini_chat_chain()
-        resp = llm.invoke(final_prompt)
-        answer = getattr(resp, "content", str(resp))
-        return RAGQueryResponse(answer=answer, sources=rag_context, query=user_query)
+        with stage("llm"):
+            answer, _ = await ainvoke_cached(final_prompt, query=user_query, context_fp=meta["context_fp"])
     except Exception as e:
-        return RAGQueryResponse(answer=f"LLM 호출 중 오류가 발생했습니다: {e}", sources=rag_context, query=user_query)
+        return RAGQueryResponse(answer=f"LLM 호출 중 오류가 발생했습니다: {e}", sources=rag_context, query=user_query,
+                                session_id=params.session_id)
+    await MEMORY.record(params.session_id, user_query, answer)
+    return RAGQueryResponse(answer=answer, sources=rag_context, query=user_query, session_id=params.session_id)
+
+@app.post("/tools/chat_with_context/csv", response_model=RAGQueryResponse)
+async def chat_with_context_csv(request: Request, user_query: str, rag_index_exists: bool = False,
+                                index_dir: Optional[str] = None, eda_context: Optional[str] = None,
+                                session_id: Optional[str] = None):
+    """Raw-body 변형: 본문 = CSV 바이트 그대로 (base64/JSON 래핑 없음), 나머지 파라미터는 query string."""
+    params = ChatWithContextParams(user_query=user_query, rag_index_exists=rag_index_exists,
+                                   index_dir=index_dir, eda_context=eda_context, session_id=session_id)
+    params._csv_raw = await request.body() or None
+    return await chat_with_context(params)
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/tools/chat_with_context/stream")
+async def chat_with_context_stream(params: ChatWithContextParams):
+    """
+    SSE 스트리밍 버전. 이벤트 순서: context(컨텍스트 준비 완료) → token* → sources → done.
+    LLM 오류 시 error 이벤트를 보낸 뒤 sources/done으로 마무리합니다. 대화 기록은 끝까지 받은 답변만 저장합니다.
+    """
+    async def gen():
+        t0 = time.perf_counter()
+        final_prompt, rag_context, meta = await _build_chat_prompt(params)
+        yield _sse("context", {**meta, "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1)})
+        ttft_ms = None
+        answer = None
+        hedge = None
+        model_name = get_model_names()[0]
+        with stage("llm_cache_lookup"):
+            cached, tier = await run_in_threadpool(RESPONSE_CACHE.get, final_prompt, model_name, None,
+                                                   params.user_query, meta["context_fp"])
+        if cached is not None:
+            ttft_ms = round((time.perf_counter() - t0) * 1000, 1)
+            answer = cached
+            yield _sse("token", {"text": cached})
+        else:
+            parts: List[str] = []
+            t_llm = time.perf_counter()
+            # 주 모델이 첫 토큰 임계값(관측 p90)을 넘기면 fallback 모델로 hedge, 먼저 답한 쪽으로 스트리밍
+            call = HEDGER.call(final_prompt, model=model_name)
+            try:
+                async for text in call.stream():
+                    if ttft_ms is None:
+                        ttft_ms = round((time.perf_counter() - t0) * 1000, 1)
+                    parts.append(text)
+                    yield _sse("token", {"text": text})
+                # 끝까지 받은 응답만 캐시 (중간 오류/끊김은 저장하지 않음). fallback이 답해도 요청 모델 키로
+                answer = "".join(parts)
+                await run_in_threadpool(RESPONSE_CACHE.put, final_prompt, model_name, answer, None,
+                                        params.user_query, meta["context_fp"])
+            except Exception as e:
+                yield _sse("error", {"message": f"LLM 호출 중 오류가 발생했습니다: {e}"})
+            record_stage("llm_stream", (time.perf_counter() - t_llm) * 1000)
+            hedge = call.report()
+        yield _sse("sources", {"sources": rag_context})
+        turn = await MEMORY.record(params.session_id, params.user_query, answer) if answer else None
+        # 헤더가 먼저 나가므로 스트리밍에서는 단계별 시간을 done 이벤트에 담습니다.
+        yield _sse("done", {"ttft_ms": ttft_ms, "cache": tier, "turn": turn, "hedge": hedge,
+                            "total_ms": round((time.perf_counter() - t0) * 1000, 1),
+                            "stages": server_timing(current_stages())})
+
+    return StreamingResponse(gen(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @app.get("/health")
 def health():
@@ -246,26 +543,68 @@ def health_head():
     from starlette.responses import Response
     return Response(status_code=204)
 
-if __name__ == "__main__":
-    import uvicorn
+WARMUP.install(app)   # GET /ready
+
+@app.get("/cache/llm")
+def llm_cache_stats():
+    """LLM 응답 캐시 적중률/항목 수."""
+    return RESPONSE_CACHE.stats()
+
+@app.get("/llm/hedge")
+def llm_hedge_stats():
+    """모델별 첫 토큰 지연 표본, 현재 hedge 임계값과 남은 hedge 예산."""
+    primary, fallback = get_model_names()
+    return {**HEDGER.stats(), "primary": primary, "fallback": fallback,
+            "threshold_ms": round(HEDGER.threshold_ms(primary), 1)}
+
+@app.get("/cache/rag_index")
+def rag_index_cache_stats():
+    """이 워커가 열어 둔 공유 인덱스 (pid별로 다름)."""
+    return INDEXES.stats()
+
+@app.get("/sessions/{session_id}")
+async def get_session(session_id: str):
+    """세션의 누적 요약/턴 수와, 다음 프롬프트에 실릴 대화 기록 크기."""
+    info = await MEMORY.session(session_id)
+    if info is None:
+        raise HTTPException(status_code=404, detail=f"세션이 없습니다: {session_id}")
+    ctx = await MEMORY.context(session_id)
+    return {**info, "prompt": ctx.report()}
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    return {"deleted": await MEMORY.delete(session_id)}
+
+RAG_SEARCH_FLIGHTS = SingleFlight("rag_search")
 
 @app.post("/tools/rag_search")
 def rag_search(params: RagSearchParams):
+    # 같은 (질의, 인덱스 버전) 검색이 진행 중이면 그 결과를 공유
+    key = (params.query, params.index_dir, _index_version(params.index_dir), params.rag_index_exists)
+    out, _ = RAG_SEARCH_FLIGHTS.do(key, lambda: _rag_search(params))
+    return out
+
+def _rag_search(params: RagSearchParams) -> Dict[str, Any]:
     q = params.query
     idx_dir = params.index_dir
     out: List[Dict] = []
     try:
         if idx_dir and os.path.isdir(idx_dir):
-            embeddings = CustomEmbeddings()
-            store = FAISS.load_local(idx_dir, embeddings=embeddings, allow_dangerous_deserialization=True)
-            hits = store.similarity_search(q, k=5)
+            with stage("rag_index_load"):
+                store = open_index(idx_dir)   # 워커 간 공유 mmap 인덱스 (프로세스당 한 번 열고 재사용)
+            with stage("rag_embed"):
+                qvec = embed_texts([q], is_query=True)[0]
+            with stage("rag_search"):
+                hits = store.similarity_search_by_vector(qvec, k=5)
             for h in hits:
                 if hasattr(h, "page_content"):
                     out.append({"text": h.page_content, "metadata": getattr(h, "metadata", {})})
                 elif isinstance(h, dict):
                     out.append({"text": h.get("text") or h.get("page_content") or "", "metadata": h.get("metadata", {})})
         elif params.rag_index_exists:
-            hits = retrieve(q, k=5)
+            from ...rag.retriever import retrieve   # LangChain Embeddings 기반 모듈 (import가 무거워 필요할 때만)
+            with stage("rag_retrieve"):
+                hits = retrieve(q, k=5)
             for h in hits:
                 if hasattr(h, "page_content"):
                     out.append({"text": h.page_content, "metadata": getattr(h, "metadata", {})})
@@ -274,4 +613,7 @@ def rag_search(params: RagSearchParams):
     except Exception as e:
         return {"hits": [], "error": str(e)}
     return {"hits": out}
+
+if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
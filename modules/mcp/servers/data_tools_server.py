@@ -2,28 +2,67 @@
 import sys, os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.responses import Response
-from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
 import pandas as pd
-import base64, io, time, requests
+import base64, time, requests, types
+import collections.abc
 import numpy as np
-from typing import Optional, Dict, Any, List
-from langchain_community.document_loaders import PyPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import FAISS
-from modules.rag.retriever import CustomEmbeddings
-
-try:
-    from sklearn.decomposition import PCA
-    from sklearn.preprocessing import StandardScaler
-except Exception:
-    PCA = None
-    StandardScaler = None
+import importlib.util
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, List, Union, get_args, get_origin
+from modules.processing.ingest import read_csv_fast, head_records
+from modules.processing.correlation import correlation_summary
+from modules.processing.dataset_store import STORE, Dataset
+from modules.processing.parquet_source import _HAS_PARQUET, EXCEL_EXTS, PARQUET_EXTS
+from modules.processing.columnar import ARROW_STREAM_MIME, wants_arrow, table_ipc, sections_ipc
+from modules.processing.downsample import downsample_series, DEFAULT_MAX_POINTS
+from modules.processing.anomaly import detect_anomalies, STREAMS
+from modules.processing.aggregate import (DEFAULT_LIMIT, normalize_spec, plan_for, result_json, run_aggregate, scan_args,
+                                         spec_key)
+from modules.observability.metrics import install as install_metrics, stage, record_stage, REGISTRY
+from modules.observability.profiling import install as install_profiling
+from modules.runtime.singleflight import AsyncSingleFlight, canonical_key
+from modules.runtime.compression import CompressionMiddleware
+from modules.runtime.warmup import Warmup
+
+# sklearn(PCA)과 PDF/LangChain 인덱싱 의존성은 처음 쓰는 요청(또는 warm-up)에서 import — 기동 시간 절감
+_HAS_SKLEARN = importlib.util.find_spec("sklearn") is not None
+
+SLICE_MAX_ROWS = int(os.getenv("DATASET_SLICE_MAX_ROWS", "200000"))   # dataset_slice 1회 최대 행 수
+
+# --- Warm-up (readiness) ---
+WARMUP = Warmup("data_tools")
+
+@WARMUP.step("imports")
+def _warm_imports():
+    # 첫 EDA/이상치/인덱싱 요청이 import 비용을 내지 않도록 미리 로드
+    loaded = []
+    if _HAS_SKLEARN:
+        from sklearn.decomposition import PCA  # noqa: F401
+        from sklearn.ensemble import IsolationForest  # noqa: F401
+        loaded.append("sklearn")
+    from langchain_community.document_loaders import PyPDFLoader  # noqa: F401
+    from langchain.text_splitter import RecursiveCharacterTextSplitter  # noqa: F401
+    from langchain_community.vectorstores import FAISS  # noqa: F401
+    from modules.rag.retriever import CustomEmbeddings  # noqa: F401
+    loaded.append("langchain")
+    return loaded
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    WARMUP.start()   # 백그라운드 실행: /health는 즉시, /ready는 warm-up 완료 후 200
+    try:
+        yield
+    finally:
+        await WARMUP.stop()
 
 # --- FastAPI app ---
-app = FastAPI(title="ai.agent.data_tools", description="Data tools server for EDA, uploads, and utilities.")
+app = FastAPI(title="ai.agent.data_tools", description="Data tools server for EDA, uploads, and utilities.",
+              lifespan=lifespan)
 
 # --- CORS: allow all origins, methods, headers for dev ---
 app.add_middleware(
@@ -35,6 +74,18 @@ app.add_middleware(
     expose_headers=["*"],
     max_age=600,
 )
+install_metrics(app, "data_tools")
+install_profiling(app, "data_tools")   # PROFILING_TOKEN이 있을 때만
+app.add_middleware(CompressionMiddleware)   # 계측 미들웨어 바깥: 압축 시간도 Server-Timing에 덧붙임
+
+def _store_metrics() -> List[str]:
+    st = STORE.stats()
+    return [
+        "# TYPE agent_dataset_store_items gauge", f"agent_dataset_store_items {st['datasets']}",
+        "# TYPE agent_dataset_store_bytes gauge", f"agent_dataset_store_bytes {st['bytes']}",
+    ]
+
+REGISTRY.register_collector(_store_metrics)
 
 # Preflight for any path
 @app.options("/{rest_of_path:path}")
@@ -42,18 +93,53 @@ def _any_options(rest_of_path: str):
     return Response(status_code=204)
 
 # --- Upload endpoints -------------------------------------------------------
+def _upload_response(request: Request, filename: str, ds: Dataset):
+    preview = ds.slice(0, 5)
+    meta = {"ok": True, "filename": filename, "dataset_id": ds.dataset_id,
+            "shape": {"rows": ds.rows, "cols": len(ds.columns)}, "ingest": ds.ingest}
+    if wants_arrow(request.headers.get("accept")):
+        # 미리보기 행은 테이블, 나머지는 스키마 메타데이터
+        return Response(table_ipc(preview, meta), media_type=ARROW_STREAM_MIME)
+    return {**meta, "preview": head_records(preview, 5)}
+
 @app.post("/upload/csv")
-async def upload_csv(file: UploadFile = File(...)):
+async def upload_csv(request: Request, file: UploadFile = File(...)):
     if not file.filename.lower().endswith(".csv"):
         raise HTTPException(status_code=400, detail="CSV 파일만 업로드 가능합니다.")
     content = await file.read()
     try:
-        df = pd.read_csv(io.BytesIO(content))
+        ds = STORE.load_csv(content)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"CSV 파싱 실패: {e}")
-    rows, cols = map(int, df.shape)
-    preview = df.head(5).to_dict(orient="records")
-    return {"ok": True, "filename": file.filename, "shape": {"rows": rows, "cols": cols}, "preview": preview}
+    return _upload_response(request, file.filename, ds)
+
+@app.post("/upload/dataset")
+async def upload_dataset(request: Request, file: UploadFile = File(...)):
+    """CSV / Parquet / Excel. Parquet는 그대로, Excel은 한 번 Parquet로 변환해 디스크에 두고
+    이후 툴은 필요한 컬럼과 row group만 읽습니다 (CSV는 /upload/csv와 동일하게 메모리 적재)."""
+    name = file.filename.lower()
+    if name.endswith(".csv"):
+        loader, kind = STORE.load_csv, "CSV"
+    elif name.endswith(PARQUET_EXTS) or name.endswith(EXCEL_EXTS):
+        if not _HAS_PARQUET:
+            raise HTTPException(status_code=501, detail="Parquet/Excel 업로드에는 pyarrow가 필요합니다.")
+        excel = name.endswith(EXCEL_EXTS)
+        loader = (lambda raw: STORE.load_excel(raw, name)) if excel else STORE.load_parquet
+        kind = "Excel" if excel else "Parquet"
+    else:
+        raise HTTPException(status_code=400, detail="CSV, Parquet(.parquet), Excel(.xlsx/.xls) 파일만 업로드 가능합니다.")
+    content = await file.read()
+
+    def _load():
+        try:
+            with stage("dataset_load"):
+                return _upload_response(request, file.filename, loader(content))
+        except RuntimeError as e:   # Excel 엔진(openpyxl/xlrd) 없음
+            raise HTTPException(status_code=501, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"{kind} 파싱 실패: {e}")
+
+    return await run_in_threadpool(_load)
 
 @app.post("/upload/pdf")
 async def upload_pdf(file: UploadFile = File(...)):
@@ -64,28 +150,43 @@ async def upload_pdf(file: UploadFile = File(...)):
     return {"ok": True, "filename": file.filename, "size_bytes": size}
 
 # --- RAG indexing for PDFs ---------------------------------------------------
+RAG_INDEX_FLIGHTS = AsyncSingleFlight("rag_index")
+
 @app.post("/tools/rag_index")
 async def rag_index(files: List[UploadFile] = File(...)):
-    """Accept one or more PDFs, build/save FAISS index, return index_dir."""
+    """Accept one or more PDFs, build/save FAISS index, return index_dir.
+    Concurrent requests with identical files share one indexing run."""
     if not files:
         raise HTTPException(status_code=400, detail="PDF 파일이 없습니다.")
     for f in files:
         if not f.filename.lower().endswith(".pdf"):
             raise HTTPException(status_code=400, detail=f"PDF만 허용됩니다: {f.filename}")
 
+    uploads = [(uf.filename, await uf.read()) for uf in files]
+    key = canonical_key(*[part for name, raw in uploads for part in (name, raw)])
+    out, shared = await RAG_INDEX_FLIGHTS.do(key, lambda: run_in_threadpool(_build_rag_index, uploads))
+    return {**out, "coalesced": shared}
+
+def _build_rag_index(uploads: List[Any]) -> Dict[str, Any]:
+    from langchain_community.document_loaders import PyPDFLoader
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from langchain_community.vectorstores import FAISS
+    from modules.rag.retriever import CustomEmbeddings
+    from modules.rag.shared_index import save_shared
+
     tmp_dir = os.path.abspath(os.path.join("data", "tmp_uploads"))
     os.makedirs(tmp_dir, exist_ok=True)
     docs = []
     names: List[str] = []
-    for uf in files:
-        raw = await uf.read()
-        tmp_path = os.path.join(tmp_dir, f"{int(time.time()*1000)}_{uf.filename}")
+    for filename, raw in uploads:
+        tmp_path = os.path.join(tmp_dir, f"{int(time.time()*1000)}_{filename}")
         with open(tmp_path, "wb") as w:
             w.write(raw)
         try:
-            loader = PyPDFLoader(tmp_path)
-            docs.extend(loader.load())
-            names.append(uf.filename)
+            with stage("pdf_load"):
+                loader = PyPDFLoader(tmp_path)
+                docs.extend(loader.load())
+            names.append(filename)
         finally:
             try:
                 os.remove(tmp_path)
@@ -95,57 +196,101 @@ async def rag_index(files: List[UploadFile] = File(...)):
     if not docs:
         raise HTTPException(status_code=400, detail="PDF에서 텍스트를 추출하지 못했습니다.")
 
-    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    chunks = splitter.split_documents(docs)
+    with stage("pdf_split"):
+        splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+        chunks = splitter.split_documents(docs)
 
     embeddings = CustomEmbeddings()
-    vs = FAISS.from_documents(chunks, embeddings)
+    with stage("embed_index"):
+        vs = FAISS.from_documents(chunks, embeddings)
 
     base_dir = os.path.abspath(os.path.join("data", "vector_store"))
     os.makedirs(base_dir, exist_ok=True)
     index_dir = os.path.join(base_dir, "faiss_index")
-    vs.save_local(index_dir)
+    with stage("index_save"):
+        save_shared(vs, index_dir)   # + 코어 워커들이 mmap으로 공유하는 docstore 파일
 
     return {"ok": True, "files": names, "chunks": len(chunks), "index_dir": index_dir}
 
 # --- Tool-style endpoints ---------------------------------------------------
+def _resolve_dataset(csv_b64: Optional[str], dataset_id: Optional[str]) -> Dataset:
+    """dataset_id(업로드 시 발급)가 캐시에 있으면 재사용하고, 없으면 csv_b64를 파싱해 등록."""
+    if dataset_id:
+        ds = STORE.get(dataset_id)
+        if ds is not None:
+            return ds
+        if not csv_b64:
+            raise HTTPException(status_code=404, detail=f"dataset_id를 찾을 수 없습니다: {dataset_id}")
+    if not csv_b64:
+        raise HTTPException(status_code=400, detail="csv_b64 또는 dataset_id가 필요합니다.")
+    try:
+        with stage("dataset_load"):
+            return STORE.load_csv(base64.b64decode(csv_b64.encode()))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"CSV 파싱 실패: {e}")
+
 class EDAParams(BaseModel):
-    csv_b64: str
+    csv_b64: Optional[str] = None
+    dataset_id: Optional[str] = None
+    corr_top_k: int = 50
+    corr_full: bool = False  # True면 전체 상관행렬을 float16 상삼각 base64로 포함
 
 @app.post("/tools/eda_summary")
 def eda_summary(params: EDAParams):
-    raw = base64.b64decode(params.csv_b64.encode())
-    df = pd.read_csv(io.BytesIO(raw))
+    df = _resolve_dataset(params.csv_b64, params.dataset_id).df
     n_rows, n_cols = df.shape
     nulls = df.isna().sum().to_dict()
     dtypes = df.dtypes.astype(str).to_dict()
-    num_cols = df.select_dtypes(include=["number"]).columns[:30]
-    corr = df[num_cols].corr().round(3).to_dict() if len(num_cols) > 1 else {}
+    corr = correlation_summary(df, top_k=params.corr_top_k, full=params.corr_full)
     return {
         "shape": {"rows": int(n_rows), "cols": int(n_cols)},
         "nulls": nulls,
         "dtypes": dtypes,
-        "corr(num<=30)": corr,
+        "corr": corr,
     }
 
 class EDAProfileParams(BaseModel):
-    csv_b64: str
+    csv_b64: Optional[str] = None
+    dataset_id: Optional[str] = None
     max_pca_points: int = 2000
     random_state: int = 42
 
 @app.post("/tools/eda_profile")
-def eda_profile(params: EDAProfileParams):
-    raw = base64.b64decode(params.csv_b64.encode())
-    df = pd.read_csv(io.BytesIO(raw))
+def eda_profile(params: EDAProfileParams, request: Request):
+    """Full EDA profile; cached per (dataset, PCA params) and computed once for concurrent duplicates.
+    With `Accept: application/vnd.apache.arrow.stream` the arrays come back as one Arrow IPC stream."""
+    ds = _resolve_dataset(params.csv_b64, params.dataset_id)
+    key = (params.max_pca_points, params.random_state)
+    cols, cached = ds.memo(("eda_profile_cols",) + key, lambda: _eda_profile(ds, params))
+    if wants_arrow(request.headers.get("accept")):
+        with stage("arrow_encode"):
+            body, _ = ds.memo(("eda_profile_arrow",) + key, lambda: sections_ipc(
+                {k: v for k, v in cols.items() if k != "meta"}, cols["meta"]))
+        return Response(body, media_type=ARROW_STREAM_MIME, headers={"X-Cached": str(cached).lower()})
+    out, _ = ds.memo(("eda_profile",) + key, lambda: _profile_json(cols))
+    return {**out, "cached": cached}
+
+NUMERIC_STAT_FIELDS = ("min", "q1", "median", "q3", "max", "mean", "std", "skew", "kurtosis", "mad")
+
+def _eda_profile(ds: Dataset, params: EDAProfileParams) -> Dict[str, Any]:
+    """
+    프로파일을 컬럼 배열(numpy) 형태로 계산합니다: {"meta", "numeric_stats", "category_counts", "pca2d"}.
+    JSON 응답은 _profile_json으로 기존 중첩 dict 모양으로 바꾸고, Arrow 응답은 배열을 그대로 씁니다.
+    """
+    df, ingest = ds.df, ds.ingest
 
     # Basic info
     n_rows, n_cols = df.shape
     nulls = df.isna().sum().astype(int).to_dict()
     dtypes = df.dtypes.astype(str).to_dict()
 
-    # Numeric statistics
+    # Numeric statistics (컬럼당 한 행)
+    t_stage = time.perf_counter()
     numeric_cols = df.select_dtypes(include=["number"]).columns.tolist()
-    numeric_stats: Dict[str, Dict[str, Any]] = {}
+    stat_names: List[str] = []
+    stats: Dict[str, List[float]] = {f: [] for f in NUMERIC_STAT_FIELDS}
+    zout_counts: List[int] = []
+    missing: List[int] = []
     for c in numeric_cols:
         s = df[c]
         if not np.issubdtype(s.dtype, np.number):
@@ -156,17 +301,13 @@ def eda_profile(params: EDAProfileParams):
         mean_v = float(sd.mean())
         std_v = float(sd.std(ddof=1)) if len(sd) > 1 else 0.0
         median_v = float(sd.median())
-        q1_v = float(sd.quantile(0.25))
-        q3_v = float(sd.quantile(0.75))
-        min_v = float(sd.min())
-        max_v = float(sd.max())
         # Additional metrics
         try:
             skew_v = float(sd.skew())
         except Exception:
             skew_v = 0.0
         try:
-            kurt_v = float(sd.kurt())
+            kurt_v = float(sd.kurt())  # Pandas kurt: excess kurtosis
         except Exception:
             kurt_v = 0.0
         try:
@@ -174,39 +315,49 @@ def eda_profile(params: EDAProfileParams):
         except Exception:
             mad_v = 0.0
         if std_v and std_v > 0:
-            z_outliers = np.abs((sd - mean_v) / std_v) > 3.0
-            zout_cnt = int(z_outliers.sum())
+            zout_cnt = int((np.abs((sd - mean_v) / std_v) > 3.0).sum())
         else:
             zout_cnt = 0
-        numeric_stats[c] = {
-            "min": min_v,
-            "q1": q1_v,
-            "median": median_v,
-            "q3": q3_v,
-            "max": max_v,
-            "mean": mean_v,
-            "std": std_v,
-            "skew": skew_v,
-            "kurtosis": kurt_v,  # Pandas kurt: excess kurtosis
-            "mad": mad_v,
-            "z_outliers_count": zout_cnt,
-            "missing": int(s.isna().sum()),
-        }
-
-    # Categorical top counts
+        row = {"min": float(sd.min()), "q1": float(sd.quantile(0.25)), "median": median_v,
+               "q3": float(sd.quantile(0.75)), "max": float(sd.max()), "mean": mean_v, "std": std_v,
+               "skew": skew_v, "kurtosis": kurt_v, "mad": mad_v}
+        stat_names.append(c)
+        for f in NUMERIC_STAT_FIELDS:
+            stats[f].append(row[f])
+        zout_counts.append(zout_cnt)
+        missing.append(int(s.isna().sum()))
+    numeric_stats = {"column": stat_names, **{f: np.asarray(v, dtype=np.float64) for f, v in stats.items()},
+                     "z_outliers_count": np.asarray(zout_counts, dtype=np.int64),
+                     "missing": np.asarray(missing, dtype=np.int64)}
+
+    record_stage("eda_numeric_stats", (time.perf_counter() - t_stage) * 1000)
+
+    # Categorical top counts (long format: 컬럼, 값, 개수)
+    t_stage = time.perf_counter()
     cat_cols = df.select_dtypes(include=["object", "category"]).columns.tolist()
-    category_counts: Dict[str, List[List[Any]]] = {}
+    cat_column: List[str] = []
+    cat_value: List[str] = []
+    cat_count: List[int] = []
     for c in cat_cols:
         try:
             vc = df[c].astype(str).fillna("<NA>").value_counts(dropna=False).head(15)
-            category_counts[c] = [[k, int(v)] for k, v in vc.items()]
         except Exception:
             continue
+        cat_column.extend([c] * len(vc))
+        cat_value.extend(str(k) for k in vc.index)
+        cat_count.extend(int(v) for v in vc.values)
+    category_counts = {"column": cat_column, "value": cat_value, "count": np.asarray(cat_count, dtype=np.int64)}
+
+    record_stage("eda_categories", (time.perf_counter() - t_stage) * 1000)
 
     # PCA 2D (if sklearn available and enough numeric columns)
-    pca_payload = None
-    if PCA is not None and StandardScaler is not None and len(numeric_cols) >= 2:
+    t_stage = time.perf_counter()
+    pca_meta = None
+    pca_arrays = None
+    if _HAS_SKLEARN and len(numeric_cols) >= 2:
         try:
+            from sklearn.decomposition import PCA
+            from sklearn.preprocessing import StandardScaler
             X = df[numeric_cols].copy()
             # Impute with mean for simplicity
             X = X.astype(float)
@@ -227,24 +378,318 @@ def eda_profile(params: EDAProfileParams):
                 Xn = scaler.fit_transform(Xs.values)
                 pca = PCA(n_components=2, random_state=params.random_state)
                 xy = pca.fit_transform(Xn)
-                pca_payload = {
-                    "row_indices": idx.tolist() if isinstance(idx, np.ndarray) else list(idx),
-                    "x": xy[:, 0].astype(float).tolist(),
-                    "y": xy[:, 1].astype(float).tolist(),
-                    "explained_variance_ratio": [float(v) for v in pca.explained_variance_ratio_],
-                }
+                pca_arrays = {"row_index": idx.astype(np.int64), "x": np.ascontiguousarray(xy[:, 0], dtype=np.float64),
+                              "y": np.ascontiguousarray(xy[:, 1], dtype=np.float64)}
+                pca_meta = {"explained_variance_ratio": [float(v) for v in pca.explained_variance_ratio_]}
         except Exception as e:
-            pca_payload = {"error": str(e)}
+            pca_meta = {"error": str(e)}
+    record_stage("eda_pca", (time.perf_counter() - t_stage) * 1000)
 
+    out: Dict[str, Any] = {
+        "meta": {
+            "shape": {"rows": int(n_rows), "cols": int(n_cols)},
+            "nulls": nulls,
+            "dtypes": dtypes,
+            "pca2d": pca_meta,
+            "ingest": ingest,
+            "dataset_id": ds.dataset_id,
+        },
+        "numeric_stats": numeric_stats,
+        "category_counts": category_counts,
+    }
+    if pca_arrays is not None:
+        out["pca2d"] = pca_arrays
+    return out
+
+def _profile_json(cols: Dict[str, Any]) -> Dict[str, Any]:
+    """컬럼 배열 프로파일 → 기존 JSON 응답 모양 (numeric_stats/category_counts는 컬럼별 dict, pca2d는 x/y 리스트)."""
+    meta = cols["meta"]
+    ns = cols["numeric_stats"]
+    numeric_stats: Dict[str, Dict[str, Any]] = {}
+    for i, c in enumerate(ns["column"]):
+        entry = {f: float(ns[f][i]) for f in NUMERIC_STAT_FIELDS}
+        entry["z_outliers_count"] = int(ns["z_outliers_count"][i])
+        entry["missing"] = int(ns["missing"][i])
+        numeric_stats[c] = entry
+    cc = cols["category_counts"]
+    category_counts: Dict[str, List[List[Any]]] = {}
+    for c, v, n in zip(cc["column"], cc["value"], cc["count"].tolist()):
+        category_counts.setdefault(c, []).append([v, n])
+    pca_payload = meta["pca2d"]
+    if "pca2d" in cols:
+        pca = cols["pca2d"]
+        pca_payload = {"row_indices": pca["row_index"].tolist(), "x": pca["x"].tolist(), "y": pca["y"].tolist(),
+                       **pca_payload}
     return {
-        "shape": {"rows": int(n_rows), "cols": int(n_cols)},
-        "nulls": nulls,
-        "dtypes": dtypes,
+        "shape": meta["shape"],
+        "nulls": meta["nulls"],
+        "dtypes": meta["dtypes"],
         "numeric_stats": numeric_stats,
         "category_counts": category_counts,
         "pca2d": pca_payload,
+        "ingest": meta["ingest"],
+        "dataset_id": meta["dataset_id"],
     }
 
+class DuplicatesParams(BaseModel):
+    csv_b64: Optional[str] = None
+    dataset_id: Optional[str] = None
+    columns: Optional[List[str]] = None   # 지정 시 해당 컬럼 조합 기준 중복
+    decimals: Optional[int] = None        # 지정 시 수치형을 반올림한 근사 중복(노이즈 센서 행)
+    max_groups: int = 20
+
+@app.post("/tools/duplicates")
+def duplicates(params: DuplicatesParams):
+    ds = _resolve_dataset(params.csv_b64, params.dataset_id)
+    try:
+        with stage("fingerprint"):
+            out = ds.fingerprints.summary(params.columns, params.decimals, max_groups=params.max_groups)
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    out["dataset_id"] = ds.dataset_id
+    return out
+
+class DownsampleParams(BaseModel):
+    csv_b64: Optional[str] = None
+    dataset_id: Optional[str] = None
+    columns: Optional[List[str]] = None   # 기본: 모든 수치형 컬럼
+    tags: Optional[List[str]] = None      # 기본: 모든 TAG
+    start: Optional[str] = None           # STD_DT 시간 창 (ISO 문자열)
+    end: Optional[str] = None
+    max_points: int = DEFAULT_MAX_POINTS  # 시리즈당 픽셀 예산
+    method: str = "lttb"                  # "lttb" | "minmax"
+    time_col: str = "STD_DT"
+    tag_col: str = "TAG"
+
+@app.post("/tools/downsample")
+def downsample(params: DownsampleParams):
+    """Per-TAG series decimated to a pixel budget, cached per (dataset, window, resolution)."""
+    ds = _resolve_dataset(params.csv_b64, params.dataset_id)
+    key = (
+        "downsample",
+        tuple(params.columns or ()), tuple(params.tags or ()), params.start, params.end,
+        params.max_points, params.method, params.time_col, params.tag_col,
+    )
+    t0 = time.perf_counter()
+
+    def _run():
+        # Parquet 데이터셋은 요청한 컬럼/TAG/시간 창만 읽음 (메모리에 있으면 전체 df 그대로)
+        columns = params.columns + [c for c in (params.time_col, params.tag_col) if c in ds.columns] \
+            if params.columns else None
+        df, read = ds.frame(columns, params.tags, params.start, params.end, params.tag_col, params.time_col)
+        out = downsample_series(df, params.columns, params.tags, params.start, params.end,
+                                params.max_points, params.method, params.time_col, params.tag_col)
+        return {**out, "read": read} if read else out
+
+    try:
+        with stage("downsample"):
+            out, cached = ds.memo(key, _run)
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {**out, "dataset_id": ds.dataset_id, "cached": cached,
+            "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2)}
+
+class AnomalyParams(BaseModel):
+    csv_b64: Optional[str] = None
+    dataset_id: Optional[str] = None
+    columns: Optional[List[str]] = None           # 기본: 모든 수치형 컬럼
+    methods: List[str] = ["zscore", "robust_z", "iqr"]  # + "iforest"
+    window: Optional[int] = None                  # z-score 롤링 창(행 수). 없으면 TAG 전체 통계
+    z_threshold: float = 3.0
+    robust_threshold: float = 3.5
+    iqr_k: float = 1.5
+    contamination: Optional[float] = None         # Isolation Forest (None → "auto")
+    n_jobs: int = -1
+    max_ranges: int = 50
+    time_col: str = "STD_DT"
+    tag_col: str = "TAG"
+
+@app.post("/tools/anomaly_detect")
+def anomaly_detect(params: AnomalyParams):
+    """Batch anomaly detection per TAG over all numeric columns; cached per (dataset, params)."""
+    ds = _resolve_dataset(params.csv_b64, params.dataset_id)
+    key = ("anomaly", params.json(exclude={"csv_b64", "dataset_id"}))
+    try:
+        with stage("anomaly_detect"):
+            out, cached = ds.memo(key, lambda: detect_anomalies(
+                ds.df, params.columns, params.methods, params.tag_col, params.time_col, params.window,
+                params.z_threshold, params.robust_threshold, params.iqr_k,
+                params.contamination if params.contamination is not None else "auto",
+                n_jobs=params.n_jobs, max_ranges=params.max_ranges,
+            ))
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    return {**out, "dataset_id": ds.dataset_id, "cached": cached}
+
+class DatasetSliceParams(BaseModel):
+    dataset_id: str
+    offset: int = 0
+    limit: int = 1000
+    columns: Optional[List[str]] = None   # 기본: 전체 컬럼
+
+@app.post("/tools/dataset_slice")
+def dataset_slice(params: DatasetSliceParams, request: Request):
+    """Row slice of a cached dataset (JSON records, or an Arrow IPC table with `Accept: application/vnd.apache.arrow.stream`)."""
+    ds = _resolve_dataset(None, params.dataset_id)
+    if params.offset < 0 or params.limit < 0:
+        raise HTTPException(status_code=400, detail="offset/limit은 0 이상이어야 합니다.")
+    try:
+        part = ds.slice(params.offset, min(params.limit, SLICE_MAX_ROWS), params.columns)
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=f"누락 컬럼: {e}")
+    meta = {"dataset_id": ds.dataset_id, "offset": params.offset, "rows": int(len(part)),
+            "total_rows": ds.rows}
+    if wants_arrow(request.headers.get("accept")):
+        with stage("arrow_encode"):
+            return Response(table_ipc(part, meta), media_type=ARROW_STREAM_MIME)
+    return {**meta, "columns": [str(c) for c in part.columns], "records": head_records(part, len(part))}
+
+class AggregateParams(BaseModel):
+    csv_b64: Optional[str] = None
+    dataset_id: Optional[str] = None
+    question: Optional[str] = None                 # spec 대신 자연어 질문 (키워드 플래너가 spec 생성)
+    metrics: Optional[List[Dict[str, Any]]] = None  # [{"column": "TEMP", "agg": "max"}, {"column": "*", "agg": "count"}]
+    group_by: Optional[List[str]] = None
+    resample: Optional[str] = None                 # pandas 주기 문자열 ("1h", "1D", ...)
+    filters: Optional[List[Dict[str, Any]]] = None  # [{"column": "TAG", "op": "in", "value": ["A"]}]
+    start: Optional[str] = None                    # time_col 시간 창 (ISO 문자열)
+    end: Optional[str] = None
+    last: Optional[str] = None                     # 마지막 시각 기준 기간 ("6h", "7D")
+    rolling: Optional[Dict[str, Any]] = None       # {"window": "1h" | 60, "agg": "mean"} → metric 컬럼을 rolling 값으로
+    corr: Optional[List[str]] = None               # 쌍별 Pearson 상관 (그룹별)
+    sort_by: Optional[str] = None                  # 결과 컬럼명 (예: "max(TEMP)")
+    descending: bool = True
+    limit: int = DEFAULT_LIMIT
+    time_col: str = "STD_DT"
+    tag_col: str = "TAG"
+
+@app.post("/tools/aggregate")
+def aggregate(params: AggregateParams, request: Request):
+    """Exact group-by/resample/filter/rolling/correlation aggregates over a cached dataset; cached per (dataset, spec).
+    With `question` and no metrics/corr, the spec is planned from keywords (planned=false if nothing to aggregate)."""
+    ds = _resolve_dataset(params.csv_b64, params.dataset_id)
+    t0 = time.perf_counter()
+    raw_spec = params.dict(exclude={"csv_b64", "dataset_id", "question"})
+    planned = bool(params.question) and not (params.metrics or params.corr)
+    if planned:
+        plan = plan_for(ds.planning_frame(params.tag_col), params.question, params.time_col, params.tag_col)
+        if plan is None:
+            return {"planned": False, "dataset_id": ds.dataset_id, "columns": [], "rows": []}
+        raw_spec.update({k: v for k, v in plan.items() if v not in (None, [])})
+
+    def _run(spec):
+        # Parquet 데이터셋은 spec이 쓰는 컬럼과 TAG 필터/시간 창에 걸리는 row group만 읽음
+        df, read = ds.frame(**scan_args(spec))
+        out, meta = run_aggregate(df, spec)
+        return out, ({**meta, "total_rows": ds.rows, "read": read} if read else meta)
+
+    try:
+        spec = normalize_spec(raw_spec, ds.columns)
+        with stage("aggregate"):
+            (out, meta), cached = ds.memo(("aggregate", spec_key(spec)), lambda: _run(spec))
+    except (KeyError, ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    meta = {**meta, "spec": spec, "dataset_id": ds.dataset_id, "cached": cached, "planned": planned,
+            "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2)}
+    if wants_arrow(request.headers.get("accept")):
+        with stage("arrow_encode"):
+            return Response(table_ipc(out, meta), media_type=ARROW_STREAM_MIME)
+    return {**result_json(out), **meta}
+
+# --- Raw-body CSV variants ----------------------------------------------------
+# 본문 = CSV 바이트 그대로 (base64/JSON 래핑 없이 ~33% 작고 디코드 단계 없음), 파라미터는 query string.
+# 리스트 파라미터는 반복 키로 전달합니다 (예: ?columns=A&columns=B).
+# (params 모델, 핸들러, Accept 협상을 위해 Request를 받는지)
+CSV_TOOLS = {
+    "eda_summary": (EDAParams, eda_summary, False),
+    "eda_profile": (EDAProfileParams, eda_profile, True),
+    "duplicates": (DuplicatesParams, duplicates, False),
+    "downsample": (DownsampleParams, downsample, False),
+    "anomaly_detect": (AnomalyParams, anomaly_detect, False),
+}
+
+def _is_list_type(annotation) -> bool:
+    """List[str] / list[str] / Sequence[str] / Tuple[...] 등 목록 타입인지 (Optional/Union은 벗겨서 판단)."""
+    origin = get_origin(annotation)
+    if origin is Union or origin is types.UnionType:
+        return any(_is_list_type(a) for a in get_args(annotation) if a is not type(None))
+    return isinstance(origin, type) and issubclass(origin, collections.abc.Sequence) and not issubclass(origin, (str, bytes))
+
+def _query_params(model, query) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for name, field in model.model_fields.items():
+        values = query.getlist(name)
+        if values:
+            out[name] = values if _is_list_type(field.annotation) else values[-1]
+    return out
+
+@app.post("/tools/{tool}/csv")
+async def csv_tool(tool: str, request: Request):
+    spec = CSV_TOOLS.get(tool)
+    if spec is None:
+        raise HTTPException(status_code=404, detail=f"raw CSV 변형이 없는 툴입니다: {tool}")
+    model, handler, takes_request = spec
+    try:
+        params = model(**_query_params(model, request.query_params))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors())
+    raw = await request.body()
+    if not raw:
+        raise HTTPException(status_code=400, detail="CSV 본문이 비어 있습니다.")
+
+    def _run():
+        try:
+            with stage("dataset_load"):
+                ds = STORE.load_csv(raw)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"CSV 파싱 실패: {e}")
+        resolved = params.copy(update={"csv_b64": None, "dataset_id": ds.dataset_id})
+        return handler(resolved, request) if takes_request else handler(resolved)
+
+    return await run_in_threadpool(_run)
+
+class AnomalyStreamParams(BaseModel):
+    stream_id: Optional[str] = None               # 없으면 새 스트림 생성
+    seed_dataset_id: Optional[str] = None         # 새 스트림의 과거 이력(업로드된 데이터셋)
+    fit_iforest: bool = False                     # 시드 시 TAG별 Isolation Forest 학습
+    rows: Optional[List[Dict[str, Any]]] = None   # 추가된 행 (또는 csv_b64)
+    csv_b64: Optional[str] = None
+    columns: Optional[List[str]] = None
+    z_threshold: float = 3.0
+    time_col: str = "STD_DT"
+    tag_col: str = "TAG"
+
+@app.post("/tools/anomaly_stream")
+def anomaly_stream(params: AnomalyStreamParams):
+    """Score appended rows incrementally against online per-TAG state (no refit of history)."""
+    sid, det, created = STREAMS.get_or_create(
+        params.stream_id, columns=params.columns, tag_col=params.tag_col,
+        time_col=params.time_col, z_threshold=params.z_threshold,
+    )
+    seeded = None
+    if created and params.seed_dataset_id:
+        seed = STORE.get(params.seed_dataset_id)
+        if seed is None:
+            raise HTTPException(status_code=404, detail=f"dataset_id를 찾을 수 없습니다: {params.seed_dataset_id}")
+        try:
+            seeded = det.seed(seed.df, fit_iforest=params.fit_iforest)
+        except (KeyError, RuntimeError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    if params.rows:
+        batch = pd.DataFrame(params.rows)
+    elif params.csv_b64:
+        batch, _ = read_csv_fast(base64.b64decode(params.csv_b64.encode()))
+    else:
+        return {"stream_id": sid, "created": created, "seeded": seeded, "rows": 0, "rows_seen": det.rows_seen}
+    try:
+        out = det.update(batch)
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=f"누락 컬럼: {e}")
+    return {"stream_id": sid, "created": created, "seeded": seeded, **out}
+
 class PingParams(BaseModel):
     url: str
 
@@ -266,6 +711,8 @@ def health():
 def health_head():
     return Response(status_code=204)
 
+WARMUP.install(app)   # GET /ready
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8002)
@@ -0,0 +1,280 @@
+from __future__ import annotations
+import bisect
+import contextvars
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# --- CONFIGS ---
+REQUEST_ID_HEADER = "X-Request-ID"
+# 초 단위 버킷 (Prometheus 관례). 마지막은 +Inf.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+                   float("inf"))
+
+# 요청 단위 컨텍스트: request id와 단계별 소요 시간 [(stage, ms)].
+# 리스트 객체 자체를 공유하므로 run_in_threadpool(컨텍스트 복사) 안에서 기록해도 요청 쪽에서 보입니다.
+_REQUEST_ID: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+_STAGES: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar("stages", default=None)
+
+
+def _fmt_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(v: Any) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_num(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(k, "")) for k in self.labels)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *a, **kw):
+        super().__init__(*a, **kw)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_fmt_labels(self.labels, k)} {_fmt_num(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_, labels)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}   # key → [counts(비누적), sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            s[0][i] += 1
+            s[1] += value
+            s[2] += 1
+
+    def _samples(self) -> List[str]:
+        out: List[str] = []
+        with self._lock:
+            items = [(k, list(s[0]), s[1], s[2]) for k, s in self._series.items()]
+        for key, counts, total, n in items:
+            acc = 0
+            for ub, c in zip(self.buckets, counts):
+                acc += c
+                le = 'le="%s"' % _fmt_num(ub)
+                out.append(f"{self.name}_bucket{_fmt_labels(self.labels, key, le)} {acc}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.labels, key)} {_fmt_num(total)}")
+            out.append(f"{self.name}_count{_fmt_labels(self.labels, key)} {n}")
+        return out
+
+
+class Registry:
+    """프로세스 단위 메트릭 저장소. collector는 추가 노출 줄(str 리스트)을 돌려주는 콜백입니다."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], List[str]]] = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help_: str, labels: Tuple[str, ...], **kw):
+        with self._lock:
+            m = self._metrics.get(name)
+            if m is None:
+                m = self._metrics[name] = cls(name, help_, labels, **kw)
+            return m
+
+    def counter(self, name: str, help_: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help_, labels)
+
+    def gauge(self, name: str, help_: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help_, labels)
+
+    def histogram(self, name: str, help_: str, labels: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_, labels, buckets=buckets)
+
+    def register_collector(self, fn: Callable[[], List[str]]):
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for m in metrics:
+            lines.extend(m.render())
+        for fn in self._collectors:
+            try:
+                lines.extend(fn())
+            except Exception as e:
+                lines.append(f"# collector error: {_escape(e)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_LATENCY = REGISTRY.histogram("agent_http_request_duration_seconds", "HTTP request latency",
+                                  ("service", "route", "method", "status"))
+HTTP_IN_FLIGHT = REGISTRY.gauge("agent_http_requests_in_flight", "Requests currently being served", ("service",))
+STAGE_LATENCY = REGISTRY.histogram("agent_stage_duration_seconds", "Latency of an instrumented stage",
+                                   ("service", "stage"))
+CACHE_EVENTS = REGISTRY.counter("agent_cache_events_total", "Cache lookups by cache and result",
+                                ("cache", "result"))
+
+_SERVICE = {"name": "unknown"}
+
+
+def _process_metrics() -> List[str]:
+    # 부하 테스트가 시나리오 전후로 읽어 라우트당 서버 CPU 비용을 계산합니다.
+    return ["# TYPE process_cpu_seconds_total counter", f"process_cpu_seconds_total {time.process_time()}"]
+
+
+REGISTRY.register_collector(_process_metrics)
+
+
+# ---------- 요청 컨텍스트 ----------
+def current_request_id() -> Optional[str]:
+    return _REQUEST_ID.get()
+
+
+def current_stages() -> List[Tuple[str, float]]:
+    return list(_STAGES.get() or [])
+
+
+def record_stage(name: str, ms: float):
+    """이미 측정된 소요 시간을 현재 요청 단계로 추가 (히스토그램에도 반영)."""
+    STAGE_LATENCY.observe(ms / 1000.0, service=_SERVICE["name"], stage=name)
+    stages = _STAGES.get()
+    if stages is not None:
+        stages.append((name, ms))
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """with stage("embed"): ... — 구간 시간을 히스토그램과 현재 요청의 Server-Timing에 기록합니다."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, (time.perf_counter() - t0) * 1000)
+
+
+def cache_event(cache: str, hit: bool):
+    CACHE_EVENTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def server_timing(stages: List[Tuple[str, float]], total_ms: Optional[float] = None) -> str:
+    """[(stage, ms)] → 'stage;dur=1.2, ...'. 같은 이름은 합산합니다."""
+    merged: Dict[str, float] = {}
+    for name, ms in stages:
+        merged[name] = merged.get(name, 0.0) + ms
+    parts = [f"{n};dur={ms:.1f}" for n, ms in merged.items()]
+    if total_ms is not None:
+        parts.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(parts)
+
+
+def parse_server_timing(header: Optional[str]) -> List[Tuple[str, float]]:
+    out: List[Tuple[str, float]] = []
+    for part in (header or "").split(","):
+        name, _, rest = part.strip().partition(";")
+        for kv in rest.split(";"):
+            k, _, v = kv.strip().partition("=")
+            if k == "dur" and name:
+                try:
+                    out.append((name.strip(), float(v)))
+                except ValueError:
+                    pass
+    return out
+
+
+# ---------- FastAPI 연동 ----------
+def install(app, service: str):
+    """
+    앱에 요청 계측 미들웨어와 GET /metrics 를 붙입니다.
+    - X-Request-ID: 받은 값을 이어 쓰거나 새로 발급해 응답 헤더로 돌려줌
+    - Server-Timing: 이 요청에서 기록된 단계별 시간 + total
+    """
+    from starlette.requests import Request
+    from starlette.responses import PlainTextResponse
+
+    _SERVICE["name"] = service
+
+    @app.middleware("http")
+    async def _observe(request: Request, call_next):
+        rid = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex[:16]
+        rid_token = _REQUEST_ID.set(rid)
+        stages_token = _STAGES.set([])
+        HTTP_IN_FLIGHT.inc(service=service)
+        t0 = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            total_ms = (time.perf_counter() - t0) * 1000
+            response.headers[REQUEST_ID_HEADER] = rid
+            timing = server_timing(current_stages(), total_ms)
+            if timing:
+                response.headers["Server-Timing"] = timing
+            return response
+        finally:
+            route = request.scope.get("route")
+            HTTP_LATENCY.observe(time.perf_counter() - t0, service=service,
+                                 route=getattr(route, "path", "unmatched"), method=request.method, status=status)
+            HTTP_IN_FLIGHT.dec(service=service)
+            _STAGES.reset(stages_token)
+            _REQUEST_ID.reset(rid_token)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+    return app
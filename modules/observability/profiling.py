@@ -0,0 +1,452 @@
+import asyncio
+import contextvars
+import cProfile
+import hmac
+import json
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter as _Counter
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from .metrics import REGISTRY
+
+# --- CONFIGS ---
+# 토큰이 없으면 프로파일링 비활성: 미들웨어/엔드포인트를 붙이지 않으므로 요청 경로 오버헤드 0
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN") or None
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join("data", "profiles"))   # 워커 간 공유 (core --workers N)
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))                 # 서비스별 보관 개수 (오래된 것부터 삭제)
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "10"))  # 샘플링 간격
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))  # 요청/프로세스 프로파일 최대 길이
+PROFILE_MAX_ACTIVE = int(os.getenv("PROFILE_MAX_ACTIVE", "2"))       # 동시에 도는 요청 프로파일 수 상한
+PROFILE_MAX_DEPTH = 96
+PROFILE_TOP_N = 25
+PROFILE_HEADER = "X-Profile"              # 값: sample | cprofile (1/true → sample)
+PROFILE_TOKEN_HEADER = "X-Profile-Token"
+PROFILE_ID_HEADER = "X-Profile-Id"
+PROFILE_QUERY = "__profile"               # 쿼리 플래그 (EventSource 등 헤더를 못 붙이는 클라이언트용)
+PROFILE_TOKEN_QUERY = "__profile_token"
+MODES = ("sample", "cprofile")
+
+# 대기 중인 스레드(샘플에서 제외): 잎 프레임이 (파일 끝부분, 함수)
+IDLE_FRAMES = {
+    ("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"), ("selectors.py", "select"),
+    ("queue.py", "get"), ("thread.py", "_worker"), ("socket.py", "accept"), ("socketserver.py", "serve_forever"),
+    ("profiling.py", "_run"),
+}
+
+PROFILES_TOTAL = REGISTRY.counter("agent_profiles_total", "Captured profiles by kind and outcome",
+                                  ("kind", "outcome"))
+
+# 프로파일 중인 요청의 (mode, token) — 업스트림 호출(게이트웨이 → 서버, core → data_tools)에 그대로 전달
+_FORWARD: contextvars.ContextVar[Optional[Tuple[str, str]]] = contextvars.ContextVar("profile_forward", default=None)
+
+
+def forward_headers() -> Dict[str, str]:
+    """현재 요청이 프로파일 중이면 업스트림에도 같은 프로파일 헤더 (같은 X-Request-ID로 서비스별 결과 연결)."""
+    fwd = _FORWARD.get()
+    return {PROFILE_HEADER: fwd[0], PROFILE_TOKEN_HEADER: fwd[1]} if fwd else {}
+
+
+def _authorized(token: Optional[str]) -> bool:
+    return bool(PROFILING_TOKEN and token and hmac.compare_digest(token, PROFILING_TOKEN))
+
+
+def _mode(value: Optional[str]) -> Optional[str]:
+    v = (value or "").strip().lower()
+    if not v or v in ("0", "false", "no"):
+        return None
+    return v if v in MODES else "sample"
+
+
+# ---------- Sampling profiler ----------
+class Sampler:
+    """
+    sys._current_frames()를 interval마다 읽는 순수 파이썬 wall-clock 샘플러 (모든 스레드).
+    스레드풀에서 도는 pandas/FAISS/LangChain 호출까지 보이며, 대기 중인 스레드는 잎 프레임으로 걸러 냅니다.
+    C 확장 내부는 그 함수를 부른 파이썬 프레임으로 집계됩니다.
+    """
+
+    def __init__(self, interval_s: float = PROFILE_INTERVAL_MS / 1000, max_seconds: float = PROFILE_MAX_SECONDS):
+        self.interval_s = interval_s
+        self.max_seconds = max_seconds
+        self.samples: _Counter = _Counter()          # (thread id, stack root→leaf) → 샘플 수
+        self.thread_names: Dict[int, str] = {}
+        self.ticks = 0
+        self.started = self.ended = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "Sampler":
+        self.started = time.time()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def request_stop(self):
+        """샘플링만 멈추라고 알림 (join 없음). 이후 stop()이 스레드 종료를 기다림."""
+        self._stop.set()
+
+    def stop(self) -> "Sampler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.ended = time.time()
+        return self
+
+    def _run(self):
+        me = threading.get_ident()
+        deadline = time.perf_counter() + self.max_seconds
+        while not self._stop.wait(self.interval_s) and time.perf_counter() < deadline:
+            self.ticks += 1
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < PROFILE_MAX_DEPTH:
+                    code = frame.f_code
+                    stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                    frame = frame.f_back
+                self.samples[(tid, tuple(reversed(stack)))] += 1
+        names = {t.ident: t.name for t in threading.enumerate()}
+        self.thread_names = {tid: names.get(tid, f"thread-{tid}") for tid, _ in self.samples}
+
+    def speedscope(self, name: str) -> Dict[str, Any]:
+        """speedscope 'sampled' 형식 (https://www.speedscope.app 에 그대로 열림). 스레드마다 프로파일 1개."""
+        frames: List[Dict[str, Any]] = []
+        index: Dict[Tuple[str, str, int], int] = {}
+        per_thread: Dict[int, Tuple[List[List[int]], List[float]]] = {}
+        for (tid, stack), n in self.samples.most_common():
+            ids = []
+            for fr in stack:
+                if fr not in index:
+                    index[fr] = len(frames)
+                    frames.append({"name": fr[0], "file": fr[1], "line": fr[2]})
+                ids.append(index[fr])
+            stacks, weights = per_thread.setdefault(tid, ([], []))
+            stacks.append(ids)
+            weights.append(n * self.interval_s)
+        duration = max(self.ended - self.started, 0.0)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name, "exporter": "modules.observability.profiling",
+            "shared": {"frames": frames},
+            "profiles": [{"type": "sampled", "name": self.thread_names.get(tid, str(tid)), "unit": "seconds",
+                          "startValue": 0, "endValue": duration, "samples": s, "weights": w}
+                         for tid, (s, w) in per_thread.items()],
+        }
+
+    def top(self, n: int = PROFILE_TOP_N) -> Dict[str, Any]:
+        """자기 시간(self: 잎 프레임)과 누적 시간(inclusive) 상위 함수 (초, 추정)."""
+        self_t: _Counter = _Counter()
+        incl: _Counter = _Counter()
+        for (_, stack), k in self.samples.items():
+            if stack:
+                self_t[stack[-1]] += k
+            for fr in set(stack):
+                incl[fr] += k
+
+        def rows(c):
+            return [{"function": f"{fr[0]} ({_short(fr[1])}:{fr[2]})", "seconds": round(k * self.interval_s, 4)}
+                    for fr, k in c.most_common(n)]
+
+        return {"samples": int(sum(self.samples.values())), "ticks": self.ticks,
+                "interval_ms": self.interval_s * 1000, "self": rows(self_t), "inclusive": rows(incl)}
+
+
+def _short(path: str) -> str:
+    for marker in ("site-packages" + os.sep, os.getcwd() + os.sep):
+        i = path.find(marker)
+        if i >= 0:
+            return path[i + len(marker):]
+    return "/".join(path.replace("\\", "/").split("/")[-2:])
+
+
+def _pstats_top(st: pstats.Stats, n: int = PROFILE_TOP_N) -> Dict[str, Any]:
+    rows = []
+    ranked = sorted(st.stats.items(), key=lambda kv: -kv[1][3])
+    # 이벤트 루프 대기(select/epoll)는 요약에서 제외 (.pstats 파일에는 그대로)
+    ranked = [kv for kv in ranked if (os.path.basename(kv[0][0]), kv[0][2]) not in IDLE_FRAMES
+              and "of 'select." not in kv[0][2]]
+    for (file, line, fn), (cc, nc, tt, ct, _) in ranked[:n]:
+        rows.append({"function": f"{fn} ({_short(file)}:{line})", "calls": nc, "self_s": round(tt, 4),
+                     "cumulative_s": round(ct, 4)})
+    return {"total_calls": st.total_calls, "total_s": round(st.total_tt, 4), "cumulative": rows}
+
+
+# ---------- Storage ----------
+class ProfileStore:
+    """프로파일을 PROFILE_DIR에 파일로 저장 (<id>.json 메타 + <id>.speedscope.json | <id>.pstats). 서비스별 최근 PROFILE_KEEP개."""
+
+    def __init__(self, root: str = PROFILE_DIR, keep: int = PROFILE_KEEP):
+        self.root = root
+        self.keep = keep
+        self._lock = threading.Lock()
+
+    def _path(self, pid: str, suffix: str) -> str:
+        if not pid.replace("-", "").replace("_", "").isalnum():   # 경로 조작 방지
+            raise KeyError(pid)
+        return os.path.join(self.root, f"{pid}{suffix}")
+
+    def save(self, pid: str, meta: Dict[str, Any], data: bytes, suffix: str):
+        os.makedirs(self.root, exist_ok=True)
+        with open(self._path(pid, suffix), "wb") as f:
+            f.write(data)
+        with open(self._path(pid, ".json"), "w", encoding="utf-8") as f:
+            json.dump({**meta, "file": pid + suffix}, f, ensure_ascii=False)
+        self._prune(meta["service"])
+
+    def _prune(self, service: str):
+        with self._lock:
+            items = self.list(service=service)
+            for m in items[self.keep:]:
+                for name in (m["id"] + ".json", m.get("file")):
+                    try:
+                        os.remove(os.path.join(self.root, name))
+                    except (OSError, TypeError):
+                        pass
+
+    def list(self, request_id: Optional[str] = None, service: Optional[str] = None) -> List[Dict[str, Any]]:
+        """최신순 메타 목록."""
+        if not os.path.isdir(self.root):
+            return []
+        out = []
+        for name in os.listdir(self.root):
+            if name.endswith(".json") and not name.endswith(".speedscope.json"):
+                try:
+                    with open(os.path.join(self.root, name), encoding="utf-8") as f:
+                        meta = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if (request_id is None or meta.get("request_id") == request_id) and \
+                        (service is None or meta.get("service") == service):
+                    out.append(meta)
+        return sorted(out, key=lambda m: m.get("started", 0), reverse=True)
+
+    def get(self, pid: str) -> Tuple[Dict[str, Any], str]:
+        """(메타, 데이터 파일 경로). 없으면 KeyError."""
+        try:
+            with open(self._path(pid, ".json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except OSError:
+            raise KeyError(pid)
+        return meta, os.path.join(self.root, meta["file"])
+
+
+STORE = ProfileStore()
+
+
+class _Capture:
+    """요청 1건 또는 프로세스 전체 프로파일 실행. cProfile은 스레드별이라 이벤트 루프 스레드만 잡힙니다."""
+
+    _cprofile_lock = threading.Lock()   # sys.setprofile은 스레드당 1개 — 동시에 하나만 (나머지는 sample로)
+    _active = 0
+    _active_lock = threading.Lock()
+
+    def __init__(self, service: str, kind: str, mode: str, label: str, request_id: Optional[str] = None,
+                 interval_ms: float = PROFILE_INTERVAL_MS, max_seconds: float = PROFILE_MAX_SECONDS):
+        self.service, self.kind, self.label, self.request_id = service, kind, label, request_id
+        self.id = f"{service}-{uuid.uuid4().hex[:12]}"
+        if mode == "cprofile" and not _Capture._cprofile_lock.acquire(blocking=False):
+            mode = "sample"
+        self.mode = mode
+        self.interval_s = max(interval_ms, 1.0) / 1000
+        self.max_seconds = min(max_seconds, PROFILE_MAX_SECONDS)
+        self._prof: Optional[cProfile.Profile] = None
+        self._sampler: Optional[Sampler] = None
+        self._t0 = 0.0
+        self._elapsed: Optional[float] = None
+        self.started = 0.0
+
+    @classmethod
+    def try_acquire(cls) -> bool:
+        with cls._active_lock:
+            if cls._active >= PROFILE_MAX_ACTIVE:
+                return False
+            cls._active += 1
+            return True
+
+    @classmethod
+    def release(cls):
+        with cls._active_lock:
+            cls._active -= 1
+
+    def start(self) -> "_Capture":
+        self.started, self._t0 = time.time(), time.perf_counter()
+        if self.mode == "cprofile":
+            self._prof = cProfile.Profile()
+            self._prof.enable()
+        else:
+            self._sampler = Sampler(self.interval_s, self.max_seconds).start()
+        return self
+
+    def stop(self) -> "_Capture":
+        """수집만 멈춤 (가벼움). cProfile은 켠 스레드에서 꺼야 하므로 start()와 같은 스레드(이벤트 루프)에서 호출."""
+        if self._elapsed is None:
+            self._elapsed = time.perf_counter() - self._t0
+            if self._prof is not None:
+                self._prof.disable()
+                _Capture._cprofile_lock.release()
+            else:
+                self._sampler.request_stop()
+        return self
+
+    def save(self, **extra) -> Dict[str, Any]:
+        """샘플러 스레드 join, pstats/speedscope 직렬화, 파일 저장 (무거움 → asyncio.to_thread로 호출)."""
+        self.stop()
+        elapsed = self._elapsed
+        if self._prof is not None:
+            st = pstats.Stats(self._prof)
+            # pstats.Stats.dump_stats와 같은 형식 (pstats.Stats(path), snakeviz로 열림)
+            data, suffix, top = marshal.dumps(st.stats), ".pstats", _pstats_top(st)
+        else:
+            self._sampler.stop()
+            data = json.dumps(self._sampler.speedscope(f"{self.service} {self.label}")).encode("utf-8")
+            suffix, top = ".speedscope.json", self._sampler.top()
+        meta = {"id": self.id, "service": self.service, "kind": self.kind, "mode": self.mode, "label": self.label,
+                "request_id": self.request_id, "started": round(self.started, 3),
+                "duration_ms": round(elapsed * 1000, 1), **extra}
+        try:
+            STORE.save(self.id, {**meta, "top": top}, data, suffix)
+            PROFILES_TOTAL.inc(kind=self.kind, outcome="saved")
+        except Exception as e:
+            print(f"[PROFILE] save failed: {e}")
+            PROFILES_TOTAL.inc(kind=self.kind, outcome="error")
+        return {**meta, "top": top}
+
+    def finish(self, **extra) -> Dict[str, Any]:
+        """중지 → 저장 → 메타(+ 상위 함수 요약) 반환."""
+        return self.stop().save(**extra)
+
+
+# ---------- ASGI middleware ----------
+class ProfilingMiddleware:
+    """
+    X-Profile(+ X-Profile-Token) 헤더나 ?__profile=&__profile_token= 가 붙은 요청 1건을 프로파일합니다.
+    응답 본문을 끝까지 보낸 뒤(SSE 포함) 저장하고, 응답 헤더 X-Profile-Id로 id를 알려 줍니다.
+    토큰이 맞지 않거나 동시 프로파일이 PROFILE_MAX_ACTIVE개면 그냥 통과 (응답은 동일).
+    """
+
+    def __init__(self, app, service: str):
+        self.app = app
+        self.service = service
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        mode, token = None, None
+        for k, v in scope.get("headers") or ():
+            if k == b"x-profile":
+                mode = _mode(v.decode("latin-1"))
+            elif k == b"x-profile-token":
+                token = v.decode("latin-1")
+        if mode is None and PROFILE_QUERY.encode() in (scope.get("query_string") or b""):
+            q = parse_qs(scope["query_string"].decode("latin-1"))
+            mode, token = _mode((q.get(PROFILE_QUERY) or [None])[-1]), (q.get(PROFILE_TOKEN_QUERY) or [None])[-1]
+        if mode is None or not _authorized(token) or not _Capture.try_acquire():
+            # 같은 keep-alive 연결의 이전 요청 컨텍스트가 이어질 수 있어(uvicorn이 큰 본문 수신 중 resume_reading에서
+            # reader를 다시 등록) 명시적으로 비웁니다. 안 그러면 이전 프로파일 헤더가 업스트림으로 전달됨
+            fwd = _FORWARD.set(None)
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                _FORWARD.reset(fwd)
+            return
+
+        rid = _header(scope, b"x-request-id")
+        if rid is None:
+            # metrics 미들웨어가 같은 id를 쓰도록 미리 발급 → 업스트림 프로파일과 X-Request-ID로 연결
+            rid = uuid.uuid4().hex[:16]
+            scope["headers"] = list(scope.get("headers") or ()) + [(b"x-request-id", rid.encode())]
+        cap = _Capture(self.service, "request", mode, f"{scope.get('method')} {scope.get('path')}",
+                       request_id=rid).start()
+        status = {"code": 0}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(PROFILE_ID_HEADER.lower().encode(),
+                                                                   cap.id.encode())]
+            await send(message)
+
+        fwd = _FORWARD.set((cap.mode, token))
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _FORWARD.reset(fwd)
+            try:
+                # 수집 중지는 루프에서 (cProfile 스레드 제약), 직렬화/파일 저장은 스레드에서 (다른 요청을 막지 않도록)
+                meta = await asyncio.to_thread(cap.stop().save, status=status["code"])
+                print(f"[PROFILE] {meta['id']} {meta['label']} {meta['mode']} {meta['duration_ms']}ms")
+            finally:
+                _Capture.release()
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for k, v in scope.get("headers") or ():
+        if k == name:
+            return v.decode("latin-1")
+    return None
+
+
+def install(app, service: str):
+    """
+    PROFILING_TOKEN이 설정된 경우에만 요청 단위 프로파일 미들웨어와 /debug/profile* 엔드포인트를 붙입니다.
+    - POST /debug/profile?seconds=&interval_ms=: 프로세스 전체 샘플링 (시간 제한, 한 번에 하나)
+    - GET /debug/profiles[?request_id=]: 저장된 프로파일 목록, GET /debug/profiles/{id}[?format=summary]: 파일/요약
+    """
+    if not PROFILING_TOKEN:
+        return app
+    from fastapi import HTTPException, Request
+    from starlette.responses import FileResponse
+
+    app.add_middleware(ProfilingMiddleware, service=service)
+    process_lock = asyncio.Lock()
+
+    def _check(request: Request):
+        token = request.headers.get(PROFILE_TOKEN_HEADER) or request.query_params.get(PROFILE_TOKEN_QUERY)
+        if not _authorized(token):
+            raise HTTPException(status_code=403, detail="profiling token required")
+
+    @app.post("/debug/profile", include_in_schema=False)
+    async def profile_process(request: Request, seconds: float = 10.0, interval_ms: float = PROFILE_INTERVAL_MS):
+        _check(request)
+        if not 0 < seconds <= PROFILE_MAX_SECONDS:
+            raise HTTPException(status_code=400, detail=f"seconds는 0 초과 {PROFILE_MAX_SECONDS} 이하")
+        if process_lock.locked():
+            raise HTTPException(status_code=409, detail="process profile already running")
+        async with process_lock:
+            cap = _Capture(service, "process", "sample", f"process {seconds:g}s", interval_ms=interval_ms,
+                           max_seconds=seconds).start()
+            await asyncio.sleep(seconds)
+            return await asyncio.to_thread(cap.finish)
+
+    @app.get("/debug/profiles", include_in_schema=False)
+    def list_profiles(request: Request, request_id: Optional[str] = None):
+        _check(request)
+        return {"service": service, "profiles": [{k: v for k, v in m.items() if k != "top"}
+                                                 for m in STORE.list(request_id, service)]}
+
+    @app.get("/debug/profiles/{pid}", include_in_schema=False)
+    def get_profile(pid: str, request: Request, format: str = "file"):
+        _check(request)
+        try:
+            meta, path = STORE.get(pid)
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"profile not found: {pid}")
+        if format == "summary":
+            return meta
+        media = "application/json" if path.endswith(".json") else "application/octet-stream"
+        return FileResponse(path, media_type=media, filename=os.path.basename(path))
+
+    return app
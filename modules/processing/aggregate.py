@@ -0,0 +1,259 @@
+from __future__ import annotations
+import json
+from itertools import combinations
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .aggregate_plan import metric_name, plan_question
+
+# --- CONFIGS ---
+MAX_RESULT_ROWS = 1000          # 결과 행 상한 (limit 최댓값)
+DEFAULT_LIMIT = 100
+MAX_TAG_VALUES = 200            # 플래너에 넘기는 TAG 값 수 (질문에 언급된 TAG 필터용)
+BUILTIN_AGGS = ("count", "sum", "mean", "median", "min", "max", "std", "var", "first", "last", "nunique")
+QUANTILE_AGGS = {"p05": 0.05, "p25": 0.25, "p50": 0.5, "p75": 0.75, "p90": 0.9, "p95": 0.95, "p99": 0.99}
+ARG_AGGS = ("argmax", "argmin")   # 최댓값/최솟값이 나온 시각 (시간 컬럼이 없으면 행 번호)
+FILTER_OPS = ("==", "!=", ">", ">=", "<", "<=", "in", "not_in", "between", "isnull", "notnull", "contains")
+SPEC_KEYS = ("metrics", "group_by", "resample", "filters", "start", "end", "last", "rolling", "corr", "sort_by",
+             "descending", "limit", "time_col", "tag_col")
+
+
+def normalize_spec(spec: Dict[str, Any], columns: List[str]) -> Dict[str, Any]:
+    """
+    spec 검증 + 기본값 채우기. 결과는 캐시 키로도 쓰므로 키 순서/기본값을 고정합니다.
+    잘못된 컬럼은 KeyError, 잘못된 agg/op/조합은 ValueError.
+    """
+    cols = set(map(str, columns))
+    time_col = spec.get("time_col") or "STD_DT"
+    out: Dict[str, Any] = {
+        "metrics": [], "group_by": list(spec.get("group_by") or []), "resample": spec.get("resample") or None,
+        "filters": [], "start": spec.get("start"), "end": spec.get("end"), "last": spec.get("last"),
+        "rolling": None, "corr": list(spec.get("corr") or []), "sort_by": spec.get("sort_by"),
+        "descending": bool(spec.get("descending", True)),
+        "limit": max(1, min(int(spec.get("limit") or DEFAULT_LIMIT), MAX_RESULT_ROWS)),
+        "time_col": time_col if time_col in cols else None, "tag_col": spec.get("tag_col") or "TAG",
+    }
+    for m in spec.get("metrics") or []:
+        column, agg = str(m.get("column", "*")), str(m.get("agg", "mean")).lower()
+        if agg not in BUILTIN_AGGS and agg not in QUANTILE_AGGS and agg not in ARG_AGGS:
+            raise ValueError(f"지원하지 않는 agg: {agg}")
+        if column == "*" and agg != "count":
+            raise ValueError("'*'는 count에만 쓸 수 있습니다.")
+        out["metrics"].append({"column": column, "agg": agg})
+    for f in spec.get("filters") or []:
+        op = str(f.get("op", "=="))
+        if op not in FILTER_OPS:
+            raise ValueError(f"지원하지 않는 필터 연산자: {op}")
+        out["filters"].append({"column": str(f["column"]), "op": op, "value": f.get("value")})
+    if spec.get("rolling"):
+        r = spec["rolling"]
+        if not out["metrics"] or r.get("window") in (None, ""):
+            raise ValueError("rolling에는 metrics와 window가 필요합니다.")
+        out["rolling"] = {"window": r["window"], "agg": str(r.get("agg", "mean")), "min_periods": int(r.get("min_periods", 1))}
+    if not out["metrics"] and len(out["corr"]) < 2:
+        raise ValueError("metrics 또는 corr(컬럼 2개 이상)가 필요합니다.")
+    if (out["resample"] or out["start"] or out["end"] or out["last"]) and not out["time_col"]:
+        raise ValueError(f"시간 컬럼이 없습니다: {time_col}")
+    needed = set(out["group_by"]) | set(out["corr"]) | {f["column"] for f in out["filters"]}
+    needed |= {m["column"] for m in out["metrics"] if m["column"] != "*"}
+    missing = sorted(needed - cols)
+    if missing:
+        raise KeyError(f"누락 컬럼: {missing}")
+    return out
+
+
+def spec_key(spec: Dict[str, Any]) -> str:
+    return json.dumps(spec, sort_keys=True, default=str, ensure_ascii=False)
+
+
+def scan_args(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    정규화된 spec이 실제로 읽어야 하는 범위 → Dataset.frame() 인자 (Parquet projection/pushdown).
+    TAG 필터(==, in)와 start/end만 내립니다. last는 "필터 후 마지막 시각" 기준이라 시간 범위를 미리 자르면 결과가 달라짐.
+    """
+    columns = set(spec["group_by"]) | set(spec["corr"]) | {f["column"] for f in spec["filters"]}
+    columns |= {m["column"] for m in spec["metrics"] if m["column"] != "*"}
+    if spec["time_col"]:
+        columns.add(spec["time_col"])
+    tags: Optional[set] = None
+    for f in spec["filters"]:
+        if f["column"] == spec["tag_col"] and f["op"] in ("==", "in"):
+            values = f["value"] if isinstance(f["value"], (list, tuple)) else [f["value"]]
+            tags = {str(v) for v in values} if tags is None else tags & {str(v) for v in values}
+    time_ok = spec["time_col"] and not spec["last"]
+    return {"columns": sorted(columns), "tags": sorted(tags) if tags is not None else None,
+            "start": spec["start"] if time_ok else None, "end": spec["end"] if time_ok else None,
+            "tag_col": spec["tag_col"], "time_col": spec["time_col"] or "STD_DT"}
+
+
+def plan_for(df: pd.DataFrame, question: str, time_col: str = "STD_DT", tag_col: str = "TAG") -> Optional[Dict[str, Any]]:
+    """데이터셋 컬럼 정보로 질문을 spec으로 (aggregate_plan.plan_question)."""
+    numeric = [str(c) for c in df.select_dtypes(include=["number"]).columns]
+    tag_values: List[str] = []
+    if tag_col in df.columns:
+        s = df[tag_col]
+        cats = s.cat.categories if isinstance(s.dtype, pd.CategoricalDtype) else s.dropna().unique()[:MAX_TAG_VALUES + 1]
+        if len(cats) <= MAX_TAG_VALUES:
+            tag_values = [str(v) for v in cats]
+    spec = plan_question(question, [str(c) for c in df.columns], numeric, time_col, tag_col, tag_values)
+    if spec is not None:
+        spec.update(time_col=time_col, tag_col=tag_col)
+    return spec
+
+
+def _as_time(s: pd.Series) -> pd.Series:
+    return s if pd.api.types.is_datetime64_any_dtype(s.dtype) else pd.to_datetime(s, errors="coerce")
+
+
+def _filter_mask(s: pd.Series, op: str, value: Any) -> np.ndarray:
+    if op == "isnull":
+        return s.isna().to_numpy()
+    if op == "notnull":
+        return s.notna().to_numpy()
+    if op in ("in", "not_in"):
+        values = value if isinstance(value, (list, tuple)) else [value]
+        hit = s.astype(str).isin([str(v) for v in values]) if not pd.api.types.is_numeric_dtype(s.dtype) \
+            else s.isin(values)
+        return (hit if op == "in" else ~hit).to_numpy()
+    if op == "contains":
+        return s.astype(str).str.contains(str(value), case=False, regex=False, na=False).to_numpy()
+    if pd.api.types.is_datetime64_any_dtype(s.dtype):
+        value = [pd.Timestamp(v) for v in value] if isinstance(value, (list, tuple)) else pd.Timestamp(value)
+    if op == "between":
+        lo, hi = value
+        return s.between(lo, hi).to_numpy()
+    cmp = {"==": s.eq, "!=": s.ne, ">": s.gt, ">=": s.ge, "<": s.lt, "<=": s.le}[op]
+    return cmp(value).fillna(False).to_numpy(dtype=bool)
+
+
+def _apply_rolling(view: pd.DataFrame, spec: Dict[str, Any], keys: List[str]) -> pd.DataFrame:
+    """metric 컬럼을 그룹(group_by)별 시간순 rolling 값으로 바꿉니다 (예: 1시간 이동평균의 최댓값)."""
+    r, time_col = spec["rolling"], spec["time_col"]
+    value_cols = sorted({m["column"] for m in spec["metrics"] if m["column"] != "*"})
+    window = r["window"]
+    if isinstance(window, str) and not window.isdigit():
+        if not time_col:
+            raise ValueError("시간 창 rolling에는 시간 컬럼이 필요합니다.")
+        view = view.sort_values(keys + [time_col])
+        base = view.groupby(keys, observed=True, sort=False) if keys else view
+        rolled = base.rolling(window, on=time_col, min_periods=r["min_periods"])[value_cols].agg(r["agg"])
+    else:
+        if time_col:
+            view = view.sort_values(keys + [time_col])
+        base = view.groupby(keys, observed=True, sort=False)[value_cols] if keys else view[value_cols]
+        rolled = base.rolling(int(window), min_periods=r["min_periods"]).agg(r["agg"])
+    # view를 키(+시간) 순으로 정렬해 두었으므로 결과 행 순서가 view와 같음 (pandas 버전마다 결과 인덱스가 달라 위치로 대입)
+    view = view.copy()
+    view[value_cols] = rolled[value_cols].to_numpy()
+    return view
+
+
+def _corr_frame(view: pd.DataFrame, cols: List[str], keys: List[Any]) -> pd.DataFrame:
+    """
+    쌍별 Pearson 상관을 그룹별로 벡터화해 계산: 두 값이 모두 있는 행만으로
+    corr = (E[ab] - E[a]E[b]) / sqrt((E[a²]-E[a]²)(E[b²]-E[b]²)).
+    """
+    parts = {}
+    key_cols = [k if isinstance(k, str) else k.key for k in keys]   # group_by 컬럼 + resample 시간 컬럼
+    for a, b in combinations(cols, 2):
+        x, y = view[a].astype("float64"), view[b].astype("float64")
+        both = x.notna() & y.notna()
+        x, y = x.where(both), y.where(both)
+        tmp = view[key_cols].assign(x=x, y=y, xy=x * y, xx=x * x, yy=y * y)
+        m = tmp.groupby(keys, observed=True).mean() if keys else tmp.mean().to_frame().T
+        var = (m["xx"] - m["x"] ** 2) * (m["yy"] - m["y"] ** 2)
+        parts[f"corr({a},{b})"] = ((m["xy"] - m["x"] * m["y"]) / np.sqrt(var.where(var > 0))).clip(-1, 1)
+    return pd.DataFrame(parts)
+
+
+def run_aggregate(df: pd.DataFrame, spec: Dict[str, Any]) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    정규화된 spec을 실행해 (결과 DataFrame, meta)를 반환합니다.
+    필터 마스크 → 필요한 컬럼만 → (rolling) → group_by/resample 집계 → 정렬/limit. 행 단위 파이썬 루프 없음.
+    """
+    time_col = spec["time_col"]
+    mask = np.ones(len(df), dtype=bool)
+    for f in spec["filters"]:
+        mask &= _filter_mask(df[f["column"]], f["op"], f["value"])
+    needed = set(spec["group_by"]) | set(spec["corr"]) | {m["column"] for m in spec["metrics"] if m["column"] != "*"}
+    if time_col:
+        needed.add(time_col)
+    view = df.loc[mask, [c for c in df.columns if c in needed]]
+    if time_col and not pd.api.types.is_datetime64_any_dtype(view[time_col].dtype):
+        view = view.assign(**{time_col: _as_time(view[time_col])})
+    if time_col and (spec["start"] or spec["end"] or spec["last"]):
+        ts = view[time_col]
+        tmask = ts.notna()
+        if spec["start"]:
+            tmask &= ts >= pd.Timestamp(spec["start"])
+        if spec["end"]:
+            tmask &= ts <= pd.Timestamp(spec["end"])
+        if spec["last"]:
+            tmask &= ts >= ts.max() - pd.Timedelta(spec["last"])
+        view = view[tmask]
+
+    keys: List[Any] = list(spec["group_by"])
+    if spec["rolling"]:
+        view = _apply_rolling(view, spec, list(spec["group_by"]))
+    if spec["resample"]:
+        keys.append(pd.Grouper(key=time_col, freq=spec["resample"]))
+
+    frames: List[pd.DataFrame] = []
+    if spec["metrics"]:
+        g = view.groupby(keys, observed=True, dropna=True) if keys else None
+        cols: Dict[str, pd.Series] = {}
+        for m in spec["metrics"]:
+            column, agg = m["column"], m["agg"]
+            name = metric_name(column, agg)
+            if g is None:
+                s = view[column] if column != "*" else None
+                if column == "*":
+                    value = len(view)
+                elif agg in QUANTILE_AGGS:
+                    value = s.quantile(QUANTILE_AGGS[agg])
+                elif agg in ARG_AGGS:
+                    idx = getattr(s, "idx" + agg[3:])() if s.notna().any() else None
+                    value = None if idx is None else (view.at[idx, time_col] if time_col else int(idx))
+                else:
+                    value = s.agg(agg)
+                cols[name] = pd.Series([value])
+            elif column == "*":
+                cols[name] = g.size()
+            elif agg in QUANTILE_AGGS:
+                cols[name] = g[column].quantile(QUANTILE_AGGS[agg])
+            elif agg in ARG_AGGS:
+                idx = getattr(g[column], "idx" + agg[3:])(skipna=True).dropna()
+                cols[name] = pd.Series(view.loc[idx.to_numpy(), time_col].to_numpy() if time_col else idx.to_numpy(),
+                                       index=idx.index)
+            else:
+                cols[name] = g[column].agg(agg)
+        frames.append(pd.DataFrame(cols))
+    if len(spec["corr"]) >= 2:
+        corr = _corr_frame(view, spec["corr"], keys)
+        frames.append(corr if keys else corr.reset_index(drop=True))
+    out = pd.concat(frames, axis=1) if len(frames) > 1 else frames[0]
+    if keys:
+        out = out.reset_index()
+    if spec["sort_by"]:
+        if spec["sort_by"] not in out.columns:
+            raise KeyError(f"sort_by가 결과 컬럼이 아닙니다: {spec['sort_by']}")
+        out = out.sort_values(spec["sort_by"], ascending=not spec["descending"], na_position="last")
+    row_count = len(out)
+    out = out.head(spec["limit"]).reset_index(drop=True)
+    meta = {"row_count": int(row_count), "truncated": row_count > len(out), "filtered_rows": int(len(view)),
+            "total_rows": int(len(df))}
+    return out, meta
+
+
+def result_json(out: pd.DataFrame) -> Dict[str, Any]:
+    """결과 프레임 → {"columns", "rows"}. 시각은 ISO 문자열, 결측은 None, float32 잡음 제거."""
+    frame = out.copy()
+    for c in frame.columns:
+        if pd.api.types.is_datetime64_any_dtype(frame[c].dtype):
+            frame[c] = frame[c].dt.strftime("%Y-%m-%dT%H:%M:%S")
+        elif frame[c].dtype == np.float32:
+            frame[c] = frame[c].astype(str).astype(np.float64)
+    frame = frame.astype(object).where(frame.notna(), None)
+    return {"columns": [str(c) for c in frame.columns], "rows": frame.to_numpy().tolist()}
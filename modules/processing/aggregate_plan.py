@@ -0,0 +1,173 @@
+"""
+자연어 질문 → 집계 spec (키워드 플래너)와 집계 결과의 프롬프트용 표 포맷.
+
+pandas 없이 동작합니다 (core 서버는 이 모듈만 import해 집계가 필요한 질문인지 판단하고 결과를 프롬프트에 싣습니다).
+실제 실행은 data_tools의 /tools/aggregate (modules.processing.aggregate).
+"""
+from __future__ import annotations
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# --- CONFIGS ---
+MAX_AUTO_COLUMNS = 8       # 컬럼 언급이 없을 때 집계할 수치형 컬럼 수
+MAX_CORR_COLUMNS = 6
+PROMPT_MAX_ROWS = 30       # 프롬프트에 싣는 집계 결과 행 수
+
+# (키워드, agg). 앞에서부터 매칭. "언제/시점/when"이 함께 있으면 max/min 대신 argmax/argmin도 추가
+AGG_KEYWORDS: Tuple[Tuple[Tuple[str, ...], str], ...] = (
+    (("평균", "mean", "average", "avg"), "mean"),
+    (("최댓값", "최대", "가장 높", "가장 큰", "피크", "max", "highest", "peak"), "max"),
+    (("최솟값", "최소", "가장 낮", "가장 작", "min", "lowest"), "min"),
+    (("합계", "총합", "누적", "sum", "total"), "sum"),
+    (("개수", "건수", "몇 개", "몇 건", "몇 행", "count", "how many"), "count"),
+    (("표준편차", "변동성", "std", "stdev", "volatility"), "std"),
+    (("중앙값", "median"), "median"),
+    (("95%", "p95", "상위 5%"), "p95"),
+)
+CORR_KEYWORDS = ("상관", "correlation", "corr")
+WHEN_KEYWORDS = ("언제", "시점", "몇 시", "when", "what time")
+TAG_GROUP_KEYWORDS = ("tag별", "태그별", "tag 별", "태그 별", "tag마다", "태그마다", "각 tag", "각 태그", "per tag", "by tag",
+                      "each tag")
+RESAMPLE_KEYWORDS = (
+    (("분별", "per minute", "minutely"), "1min"),
+    (("시간별", "시간대별", "hourly", "per hour"), "1h"),
+    (("일별", "날짜별", "하루별", "daily", "per day"), "1D"),
+    (("주별", "weekly", "per week"), "1W"),
+    (("월별", "monthly", "per month"), "MS"),
+)
+LAST_RE = re.compile(r"(?:최근|지난|last|past)\s*(\d+)\s*(분|시간|일|주|minutes?|mins?|hours?|days?|weeks?)", re.IGNORECASE)
+LAST_UNITS = {"분": "min", "시간": "h", "일": "D", "주": "W", "minute": "min", "min": "min", "hour": "h", "day": "D",
+              "week": "W"}
+DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2})?)?")
+TOP_KEYWORDS = ("가장", "제일", "top", "highest", "lowest", "순위")
+
+
+def _has(q: str, keywords: Sequence[str]) -> bool:
+    """q(소문자)에 키워드가 있는지. 영문 키워드는 단어 경계로 (min이 minutes, std가 std_dt에 걸리지 않도록)."""
+    for k in keywords:
+        if k.isascii() and k[:1].isalnum():
+            if re.search(r"(?<![a-z0-9_])" + re.escape(k) + r"(?![a-z0-9_])", q):
+                return True
+        elif k in q:
+            return True
+    return False
+
+
+def _mentioned(name: str, q: str) -> bool:
+    # 영숫자/밑줄 경계 (SENSOR_2가 SENSOR_250에 걸리지 않도록). 한글 조사는 경계로 취급.
+    return re.search(r"(?<![A-Za-z0-9_])" + re.escape(str(name)) + r"(?![A-Za-z0-9_])", q, re.IGNORECASE) is not None
+
+
+def question_aggs(question: str) -> List[str]:
+    q = (question or "").lower()
+    aggs = [agg for kws, agg in AGG_KEYWORDS if _has(q, kws)]
+    if _has(q, WHEN_KEYWORDS):
+        aggs += [{"max": "argmax", "min": "argmin"}[a] for a in aggs if a in ("max", "min")]
+    return aggs
+
+
+def is_aggregate_question(question: str) -> bool:
+    """집계 키워드(평균/최대/합계/개수/상관 등)가 있으면 True — core가 집계 툴을 부를지 정하는 값싼 판단."""
+    q = (question or "").lower()
+    return bool(question_aggs(q)) or _has(q, CORR_KEYWORDS)
+
+
+def plan_question(question: str, columns: Sequence[str], numeric: Sequence[str], time_col: Optional[str] = None,
+                  tag_col: Optional[str] = None, tag_values: Sequence[str] = ()) -> Optional[Dict[str, Any]]:
+    """
+    질문의 키워드로 집계 spec을 만듭니다. 집계 의도가 없으면 None.
+    - 언급된 컬럼(없으면 수치형 앞쪽 MAX_AUTO_COLUMNS개) × 키워드 agg
+    - "TAG별"/"<컬럼>별" → group_by, "시간별/일별…" → resample, "최근 N시간/일" → last, 날짜 → start/end
+    - 언급된 TAG 값 → tag_col 필터, "가장/top" → 첫 metric 기준 정렬
+    """
+    q = question or ""
+    ql = q.lower()
+    aggs = question_aggs(q)
+    wants_corr = _has(ql, CORR_KEYWORDS)
+    if not aggs and not wants_corr:
+        return None
+    value_cols = [c for c in numeric if c not in (time_col, tag_col)]
+    mentioned = [c for c in value_cols if _mentioned(c, q)]
+    targets = mentioned or value_cols[:MAX_AUTO_COLUMNS]
+
+    spec: Dict[str, Any] = {"metrics": [], "group_by": [], "filters": []}
+    for agg in aggs:
+        if agg == "count":
+            spec["metrics"].append({"column": "*", "agg": "count"})
+        else:
+            spec["metrics"] += [{"column": c, "agg": agg} for c in targets]
+    if wants_corr:
+        spec["corr"] = (mentioned if len(mentioned) >= 2 else value_cols)[:MAX_CORR_COLUMNS]
+
+    # "TAG별 …" 또는 "가장 … 높은 TAG는?" (순위 질문에 TAG 언급)
+    if tag_col and tag_col in columns and (_has(ql, TAG_GROUP_KEYWORDS) or (
+            _has(ql, TOP_KEYWORDS) and (_mentioned(tag_col, q) or "태그" in q))):
+        spec["group_by"].append(tag_col)
+    for c in columns:
+        if c not in spec["group_by"] and c not in value_cols and c != time_col \
+                and re.search(r"(?<![A-Za-z0-9_])" + re.escape(str(c)) + r"\s*별", q, re.IGNORECASE):
+            spec["group_by"].append(c)
+    if time_col and time_col in columns:
+        spec["resample"] = next((freq for kws, freq in RESAMPLE_KEYWORDS if _has(ql, kws)), None)
+        m = LAST_RE.search(q)
+        if m:
+            unit = m.group(2).lower().rstrip("s")
+            spec["last"] = f"{m.group(1)}{LAST_UNITS.get(unit, LAST_UNITS.get(unit[:3], 'h'))}"
+        dates = DATE_RE.findall(q)
+        if len(dates) >= 2:
+            spec["start"], spec["end"] = dates[0], dates[1]
+        elif dates:
+            spec["end" if _has(ql, ("이전", "까지", "before", "until")) else "start"] = dates[0]
+    if tag_col and tag_values:
+        hits = [v for v in tag_values if _mentioned(v, q)]
+        if hits and tag_col not in spec["group_by"]:
+            spec["filters"].append({"column": tag_col, "op": "in", "value": hits})
+    if spec["metrics"] and spec["group_by"] and _has(ql, TOP_KEYWORDS):
+        first = spec["metrics"][0]
+        spec["sort_by"] = metric_name(first["column"], first["agg"])
+        spec["descending"] = first["agg"] not in ("min", "argmin")
+    return spec
+
+
+def metric_name(column: str, agg: str) -> str:
+    return "count" if column == "*" else f"{agg}({column})"
+
+
+def describe_spec(spec: Dict[str, Any]) -> str:
+    """spec을 한 줄 조건 설명으로 (프롬프트 머리말)."""
+    parts = []
+    if spec.get("group_by"):
+        parts.append(", ".join(spec["group_by"]) + "별")
+    if spec.get("resample"):
+        parts.append(f"{spec['resample']} 구간")
+    if spec.get("last"):
+        parts.append(f"마지막 {spec['last']}")
+    if spec.get("start") or spec.get("end"):
+        parts.append(f"{spec.get('start') or '처음'} ~ {spec.get('end') or '끝'}")
+    for f in spec.get("filters") or []:
+        parts.append(f"{f['column']} {f['op']} {f.get('value')}")
+    if spec.get("rolling"):
+        r = spec["rolling"]
+        parts.append(f"rolling {r.get('window')} {r.get('agg', 'mean')}")
+    return ", ".join(parts) or "전체"
+
+
+def _cell(v: Any) -> str:
+    if v is None:
+        return "-"
+    if isinstance(v, float):
+        return f"{v:.6g}"
+    return str(v)
+
+
+def format_table(result: Dict[str, Any], max_rows: int = PROMPT_MAX_ROWS) -> str:
+    """/tools/aggregate 결과 → 파이프 구분 표 (헤더 + 최대 max_rows행). 행이 더 있으면 생략 표시."""
+    cols, rows = result.get("columns") or [], result.get("rows") or []
+    if not cols:
+        return ""
+    lines = [" | ".join(map(str, cols))]
+    lines += [" | ".join(_cell(v) for v in row) for row in rows[:max_rows]]
+    total = result.get("row_count", len(rows))
+    if total > min(len(rows), max_rows):
+        lines.append(f"… (총 {total}행 중 {min(len(rows), max_rows)}행)")
+    return "\n".join(lines)
@@ -0,0 +1,364 @@
+from __future__ import annotations
+import importlib.util
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# sklearn/joblib은 import만 ~1s — 설치 여부만 확인하고 iforest를 처음 쓸 때 import (서버 warm-up이 미리 로드)
+_HAS_SKLEARN = importlib.util.find_spec("sklearn") is not None
+_HAS_JOBLIB = importlib.util.find_spec("joblib") is not None
+
+# --- CONFIGS ---
+METHODS = ("zscore", "robust_z", "iqr", "iforest")
+Z_THRESHOLD = 3.0
+ROBUST_THRESHOLD = 3.5      # Iglewicz-Hoaglin modified z-score 기준
+IQR_K = 1.5
+MIN_PERIODS = 5             # 롤링/스트리밍 통계가 이 관측치 수 미만이면 판정하지 않음
+MAX_RANGES = 50             # (TAG, 방법, 컬럼)당 반환할 구간 수 상한
+ROW_KEY = "__row__"         # 행 단위 판정(Isolation Forest) 결과를 담는 컬럼 키
+MAX_STREAMS = 64
+
+
+# ---------- 공통: 정렬/그룹 ----------
+def _value_columns(df: pd.DataFrame, columns: Optional[Sequence[str]], tag_col: str, time_col: str) -> List[str]:
+    if columns:
+        missing = [c for c in columns if c not in df.columns]
+        if missing:
+            raise KeyError(f"누락 컬럼: {missing}")
+        return list(columns)
+    return [c for c in df.select_dtypes(include=["number"]).columns if c not in (tag_col, time_col)]
+
+
+def _group_layout(df: pd.DataFrame, tag_col: str, time_col: str) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """(TAG, 시간) 순 정렬 위치, 정렬된 그룹 코드, 그룹 이름 목록."""
+    if tag_col in df.columns:
+        # 결측 TAG도 하나의 그룹으로 ("<NA>"). factorize 기본값은 결측을 -1로 두어 그룹 통계/bincount가 어긋남.
+        # astype(str)의 결측 처리는 pandas 버전마다 달라("None"/"nan" 문자열 vs NaN) 먼저 object에서 치환
+        tags = df[tag_col]
+        codes, names = pd.factorize(tags.astype(object).where(tags.notna(), "<NA>").astype(str), sort=True)
+        names = [str(x) for x in names]
+    else:
+        codes, names = np.zeros(len(df), dtype=np.int64), ["all"]
+    keys = [codes]
+    if time_col in df.columns:
+        ts = df[time_col]
+        if not pd.api.types.is_datetime64_any_dtype(ts.dtype):
+            ts = pd.to_datetime(ts, errors="coerce")
+        keys.insert(0, ts.to_numpy(dtype="datetime64[ns]").astype(np.int64))
+    order = np.lexsort(keys)  # 마지막 키(그룹)가 1차 정렬 키
+    return order, codes[order], names
+
+
+def _group_starts(g: np.ndarray) -> np.ndarray:
+    """정렬된 그룹 코드에서 각 행이 속한 그룹의 시작 위치."""
+    n = len(g)
+    first = np.r_[True, g[1:] != g[:-1]] if n else np.zeros(0, dtype=bool)
+    return np.maximum.accumulate(np.where(first, np.arange(n), 0))
+
+
+# ---------- 배치 탐지기 (정렬된 X: n x p) ----------
+def _zscore_mask(X: np.ndarray, g: np.ndarray, window: Optional[int], threshold: float) -> np.ndarray:
+    """window가 없으면 그룹 전체 평균/표준편차, 있으면 직전 window개 관측치의 롤링 통계 (cumsum 기반)."""
+    frame = pd.DataFrame(X)
+    mean = frame.groupby(g).transform("mean").to_numpy()
+    if not window:
+        std = frame.groupby(g).transform("std").to_numpy()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.abs((X - mean) / std) > threshold
+    Xc = X - mean                                  # 누적합 상쇄 오차를 줄이기 위해 그룹 평균으로 중심화
+    valid = ~np.isnan(Xc)
+    X0 = np.where(valid, Xc, 0.0)
+    zero = np.zeros((1, X.shape[1]))
+    cs = np.vstack([zero, np.cumsum(X0, axis=0)])
+    cs2 = np.vstack([zero, np.cumsum(X0 * X0, axis=0)])
+    cc = np.vstack([zero, np.cumsum(valid, axis=0)])
+    i = np.arange(len(X))
+    lo = np.maximum(i - window, _group_starts(g))  # 현재 행을 제외한 직전 window개
+    s = cs[i] - cs[lo]
+    s2 = cs2[i] - cs2[lo]
+    cnt = cc[i] - cc[lo]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mu = s / cnt
+        var = (s2 - s * mu) / (cnt - 1)
+        z = (Xc - mu) / np.sqrt(var)
+    return (np.abs(z) > threshold) & (cnt >= MIN_PERIODS)
+
+
+def _robust_z_mask(X: np.ndarray, g: np.ndarray, threshold: float) -> np.ndarray:
+    """중앙값/MAD 기반 modified z = 0.6745·(x-median)/MAD."""
+    frame = pd.DataFrame(X)
+    med = frame.groupby(g).transform("median").to_numpy()
+    mad = pd.DataFrame(np.abs(X - med)).groupby(g).transform("median").to_numpy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.abs(0.6745 * (X - med) / mad) > threshold
+
+
+def _iqr_mask(X: np.ndarray, g: np.ndarray, k: float) -> np.ndarray:
+    grouped = pd.DataFrame(X).groupby(g)
+    q1 = grouped.quantile(0.25).to_numpy()[g]
+    q3 = grouped.quantile(0.75).to_numpy()[g]
+    iqr = q3 - q1
+    return (X < q1 - k * iqr) | (X > q3 + k * iqr)
+
+
+def _fit_iforest(X: np.ndarray, contamination: Any, random_state: int):
+    """그룹 1개에 대한 Isolation Forest 학습 (결측은 컬럼 중앙값으로 대체). (레이블, 모델, 대체값) 반환."""
+    fill = np.nanmedian(X, axis=0) if len(X) else np.zeros(X.shape[1])
+    fill = np.where(np.isnan(fill), 0.0, fill)
+    Xf = np.where(np.isnan(X), fill, X)
+    from sklearn.ensemble import IsolationForest
+    model = IsolationForest(contamination=contamination, random_state=random_state)
+    labels = model.fit_predict(Xf) == -1
+    return labels, model, fill
+
+
+def _iforest_groups(X: np.ndarray, g: np.ndarray, contamination: Any, random_state: int,
+                    n_jobs: int) -> Tuple[np.ndarray, Dict[int, Any]]:
+    """그룹별 Isolation Forest를 코어 수만큼 병렬(joblib 프로세스 풀)로 학습."""
+    if not _HAS_SKLEARN:
+        raise RuntimeError("scikit-learn이 설치되어 있지 않아 Isolation Forest를 사용할 수 없습니다.")
+    starts = np.flatnonzero(np.r_[True, g[1:] != g[:-1]]) if len(g) else np.zeros(0, dtype=np.int64)
+    bounds = list(zip(starts, np.r_[starts[1:], len(g)]))
+    jobs = [(s, e) for s, e in bounds if e - s >= MIN_PERIODS]
+    if _HAS_JOBLIB and n_jobs != 1 and len(jobs) > 1:
+        from joblib import Parallel, delayed
+        results = Parallel(n_jobs=n_jobs)(
+            delayed(_fit_iforest)(X[s:e], contamination, random_state) for s, e in jobs
+        )
+    else:
+        results = [_fit_iforest(X[s:e], contamination, random_state) for s, e in jobs]
+    mask = np.zeros(len(g), dtype=bool)
+    models: Dict[int, Any] = {}
+    for (s, e), (labels, model, fill) in zip(jobs, results):
+        mask[s:e] = labels
+        models[int(g[s])] = (model, fill)
+    return mask, models
+
+
+# ---------- 결과 압축 ----------
+def _ranges(mask: np.ndarray, g: np.ndarray, order: np.ndarray, t_sorted: Optional[np.ndarray],
+            names: List[str], max_ranges: int) -> Dict[str, Dict[str, Any]]:
+    """정렬 순서에서 연속된 이상 구간을 [시작 행, 끝 행](원본 행 번호)으로 묶어 TAG별로 반환."""
+    idx = np.flatnonzero(mask)
+    if idx.size == 0:
+        return {}
+    brk = np.r_[True, (np.diff(idx) != 1) | (g[idx[1:]] != g[idx[:-1]])]
+    run_s = idx[brk]
+    run_e = idx[np.r_[brk[1:], True]]
+    out: Dict[str, Dict[str, Any]] = {}
+    run_g = g[run_s]
+    cnt_by_g = np.bincount(g[idx], minlength=len(names))
+    for code in np.unique(run_g):
+        sel = np.flatnonzero(run_g == code)[:max_ranges]
+        entry: Dict[str, Any] = {
+            "count": int(cnt_by_g[code]),
+            "ranges": [[int(order[a]), int(order[b])] for a, b in zip(run_s[sel], run_e[sel])],
+        }
+        if t_sorted is not None:
+            entry["times"] = [[int(t_sorted[a]), int(t_sorted[b])] for a, b in zip(run_s[sel], run_e[sel])]
+        if len(np.flatnonzero(run_g == code)) > max_ranges:
+            entry["truncated"] = True
+        out[names[int(code)]] = entry
+    return out
+
+
+def detect_anomalies(df: pd.DataFrame, columns: Optional[Sequence[str]] = None,
+                     methods: Sequence[str] = ("zscore", "robust_z", "iqr"),
+                     tag_col: str = "TAG", time_col: str = "STD_DT", window: Optional[int] = None,
+                     z_threshold: float = Z_THRESHOLD, robust_threshold: float = ROBUST_THRESHOLD,
+                     iqr_k: float = IQR_K, contamination: Any = "auto", random_state: int = 42,
+                     n_jobs: int = -1, max_ranges: int = MAX_RANGES) -> Dict[str, Any]:
+    """
+    TAG별로 모든 수치형 컬럼에 이상치 탐지기를 적용합니다.
+    반환: summary(방법별 총계/컬럼별/TAG별 개수) + anomalies[TAG][방법][컬럼] = {count, ranges, times}
+    ranges는 (TAG, 시간) 순서에서 연속된 이상 구간의 원본 행 번호 [시작, 끝]입니다.
+    """
+    bad = [m for m in methods if m not in METHODS]
+    if bad:
+        raise ValueError(f"지원하지 않는 method: {bad} (가능: {METHODS})")
+    cols = _value_columns(df, columns, tag_col, time_col)
+    order, g, names = _group_layout(df, tag_col, time_col)
+    X = df[cols].to_numpy(dtype=np.float64, na_value=np.nan)[order] if cols else np.empty((len(df), 0))
+    t_sorted = None
+    if time_col in df.columns:
+        ts = pd.to_datetime(df[time_col], errors="coerce").to_numpy(dtype="datetime64[ms]").astype(np.int64)
+        t_sorted = ts[order]
+
+    masks: Dict[str, Dict[str, np.ndarray]] = {}
+    if cols:
+        for m in methods:
+            if m == "zscore":
+                M = _zscore_mask(X, g, window, z_threshold)
+            elif m == "robust_z":
+                M = _robust_z_mask(X, g, robust_threshold)
+            elif m == "iqr":
+                M = _iqr_mask(X, g, iqr_k)
+            else:
+                row_mask, _ = _iforest_groups(X, g, contamination, random_state, n_jobs)
+                masks[m] = {ROW_KEY: row_mask}
+                continue
+            masks[m] = {c: M[:, j] for j, c in enumerate(cols)}
+
+    anomalies: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    summary: Dict[str, Any] = {}
+    for m, per_col in masks.items():
+        total = 0
+        by_col: Dict[str, int] = {}
+        by_tag: Dict[str, int] = {}
+        for c, mask in per_col.items():
+            cnt = int(mask.sum())
+            if not cnt:
+                continue
+            total += cnt
+            by_col[c] = cnt
+            for tag, entry in _ranges(mask, g, order, t_sorted, names, max_ranges).items():
+                anomalies.setdefault(tag, {}).setdefault(m, {})[c] = entry
+                by_tag[tag] = by_tag.get(tag, 0) + entry["count"]
+        summary[m] = {"total": total, "by_column": by_col, "by_tag": by_tag}
+
+    return {
+        "rows": int(len(df)),
+        "columns": cols,
+        "tags": names,
+        "methods": list(masks.keys()),
+        "window": window,
+        "summary": summary,
+        "anomalies": anomalies,
+    }
+
+
+# ---------- 스트리밍 ----------
+class StreamingDetector:
+    """
+    TAG×컬럼별 온라인 상태(Welford 평균/분산)를 유지하며, 추가된 행만 점진적으로 채점합니다.
+    seed()로 과거 이력을 한 번 반영(및 선택적으로 TAG별 Isolation Forest 학습)해 두면
+    이후 update()는 전체 이력을 다시 학습하지 않고 새 행만 평가합니다.
+    """
+
+    def __init__(self, columns: Optional[Sequence[str]] = None, tag_col: str = "TAG", time_col: str = "STD_DT",
+                 z_threshold: float = Z_THRESHOLD, min_periods: int = MIN_PERIODS):
+        self.columns = list(columns) if columns else None
+        self.tag_col = tag_col
+        self.time_col = time_col
+        self.z_threshold = z_threshold
+        self.min_periods = min_periods
+        # tag → (n[p], mean[p], m2[p])
+        self._state: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        self._models: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.rows_seen = 0
+
+    def _split(self, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        if self.columns is None:
+            self.columns = _value_columns(df, None, self.tag_col, self.time_col)
+        order, g, names = _group_layout(df, self.tag_col, self.time_col)
+        starts = np.flatnonzero(np.r_[True, g[1:] != g[:-1]]) if len(g) else np.zeros(0, dtype=np.int64)
+        return {names[int(g[s])]: order[s:e] for s, e in zip(starts, np.r_[starts[1:], len(g)])}
+
+    def _fold(self, tag: str, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """X(k x p)를 상태에 순서대로 반영하면서, 각 행을 '반영 직전' 통계로 채점한 z와 유효 개수 반환."""
+        p = X.shape[1]
+        n0, mean0, m20 = self._state.get(tag, (np.zeros(p), np.zeros(p), np.zeros(p)))
+        valid = ~np.isnan(X)
+        # 상태가 비어 있는 컬럼은 배치 평균을 기준점으로 사용 (기준점은 결과에 영향 없고 정밀도만 개선)
+        first = np.where(valid, X, 0.0).sum(axis=0) / np.maximum(valid.sum(axis=0), 1)
+        mean0 = np.where(n0 > 0, mean0, first)
+        d = np.where(valid, X - mean0, 0.0)
+        zero = np.zeros((1, p))
+        # 각 행 직전까지의 누적(배치 내 prefix) — mean0 기준으로 이동해 상쇄 오차를 줄임
+        cs = np.vstack([zero, np.cumsum(d, axis=0)])
+        cs2 = np.vstack([zero, np.cumsum(d * d, axis=0)])
+        cc = np.vstack([zero, np.cumsum(valid, axis=0)])
+        n = n0 + cc[:-1]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mu = mean0 + cs[:-1] / n
+            var = (m20 + cs2[:-1] - cs[:-1] ** 2 / n) / (n - 1)
+            z = (X - mu) / np.sqrt(var)
+        # 배치 전체 반영 후 상태
+        n1 = n0 + cc[-1]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean1 = np.where(n1 > 0, mean0 + cs[-1] / np.maximum(n1, 1), mean0)
+            m21 = m20 + cs2[-1] - np.where(n1 > 0, cs[-1] ** 2 / np.maximum(n1, 1), 0.0)
+        self._state[tag] = (n1, mean1, np.maximum(m21, 0.0))
+        return z, n
+
+    def seed(self, df: pd.DataFrame, fit_iforest: bool = False, contamination: Any = "auto",
+             random_state: int = 42, n_jobs: int = -1) -> Dict[str, Any]:
+        """과거 이력을 상태에 반영합니다(채점 결과는 버림). fit_iforest면 TAG별 모델을 병렬 학습해 보관."""
+        with self._lock:
+            groups = self._split(df)
+            for tag, pos in groups.items():
+                self._fold(tag, df[self.columns].to_numpy(dtype=np.float64, na_value=np.nan)[pos])
+            if fit_iforest and self.columns:
+                order, g, names = _group_layout(df, self.tag_col, self.time_col)
+                X = df[self.columns].to_numpy(dtype=np.float64, na_value=np.nan)[order]
+                _, models = _iforest_groups(X, g, contamination, random_state, n_jobs)
+                self._models.update({names[k]: v for k, v in models.items()})
+            self.rows_seen += len(df)
+            return {"tags": len(self._state), "rows_seen": self.rows_seen, "iforest_tags": len(self._models)}
+
+    def update(self, df: pd.DataFrame, max_ranges: int = MAX_RANGES) -> Dict[str, Any]:
+        """새로 추가된 행만 채점. 반환 ranges의 행 번호는 이번 배치(df) 기준입니다."""
+        with self._lock:
+            groups = self._split(df)
+            X_all = df[self.columns].to_numpy(dtype=np.float64, na_value=np.nan)
+            z_mask = np.zeros(X_all.shape, dtype=bool)
+            row_mask = np.zeros(len(df), dtype=bool)
+            for tag, pos in groups.items():
+                z, n = self._fold(tag, X_all[pos])
+                z_mask[pos] = (np.abs(z) > self.z_threshold) & (n >= self.min_periods)
+                if tag in self._models:
+                    model, fill = self._models[tag]
+                    Xf = np.where(np.isnan(X_all[pos]), fill, X_all[pos])
+                    row_mask[pos] = model.predict(Xf) == -1
+            self.rows_seen += len(df)
+
+        order, g, names = _group_layout(df, self.tag_col, self.time_col)
+        t_sorted = None
+        if self.time_col in df.columns:
+            ts = pd.to_datetime(df[self.time_col], errors="coerce").to_numpy(dtype="datetime64[ms]").astype(np.int64)
+            t_sorted = ts[order]
+        per_method = {"zscore": {c: z_mask[:, j] for j, c in enumerate(self.columns)}}
+        if self._models:
+            per_method["iforest"] = {ROW_KEY: row_mask}
+        anomalies: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        summary: Dict[str, Any] = {}
+        for m, per_col in per_method.items():
+            total = 0
+            for c, mask in per_col.items():
+                cnt = int(mask.sum())
+                if not cnt:
+                    continue
+                total += cnt
+                for tag, entry in _ranges(mask[order], g, order, t_sorted, names, max_ranges).items():
+                    anomalies.setdefault(tag, {}).setdefault(m, {})[c] = entry
+            summary[m] = {"total": total}
+        return {"rows": int(len(df)), "rows_seen": self.rows_seen, "summary": summary, "anomalies": anomalies}
+
+
+class StreamRegistry:
+    """stream_id → StreamingDetector (프로세스 내 LRU)."""
+
+    def __init__(self, max_items: int = MAX_STREAMS):
+        self.max_items = max_items
+        self._items: "OrderedDict[str, StreamingDetector]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, stream_id: Optional[str], **kwargs) -> Tuple[str, StreamingDetector, bool]:
+        with self._lock:
+            if stream_id and stream_id in self._items:
+                self._items.move_to_end(stream_id)
+                return stream_id, self._items[stream_id], False
+            sid = stream_id or uuid.uuid4().hex[:16]
+            det = StreamingDetector(**kwargs)
+            self._items[sid] = det
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+            return sid, det, True
+
+
+STREAMS = StreamRegistry()
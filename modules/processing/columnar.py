@@ -0,0 +1,75 @@
+from __future__ import annotations
+import json
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    _HAS_ARROW = True
+except ImportError:
+    pa = None
+    pa_ipc = None
+    _HAS_ARROW = False
+
+# --- CONFIGS ---
+ARROW_STREAM_MIME = "application/vnd.apache.arrow.stream"
+META_KEY = b"meta"          # 스키마 메타데이터에 싣는 작은 JSON (shape, dataset_id 등)
+SECTION_SEP = "."           # 섹션 컬럼 이름: "<section>.<column>" (예: "pca2d.x")
+
+
+def wants_arrow(accept: Optional[str]) -> bool:
+    """Accept 헤더가 Arrow IPC 스트림을 요청하고 pyarrow가 있으면 True. 없으면 호출 측이 JSON으로 응답."""
+    return _HAS_ARROW and ARROW_STREAM_MIME in (accept or "")
+
+
+def _schema_meta(meta: Optional[Dict[str, Any]]) -> Dict[bytes, bytes]:
+    return {META_KEY: json.dumps(meta or {}, ensure_ascii=False, default=str).encode("utf-8")}
+
+
+def _write(table: "pa.Table") -> bytes:
+    sink = pa.BufferOutputStream()
+    with pa_ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def table_ipc(df: pd.DataFrame, meta: Optional[Dict[str, Any]] = None) -> bytes:
+    """DataFrame 조각(행 = 레코드)을 Arrow IPC 스트림으로. 컬럼 버퍼를 그대로 복사하므로 값 단위 객체가 생기지 않습니다."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    return _write(table.replace_schema_metadata(_schema_meta(meta)))
+
+
+def sections_ipc(sections: Dict[str, Dict[str, Any]], meta: Optional[Dict[str, Any]] = None) -> bytes:
+    """
+    길이가 서로 다른 여러 배열 묶음(섹션)을 하나의 IPC 스트림으로 씁니다.
+    한 행짜리 테이블에 "<section>.<column>" 이름의 list 컬럼으로 담으므로, 각 배열은 연속 버퍼 하나가 됩니다
+    (pyarrow: table["pca2d.x"][0].values.to_numpy(), JS: table.getChild("pca2d.x").get(0)).
+    """
+    names, arrays = [], []
+    for section, columns in sections.items():
+        for name, values in columns.items():
+            values = values if isinstance(values, pa.Array) else pa.array(values)
+            names.append(f"{section}{SECTION_SEP}{name}")
+            arrays.append(pa.ListArray.from_arrays(pa.array([0, len(values)], pa.int32()), values))
+    table = pa.Table.from_arrays(arrays, names=names)
+    return _write(table.replace_schema_metadata(_schema_meta(meta)))
+
+
+def read_ipc(body: bytes) -> Tuple["pa.Table", Dict[str, Any]]:
+    table = pa_ipc.open_stream(pa.py_buffer(body)).read_all()
+    raw = (table.schema.metadata or {}).get(META_KEY)
+    return table, (json.loads(raw) if raw else {})
+
+
+def read_sections(body: bytes) -> Tuple[Dict[str, Dict[str, np.ndarray]], Dict[str, Any]]:
+    """sections_ipc의 역변환 (클라이언트/벤치용). 수치 배열은 복사 없이 numpy 뷰로 돌려줍니다."""
+    table, meta = read_ipc(body)
+    out: Dict[str, Dict[str, np.ndarray]] = {}
+    for name in table.column_names:
+        section, _, column = name.partition(SECTION_SEP)
+        values = table.column(name).chunk(0).values
+        out.setdefault(section, {})[column] = values.to_numpy(zero_copy_only=False)
+    return out, meta
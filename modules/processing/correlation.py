@@ -0,0 +1,193 @@
+from __future__ import annotations
+import base64
+import os
+import concurrent.futures
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# --- CONFIGS ---
+BLOCK_SIZE = 256        # 블록 한 변의 컬럼 수 (float32 256x256 블록 ≈ 256KB, L2 캐시 크기)
+DEFAULT_TOP_K = 50
+MIN_PERIODS = 2         # 쌍별 유효 관측치가 이보다 적으면 r=NaN
+
+
+def _standardize(df: pd.DataFrame, cols: List[str]) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    컬럼별 평균/표준편차로 한 번만 표준화한 float32 행렬을 반환합니다.
+    결측치가 있으면 0으로 채운 행렬과 유효 마스크(float32 0/1)를 함께 반환합니다.
+    """
+    X = df[cols].to_numpy(dtype=np.float64, na_value=np.nan)
+    valid = ~np.isnan(X)
+    has_nan = not bool(valid.all())
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.nanmean(X, axis=0) if has_nan else X.mean(axis=0)
+        std = np.nanstd(X, axis=0) if has_nan else X.std(axis=0)
+    std[~(std > 0)] = np.nan  # 분산 0 컬럼은 r=NaN (pandas와 동일)
+    Z = ((X - mean) / std).astype(np.float32)
+    if not has_nan:
+        return Z, None
+    Z[~valid] = 0.0
+    return Z, valid.astype(np.float32)
+
+
+def _block_corr(Z: np.ndarray, M: Optional[np.ndarray], n: int,
+                i0: int, i1: int, j0: int, j1: int, min_periods: int) -> np.ndarray:
+    """컬럼 블록 [i0:i1) x [j0:j1) 의 상관계수를 float32 행렬곱으로 계산."""
+    Zi, Zj = Z[:, i0:i1], Z[:, j0:j1]
+    if M is None:
+        return (Zi.T @ Zj) / np.float32(n)
+    # pairwise-complete: 두 컬럼이 모두 유효한 행만으로 Pearson r
+    Mi, Mj = M[:, i0:i1], M[:, j0:j1]
+    N = Mi.T @ Mj
+    Si = Zi.T @ Mj
+    Sj = Mi.T @ Zj
+    Qi = (Zi * Zi).T @ Mj
+    Qj = Mi.T @ (Zj * Zj)
+    P = Zi.T @ Zj
+    with np.errstate(invalid="ignore", divide="ignore"):
+        num = N * P - Si * Sj
+        den = np.sqrt((N * Qi - Si * Si) * (N * Qj - Sj * Sj))
+        r = num / den
+    r[(N < min_periods) | ~(den > 0)] = np.nan
+    return np.clip(r, -1.0, 1.0)
+
+
+def _blocks(p: int, block_size: int) -> List[Tuple[int, int, int, int]]:
+    """상삼각(대각 포함) 블록 좌표 목록."""
+    edges = list(range(0, p, block_size)) + [p]
+    spans = list(zip(edges[:-1], edges[1:]))
+    return [(i0, i1, j0, j1) for a, (i0, i1) in enumerate(spans) for (j0, j1) in spans[a:]]
+
+
+def iter_corr_blocks(df: pd.DataFrame, cols: Optional[List[str]] = None, block_size: int = BLOCK_SIZE,
+                     n_jobs: Optional[int] = None, min_periods: int = MIN_PERIODS):
+    """
+    상삼각 블록 단위로 (i0, j0, r_block)을 내보냅니다.
+    n_jobs > 1 이면 스레드 풀에서 블록을 병렬 계산합니다(numpy matmul은 GIL 해제).
+    """
+    cols = list(cols) if cols is not None else list(df.select_dtypes(include=["number"]).columns)
+    if len(cols) < 2:
+        return
+    Z, M = _standardize(df, cols)
+    n = Z.shape[0]
+    coords = _blocks(len(cols), block_size)
+    if n_jobs is None:
+        n_jobs = min(4, os.cpu_count() or 1) if len(coords) > 1 else 1
+    if n_jobs <= 1:
+        for (i0, i1, j0, j1) in coords:
+            yield i0, j0, _block_corr(Z, M, n, i0, i1, j0, j1, min_periods)
+        return
+    with concurrent.futures.ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        futures = {executor.submit(_block_corr, Z, M, n, i0, i1, j0, j1, min_periods): (i0, j0)
+                   for (i0, i1, j0, j1) in coords}
+        for fut in concurrent.futures.as_completed(futures):
+            i0, j0 = futures[fut]
+            yield i0, j0, fut.result()
+
+
+def corr_matrix(df: pd.DataFrame, cols: Optional[List[str]] = None, **kwargs) -> Tuple[List[str], np.ndarray]:
+    """전체 상관행렬(float32, p x p). 블록 엔진으로 계산하고 대칭으로 채웁니다."""
+    cols = list(cols) if cols is not None else list(df.select_dtypes(include=["number"]).columns)
+    p = len(cols)
+    out = np.full((p, p), np.nan, dtype=np.float32)
+    for i0, j0, r in iter_corr_blocks(df, cols, **kwargs):
+        bi, bj = r.shape
+        out[i0:i0 + bi, j0:j0 + bj] = r
+        out[j0:j0 + bj, i0:i0 + bi] = r.T
+    return cols, out
+
+
+def correlation_summary(df: pd.DataFrame, cols: Optional[List[str]] = None, top_k: int = DEFAULT_TOP_K,
+                        full: bool = False, **kwargs) -> Dict[str, Any]:
+    """
+    모든 수치형 컬럼의 상관관계 요약.
+    - top_pairs: |r| 상위 k개 쌍 (블록별로 부분 정렬 후 병합, 전체 행렬을 보관하지 않음)
+    - strongest: 컬럼별 |r|이 가장 큰 상대 컬럼
+    - matrix: full=True일 때만, 상삼각 float16 base64 (encode_condensed 참고)
+    """
+    cols = list(cols) if cols is not None else list(df.select_dtypes(include=["number"]).columns)
+    p = len(cols)
+    result: Dict[str, Any] = {"method": "pearson", "columns": p, "top_pairs": [], "strongest": {}}
+    if p < 2:
+        return result
+
+    best_r = np.full(p, np.nan, dtype=np.float32)
+    best_j = np.full(p, -1, dtype=np.int64)
+    cand_r = np.empty(0, dtype=np.float32)
+    cand_i = np.empty(0, dtype=np.int64)
+    cand_j = np.empty(0, dtype=np.int64)
+    full_mat = np.full((p, p), np.nan, dtype=np.float32) if full else None
+
+    for i0, j0, r in iter_corr_blocks(df, cols, **kwargs):
+        bi, bj = r.shape
+        ii, jj = np.meshgrid(np.arange(i0, i0 + bi), np.arange(j0, j0 + bj), indexing="ij")
+        keep = (jj > ii) & ~np.isnan(r)
+        if full_mat is not None:
+            full_mat[i0:i0 + bi, j0:j0 + bj] = r
+            full_mat[j0:j0 + bj, i0:i0 + bi] = r.T
+        if not keep.any():
+            continue
+        rv, iv, jv = r[keep], ii[keep], jj[keep]
+        absr = np.abs(rv)
+
+        # 컬럼별 최강 상대 갱신 (i→j, j→i 양방향)
+        for src, dst in ((iv, jv), (jv, iv)):
+            order = np.lexsort((absr, src))          # src별로 |r| 오름차순 → 마지막이 최대
+            last = np.r_[src[order][1:] != src[order][:-1], True]
+            s_idx, d_idx, v = src[order][last], dst[order][last], rv[order][last]
+            cur = np.abs(best_r[s_idx])
+            upd = np.isnan(cur) | (np.abs(v) > cur)
+            best_r[s_idx[upd]] = v[upd]
+            best_j[s_idx[upd]] = d_idx[upd]
+
+        # top-k 후보 병합
+        if top_k > 0:
+            if len(absr) > top_k:
+                sel = np.argpartition(-absr, top_k - 1)[:top_k]
+                rv, iv, jv = rv[sel], iv[sel], jv[sel]
+            cand_r = np.concatenate([cand_r, rv])
+            cand_i = np.concatenate([cand_i, iv])
+            cand_j = np.concatenate([cand_j, jv])
+            if len(cand_r) > top_k:
+                sel = np.argpartition(-np.abs(cand_r), top_k - 1)[:top_k]
+                cand_r, cand_i, cand_j = cand_r[sel], cand_i[sel], cand_j[sel]
+
+    order = np.argsort(-np.abs(cand_r), kind="stable")
+    result["top_pairs"] = [
+        {"a": cols[int(cand_i[o])], "b": cols[int(cand_j[o])], "r": round(float(cand_r[o]), 3)} for o in order
+    ]
+    result["strongest"] = {
+        cols[i]: {"partner": cols[int(best_j[i])], "r": round(float(best_r[i]), 3)}
+        for i in range(p) if best_j[i] >= 0
+    }
+    if full_mat is not None:
+        result["matrix"] = encode_condensed(cols, full_mat)
+    return result
+
+
+def encode_condensed(cols: List[str], mat: np.ndarray) -> Dict[str, Any]:
+    """
+    대칭 상관행렬의 상삼각(대각 제외)을 행 우선 순서의 float16 little-endian으로 인코딩.
+    p=500이면 124,750개 값 → 약 250KB(JSON 중첩 dict 대비 수십 배 작음).
+    """
+    iu = np.triu_indices(len(cols), k=1)
+    data = mat[iu].astype("<f2").tobytes()
+    return {
+        "encoding": "float16-condensed-b64",
+        "columns": list(cols),
+        "data": base64.b64encode(data).decode("ascii"),
+    }
+
+
+def decode_condensed(payload: Dict[str, Any]) -> Tuple[List[str], np.ndarray]:
+    """encode_condensed의 역변환 (대각 1.0)."""
+    cols = list(payload["columns"])
+    p = len(cols)
+    vals = np.frombuffer(base64.b64decode(payload["data"]), dtype="<f2").astype(np.float32)
+    mat = np.eye(p, dtype=np.float32)
+    iu = np.triu_indices(p, k=1)
+    mat[iu] = vals
+    mat[(iu[1], iu[0])] = vals
+    return cols, mat
@@ -0,0 +1,262 @@
+from __future__ import annotations
+import hashlib
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .ingest import read_csv_fast
+from . import parquet_source
+from ..observability.metrics import cache_event
+from ..runtime.singleflight import SingleFlight
+
+# --- CONFIGS ---
+MAX_DATASETS = 8                      # LRU 보관 개수
+MAX_BYTES = 2 * 1024 ** 3             # 보관 DataFrame + 파생 결과 + 지문 메모리 합계 상한 (2GB)
+MAX_DERIVED = 64                      # 데이터셋당 파생 결과 캐시 항목 수
+
+
+def sizeof(value: Any, _depth: int = 0) -> int:
+    """파생 결과의 대략적인 메모리 크기 (bytes/ndarray/DataFrame은 정확히, 컨테이너는 재귀, 스칼라 리스트는 첫 원소 기준)."""
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, memoryview):
+        return value.nbytes
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if _depth > 8:
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(k, _depth + 1) + sizeof(v, _depth + 1) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        if value and isinstance(next(iter(value)), (int, float, bool, str, type(None))):
+            return sys.getsizeof(value) + len(value) * sys.getsizeof(next(iter(value)))   # 긴 숫자 리스트(차트 시리즈)
+        return sys.getsizeof(value) + sum(sizeof(v, _depth + 1) for v in value)
+    return sys.getsizeof(value)
+
+
+def dataset_id_for(raw: bytes) -> str:
+    """원본 바이트의 sha1 앞 16자. 같은 파일은 항상 같은 id."""
+    return hashlib.sha1(raw).hexdigest()[:16]
+
+
+class Dataset:
+    """
+    파싱된 DataFrame과 그 파생 결과(지문, 다운샘플 등)를 함께 보관하는 항목.
+    Parquet/Excel 데이터셋은 source(ParquetSource)만 들고 있다가, 컬럼/TAG/시간 조건이 있는 툴은 frame()으로
+    필요한 부분만 읽고, 전체가 필요한 툴이 df에 처음 접근할 때 한 번 전체를 적재합니다.
+    """
+
+    def __init__(self, dataset_id: str, df: Optional[pd.DataFrame], ingest: Dict[str, Any],
+                 source: Optional["parquet_source.ParquetSource"] = None):
+        self.dataset_id = dataset_id
+        self._df = df
+        self.source = source
+        self.ingest = ingest
+        self.base_bytes = int(ingest.get("memory_after") or (df.memory_usage(deep=True).sum() if df is not None else 0))
+        self.created = time.time()
+        self.cache: "OrderedDict[Any, Any]" = OrderedDict()   # 파생 결과 캐시 (키는 호출 측이 정의)
+        self._cache_bytes: Dict[Any, int] = {}
+        self._lock = threading.Lock()
+        self._flight = SingleFlight("derived")
+        self._fingerprints = None
+        self.on_grow: Optional[Callable[[], None]] = None   # 저장소가 설정: 크기가 늘면 LRU 상한 재적용
+
+    @property
+    def nbytes(self) -> int:
+        """DataFrame + 파생 결과 캐시(프로파일/다운샘플/집계/Arrow 본문) + 행 지문 해시 배열."""
+        fp = self._fingerprints.nbytes if self._fingerprints is not None else 0
+        return self.base_bytes + sum(self._cache_bytes.values()) + fp
+
+    def _grew(self):
+        if self.on_grow is not None:
+            self.on_grow()
+
+    def memo(self, key: Any, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        key로 파생 결과를 캐시합니다. (값, 재사용 여부) 반환. 오래된 항목부터 MAX_DERIVED개로 유지.
+        같은 key를 동시에 계산 중이면 기다렸다가 그 결과를 공유합니다 (재사용으로 취급).
+        """
+        with self._lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                cache_event("derived", True)
+                return self.cache[key], True
+        cache_event("derived", False)
+        value, shared = self._flight.do(key, fn)
+        if shared:
+            return value, True
+        size = sizeof(value)
+        with self._lock:
+            self.cache[key] = value
+            self._cache_bytes[key] = size
+            while len(self.cache) > MAX_DERIVED:
+                old, _ = self.cache.popitem(last=False)
+                self._cache_bytes.pop(old, None)
+        self._grew()
+        return value, False
+
+    @property
+    def df(self) -> pd.DataFrame:
+        if self._df is None:
+            def _load() -> pd.DataFrame:
+                df, report = self.source.load_all()
+                self.base_bytes = report["memory_after"]
+                self.ingest = {**self.ingest, "full_load": report}
+                return df
+            self._df, shared = self._flight.do("__full__", _load)
+            if not shared:
+                self._grew()
+        return self._df
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.source.columns) if self._df is None else [str(c) for c in self._df.columns]
+
+    @property
+    def rows(self) -> int:
+        return self.source.rows if self._df is None else int(len(self._df))
+
+    def frame(self, columns: Optional[Sequence[str]] = None, tags: Optional[Sequence[str]] = None,
+              start: Optional[str] = None, end: Optional[str] = None, tag_col: str = "TAG",
+              time_col: str = "STD_DT") -> Tuple[pd.DataFrame, Optional[Dict[str, Any]]]:
+        """
+        (df, 읽기 리포트). 메모리에 전체가 있으면 그대로 (리포트 None, 필터는 호출 측이 적용),
+        Parquet만 있으면 columns projection + TAG/시간 row group pushdown으로 필요한 바이트만 읽습니다.
+        """
+        if self._df is not None or self.source is None:
+            return self.df, None
+        return self.source.read(columns, tags, start, end, tag_col, time_col)
+
+    def slice(self, offset: int, limit: int, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """행 구간 [offset, offset+limit). Parquet만 있으면 그 구간이 걸친 row group만 읽습니다. 없는 컬럼은 KeyError."""
+        if self._df is None and self.source is not None:
+            return self.source.read_rows(offset, limit, columns)
+        part = self._df[list(columns)] if columns else self._df
+        return part.iloc[offset:offset + limit]
+
+    def planning_frame(self, tag_col: str = "TAG") -> pd.DataFrame:
+        """컬럼/dtype/TAG 값만 필요한 경우(집계 플래너)용. Parquet는 0행 스키마 + TAG 컬럼만 읽은 고유값."""
+        if self._df is not None or self.source is None:
+            return self.df
+        return self.source.planning_frame(tag_col)
+
+    @property
+    def fingerprints(self):
+        """행 지문 인덱스 (최초 접근 시 생성 후 데이터셋과 함께 캐시)."""
+        with self._lock:
+            if self._fingerprints is None:
+                from .fingerprint import FingerprintIndex
+                self._fingerprints = FingerprintIndex(self.df, on_grow=self._grew)
+            return self._fingerprints
+
+
+class DatasetStore:
+    """dataset_id → Dataset 의 프로세스 내 LRU 캐시."""
+
+    def __init__(self, max_items: int = MAX_DATASETS, max_bytes: int = MAX_BYTES):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[str, Dataset]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight("dataset_load")
+
+    def get(self, dataset_id: str) -> Optional[Dataset]:
+        """메모리에 없으면 디스크의 Parquet(업로드/Excel 변환본)를 엽니다 — 재시작/LRU 축출 후에도 재업로드 불필요."""
+        with self._lock:
+            ds = self._items.get(dataset_id)
+            if ds is not None:
+                self._items.move_to_end(dataset_id)
+                return ds
+        path = parquet_source.parquet_path(dataset_id)
+        if not parquet_source._HAS_PARQUET or not os.path.exists(path):
+            return None
+        ds, _ = self._flight.do(dataset_id, lambda: self._open_parquet(dataset_id, path, {}))
+        return ds
+
+    def _open_parquet(self, dataset_id: str, path: str, ingest: Dict[str, Any]) -> Dataset:
+        source = parquet_source.ParquetSource(path)
+        return self.put(Dataset(dataset_id, None, {**source.describe(), **ingest}, source=source))
+
+    def put(self, ds: Dataset) -> Dataset:
+        ds.on_grow = self.rebalance
+        with self._lock:
+            self._items[ds.dataset_id] = ds
+            self._items.move_to_end(ds.dataset_id)
+            self._evict()
+        return ds
+
+    def load_csv(self, raw: bytes) -> Dataset:
+        """캐시에 있으면 재사용, 없으면 read_csv_fast로 파싱 후 등록. 같은 파일의 동시 파싱은 1번만."""
+        dsid = dataset_id_for(raw)
+        ds = self.get(dsid)
+        cache_event("dataset", ds is not None)
+        if ds is not None:
+            return ds
+
+        def _parse() -> Dataset:
+            df, ingest = read_csv_fast(raw)
+            return self.put(Dataset(dsid, df, ingest))
+
+        ds, _ = self._flight.do(dsid, _parse)
+        return ds
+
+    def load_parquet(self, raw: bytes) -> Dataset:
+        """Parquet 업로드: 파일을 그대로 저장하고 footer(스키마/row group 통계)만 읽어 등록."""
+        dsid = dataset_id_for(raw)
+        ds = self.get(dsid)
+        cache_event("dataset", ds is not None)
+        if ds is not None:
+            return ds
+        ds, _ = self._flight.do(dsid, lambda: self._open_parquet(
+            dsid, parquet_source.store_parquet(dsid, raw), {"engine": "parquet"}))
+        return ds
+
+    def load_excel(self, raw: bytes, filename: str = "") -> Dataset:
+        """Excel 업로드: 한 번만 Parquet로 변환(디스크 보관)하고 이후에는 Parquet 데이터셋으로 다룹니다."""
+        dsid = dataset_id_for(raw)
+        ds = self.get(dsid)
+        cache_event("dataset", ds is not None)
+        if ds is not None:
+            return ds
+
+        def _convert() -> Dataset:
+            path, report = parquet_source.excel_to_parquet(dsid, raw, filename)
+            return self._open_parquet(dsid, path, {"engine": "excel", "conversion": report})
+
+        ds, _ = self._flight.do(dsid, _convert)
+        return ds
+
+    def rebalance(self):
+        """항목 크기가 늘었을 때 (파생 결과 캐시, 지문, 전체 적재) 상한을 다시 적용."""
+        with self._lock:
+            self._evict()
+
+    def _evict(self):
+        total = sum(d.nbytes for d in self._items.values())
+        while self._items and (len(self._items) > self.max_items or total > self.max_bytes):
+            if len(self._items) == 1:
+                break  # 방금 넣은 항목은 크기와 무관하게 유지
+            _, old = self._items.popitem(last=False)
+            total -= old.nbytes
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "datasets": len(self._items),
+                "bytes": sum(d.nbytes for d in self._items.values()),
+                "ids": list(self._items.keys()),
+            }
+
+
+# 서버 프로세스 공용 저장소
+STORE = DatasetStore()
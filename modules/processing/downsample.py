@@ -0,0 +1,154 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# --- CONFIGS ---
+DEFAULT_MAX_POINTS = 2000     # 시리즈당 픽셀 예산
+METHODS = ("lttb", "minmax")
+
+
+def _bucket_edges(n: int, n_buckets: int) -> np.ndarray:
+    return np.linspace(0, n, n_buckets + 1).astype(np.int64)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets. 첫/끝 점을 고정하고 가운데를 n_out-2개 버킷으로 나눠
+    버킷마다 (이전 선택점, 현재 후보, 다음 버킷 평균) 삼각형 넓이가 최대인 점을 고릅니다.
+    버킷 평균은 cumsum으로 한 번에 계산하고, 순차 의존이 있는 선택만 버킷 단위로 돕니다.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    xf = x.astype(np.float64)
+    yf = y.astype(np.float64)
+    edges = _bucket_edges(n - 2, n_out - 2) + 1          # 가운데 구간 [1, n-1)
+    cx = np.r_[0.0, np.cumsum(xf)]
+    cy = np.r_[0.0, np.cumsum(yf)]
+    # 버킷 b의 "다음 버킷" 평균 (마지막 버킷의 다음은 끝 점)
+    nxt_lo = np.r_[edges[1:-1], n - 1]
+    nxt_hi = np.r_[edges[2:], n]
+    cnt = (nxt_hi - nxt_lo).astype(np.float64)
+    avg_x = (cx[nxt_hi] - cx[nxt_lo]) / cnt
+    avg_y = (cy[nxt_hi] - cy[nxt_lo]) / cnt
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        ax, ay = xf[a], yf[a]
+        area = np.abs((ax - avg_x[b]) * (yf[lo:hi] - ay) - (ax - xf[lo:hi]) * (avg_y[b] - ay))
+        a = lo + int(np.argmax(area))
+        out[b + 1] = a
+    return out
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """버킷별 최솟값/최댓값 위치를 모두 남기는 decimation (스파이크 보존). 완전 벡터화."""
+    n = len(y)
+    n_buckets = max(n_out // 2, 1)
+    if n <= n_out:
+        return np.arange(n)
+    size = -(-n // n_buckets)  # ceil
+    pad = n_buckets * size - n
+    yf = y.astype(np.float64)
+    lo_m = np.r_[yf, np.full(pad, np.inf)].reshape(n_buckets, size)
+    hi_m = np.r_[yf, np.full(pad, -np.inf)].reshape(n_buckets, size)
+    base = np.arange(n_buckets) * size
+    idx = np.concatenate([base + lo_m.argmin(axis=1), base + hi_m.argmax(axis=1)])
+    return np.unique(idx[idx < n])
+
+
+def decimate(x: np.ndarray, y: np.ndarray, max_points: int, method: str = "lttb") -> np.ndarray:
+    """결측치를 제외한 (x, y)에서 남길 위치 인덱스를 반환합니다."""
+    if method not in METHODS:
+        raise ValueError(f"지원하지 않는 method: {method} (가능: {METHODS})")
+    ok = np.flatnonzero(~np.isnan(y))
+    if len(ok) <= max_points:
+        return ok
+    if method == "minmax":
+        return ok[minmax_indices(y[ok], max_points)]
+    return ok[lttb_indices(x[ok], y[ok], max_points)]
+
+
+def downsample_series(df: pd.DataFrame, columns: Optional[List[str]] = None, tags: Optional[List[str]] = None,
+                      start: Optional[str] = None, end: Optional[str] = None,
+                      max_points: int = DEFAULT_MAX_POINTS, method: str = "lttb",
+                      time_col: str = "STD_DT", tag_col: str = "TAG") -> Dict[str, Any]:
+    """
+    TAG별·값 컬럼별 시계열을 픽셀 예산(max_points)에 맞춰 줄입니다.
+    시간축은 time_col(없으면 행 번호), 출력 t는 epoch ms(정수) 또는 행 번호입니다.
+    시간 컬럼이 없는데 start/end를 주면 ValueError (행 번호 축에는 시간 범위를 적용할 수 없음).
+    """
+    has_time = time_col in df.columns
+    has_tag = tag_col in df.columns
+    if (start or end) and not has_time:
+        raise ValueError(f"시간 컬럼이 없습니다: {time_col} (start/end를 적용할 수 없음)")
+    if columns:
+        missing = [c for c in columns if c not in df.columns]
+        if missing:
+            raise KeyError(f"누락 컬럼: {missing}")
+        value_cols = list(columns)
+    else:
+        value_cols = [c for c in df.select_dtypes(include=["number"]).columns if c not in (time_col, tag_col)]
+
+    if has_time:
+        ts = df[time_col]
+        if not pd.api.types.is_datetime64_any_dtype(ts.dtype):
+            ts = pd.to_datetime(ts, errors="coerce")
+        t_ms = ts.to_numpy(dtype="datetime64[ms]").astype(np.int64)
+        t_ok = ~ts.isna().to_numpy()
+    else:
+        t_ms = np.arange(len(df), dtype=np.int64)
+        t_ok = np.ones(len(df), dtype=bool)
+
+    mask = t_ok.copy()
+    if start:
+        mask &= t_ms >= pd.Timestamp(start).value // 1_000_000
+    if end:
+        mask &= t_ms <= pd.Timestamp(end).value // 1_000_000
+
+    if has_tag:
+        groups = df[tag_col].groupby(df[tag_col], observed=True, sort=True).indices
+        groups = {str(k): v for k, v in groups.items()}
+        if tags:
+            wanted = {str(t) for t in tags}
+            groups = {k: v for k, v in groups.items() if k in wanted}
+    else:
+        groups = {"all": np.arange(len(df))}
+
+    values = {c: df[c].to_numpy(dtype=np.float64, na_value=np.nan) for c in value_cols}
+    series: Dict[str, Dict[str, Any]] = {}
+    raw_points = 0
+    out_points = 0
+    for tag, pos in groups.items():
+        pos = pos[mask[pos]]
+        if pos.size == 0:
+            continue
+        t = t_ms[pos]
+        if has_time and np.any(t[1:] < t[:-1]):
+            order = np.argsort(t, kind="stable")
+            pos, t = pos[order], t[order]
+        per_col: Dict[str, Any] = {}
+        for c in value_cols:
+            y = values[c][pos]
+            keep = decimate(t, y, max_points, method)
+            raw_points += int(np.count_nonzero(~np.isnan(y)))
+            out_points += int(keep.size)
+            per_col[c] = {"t": t[keep].tolist(), "y": np.round(y[keep], 6).tolist()}
+        series[tag] = per_col
+
+    return {
+        "method": method,
+        "max_points": max_points,
+        "time_col": time_col if has_time else None,
+        "tag_col": tag_col if has_tag else None,
+        "columns": value_cols,
+        "window": {"start": start, "end": end},
+        "raw_points": raw_points,
+        "points": out_points,
+        "series": series,
+    }
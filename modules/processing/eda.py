@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
 from typing import Dict, Any, Optional
+from .correlation import correlation_summary, corr_matrix
+from .fingerprint import FingerprintIndex
 
 def require_columns(df: pd.DataFrame, cols: list[str]):
     missing = [c for c in cols if c not in df.columns]
@@ -8,22 +10,24 @@ def require_columns(df: pd.DataFrame, cols: list[str]):
         return False, f"누락 컬럼: {missing} / 사용 가능: {list(df.columns)}"
     return True, None
 
-def _numeric_cols(df: pd.DataFrame, limit: int = 30) -> list[str]:
+def _numeric_cols(df: pd.DataFrame, limit: Optional[int] = 30) -> list[str]:
     return list(df.select_dtypes(include=["number"]).columns[:limit])
 
-def quick_summary(df: pd.DataFrame) -> Dict[str, Any]:
+def quick_summary(df: pd.DataFrame, corr_top_k: int = 20,
+                  fingerprints: Optional[FingerprintIndex] = None) -> Dict[str, Any]:
     n_rows, n_cols = df.shape
     nulls = df.isna().sum().to_dict()
     dtypes = df.dtypes.astype(str).to_dict()
-    dup_cnt = int(df.duplicated().sum())
-    num_cols = _numeric_cols(df)
-    corr = df[num_cols].corr().round(3).replace({np.nan: None}).to_dict() if len(num_cols) > 1 else {}
+    # 데이터셋에 캐시된 지문 인덱스가 있으면 재사용 (없으면 1회 계산)
+    dup_cnt = (fingerprints or FingerprintIndex(df)).duplicate_count()
+    # 전체 수치형 컬럼 대상, |r| 상위 쌍과 컬럼별 최강 상대만 반환
+    corr = correlation_summary(df, top_k=corr_top_k)
     return {
         "shape": {"rows": int(n_rows), "cols": int(n_cols)},
         "nulls": {k: int(v) for k, v in nulls.items()},
         "dtypes": dtypes,
         "duplicates": dup_cnt,
-        "corr(num<=30)": corr,
+        "corr": corr,
     }
 
 def summary_to_cards(summary: Dict[str, Any]) -> Dict[str, Any]:
@@ -43,14 +47,25 @@ def summary_to_cards(summary: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 def plot_corr(df: pd.DataFrame, limit: int = 30):
-    """상관행렬 히트맵 matplotlib Figure 반환 (수치형 2열 이상일 때만)"""
+    """상관행렬 히트맵 matplotlib Figure 반환 (수치형 2열 이상일 때만)
+    컬럼이 limit개를 넘으면 전체를 계산한 뒤 최강 |r|이 큰 limit개 컬럼만 그립니다."""
     import matplotlib.pyplot as plt
 
-    cols = _numeric_cols(df, limit=limit)
-    if len(cols) < 2:
+    all_cols = _numeric_cols(df, limit=None)
+    if len(all_cols) < 2:
         return None
 
-    corr = df[cols].corr()
+    cols_all, mat = corr_matrix(df, all_cols)
+    if len(cols_all) > limit:
+        off = np.nan_to_num(np.abs(mat), nan=-1.0)
+        np.fill_diagonal(off, -1.0)
+        strength = off.max(axis=1)
+        pick = np.sort(np.argsort(-strength, kind="stable")[:limit])
+        mat = mat[np.ix_(pick, pick)]
+        cols = [cols_all[i] for i in pick]
+    else:
+        cols = cols_all
+    corr = pd.DataFrame(mat, index=cols, columns=cols)
     fig = plt.figure(figsize=(min(0.6*len(cols)+3, 12), min(0.6*len(cols)+3, 12)))
     ax = plt.gca()
     im = ax.imshow(corr, vmin=-1, vmax=1)
@@ -58,7 +73,7 @@ def plot_corr(df: pd.DataFrame, limit: int = 30):
     ax.set_yticks(range(len(cols)))
     ax.set_xticklabels(cols, rotation=45, ha="right")
     ax.set_yticklabels(cols)
-    ax.set_title("Correlation (numeric ≤ 30)")
+    ax.set_title(f"Correlation (top {len(cols)} of {len(all_cols)} numeric)")
     # 값 라벨 일부만 표시(과밀 방지)
     if len(cols) <= 12:
         for i in range(len(cols)):
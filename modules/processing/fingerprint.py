@@ -0,0 +1,116 @@
+from __future__ import annotations
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def _combine(hashes: List[np.ndarray], n: int) -> np.ndarray:
+    """컬럼별 uint64 해시를 행 단위로 결합 (pandas combine_hash_arrays와 같은 방식)."""
+    out = np.full(n, 0x345678, dtype=np.uint64)
+    mult = np.full(n, 1000003, dtype=np.uint64)
+    num = len(hashes)
+    for i, h in enumerate(hashes):
+        out ^= h
+        out *= mult
+        mult += np.uint64(82520 + 2 * (num - i - 1))
+    out += np.uint64(97531)
+    return out
+
+
+class FingerprintIndex:
+    """
+    데이터셋 1개에 대한 64비트 행 지문 인덱스.
+    컬럼별 해시(pd.util.hash_pandas_object)를 한 번만 계산해 캐시하고,
+    전체 행/컬럼 부분집합/근사(반올림) 지문은 캐시된 컬럼 해시를 결합해 만듭니다.
+    """
+
+    def __init__(self, df: pd.DataFrame, on_grow: Optional[Callable[[], None]] = None):
+        self.df = df
+        self.n = len(df)
+        self.on_grow = on_grow   # 해시 배열이 새로 캐시될 때 (Dataset이 메모리 합계를 다시 계산하도록)
+        self._col_hashes: Dict[Tuple[str, Optional[int]], np.ndarray] = {}
+        self._row_hashes: Dict[Tuple[Tuple[str, ...], Optional[int]], np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def _col_hash(self, col: str, decimals: Optional[int]) -> np.ndarray:
+        s = self.df[col]
+        # 반올림은 수치형 컬럼에만 의미가 있으므로 그 외는 정확 해시를 공유
+        if decimals is not None and not pd.api.types.is_numeric_dtype(s.dtype):
+            decimals = None
+        key = (col, decimals)
+        h = self._col_hashes.get(key)
+        if h is None:
+            if decimals is not None:
+                s = s.astype(np.float64).round(decimals) + 0.0  # -0.0 → 0.0
+            h = pd.util.hash_pandas_object(s, index=False).to_numpy(dtype=np.uint64)
+            self._col_hashes[key] = h
+            self._grew()
+        return h
+
+    def hashes(self, columns: Optional[List[str]] = None, decimals: Optional[int] = None) -> np.ndarray:
+        """행 지문 (n,) uint64. columns=None이면 전체 컬럼, decimals가 있으면 수치형을 반올림 후 해시."""
+        cols = tuple(columns) if columns else tuple(self.df.columns)
+        missing = [c for c in cols if c not in self.df.columns]
+        if missing:
+            raise KeyError(f"누락 컬럼: {missing}")
+        key = (cols, decimals)
+        with self._lock:
+            h = self._row_hashes.get(key)
+            if h is None:
+                h = _combine([self._col_hash(c, decimals) for c in cols], self.n)
+                self._row_hashes[key] = h
+                self._grew()
+            return h
+
+    def _grew(self):
+        if self.on_grow is not None:
+            self.on_grow()
+
+    @property
+    def nbytes(self) -> int:
+        """캐시된 컬럼/행 해시 배열 합계 (8바이트 × 행 수 × 배열 수)."""
+        arrays = list(self._col_hashes.values()) + list(self._row_hashes.values())   # 다른 스레드가 추가 중이어도 안전한 스냅샷
+        return int(sum(h.nbytes for h in arrays))
+
+    def duplicate_count(self, columns: Optional[List[str]] = None, decimals: Optional[int] = None) -> int:
+        """첫 등장 이후 반복된 행 수 (df.duplicated().sum()과 동일한 의미)."""
+        h = self.hashes(columns, decimals)
+        return int(self.n - len(np.unique(h)))
+
+    def duplicate_groups(self, columns: Optional[List[str]] = None, decimals: Optional[int] = None,
+                         max_groups: int = 20, max_rows: int = 20) -> List[Dict[str, Any]]:
+        """중복 그룹 목록 (크기 내림차순). 각 그룹은 행 위치(row_indices)와 크기를 담습니다."""
+        h = self.hashes(columns, decimals)
+        if self.n == 0:
+            return []
+        order = np.argsort(h, kind="stable")
+        hs = h[order]
+        starts = np.flatnonzero(np.r_[True, hs[1:] != hs[:-1]])
+        sizes = np.diff(np.r_[starts, len(hs)])
+        dup = np.flatnonzero(sizes > 1)
+        if dup.size == 0:
+            return []
+        top = dup[np.argsort(-sizes[dup], kind="stable")[:max_groups]]
+        groups = []
+        for g in top:
+            rows = order[starts[g]:starts[g] + sizes[g]]
+            groups.append({
+                "fingerprint": format(int(hs[starts[g]]), "016x"),
+                "count": int(sizes[g]),
+                "row_indices": [int(i) for i in rows[:max_rows]],
+            })
+        return groups
+
+    def summary(self, columns: Optional[List[str]] = None, decimals: Optional[int] = None,
+                max_groups: int = 20) -> Dict[str, Any]:
+        groups = self.duplicate_groups(columns, decimals, max_groups=max_groups)
+        return {
+            "rows": self.n,
+            "columns": list(columns) if columns else None,
+            "decimals": decimals,
+            "mode": "near" if decimals is not None else "exact",
+            "duplicates": self.duplicate_count(columns, decimals),
+            "groups": groups,
+        }
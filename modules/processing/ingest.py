@@ -0,0 +1,201 @@
+from __future__ import annotations
+import io
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# pandas의 engine="pyarrow"(멀티스레드 CSV 파서)는 pyarrow가 있을 때만 사용
+try:
+    import pyarrow  # noqa: F401
+    _HAS_PYARROW = True
+except Exception:
+    _HAS_PYARROW = False
+
+# --- CONFIGS ---
+SAMPLE_ROWS = 2000                 # 스키마 추정에 사용할 샘플 행 수
+DATETIME_HINTS = ("STD_DT",)       # 이름만으로 타임스탬프로 보는 컬럼
+DATETIME_SUFFIXES = ("_DT", "_DATE", "_TIME", "TIMESTAMP")
+CATEGORY_MAX_RATIO = 0.5           # 고유값/행 비율이 이 이하인 문자열 컬럼은 category로 변환
+# float64 → float32는 왕복이 정확할 때만. 오차를 감수할 컬럼은 절대 허용 오차를 명시 ("TEMP=0.01,PRESS=0.5")
+FLOAT32_ATOL: Dict[str, float] = {
+    k.strip(): float(v) for k, _, v in
+    (item.partition("=") for item in os.getenv("INGEST_FLOAT32_ATOL", "").split(",") if "=" in item)
+}
+
+
+def _is_text(s: pd.Series) -> bool:
+    return s.dtype == object or pd.api.types.is_string_dtype(s.dtype)
+
+
+def _looks_like_datetime(name: str, s: pd.Series) -> bool:
+    """이름 힌트(STD_DT, *_DT, *_DATE 등)가 있고 샘플 값 대부분이 날짜로 파싱되면 True."""
+    if pd.api.types.is_datetime64_any_dtype(s.dtype):
+        return True
+    upper = str(name).upper()
+    if upper not in DATETIME_HINTS and not upper.endswith(DATETIME_SUFFIXES):
+        return False
+    if not _is_text(s):
+        return False
+    probe = s.dropna().head(200)
+    if probe.empty:
+        return False
+    parsed = pd.to_datetime(probe, errors="coerce")
+    return float(parsed.notna().mean()) >= 0.9
+
+
+def sniff_schema(raw: bytes, sample_rows: int = SAMPLE_ROWS) -> Dict[str, List[str]]:
+    """앞부분 샘플 행만 읽어 컬럼을 numeric / datetime / string 으로 분류합니다."""
+    sample = pd.read_csv(io.BytesIO(raw), nrows=sample_rows)
+    numeric: List[str] = []
+    datetimes: List[str] = []
+    strings: List[str] = []
+    for c in sample.columns:
+        s = sample[c]
+        if pd.api.types.is_numeric_dtype(s.dtype):
+            numeric.append(c)
+        elif _looks_like_datetime(c, s):
+            datetimes.append(c)
+        elif _is_text(s):
+            strings.append(c)
+    return {"columns": list(sample.columns), "numeric": numeric, "datetime": datetimes, "string": strings}
+
+
+def _parse(raw: bytes, usecols: Optional[List[str]] = None) -> Tuple[pd.DataFrame, str]:
+    """pyarrow 엔진으로 파싱하고, 미지원 옵션/포맷이면 C 엔진으로 폴백."""
+    if _HAS_PYARROW:
+        try:
+            return pd.read_csv(io.BytesIO(raw), engine="pyarrow", usecols=usecols), "pyarrow"
+        except Exception:
+            pass
+    return pd.read_csv(io.BytesIO(raw), usecols=usecols), "c"
+
+
+def _downcast_numeric(s: pd.Series, atol: Optional[float] = None) -> pd.Series:
+    """
+    정수는 무손실 최소 폭으로, 실수는 float32 왕복이 정확할 때만 float32로
+    (atol이 주어진 컬럼은 왕복 오차가 atol 이하이면). 상대 오차 기준은 float32 정밀도(~6e-8)보다 느슨하면
+    항상 통과하므로 쓰지 않습니다 — 예: 1700000000.5 → 1700000000.0.
+    """
+    if pd.api.types.is_bool_dtype(s.dtype):
+        return s
+    if pd.api.types.is_integer_dtype(s.dtype):
+        return pd.to_numeric(s, downcast="integer")
+    if pd.api.types.is_float_dtype(s.dtype) and s.dtype != np.float32:
+        vals = s.to_numpy(dtype=np.float64, na_value=np.nan)
+        finite = vals[np.isfinite(vals)]
+        if finite.size and np.abs(finite).max() >= np.finfo(np.float32).max:
+            return s
+        as32 = vals.astype(np.float32)
+        back = as32.astype(np.float64)
+        if atol is None:
+            lossless = np.array_equal(back, vals, equal_nan=True)
+        else:
+            lossless = np.allclose(back, vals, rtol=0.0, atol=atol, equal_nan=True)
+        if lossless:
+            return pd.Series(as32, index=s.index, name=s.name)
+    return s
+
+
+def _parse_datetime(s: pd.Series) -> Tuple[Optional[pd.Series], int]:
+    """
+    전체 컬럼을 datetime으로 파싱. 첫 형식과 다른 값이 섞여 있으면 format="mixed"로 다시 시도하고,
+    그래도 원래 값이 있던 칸이 NaT가 되면 (None, 잃는 개수)를 반환해 호출 측이 문자열로 유지하게 합니다.
+    """
+    present = s.notna()
+    parsed = pd.to_datetime(s, errors="coerce")
+    lost = int((parsed.isna() & present).sum())
+    if lost:
+        try:
+            parsed = pd.to_datetime(s, errors="coerce", format="mixed")
+            lost = int((parsed.isna() & present).sum())
+        except (ValueError, TypeError):   # 예: 시간대가 있는 값과 없는 값이 섞임
+            pass
+    return (None, lost) if lost else (parsed, 0)
+
+
+def optimize_dtypes(df: pd.DataFrame, schema: Optional[Dict[str, List[str]]] = None,
+                    float32_atol: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """
+    DataFrame dtype을 제자리(in-place)에서 최적화하고 변경 내역을 반환합니다.
+    - 수치형: 무손실 최소 폭으로 다운캐스트 (float32는 왕복이 정확하거나 float32_atol(기본 FLOAT32_ATOL)에 명시된 컬럼만)
+    - 타임스탬프(STD_DT 등): datetime64로 한 번만 파싱. 값을 잃는(NaT가 되는) 컬럼은 문자열로 두고
+      datetime_unparsed에 파싱 못 한 개수를 남김
+    - 저카디널리티 문자열(TAG 등): category
+    """
+    dt_cols = set((schema or {}).get("datetime", []))
+    atol = FLOAT32_ATOL if float32_atol is None else float32_atol
+    downcast: Dict[str, str] = {}
+    categorized: List[str] = []
+    datetimes: List[str] = []
+    unparsed: Dict[str, int] = {}
+    n = max(len(df), 1)
+    for c in df.columns:
+        s = df[c]
+        if pd.api.types.is_numeric_dtype(s.dtype):
+            out = _downcast_numeric(s, atol.get(str(c)))
+            if out.dtype != s.dtype:
+                downcast[c] = f"{s.dtype}->{out.dtype}"
+                df[c] = out
+            continue
+        if pd.api.types.is_datetime64_any_dtype(s.dtype):
+            datetimes.append(c)
+            continue
+        if c in dt_cols or (schema is None and _looks_like_datetime(c, s)):
+            parsed, lost = _parse_datetime(s)
+            if parsed is not None:
+                df[c] = parsed
+                datetimes.append(c)
+                continue
+            unparsed[c] = lost   # 일부 값이 날짜로 읽히지 않음 → 문자열 그대로 (아래 category 판단은 동일)
+        if _is_text(s):
+            if s.nunique(dropna=True) / n <= CATEGORY_MAX_RATIO:
+                df[c] = s.astype("category")
+                categorized.append(c)
+    return {"downcast": downcast, "categorized": categorized, "datetimes": datetimes, "datetime_unparsed": unparsed}
+
+
+def read_csv_fast(raw: bytes, usecols: Optional[List[str]] = None, optimize: bool = True) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    공용 CSV 적재 엔트리포인트.
+    샘플로 스키마를 추정 → pyarrow(가능 시)로 파싱 → dtype 최적화 후 (df, 리포트) 반환.
+    리포트에는 엔진, 파싱/최적화 시간(ms), 최적화 전후 메모리와 절감량이 담깁니다.
+    """
+    t0 = time.perf_counter()
+    schema = sniff_schema(raw)
+    df, engine = _parse(raw, usecols=usecols)
+    t1 = time.perf_counter()
+
+    mem_before = int(df.memory_usage(deep=True).sum())
+    changes: Dict[str, Any] = {"downcast": {}, "categorized": [], "datetimes": [], "datetime_unparsed": {}}
+    if optimize:
+        changes = optimize_dtypes(df, schema)
+    t2 = time.perf_counter()
+    mem_after = int(df.memory_usage(deep=True).sum()) if optimize else mem_before
+
+    report = {
+        "engine": engine,
+        "rows": int(df.shape[0]),
+        "cols": int(df.shape[1]),
+        "parse_ms": round((t1 - t0) * 1000, 2),
+        "optimize_ms": round((t2 - t1) * 1000, 2),
+        "memory_before": mem_before,
+        "memory_after": mem_after,
+        "memory_saved": mem_before - mem_after,
+        "memory_saved_pct": round(100.0 * (mem_before - mem_after) / mem_before, 1) if mem_before else 0.0,
+        **changes,
+    }
+    return df, report
+
+
+def head_records(df: pd.DataFrame, n: int = 5) -> List[Dict[str, Any]]:
+    """미리보기용 레코드. float32 컬럼은 최단 10진 표현으로 되돌려 12.340000152 같은 잡음을 없애고,
+    결측치는 JSON 직렬화가 가능하도록 None으로 바꿉니다."""
+    head = df.head(n).copy()
+    for c in head.columns:
+        if head[c].dtype == np.float32:
+            head[c] = head[c].astype(str).astype(np.float64)
+    head = head.astype(object).where(head.notna(), None)
+    return head.to_dict(orient="records")
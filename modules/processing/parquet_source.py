@@ -0,0 +1,294 @@
+"""
+Parquet 파일 기반 데이터셋: 필요한 컬럼(projection)과 row group(통계로 TAG/시간 범위 pushdown)만 읽습니다.
+
+- 업로드된 Parquet는 그대로 PARQUET_DIR/<dataset_id>.parquet 로 저장
+- Excel은 한 번만 DataFrame → dtype 최적화 → (TAG, 시간) 정렬 → Parquet로 변환해 같은 위치에 저장 (재업로드 시 재변환 없음)
+- row group 선택은 footer의 min/max 통계로 직접 계산 (pyarrow.dataset은 dictionary(TAG) 컬럼 통계로 거르지 않음)
+"""
+from __future__ import annotations
+import importlib.util
+import io
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from .ingest import optimize_dtypes
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    _HAS_PARQUET = True
+except ImportError:
+    pa = pc = pq = None
+    _HAS_PARQUET = False
+
+# pd.read_excel 엔진 (xlsx: openpyxl, xls: xlrd). 없으면 Excel 업로드만 501
+_HAS_OPENPYXL = importlib.util.find_spec("openpyxl") is not None
+_HAS_XLRD = importlib.util.find_spec("xlrd") is not None
+
+# --- CONFIGS ---
+PARQUET_DIR = os.path.abspath(os.getenv("DATASET_PARQUET_DIR", os.path.join("data", "datasets")))
+PARQUET_MAX_BYTES = int(os.getenv("DATASET_PARQUET_MAX_BYTES", str(20 * 1024 ** 3)))   # 디스크 보관 상한 (오래된 것부터 삭제)
+ROW_GROUP_ROWS = int(os.getenv("DATASET_ROW_GROUP_ROWS", "65536"))   # Excel 변환 시 row group 크기 (작을수록 pushdown 정밀)
+PARQUET_EXTS = (".parquet", ".pq")
+EXCEL_EXTS = (".xlsx", ".xlsm", ".xls")
+_DIR_LOCK = threading.Lock()
+
+
+def parquet_path(dataset_id: str) -> str:
+    return os.path.join(PARQUET_DIR, f"{dataset_id}.parquet")
+
+
+def _prune_dir(keep: str):
+    """PARQUET_DIR 합계가 PARQUET_MAX_BYTES를 넘으면 오래된 파일부터 삭제 (방금 쓴 파일은 유지)."""
+    files = []
+    for name in os.listdir(PARQUET_DIR):
+        path = os.path.join(PARQUET_DIR, name)
+        if name.endswith(".parquet") and path != keep:
+            try:
+                st = os.stat(path)
+                files.append((st.st_mtime, st.st_size, path))
+            except OSError:
+                pass
+    total = sum(size for _, size, _ in files) + os.path.getsize(keep)
+    for _, size, path in sorted(files):
+        if total <= PARQUET_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+def _write_atomic(path: str, write):
+    os.makedirs(PARQUET_DIR, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    with _DIR_LOCK:
+        _prune_dir(path)
+
+
+def store_parquet(dataset_id: str, raw: bytes) -> str:
+    """업로드된 Parquet 바이트를 검증 후 그대로 저장 (이미 있으면 재사용)."""
+    path = parquet_path(dataset_id)
+    if os.path.exists(path):
+        os.utime(path)
+        return path
+    pq.ParquetFile(io.BytesIO(raw)).metadata   # footer가 깨졌으면 여기서 예외
+
+    def _write(tmp: str):
+        with open(tmp, "wb") as w:
+            w.write(raw)
+
+    _write_atomic(path, _write)
+    return path
+
+
+def excel_to_parquet(dataset_id: str, raw: bytes, filename: str = "", time_col: str = "STD_DT",
+                     tag_col: str = "TAG") -> Tuple[str, Dict[str, Any]]:
+    """
+    Excel 첫 시트 → dtype 최적화 → (TAG, 시간) 정렬 → Parquet (ROW_GROUP_ROWS행 단위). (경로, 변환 리포트) 반환.
+    정렬해 두면 row group마다 TAG/시간 범위가 좁아져 pushdown이 대부분의 row group을 건너뜁니다.
+    """
+    path = parquet_path(dataset_id)
+    if os.path.exists(path):
+        os.utime(path)
+        return path, {"converted": False}
+    engine = "xlrd" if filename.lower().endswith(".xls") else "openpyxl"
+    if not (_HAS_XLRD if engine == "xlrd" else _HAS_OPENPYXL):
+        raise RuntimeError(f"Excel 읽기에는 {engine} 패키지가 필요합니다.")
+    t0 = time.perf_counter()
+    df = pd.read_excel(io.BytesIO(raw), sheet_name=0, engine=engine)
+    df.columns = [str(c) for c in df.columns]
+    t1 = time.perf_counter()
+    changes = optimize_dtypes(df)
+    order = [c for c in (tag_col, time_col) if c in df.columns]
+    if order:
+        df = df.sort_values(order, kind="stable", ignore_index=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    _write_atomic(path, lambda tmp: pq.write_table(table, tmp, row_group_size=ROW_GROUP_ROWS, compression="zstd"))
+    report = {"converted": True, "engine": engine, "rows": int(len(df)), "cols": int(df.shape[1]),
+              "read_ms": round((t1 - t0) * 1000, 2), "convert_ms": round((time.perf_counter() - t1) * 1000, 2),
+              "sorted_by": order, **changes}
+    return path, report
+
+
+def _is_text_type(t: "pa.DataType") -> bool:
+    if pa.types.is_dictionary(t):
+        t = t.value_type
+    return pa.types.is_string(t) or pa.types.is_large_string(t)
+
+
+def _ts(v: Any) -> pd.Timestamp:
+    ts = pd.Timestamp(v)
+    return ts.tz_convert(None) if ts.tzinfo is not None else ts
+
+
+def _stat(v: Any) -> Any:
+    return v.decode("utf-8", errors="replace") if isinstance(v, bytes) else v
+
+
+class ParquetSource:
+    """Parquet 파일 1개. 스키마/row group 통계는 footer만 읽어 보관하고, 데이터는 read() 때 필요한 만큼만."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = pq.ParquetFile(path)
+        self.meta = self.file.metadata
+        self.schema = self.file.schema_arrow
+        self.columns = [str(n) for n in self.schema.names]
+        self.rows = int(self.meta.num_rows)
+        self.file_bytes = os.path.getsize(path)
+        # parquet 컬럼 순번 (중첩 없는 표 기준: 최상위 이름 → 리프 컬럼 index)
+        self._col_index = {self.meta.schema.column(i).path.split(".")[0]: i for i in range(self.meta.num_columns)}
+        self._lock = threading.Lock()   # 하나의 ParquetFile 핸들을 여러 스레드가 동시에 읽지 않도록
+        self._distinct: Dict[str, List[str]] = {}
+
+    def _stats(self, rg: int, column: str):
+        idx = self._col_index.get(column)
+        if idx is None:
+            return None
+        st = self.meta.row_group(rg).column(idx).statistics
+        return st if st is not None and st.has_min_max else None
+
+    def row_groups(self, tags: Optional[Sequence[str]] = None, start: Optional[str] = None, end: Optional[str] = None,
+                   tag_col: str = "TAG", time_col: str = "STD_DT") -> List[int]:
+        """통계(min/max)상 조건을 만족할 수 있는 row group 번호. 통계가 없거나 타입이 맞지 않으면 읽는 쪽으로."""
+        use_tags = bool(tags) and tag_col in self.columns and _is_text_type(self.schema.field(tag_col).type)
+        use_time = bool(start or end) and time_col in self.columns \
+            and pa.types.is_timestamp(self.schema.field(time_col).type)
+        lo = _ts(start) if use_time and start else None
+        hi = _ts(end) if use_time and end else None
+        wanted = sorted({str(t) for t in tags}) if use_tags else []
+        keep: List[int] = []
+        for rg in range(self.meta.num_row_groups):
+            if use_tags:
+                st = self._stats(rg, tag_col)
+                if st is not None and not any(_stat(st.min) <= t <= _stat(st.max) for t in wanted):
+                    continue
+            if use_time:
+                st = self._stats(rg, time_col)
+                if st is not None and ((lo is not None and _ts(st.max) < lo) or (hi is not None and _ts(st.min) > hi)):
+                    continue
+            keep.append(rg)
+        return keep
+
+    def _expr(self, tags, start, end, tag_col, time_col):
+        """읽은 row group 안에서의 정확한 행 필터 (row group 통계는 범위만 알려주므로)."""
+        expr = None
+        if tags and tag_col in self.columns and _is_text_type(self.schema.field(tag_col).type):
+            expr = pc.field(tag_col).isin([str(t) for t in tags])
+        if (start or end) and time_col in self.columns:
+            t = self.schema.field(time_col).type
+            if pa.types.is_timestamp(t):
+                for bound, op in ((start, "ge"), (end, "le")):
+                    if not bound:
+                        continue
+                    ts = _ts(bound)
+                    ts = ts.tz_localize("UTC").tz_convert(t.tz) if t.tz else ts
+                    value = pa.scalar(ts, type=t)
+                    cond = pc.field(time_col) >= value if op == "ge" else pc.field(time_col) <= value
+                    expr = cond if expr is None else expr & cond
+        return expr
+
+    def _bytes(self, row_groups: Iterable[int], columns: Sequence[str]) -> int:
+        idx = [self._col_index[c] for c in columns if c in self._col_index]
+        return int(sum(self.meta.row_group(rg).column(i).total_compressed_size for rg in row_groups for i in idx))
+
+    def read(self, columns: Optional[Sequence[str]] = None, tags: Optional[Sequence[str]] = None,
+             start: Optional[str] = None, end: Optional[str] = None, tag_col: str = "TAG",
+             time_col: str = "STD_DT") -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """
+        columns(+TAG/시간 필터에 쓰는 컬럼)만, 조건에 걸릴 수 있는 row group만 읽고 행 필터까지 적용한 (df, 리포트).
+        columns=None이면 모든 컬럼. 없는 컬럼은 KeyError.
+        """
+        t0 = time.perf_counter()
+        cols = list(self.columns) if columns is None else list(dict.fromkeys(str(c) for c in columns))
+        missing = [c for c in cols if c not in self.columns]
+        if missing:
+            raise KeyError(f"누락 컬럼: {missing}")
+        expr = self._expr(tags, start, end, tag_col, time_col)
+        read_cols = cols + [c for c in (tag_col, time_col) if expr is not None and c in self.columns and c not in cols]
+        rgs = self.row_groups(tags, start, end, tag_col, time_col)
+        with self._lock:
+            table = self.file.read_row_groups(rgs, columns=read_cols) if rgs \
+                else self.schema.empty_table().select(read_cols)
+        rows_read = table.num_rows
+        if expr is not None and rows_read:
+            table = table.filter(expr)
+        df = table.select(cols).to_pandas()
+        report = {"source": "parquet", "columns_read": read_cols, "row_groups": self.meta.num_row_groups,
+                  "row_groups_read": len(rgs), "rows_read": int(rows_read), "rows": int(len(df)),
+                  "bytes_read": self._bytes(rgs, read_cols), "file_bytes": self.file_bytes,
+                  "read_ms": round((time.perf_counter() - t0) * 1000, 2)}
+        return df, report
+
+    def read_rows(self, offset: int, limit: int, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """행 구간 [offset, offset+limit) — 그 구간이 걸친 row group만 읽습니다."""
+        cols = list(self.columns) if columns is None else [str(c) for c in columns]
+        missing = [c for c in cols if c not in self.columns]
+        if missing:
+            raise KeyError(f"누락 컬럼: {missing}")
+        stop = min(offset + limit, self.rows)
+        rgs, first_row, pos = [], None, 0
+        for rg in range(self.meta.num_row_groups):
+            n = self.meta.row_group(rg).num_rows
+            if pos + n > offset and pos < stop:
+                rgs.append(rg)
+                first_row = pos if first_row is None else first_row
+            pos += n
+        if not rgs or offset >= stop:
+            return self.schema.empty_table().select(cols).to_pandas()
+        with self._lock:
+            table = self.file.read_row_groups(rgs, columns=cols)
+        return table.slice(offset - first_row, stop - offset).to_pandas()
+
+    def distinct(self, column: str, limit: int) -> Optional[List[str]]:
+        """컬럼 고유값 (그 컬럼만 읽음). limit개를 넘으면 None. 결과는 보관."""
+        if column not in self._distinct:
+            with self._lock:
+                col = self.file.read(columns=[column]).column(0)
+            if pa.types.is_dictionary(col.type):
+                col = col.cast(col.type.value_type)
+            values = pc.unique(col.drop_null())
+            self._distinct[column] = [str(v) for v in values.to_pylist()] if len(values) <= limit else None
+        return self._distinct[column]
+
+    def planning_frame(self, tag_col: str = "TAG", max_tags: int = 200) -> pd.DataFrame:
+        """0행, 실제 dtype의 DataFrame (+ TAG는 고유값을 category로) — 컬럼/수치형/TAG 값만 보는 플래너용."""
+        df = self.schema.empty_table().to_pandas()
+        if tag_col in self.columns:
+            values = self.distinct(tag_col, max_tags)
+            if values is not None:
+                df[tag_col] = pd.Categorical([], categories=values)
+        return df
+
+    def load_all(self) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """전체 적재 (컬럼/행 제한 없는 분석용). CSV 적재와 같은 dtype 최적화를 거칩니다."""
+        t0 = time.perf_counter()
+        with self._lock:
+            df = self.file.read().to_pandas()
+        t1 = time.perf_counter()
+        mem_before = int(df.memory_usage(deep=True).sum())
+        changes = optimize_dtypes(df)
+        mem_after = int(df.memory_usage(deep=True).sum())
+        return df, {"engine": "parquet", "rows": int(df.shape[0]), "cols": int(df.shape[1]),
+                    "parse_ms": round((t1 - t0) * 1000, 2),
+                    "optimize_ms": round((time.perf_counter() - t1) * 1000, 2),
+                    "memory_before": mem_before, "memory_after": mem_after, "memory_saved": mem_before - mem_after,
+                    **changes}
+
+    def describe(self) -> Dict[str, Any]:
+        return {"source": "parquet", "rows": self.rows, "cols": len(self.columns),
+                "row_groups": self.meta.num_row_groups, "file_bytes": self.file_bytes,
+                "columns": {f.name: str(f.type) for f in self.schema}}
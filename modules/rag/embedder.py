@@ -2,6 +2,7 @@ from __future__ import annotations
 from typing import List
 import os
 import hashlib
+import importlib.util
 import numpy as np
 import time
 from dotenv import load_dotenv
@@ -12,16 +13,36 @@ try:
 except Exception:
     pass
 
+# Gemini SDK는 무거우므로(~0.5s) 설치 여부만 확인하고, 첫 google 임베딩 호출(또는 서버 warm-up) 때 import
 try:
-    import google.generativeai as genai
-    _HAS_GEMINI = True
-except ImportError:
-    genai = None
+    _HAS_GEMINI = importlib.util.find_spec("google.generativeai") is not None
+except ModuleNotFoundError:
     _HAS_GEMINI = False
+_GENAI = None
+
+
+def _genai():
+    global _GENAI
+    if _GENAI is None:
+        import google.generativeai as genai
+        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+        _GENAI = genai
+    return _GENAI
+
+
+def warm_embedder() -> str:
+    """현재 EMBEDDING_PROVIDER의 클라이언트를 미리 준비합니다 (서버 warm-up용). 준비한 provider 이름 반환."""
+    provider = os.getenv("EMBEDDING_PROVIDER", "google").lower()
+    if provider == "google" and _HAS_GEMINI and os.getenv("GOOGLE_API_KEY"):
+        _genai()
+    return provider
 
 # Gemini Embedding 모델의 최대 배치 크기
 GEMINI_BATCH_SIZE = 100
 _DIM = int(os.getenv("EMBEDDING_DIM", "768")) # Gemini text-embedding-004 모델은 768 차원
+# EMBEDDING_PROVIDER=fake: 부하 테스트용. 해시 임베딩 + 호출당 고정 지연 + 텍스트당 지연
+FAKE_EMBED_LATENCY_MS = float(os.getenv("FAKE_EMBED_LATENCY_MS", "50"))
+FAKE_EMBED_PER_TEXT_MS = float(os.getenv("FAKE_EMBED_PER_TEXT_MS", "1"))
 
 def _hash_embed(text: str, dim: int = _DIM) -> List[float]:
     """Google API 실패 시 사용할 매우 기본적인 폴백 임베딩"""
@@ -38,10 +59,14 @@ def embed_texts(texts: List[str], is_query: bool = False) -> List[List[float]]:
     오류 발생 시 명시적인 예외를 발생시킵니다.
     """
     provider = os.getenv("EMBEDDING_PROVIDER", "google").lower()
-    
+
+    if provider == "fake":
+        time.sleep((FAKE_EMBED_LATENCY_MS + FAKE_EMBED_PER_TEXT_MS * len(texts)) / 1000.0)
+        return [_hash_embed(t) for t in texts]
+
     if provider == "google" and _HAS_GEMINI and os.getenv("GOOGLE_API_KEY"):
         try:
-            genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+            genai = _genai()
             model = os.getenv("EMBEDDING_MODEL", "models/text-embedding-004")
             
             all_embeddings = []
@@ -9,7 +9,7 @@ from langchain_community.vectorstores import FAISS
 from langchain.embeddings.base import Embeddings
 from typing import List
 from .embedder import embed_texts
-from ..chatbot.chain_factory import create_gemini_chat_chain
+from ..chatbot.chain_factory import create_gemini_chat_chain, invoke_cached
 
 # --- CONFIGS ---
 VECTOR_STORE_DIR = "data/vector_store"
@@ -110,8 +110,7 @@ def compose_answer(hits: list, query: str, temperature: float = 0.2) -> str:
     )
     
     try:
-        resp = llm.invoke(prompt)
-        text = getattr(resp, "content", "") or str(resp)
+        text, _ = invoke_cached(prompt, temperature=temperature)
         return text.strip() if text else "[LLM 오류] 응답이 비어 있습니다."
     except Exception as e:
         return f"[LLM 오류] {e}\n네트워크 또는 API를 확인하거나 질문을 구체화해주세요."
@@ -1,10 +1,10 @@
 import os
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
-from langchain_community.vectorstores import FAISS
-from langchain.embeddings.base import Embeddings
-from typing import List
+from langchain_core.embeddings import Embeddings
+from typing import List, Optional
 from .embedder import embed_texts
+from .shared_index import open_index
 
 # --- CONFIGS ---
 VECTOR_STORE_DIR = "data/vector_store"
@@ -18,21 +18,25 @@ class CustomEmbeddings(Embeddings):
     def embed_query(self, text: str) -> List[float]:
         return embed_texts([text], is_query=True)[0]
 
-def retrieve(query: str, k: int = 5) -> list:
+def retrieve(query: str, k: int = 5, fetch_k: Optional[int] = None) -> list:
     """
     저장된 FAISS 인덱스를 로드하여 주어진 쿼리와 가장 유사한 k개의 문서를 검색합니다.
+    fetch_k를 주면 후보 fetch_k개 중 MMR(중복 제거)로 k개를 고릅니다.
     """
     index_path = os.path.join(VECTOR_STORE_DIR, INDEX_NAME)
     if not os.path.exists(index_path):
         raise FileNotFoundError(f"Vector store index not found at {index_path}. Please run indexing first.")
 
-    # 인덱싱에 사용된 것과 동일한 임베딩 모델 로드
-    embeddings = CustomEmbeddings()
+    # 인덱싱에 사용된 것과 동일한 임베딩 모델로 질의 임베딩
+    qvec = embed_texts([query], is_query=True)[0]
 
-    # 로컬 인덱스 로드
-    vector_store = FAISS.load_local(index_path, embeddings, allow_dangerous_deserialization=True)
+    # 로컬 인덱스 (프로세스당 한 번 mmap으로 열어 재사용, 워커 간 페이지 공유)
+    vector_store = open_index(index_path)
 
     # 유사도 검색 실행
-    hits = vector_store.similarity_search(query, k=k)
+    if fetch_k:
+        hits = vector_store.max_marginal_relevance_search_by_vector(qvec, k=k, fetch_k=fetch_k)
+    else:
+        hits = vector_store.similarity_search_by_vector(qvec, k=k)
 
     return hits
@@ -0,0 +1,226 @@
+"""
+여러 워커 프로세스가 같은 물리 메모리를 공유하는 읽기 전용 RAG 인덱스.
+
+LangChain FAISS 포맷(index.faiss + index.pkl) 폴더 옆에 공유용 docstore 파일을 만들고,
+- 벡터: index.faiss를 faiss IO_FLAG_MMAP(_IFC)로 매핑 → 페이지를 OS 페이지 캐시에서 공유
+- 문서: docstore.bin(레코드 JSON을 이어 붙인 UTF-8) + docstore.offsets.npy(int64 경계, np.load mmap)
+로 엽니다. 워커 수를 늘려도 인덱스/문서 본문은 파일 매핑 페이지 한 벌만 사용합니다.
+"""
+from __future__ import annotations
+import importlib.util
+import json
+import mmap
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from langchain_core.documents import Document
+
+# faiss는 인덱스를 처음 열 때 import (서버 warm-up에서 기본 인덱스를 열며 미리 로드)
+_HAS_FAISS = importlib.util.find_spec("faiss") is not None
+
+# --- CONFIGS ---
+INDEX_FILE = "index.faiss"
+PICKLE_FILE = "index.pkl"
+DOCSTORE_FILE = "docstore.bin"
+OFFSETS_FILE = "docstore.offsets.npy"
+CACHE_SIZE = int(os.getenv("RAG_INDEX_CACHE_SIZE", "8"))   # 프로세스당 열어 둘 인덱스 수 (매핑 핸들만 보관)
+# 워커 부팅 시 미리 열고 페이지 캐시에 올릴 인덱스 폴더 (쉼표 구분)
+PRELOAD_DIRS = [p for p in os.getenv("RAG_PRELOAD_INDEXES", "data/vector_store/faiss_index").split(",") if p.strip()]
+
+
+def _mmap_flags() -> int:
+    import faiss
+    # IO_FLAG_MMAP_IFC: Flat 계열 코드 배열까지 파일 매핑 (faiss>=1.8). 없으면 IVF 리스트만 매핑되는 IO_FLAG_MMAP
+    flag = getattr(faiss, "IO_FLAG_MMAP_IFC", None) or faiss.IO_FLAG_MMAP
+    return flag | faiss.IO_FLAG_READ_ONLY
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+def export_shared(idx_dir: str, store: Any = None) -> int:
+    """
+    LangChain FAISS 폴더에 공유 docstore 파일을 씁니다 (인덱스 위치 i → 레코드 i).
+    store(FAISS 객체)를 주면 그 docstore를, 없으면 index.pkl을 읽습니다. 임시 파일 → os.replace로 원자적 교체.
+    """
+    if store is not None:
+        docstore, id_map = store.docstore, store.index_to_docstore_id
+    else:
+        with open(os.path.join(idx_dir, PICKLE_FILE), "rb") as f:
+            docstore, id_map = pickle.load(f)   # save_local이 쓴 신뢰된 로컬 파일
+    n = len(id_map)
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    tag = f".{os.getpid()}.{threading.get_ident()}.tmp"
+    bin_path = os.path.join(idx_dir, DOCSTORE_FILE)
+    off_path = os.path.join(idx_dir, OFFSETS_FILE)
+    with open(bin_path + tag, "wb") as w:
+        pos = 0
+        for i in range(n):
+            doc_id = id_map[i]
+            doc = docstore.search(doc_id)
+            rec = {"id": doc_id, "text": getattr(doc, "page_content", str(doc)),
+                   "metadata": getattr(doc, "metadata", {}) or {}}
+            raw = json.dumps(rec, ensure_ascii=False, default=str).encode("utf-8")
+            w.write(raw)
+            pos += len(raw)
+            offsets[i + 1] = pos
+    with open(off_path + tag, "wb") as w:
+        np.save(w, offsets)
+    # offsets를 나중에 교체: 열기 쪽은 offsets mtime으로 최신 여부를 판단
+    os.replace(bin_path + tag, bin_path)
+    os.replace(off_path + tag, off_path)
+    return n
+
+
+def save_shared(store: Any, idx_dir: str) -> str:
+    """
+    FAISS 객체를 idx_dir에 저장하고 공유 docstore까지 씁니다 (rag_index 빌드용).
+    다른 워커가 기존 파일을 매핑 중일 수 있으므로 제자리 덮어쓰기 대신 임시 폴더에 쓴 뒤 파일별 os.replace
+    (기존 매핑은 옛 inode를 계속 보고, 다음 open_index부터 새 파일을 엽니다).
+    """
+    os.makedirs(idx_dir, exist_ok=True)
+    tmp_dir = f"{idx_dir.rstrip(os.sep)}.{os.getpid()}.{threading.get_ident()}.tmp"
+    store.save_local(tmp_dir)
+    export_shared(tmp_dir, store)
+    # index.faiss(버전 기준)를 마지막에 교체
+    for name in (DOCSTORE_FILE, OFFSETS_FILE, PICKLE_FILE, INDEX_FILE):
+        os.replace(os.path.join(tmp_dir, name), os.path.join(idx_dir, name))
+    os.rmdir(tmp_dir)
+    return idx_dir
+
+
+def _needs_export(idx_dir: str) -> bool:
+    off = _mtime(os.path.join(idx_dir, OFFSETS_FILE))
+    return (not os.path.exists(os.path.join(idx_dir, DOCSTORE_FILE))
+            or off < _mtime(os.path.join(idx_dir, PICKLE_FILE)))
+
+
+class SharedIndex:
+    """
+    mmap으로 연 읽기 전용 인덱스. LangChain FAISS의 *_by_vector 검색과 같은 결과(Document 목록)를 돌려줍니다.
+    프로세스 간에 공유되는 것은 파일 매핑 페이지이고, 객체 자체는 워커마다 하나씩입니다.
+    """
+
+    def __init__(self, idx_dir: str):
+        if not _HAS_FAISS:
+            raise RuntimeError("faiss is not installed")
+        self.idx_dir = idx_dir
+        if _needs_export(idx_dir):
+            export_shared(idx_dir)
+        self.version = _mtime(os.path.join(idx_dir, INDEX_FILE))
+        import faiss
+        self.index = faiss.read_index(os.path.join(idx_dir, INDEX_FILE), _mmap_flags())
+        self.offsets = np.load(os.path.join(idx_dir, OFFSETS_FILE), mmap_mode="r")
+        with open(os.path.join(idx_dir, DOCSTORE_FILE), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self._docs = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.warmed_ms: Optional[float] = None
+
+    def __len__(self) -> int:
+        return self.index.ntotal
+
+    def document(self, i: int) -> "Document":
+        from langchain_core.documents import Document
+        rec = json.loads(self._docs[int(self.offsets[i]):int(self.offsets[i + 1])])
+        return Document(page_content=rec["text"], metadata=rec.get("metadata") or {}, id=rec.get("id"))
+
+    def _search(self, vec: List[float], k: int):
+        q = np.asarray([vec], dtype=np.float32)
+        _, ids = self.index.search(q, min(k, self.index.ntotal))
+        return q, [int(i) for i in ids[0] if i >= 0]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4) -> List["Document"]:
+        _, ids = self._search(embedding, k)
+        return [self.document(i) for i in ids]
+
+    def max_marginal_relevance_search_by_vector(self, embedding: List[float], k: int = 4, fetch_k: int = 20,
+                                                lambda_mult: float = 0.5) -> List["Document"]:
+        q, ids = self._search(embedding, fetch_k)
+        if not ids:
+            return []
+        from langchain_community.vectorstores.utils import maximal_marginal_relevance
+        cand = np.stack([self.index.reconstruct(i) for i in ids])
+        picked = maximal_marginal_relevance(q, cand, k=k, lambda_mult=lambda_mult)
+        return [self.document(ids[j]) for j in picked if j >= 0]
+
+    def warm(self) -> float:
+        """인덱스/문서 파일을 페이지 캐시에 올리고(WILLNEED) 전체 스캔 한 번으로 이 프로세스 매핑을 채웁니다."""
+        t0 = time.perf_counter()
+        for name in (INDEX_FILE, DOCSTORE_FILE, OFFSETS_FILE):
+            try:
+                fd = os.open(os.path.join(self.idx_dir, name), os.O_RDONLY)
+                try:
+                    if hasattr(os, "posix_fadvise"):
+                        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+                finally:
+                    os.close(fd)
+            except OSError:
+                pass
+        if self.index.ntotal:
+            self._search([0.0] * self.index.d, 1)
+        self.warmed_ms = round((time.perf_counter() - t0) * 1000, 1)
+        return self.warmed_ms
+
+
+class _IndexCache:
+    """폴더 → SharedIndex (LRU). index.faiss가 다시 쓰이면(재인덱싱) 새로 엽니다."""
+
+    def __init__(self, max_items: int = CACHE_SIZE):
+        self.max_items = max_items
+        self._items: "OrderedDict[str, SharedIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.opens = 0
+
+    def get(self, idx_dir: str) -> SharedIndex:
+        key = os.path.realpath(idx_dir)
+        with self._lock:
+            cur = self._items.get(key)
+            if cur is not None and cur.version == _mtime(os.path.join(key, INDEX_FILE)) and not _needs_export(key):
+                self._items.move_to_end(key)
+                self.hits += 1
+                return cur
+            idx = SharedIndex(key)
+            self.opens += 1
+            self._items[key] = idx
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+            return idx
+
+    def preload(self, dirs: List[str] = PRELOAD_DIRS) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for d in dirs:
+            d = d.strip()
+            if not os.path.exists(os.path.join(d, INDEX_FILE)):
+                continue
+            try:
+                idx = self.get(d)
+                out[d] = {"vectors": len(idx), "warm_ms": idx.warm()}
+            except Exception as e:
+                print(f"[RAG] preload failed for {d}: {e}")
+                out[d] = {"error": str(e)}
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"pid": os.getpid(), "hits": self.hits, "opens": self.opens,
+                    "indexes": {k: {"vectors": len(v), "warm_ms": v.warmed_ms} for k, v in self._items.items()}}
+
+
+INDEXES = _IndexCache()
+
+
+def open_index(idx_dir: str) -> SharedIndex:
+    return INDEXES.get(idx_dir)
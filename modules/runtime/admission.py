@@ -0,0 +1,223 @@
+from __future__ import annotations
+import asyncio
+import contextvars
+import heapq
+import itertools
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from ..observability.metrics import REGISTRY, record_stage
+
+# --- CONFIGS ---
+# 우선순위 클래스 (숫자가 작을수록 먼저). 라우트는 ROUTE_POLICY의 "class"로 지정.
+PRIORITIES = {"interactive": 0, "analysis": 1, "bulk": 2}
+ADMISSION_CAPACITY = int(os.getenv("ADMISSION_CAPACITY", "64"))          # 업스트림 동시 호출 총량
+ADMISSION_CLIENT_LIMIT = int(os.getenv("ADMISSION_CLIENT_LIMIT", "16"))  # 클라이언트당 동시 호출
+CLIENT_ID_HEADER = "X-Client-ID"   # 없으면 접속 IP
+
+
+@dataclass
+class ClassPolicy:
+    share: float          # 총량 중 이 클래스가 동시에 쓸 수 있는 비율 (남는 몫은 상위 클래스 전용)
+    max_queue: int        # 대기열 상한. 넘으면 즉시 429
+    queue_timeout: float  # 대기 마감(초). 넘으면 429
+
+
+def _env_class(name: str, share: float, max_queue: int, queue_timeout: float) -> ClassPolicy:
+    p = f"ADMISSION_{name.upper()}_"
+    return ClassPolicy(float(os.getenv(p + "SHARE", share)), int(os.getenv(p + "MAX_QUEUE", max_queue)),
+                       float(os.getenv(p + "QUEUE_TIMEOUT", queue_timeout)))
+
+
+DEFAULT_CLASSES: Dict[str, ClassPolicy] = {
+    "interactive": _env_class("interactive", 1.0, 256, 5.0),
+    "analysis": _env_class("analysis", 0.75, 128, 15.0),
+    "bulk": _env_class("bulk", 0.25, 16, 30.0),
+}
+
+ADMISSION_EVENTS = REGISTRY.counter("agent_admission_total", "Admission decisions by route and outcome",
+                                    ("route", "outcome"))
+ADMISSION_WAIT = REGISTRY.histogram("agent_admission_wait_seconds", "Time spent queued before admission",
+                                    ("class",))
+
+_CLIENT: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("admission_client", default=None)
+
+
+class AdmissionRejected(Exception):
+    """포화(대기열 가득/대기 마감 초과). 호출 측은 429 + Retry-After로 변환합니다."""
+
+    def __init__(self, route: str, reason: str, retry_after: float):
+        super().__init__(f"{route}: {reason}")
+        self.route = route
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "cls", "route", "client", "limit", "future")
+
+    def __init__(self, priority: int, seq: int, cls: str, route: str, client: str, limit: Optional[int]):
+        self.priority, self.seq, self.cls, self.route, self.client, self.limit = priority, seq, cls, route, client, limit
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class AdmissionController:
+    """
+    게이트웨이 앞단 스케줄러: 총량/클래스 몫/라우트별/클라이언트별 동시 실행 한도 + 우선순위 대기열.
+    - 자리가 나면 (우선순위, 도착순)으로 깨웁니다. 라우트/클라이언트 한도에 막힌 요청은 건너뛰어 뒤 요청을 막지 않음.
+    - 하위 클래스는 총량의 share까지만 쓰므로 bulk가 몰려도 interactive 몫이 남습니다.
+    - 대기열이 가득 차거나 queue_timeout 안에 못 들어가면 AdmissionRejected(retry_after 포함).
+    단일 이벤트 루프(게이트웨이 프로세스)에서 사용합니다.
+    """
+
+    def __init__(self, capacity: int = ADMISSION_CAPACITY, classes: Optional[Dict[str, ClassPolicy]] = None,
+                 client_limit: int = ADMISSION_CLIENT_LIMIT):
+        self.capacity = capacity
+        self.classes = classes or DEFAULT_CLASSES
+        self.client_limit = client_limit
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+        self.inflight = 0
+        self.by_class: Dict[str, int] = {c: 0 for c in self.classes}
+        self.by_route: Dict[str, int] = {}
+        self.by_client: Dict[str, int] = {}
+        self.queued: Dict[str, int] = {c: 0 for c in self.classes}
+        self._hold_s: Dict[str, float] = {}   # 라우트별 점유 시간 EWMA (Retry-After 추정)
+        REGISTRY.register_collector(self._metrics)
+
+    def _class_cap(self, cls: str) -> int:
+        return max(1, int(self.capacity * self.classes[cls].share))
+
+    def _fits(self, cls: str, route: str, client: str, limit: Optional[int]) -> bool:
+        if self.inflight >= self.capacity or self.by_class[cls] >= self._class_cap(cls):
+            return False
+        if limit is not None and self.by_route.get(route, 0) >= limit:
+            return False
+        return self.by_client.get(client, 0) < self.client_limit
+
+    def _take(self, cls: str, route: str, client: str):
+        self.inflight += 1
+        self.by_class[cls] += 1
+        self.by_route[route] = self.by_route.get(route, 0) + 1
+        self.by_client[client] = self.by_client.get(client, 0) + 1
+
+    def _give(self, cls: str, route: str, client: str):
+        self.inflight -= 1
+        self.by_class[cls] -= 1
+        self.by_route[route] -= 1
+        self.by_client[client] -= 1
+        if not self.by_client[client]:
+            del self.by_client[client]
+
+    def _dispatch(self):
+        """
+        대기자를 (우선순위, 도착순)으로 훑어 들어갈 수 있는 만큼 깨웁니다.
+        클래스 몫/라우트/클라이언트 한도에 막힌 대기자는 건너뛰고(뒤 요청을 막지 않음), 총량이 차면 멈춥니다.
+        """
+        keep: List[_Waiter] = []
+        for w in sorted(self._queue):
+            if w.future.done():
+                continue
+            if self._fits(w.cls, w.route, w.client, w.limit):
+                self._take(w.cls, w.route, w.client)
+                self.queued[w.cls] -= 1
+                w.future.set_result(True)
+            else:
+                keep.append(w)
+        self._queue = keep
+        heapq.heapify(self._queue)
+
+    def retry_after(self, route: str, cls: str) -> float:
+        """대기 중인 같은 클래스 요청 수 × 평균 점유 시간 / 클래스 몫으로 대략 추정 (최소 1초)."""
+        hold = self._hold_s.get(route, 1.0)
+        return max(1.0, math.ceil(hold * (self.queued[cls] + 1) / self._class_cap(cls)))
+
+    @asynccontextmanager
+    async def slot(self, route: str, cls: str = "interactive", limit: Optional[int] = None,
+                   client: Optional[str] = None, queue_timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """async with ADMISSION.slot("chat", "interactive"): ... — 자리를 얻을 때까지 대기, 실패 시 AdmissionRejected."""
+        client = client or _CLIENT.get() or "anonymous"
+        policy = self.classes[cls]
+        t0 = time.perf_counter()
+        # 같거나 높은 우선순위 대기자가 있으면 새치기하지 않고 대기열을 거침 (_dispatch가 바로 들여보낼 수 있음)
+        if self._fits(cls, route, client, limit) and not any(
+                w.priority <= PRIORITIES[cls] and not w.future.done() for w in self._queue):
+            self._take(cls, route, client)
+            ADMISSION_EVENTS.inc(route=route, outcome="admitted")
+        else:
+            if self.queued[cls] >= policy.max_queue:
+                ADMISSION_EVENTS.inc(route=route, outcome="rejected_queue_full")
+                raise AdmissionRejected(route, "queue full", self.retry_after(route, cls))
+            w = _Waiter(PRIORITIES[cls], next(self._seq), cls, route, client, limit)
+            heapq.heappush(self._queue, w)
+            self.queued[cls] += 1
+            self._dispatch()
+            try:
+                await asyncio.wait_for(asyncio.shield(w.future), timeout=queue_timeout or policy.queue_timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                if w.future.done() and not w.future.cancelled():
+                    # 마감과 동시에 자리를 받았으면 돌려주고 다음 대기자에게
+                    self._give(cls, route, client)
+                else:
+                    w.future.cancel()
+                    self.queued[cls] -= 1
+                self._dispatch()
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                ADMISSION_EVENTS.inc(route=route, outcome="rejected_timeout")
+                raise AdmissionRejected(route, "queue timeout", self.retry_after(route, cls))
+            ADMISSION_EVENTS.inc(route=route, outcome="queued")
+        waited = time.perf_counter() - t0
+        ADMISSION_WAIT.observe(waited, **{"class": cls})
+        if waited > 0.001:
+            record_stage("admission_wait", waited * 1000)
+        t_hold = time.perf_counter()
+        try:
+            yield
+        finally:
+            held = time.perf_counter() - t_hold
+            self._hold_s[route] = 0.8 * self._hold_s.get(route, held) + 0.2 * held
+            self._give(cls, route, client)
+            self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"capacity": self.capacity, "client_limit": self.client_limit, "inflight": self.inflight,
+                "inflight_by_class": dict(self.by_class), "queued_by_class": dict(self.queued),
+                "inflight_by_route": {k: v for k, v in self.by_route.items() if v},
+                "class_caps": {c: self._class_cap(c) for c in self.classes},
+                "clients": len(self.by_client)}
+
+    def _metrics(self) -> List[str]:
+        lines = ["# TYPE agent_admission_queue_depth gauge"]
+        lines += [f'agent_admission_queue_depth{{class="{c}"}} {n}' for c, n in self.queued.items()]
+        lines.append("# TYPE agent_admission_inflight gauge")
+        lines += [f'agent_admission_inflight{{class="{c}"}} {n}' for c, n in self.by_class.items()]
+        return lines
+
+
+class ClientIdMiddleware:
+    """요청의 클라이언트 식별자(X-Client-ID 헤더, 없으면 접속 IP)를 컨텍스트에 기록 (클라이언트별 한도용)."""
+
+    def __init__(self, app):
+        self.app = app
+        self._header = CLIENT_ID_HEADER.lower().encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        client = next((v.decode("latin-1") for k, v in scope.get("headers") or [] if k == self._header), None)
+        if not client and scope.get("client"):
+            client = scope["client"][0]
+        token = _CLIENT.set(client)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _CLIENT.reset(token)
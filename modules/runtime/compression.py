@@ -0,0 +1,320 @@
+from __future__ import annotations
+import gzip
+import io
+import os
+import time
+import zlib
+from typing import List, Optional, Tuple
+
+from ..observability.metrics import REGISTRY, record_stage
+
+try:
+    import zstandard
+    _HAS_ZSTD = True
+except ImportError:
+    zstandard = None
+    _HAS_ZSTD = False
+
+# --- CONFIGS ---
+COMPRESS_MIN_BYTES = int(os.getenv("HTTP_COMPRESS_MIN_BYTES", "1024"))   # 이보다 작은 본문은 그대로
+GZIP_LEVEL = int(os.getenv("HTTP_GZIP_LEVEL", "5"))
+ZSTD_LEVEL = int(os.getenv("HTTP_ZSTD_LEVEL", "3"))
+# 압축 해제한 요청 본문 상한 (압축 폭탄 방지). 넘으면 413
+MAX_DECOMPRESSED_BYTES = int(os.getenv("HTTP_MAX_DECOMPRESSED_BYTES", str(1024 ** 3)))
+DECOMPRESS_CHUNK = 1024 ** 2
+# 선호 순서. zstd는 zstandard가 설치된 경우에만 제공합니다.
+SUPPORTED_ENCODINGS: Tuple[str, ...] = ("zstd", "gzip") if _HAS_ZSTD else ("gzip",)
+# 이미 압축된 형식과 SSE(청크마다 즉시 전달해야 함)는 건드리지 않음
+SKIP_CONTENT_TYPES = ("text/event-stream", "image/", "video/", "audio/", "application/zip", "application/gzip",
+                      "application/pdf")
+
+COMPRESSION_BYTES = REGISTRY.counter("agent_http_compression_bytes_total",
+                                     "Body bytes before (raw) and after (wire) compression",
+                                     ("direction", "encoding", "kind"))
+
+
+class DecompressedTooLarge(ValueError):
+    """압축 해제 결과가 상한을 넘음 (→ 413)."""
+
+    def __init__(self, limit: int):
+        super().__init__(f"decompressed body exceeds {limit} bytes")
+        self.limit = limit
+
+
+def choose_encoding(accept_encoding: Optional[str], supported: Tuple[str, ...] = SUPPORTED_ENCODINGS) -> Optional[str]:
+    """Accept-Encoding(q 값 포함)을 해석해 supported 중 가장 선호되는 인코딩을 고릅니다."""
+    if not accept_encoding:
+        return None
+    q = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        weight = 1.0
+        for p in params.split(";"):
+            k, _, v = p.strip().partition("=")
+            if k == "q":
+                try:
+                    weight = float(v)
+                except ValueError:
+                    weight = 0.0
+        q[name.strip().lower()] = weight
+    best = None
+    for enc in supported:
+        w = q.get(enc, q.get("*", 0.0))
+        if w > 0 and (best is None or w > best[1]):
+            best = (enc, w)
+    return best[0] if best else None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError(f"unsupported encoding: {encoding}")
+
+
+def decompress(data: bytes, encoding: str, max_size: int = MAX_DECOMPRESSED_BYTES) -> bytes:
+    """
+    DECOMPRESS_CHUNK 단위로 조금씩 풀며 결과가 max_size를 넘는 순간 DecompressedTooLarge를 냅니다
+    (작은 본문이 수 GB로 풀리는 압축 폭탄이 메모리를 다 쓰지 않도록).
+    """
+    if encoding == "zstd" and _HAS_ZSTD:
+        # content size가 프레임에 없을 수 있으므로 스트리밍 디코더 사용
+        with zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data)) as reader:
+            return _bounded(iter(lambda: reader.read(DECOMPRESS_CHUNK), b""), max_size)
+    if encoding in ("gzip", "x-gzip"):
+        return _bounded(_inflate(data, 16 + zlib.MAX_WBITS, members=True), max_size)
+    if encoding == "deflate":
+        return _bounded(_inflate(data, zlib.MAX_WBITS, members=False), max_size)
+    raise ValueError(f"unsupported encoding: {encoding}")
+
+
+def _inflate(data: bytes, wbits: int, members: bool):
+    """zlib/gzip 스트림을 max_length로 잘라 가며 푸는 제너레이터. gzip은 여러 멤버를 이어 붙인 본문도 처리."""
+    while data:
+        d = zlib.decompressobj(wbits)
+        buf = data
+        while not d.eof:
+            chunk = d.decompress(buf, DECOMPRESS_CHUNK)
+            if not chunk and len(d.unconsumed_tail) == len(buf):
+                raise zlib.error("incomplete or truncated stream")
+            buf = d.unconsumed_tail
+            if chunk:
+                yield chunk
+        data = d.unused_data if members else b""
+        if not data.strip(b"\x00"):   # gzip.decompress처럼 끝의 0 패딩은 무시
+            break
+
+
+def _bounded(chunks, max_size: int) -> bytes:
+    out: List[bytes] = []
+    total = 0
+    for chunk in chunks:
+        total += len(chunk)
+        if total > max_size:
+            raise DecompressedTooLarge(max_size)
+        out.append(chunk)
+    return b"".join(out)
+
+
+class _StreamCompressor:
+    """청크 단위 압축 (스트리밍 응답용). 각 청크 뒤에 flush해 수신 측이 바로 풀 수 있게 합니다."""
+
+    def __init__(self, encoding: str):
+        if encoding == "zstd":
+            self._c = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+            self._flush_mode = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        else:
+            self._c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._flush_mode = zlib.Z_SYNC_FLUSH
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._c.compress(data) + self._c.flush(self._flush_mode)
+
+    def finish(self) -> bytes:
+        return self._c.flush()
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[str]:
+    for k, v in headers:
+        if k.lower() == name:
+            return v.decode("latin-1")
+    return None
+
+
+def _without(headers: List[Tuple[bytes, bytes]], *names: bytes) -> List[Tuple[bytes, bytes]]:
+    return [(k, v) for k, v in headers if k.lower() not in names]
+
+
+def _append_timing(headers: List[Tuple[bytes, bytes]], name: str, ms: float) -> List[Tuple[bytes, bytes]]:
+    """Server-Timing에 압축/해제 시간을 덧붙입니다 (이 미들웨어는 계측 미들웨어 바깥에서 돌기 때문)."""
+    entry = f"{name};dur={ms:.1f}"
+    cur = _header(headers, b"server-timing")
+    value = f"{cur}, {entry}" if cur else entry
+    return _without(headers, b"server-timing") + [(b"server-timing", value.encode("latin-1"))]
+
+
+class CompressionMiddleware:
+    """
+    요청/응답 본문 압축을 협상하는 ASGI 미들웨어 (서비스 공용).
+    - 요청: Content-Encoding(zstd/gzip)이 붙은 본문은 앱에 넘기기 전에 풀어 줍니다 (max_decompressed 초과 시 413).
+    - 응답: Accept-Encoding에 맞춰 minimum_size 이상인 본문을 압축합니다. SSE/이미 압축된 형식은 제외.
+    - 모든 응답에 Accept-Encoding(RFC 7694)으로 받을 수 있는 요청 인코딩을 알려,
+      게이트웨이가 지원이 확인된 서버에만 압축된 요청을 보내도록 합니다.
+    압축/해제 시간은 Server-Timing(compress, decompress)과 agent_stage_duration_seconds에 기록됩니다.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES,
+                 max_decompressed: int = MAX_DECOMPRESSED_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.max_decompressed = max_decompressed
+        self._advertise = (b"accept-encoding", ", ".join(SUPPORTED_ENCODINGS).encode("latin-1"))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        req_headers = list(scope.get("headers") or [])
+        timings: List[Tuple[str, float]] = []
+        req_enc = (_header(req_headers, b"content-encoding") or "").strip().lower()
+        if req_enc and req_enc != "identity":
+            parts: List[bytes] = []
+            more = True
+            while more:
+                msg = await receive()
+                parts.append(msg.get("body", b""))
+                more = msg.get("more_body", False)
+            body = b"".join(parts)
+            t0 = time.perf_counter()
+            try:
+                raw = decompress(body, req_enc, self.max_decompressed)
+            except DecompressedTooLarge as e:
+                await _plain(send, 413, f"request body too large: {e}", [self._advertise])
+                return
+            except Exception as e:
+                await _plain(send, 415 if "unsupported" in str(e) else 400, f"request body decode failed: {e}",
+                             [self._advertise])
+                return
+            ms = (time.perf_counter() - t0) * 1000
+            record_stage("decompress", ms)
+            timings.append(("decompress", ms))
+            COMPRESSION_BYTES.inc(len(body), direction="request", encoding=req_enc, kind="wire")
+            COMPRESSION_BYTES.inc(len(raw), direction="request", encoding=req_enc, kind="raw")
+            scope = dict(scope)
+            scope["headers"] = _without(req_headers, b"content-encoding", b"content-length") + [
+                (b"content-length", str(len(raw)).encode("latin-1"))]
+            receive = _replay(raw, receive)
+
+        encoding = choose_encoding(_header(req_headers, b"accept-encoding"))
+        await self.app(scope, receive, _Responder(send, encoding, self.minimum_size, timings, self._advertise))
+
+
+class _Responder:
+    def __init__(self, send, encoding: Optional[str], minimum_size: int, timings: List[Tuple[str, float]],
+                 advertise: Tuple[bytes, bytes]):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.timings = timings
+        self.advertise = advertise
+        self.start = None
+        self.passthrough = False
+        self.sized = False
+        self.buffer: List[bytes] = []
+        self.streamer: Optional[_StreamCompressor] = None
+        self.raw_bytes = 0
+        self.wire_bytes = 0
+
+    def _headers(self, headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+        headers = _without(headers, b"accept-encoding") + [self.advertise]
+        for name, ms in self.timings:
+            headers = _append_timing(headers, name, ms)
+        return headers
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            headers = list(message.get("headers") or [])
+            ctype = (_header(headers, b"content-type") or "").lower()
+            length = _header(headers, b"content-length")
+            self.sized = length is not None
+            self.passthrough = (self.encoding is None or _header(headers, b"content-encoding") is not None
+                                or any(ctype.startswith(t) for t in SKIP_CONTENT_TYPES)
+                                or (self.sized and int(length) < self.minimum_size))
+            self.start = {**message, "headers": self._headers(headers)}
+            if self.passthrough:
+                await self.send(self.start)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more = message.get("more_body", False)
+        if self.sized:
+            # 크기가 정해진 응답: (BaseHTTPMiddleware를 거치며 여러 조각으로 와도) 모아서 한 번에 압축
+            self.buffer.append(body)
+            if not more:
+                await self._single(b"".join(self.buffer))
+            return
+
+        headers = self.start["headers"]
+        if self.streamer is None:
+            self.streamer = _StreamCompressor(self.encoding)
+            headers = _without(headers, b"content-length") + [
+                (b"content-encoding", self.encoding.encode("latin-1")), (b"vary", b"Accept-Encoding")]
+            await self.send({**self.start, "headers": headers})
+        self.raw_bytes += len(body)
+        out = self.streamer.chunk(body) if body else b""
+        if not more:
+            out += self.streamer.finish()
+            self._count()
+        self.wire_bytes += len(out)
+        await self.send({"type": "http.response.body", "body": out, "more_body": more})
+
+    async def _single(self, body: bytes):
+        headers = self.start["headers"]
+        if len(body) < self.minimum_size:
+            await self.send(self.start)
+            await self.send({"type": "http.response.body", "body": body})
+            return
+        t0 = time.perf_counter()
+        out = compress(body, self.encoding)
+        ms = (time.perf_counter() - t0) * 1000
+        record_stage("compress", ms)
+        self.raw_bytes, self.wire_bytes = len(body), len(out)
+        self._count()
+        headers = _append_timing(_without(headers, b"content-length"), "compress", ms) + [
+            (b"content-encoding", self.encoding.encode("latin-1")),
+            (b"content-length", str(len(out)).encode("latin-1")),
+            (b"vary", b"Accept-Encoding"),
+        ]
+        await self.send({**self.start, "headers": headers})
+        await self.send({"type": "http.response.body", "body": out})
+
+    def _count(self):
+        COMPRESSION_BYTES.inc(self.raw_bytes, direction="response", encoding=self.encoding, kind="raw")
+        COMPRESSION_BYTES.inc(self.wire_bytes, direction="response", encoding=self.encoding, kind="wire")
+
+
+def _replay(body: bytes, receive):
+    sent = False
+
+    async def _receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()   # http.disconnect 등은 원래 채널에서
+
+    return _receive
+
+
+async def _plain(send, status: int, text: str, extra_headers: List[Tuple[bytes, bytes]]):
+    body = text.encode("utf-8")
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"text/plain; charset=utf-8"),
+                            (b"content-length", str(len(body)).encode("latin-1"))] + extra_headers})
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+import httpx
+
+# 서비스 간 HTTP 호출의 공용 재시도 기준 (게이트웨이 Upstream, MCP 클라이언트).
+# 업스트림이 요청을 처리하지 않았다고 볼 수 있는 경우만 재시도: 응답 헤더 수신 전 연결 단계 오류와 502/503.
+# ReadTimeout/504는 업스트림이 계산 중이거나 이미 끝냈을 수 있으므로 재시도하지 않음 (무거운 툴 중복 실행 방지)
+RETRY_STATUSES = {502, 503}
+RETRY_TRANSPORT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+
+
+def retryable_error(e: BaseException, response_started: bool) -> bool:
+    """전송 오류 e를 재시도해도 되는지 (response_started: 응답 헤더를 이미 받았는지)."""
+    return not response_started and isinstance(e, RETRY_TRANSPORT_ERRORS)
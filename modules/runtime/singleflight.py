@@ -0,0 +1,107 @@
+from __future__ import annotations
+import asyncio
+import hashlib
+import json
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+from ..observability.metrics import REGISTRY
+
+T = TypeVar("T")
+
+SINGLEFLIGHT_CALLS = REGISTRY.counter("agent_singleflight_calls_total",
+                                      "Single-flight calls by group and role (leader ran it, coalesced waited)",
+                                      ("group", "role"))
+SINGLEFLIGHT_IN_FLIGHT = REGISTRY.gauge("agent_singleflight_in_flight", "Distinct computations in flight", ("group",))
+
+
+def canonical_key(*parts: Any) -> str:
+    """요청 본문 등을 정렬된 JSON으로 직렬화해 sha1. 키 순서/공백이 달라도 같은 키."""
+    h = hashlib.sha1()
+    for p in parts:
+        if isinstance(p, (bytes, bytearray)):
+            h.update(hashlib.sha1(p).digest())
+        else:
+            h.update(json.dumps(p, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class _Call:
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    스레드용 single-flight: 같은 key의 계산이 진행 중이면 새로 시작하지 않고 그 결과를 기다려 공유합니다.
+    결과는 저장하지 않습니다 (끝나면 key 해제) — 캐시는 호출 측 책임.
+    """
+
+    def __init__(self, group: str):
+        self.group = group
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> Tuple[T, bool]:
+        """(값, 공유 여부) 반환. 리더의 예외는 대기자에게도 그대로 전파됩니다."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            SINGLEFLIGHT_CALLS.inc(group=self.group, role="coalesced")
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        SINGLEFLIGHT_CALLS.inc(group=self.group, role="leader")
+        SINGLEFLIGHT_IN_FLIGHT.inc(group=self.group)
+        try:
+            call.value = fn()
+            return call.value, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            SINGLEFLIGHT_IN_FLIGHT.dec(group=self.group)
+            call.event.set()
+
+
+class AsyncSingleFlight:
+    """
+    asyncio용 single-flight. 계산은 별도 Task로 돌리고 모두 shield로 기다리므로,
+    먼저 온 요청(리더)의 클라이언트가 끊겨도 나머지 대기자의 계산은 취소되지 않습니다.
+    """
+
+    def __init__(self, group: str):
+        self.group = group
+        self._tasks: Dict[Hashable, "asyncio.Task[Any]"] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        task = self._tasks.get(key)
+        shared = task is not None
+        if shared:
+            SINGLEFLIGHT_CALLS.inc(group=self.group, role="coalesced")
+        else:
+            SINGLEFLIGHT_CALLS.inc(group=self.group, role="leader")
+            SINGLEFLIGHT_IN_FLIGHT.inc(group=self.group)
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda t, k=key: self._done(k, t))
+        return await asyncio.shield(task), shared
+
+    def _done(self, key: Hashable, task: "asyncio.Task[Any]"):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        SINGLEFLIGHT_IN_FLIGHT.dec(group=self.group)
+        if not task.cancelled():
+            task.exception()  # 대기자가 모두 떠난 경우 "never retrieved" 경고 방지
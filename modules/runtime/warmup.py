@@ -0,0 +1,87 @@
+from __future__ import annotations
+import asyncio
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..observability.metrics import REGISTRY, record_stage
+
+# --- CONFIGS ---
+# 0이면 warm-up 없이 바로 ready (무거운 의존성은 첫 요청에서 lazy import)
+WARMUP_ENABLED = os.getenv("SERVICE_WARMUP", "1").lower() not in ("0", "false", "no")
+
+
+class Warmup:
+    """
+    서비스 기동 직후 백그라운드에서 실행하는 초기화 단계 묶음 (기본 인덱스 로드, 모델 클라이언트 생성, 무거운 import 등).
+    /health(liveness)는 프로세스가 뜨면 바로 200, /ready(readiness)는 모든 단계가 끝난 뒤 200 (그 전에는 503).
+    단계 실패는 ready를 막지 않고 status()에 기록합니다 (해당 기능은 첫 요청에서 다시 시도).
+    """
+
+    def __init__(self, service: str):
+        self.service = service
+        self.steps: List[Tuple[str, Callable[[], Any]]] = []
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.ready = False
+        self.started_at = time.time()
+        self.ready_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        REGISTRY.register_collector(self._metrics)
+
+    def step(self, name: str):
+        """@WARMUP.step("rag_index") — 등록 순서대로 스레드에서 실행됩니다."""
+        def deco(fn: Callable[[], Any]):
+            self.steps.append((name, fn))
+            return fn
+        return deco
+
+    async def run(self):
+        for name, fn in self.steps:
+            t0 = time.perf_counter()
+            try:
+                detail = await asyncio.to_thread(fn)
+                self.results[name] = {"ok": True, "detail": detail}
+            except Exception as e:
+                print(f"[WARMUP] {self.service}.{name} failed: {e}")
+                self.results[name] = {"ok": False, "error": str(e)}
+            ms = (time.perf_counter() - t0) * 1000
+            self.results[name]["ms"] = round(ms, 1)
+            record_stage(f"warmup.{name}", ms)
+        self._mark_ready()
+        print(f"[WARMUP] {self.service} ready in {self.status()['startup_ms']} ms (pid={os.getpid()})")
+
+    def start(self):
+        """lifespan 시작 시 호출. 이벤트 루프를 막지 않고 백그라운드로 단계들을 실행합니다."""
+        if not WARMUP_ENABLED or not self.steps:
+            self._mark_ready()
+            return
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+    def _mark_ready(self):
+        self.ready = True
+        self.ready_at = time.time()
+
+    def status(self) -> Dict[str, Any]:
+        elapsed = (self.ready_at or time.time()) - self.started_at
+        return {"ready": self.ready, "service": self.service, "pid": os.getpid(),
+                "startup_ms": round(elapsed * 1000, 1), "steps": dict(self.results),
+                "pending": [n for n, _ in self.steps if n not in self.results]}
+
+    def install(self, app):
+        """GET /ready 등록: 준비되면 200, 아니면 503 (본문은 둘 다 status())."""
+        from starlette.responses import JSONResponse
+
+        @app.get("/ready")
+        def ready():
+            return JSONResponse(self.status(), status_code=200 if self.ready else 503)
+
+    def _metrics(self) -> List[str]:
+        return ["# TYPE agent_ready gauge", f'agent_ready{{service="{self.service}"}} {int(self.ready)}']
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+from modules.processing.anomaly import StreamingDetector, detect_anomalies
+
+
+def _frame() -> pd.DataFrame:
+    n = 40
+    tags = np.array(["A"] * n + [None] * n + ["B"] * n, dtype=object)
+    values = np.r_[np.full(n, 10.0), np.full(n, 500.0), np.full(n, 20.0)]
+    values[n + 5] = 5000.0   # 결측 TAG 그룹 안에서만 튀는 값
+    values[5] = 100.0
+    return pd.DataFrame({"TAG": tags, "STD_DT": pd.date_range("2024-01-01", periods=3 * n, freq="min"),
+                         "V": values})
+
+
+def test_missing_tag_forms_its_own_group():
+    out = detect_anomalies(_frame(), methods=("zscore", "robust_z", "iqr"))
+    assert out["tags"] == ["<NA>", "A", "B"]
+    for method in ("robust_z", "iqr"):
+        assert out["summary"][method]["by_tag"] == {"<NA>": 1, "A": 1}
+        assert out["anomalies"]["<NA>"][method]["V"]["ranges"] == [[45, 45]]
+        assert out["anomalies"]["A"][method]["V"]["ranges"] == [[5, 5]]
+
+
+def test_streaming_split_keeps_missing_tag_rows_separate():
+    parts = StreamingDetector()._split(_frame())
+    assert sorted(parts) == ["<NA>", "A", "B"]
+    assert sorted(parts["<NA>"].tolist()) == list(range(40, 80))
+    assert sorted(parts["B"].tolist()) == list(range(80, 120))
+
+
+def test_missing_tag_group_for_category_and_string_dtypes():
+    for dtype in ("category", "string", object):
+        df = _frame()
+        df["TAG"] = df["TAG"].astype(dtype)
+        assert detect_anomalies(df, methods=("iqr",))["tags"] == ["<NA>", "A", "B"], dtype
@@ -0,0 +1,65 @@
+import asyncio
+import gzip
+import zlib
+
+import httpx
+import pytest
+
+from modules.runtime import compression
+from modules.runtime.compression import CompressionMiddleware, DecompressedTooLarge, compress, decompress
+
+
+async def _echo_length(scope, receive, send):
+    body = b""
+    more = True
+    while more:
+        msg = await receive()
+        body += msg.get("body", b"")
+        more = msg.get("more_body", False)
+    text = str(len(body)).encode()
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"content-type", b"text/plain"), (b"content-length", str(len(text)).encode())]})
+    await send({"type": "http.response.body", "body": text})
+
+
+def _post(body: bytes, encoding: str, **options) -> httpx.Response:
+    async def run():
+        transport = httpx.ASGITransport(app=CompressionMiddleware(_echo_length, **options))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/", content=body, headers={"Content-Encoding": encoding})
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("encoding", compression.SUPPORTED_ENCODINGS)
+def test_round_trip(encoding):
+    raw = b"TAG,STD_DT,VALUE\n" * 10_000
+    assert decompress(compress(raw, encoding), encoding) == raw
+
+
+def test_gzip_multiple_members_and_deflate():
+    assert decompress(gzip.compress(b"a" * 10) + gzip.compress(b"b" * 10), "gzip") == b"a" * 10 + b"b" * 10
+    assert decompress(zlib.compress(b"c" * 100), "deflate") == b"c" * 100
+
+
+@pytest.mark.parametrize("encoding", compression.SUPPORTED_ENCODINGS)
+def test_limit_is_enforced_while_decompressing(encoding):
+    bomb = compress(b"\0" * (8 * 1024 ** 2), encoding)
+    assert len(bomb) < 64 * 1024
+    with pytest.raises(DecompressedTooLarge):
+        decompress(bomb, encoding, max_size=1024 ** 2)
+
+
+def test_truncated_gzip_is_rejected():
+    with pytest.raises(zlib.error):
+        decompress(gzip.compress(b"x" * 10_000)[:-20], "gzip")
+
+
+def test_middleware_returns_413_for_decompression_bomb():
+    r = _post(gzip.compress(b"\0" * (8 * 1024 ** 2)), "gzip", max_decompressed=1024 ** 2)
+    assert r.status_code == 413
+
+
+def test_middleware_passes_decompressed_body():
+    r = _post(gzip.compress(b"x" * 5000), "gzip")
+    assert r.status_code == 200
+    assert r.text == "5000"
@@ -0,0 +1,31 @@
+from typing import List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel
+from starlette.datastructures import QueryParams
+
+from modules.mcp.servers.data_tools_server import _is_list_type, _query_params
+
+
+class _Params(BaseModel):
+    columns: Optional[List[str]] = None
+    tags: Optional[list[str]] = None
+    methods: Sequence[str] = ("zscore",)
+    pair: Optional[Tuple[str, ...]] = None
+    start: Optional[str] = None
+    max_points: int = 10
+
+
+def test_list_annotations_are_detected_without_string_matching():
+    assert _is_list_type(Optional[List[str]])
+    assert _is_list_type(list[str] | None)
+    assert _is_list_type(Sequence[str])
+    assert not _is_list_type(Optional[str])
+    assert not _is_list_type(int)
+
+
+def test_repeated_query_keys_build_lists():
+    q = QueryParams("columns=A&columns=B&tags=T1&methods=iqr&methods=zscore&pair=x&start=s1&start=s2&max_points=5")
+    out = _query_params(_Params, q)
+    assert out == {"columns": ["A", "B"], "tags": ["T1"], "methods": ["iqr", "zscore"], "pair": ["x"],
+                   "start": "s2", "max_points": "5"}
+    assert _Params(**out).methods == ["iqr", "zscore"]
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from modules.processing.dataset_store import Dataset, DatasetStore
+
+
+def _dataset(dataset_id: str, rows: int = 1000) -> Dataset:
+    df = pd.DataFrame({"A": np.arange(rows, dtype=np.float64), "B": np.arange(rows, dtype=np.int64)})
+    return Dataset(dataset_id, df, {"memory_after": int(df.memory_usage(deep=True).sum())})
+
+
+def test_memoized_results_count_toward_nbytes():
+    ds = _dataset("a")
+    base = ds.nbytes
+    ds.memo(("arrow",), lambda: b"x" * 50_000)
+    ds.memo(("downsample",), lambda: {"x": list(range(5000)), "y": np.zeros(5000)})
+    assert ds.nbytes >= base + 50_000 + 5000 * 8
+
+
+def test_fingerprint_hashes_count_toward_nbytes():
+    ds = _dataset("a")
+    base = ds.nbytes
+    ds.fingerprints.hashes(["A", "B"])
+    assert ds.nbytes >= base + 1000 * 8
+
+
+def test_growth_after_put_triggers_eviction():
+    first, second = _dataset("a"), _dataset("b")
+    store = DatasetStore(max_items=10, max_bytes=first.nbytes + second.nbytes + 10_000)
+    store.put(first)
+    store.put(second)
+    second.memo(("arrow",), lambda: b"x" * 100_000)
+    assert store.get("a") is None
+    assert store.get("b") is second
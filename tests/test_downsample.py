@@ -0,0 +1,21 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.processing.downsample import downsample_series
+
+
+def test_window_without_time_column_is_rejected():
+    df = pd.DataFrame({"TAG": ["A"] * 100, "V": np.arange(100, dtype=float)})
+    with pytest.raises(ValueError, match="STD_DT"):
+        downsample_series(df, start="2024-01-01")
+    with pytest.raises(ValueError):
+        downsample_series(df, end="2024-01-02")
+
+
+def test_window_filters_by_time():
+    df = pd.DataFrame({"STD_DT": pd.date_range("2024-01-01", periods=100, freq="h"), "V": np.arange(100, dtype=float)})
+    out = downsample_series(df, start="2024-01-02", end="2024-01-02 23:00")
+    assert out["raw_points"] == 24
+    assert out["window"] == {"start": "2024-01-02", "end": "2024-01-02 23:00"}
+    assert downsample_series(df.drop(columns="STD_DT"))["raw_points"] == 100
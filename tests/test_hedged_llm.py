@@ -0,0 +1,22 @@
+from modules.chatbot.hedged_llm import HedgedCall, Hedger, _attempt_failed
+
+
+def test_no_hedge_when_fallback_is_primary():
+    call = HedgedCall(Hedger(), "q", "gemini-2.5-flash", "gemini-2.5-flash", None, hedge=True)
+    assert not call.hedge
+    assert call.fallback is None
+
+
+def test_hedge_with_distinct_fallback():
+    call = HedgedCall(Hedger(), "q", "gemini-2.5-flash", "gemma3:4b", None, hedge=True)
+    assert call.hedge
+    assert call.fallback == "gemma3:4b"
+
+
+def test_attempt_failures_logged_once_per_model(capsys):
+    for _ in range(3):
+        _attempt_failed("test-model-a", "start", RuntimeError("no key"))
+    _attempt_failed("test-model-b", "start", RuntimeError("no key"))
+    out = capsys.readouterr().out
+    assert out.count("test-model-a") == 1
+    assert out.count("test-model-b") == 1
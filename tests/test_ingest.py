@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from modules.processing.ingest import optimize_dtypes, read_csv_fast
+
+
+def test_large_magnitude_floats_stay_float64():
+    vals = [1700000000.5, 1700000001.25, 1700000002.75]
+    df = pd.DataFrame({"EPOCH": vals})
+    changes = optimize_dtypes(df)
+    assert "EPOCH" not in changes["downcast"]
+    assert df["EPOCH"].dtype == np.float64
+    assert df["EPOCH"].tolist() == vals
+
+
+def test_csv_ingest_keeps_precision():
+    raw = b"EPOCH,V\n1700000000.5,0.1\n1700000001.25,0.2\n1700000002.75,0.3\n"
+    df, report = read_csv_fast(raw)
+    assert df["EPOCH"].tolist() == [1700000000.5, 1700000001.25, 1700000002.75]
+    assert df["V"].tolist() == [0.1, 0.2, 0.3]   # 0.1은 float32로 정확히 표현되지 않음 → float64 유지
+    assert report["downcast"] == {}
+
+
+def test_exactly_representable_floats_downcast():
+    df = pd.DataFrame({"HALF": [0.5, 1.25, -3.0, np.nan]})
+    changes = optimize_dtypes(df)
+    assert df["HALF"].dtype == np.float32
+    assert changes["downcast"] == {"HALF": "float64->float32"}
+
+
+def test_explicit_absolute_tolerance_per_column():
+    df = pd.DataFrame({"TEMP": [20.1, 20.2, 20.3], "EPOCH": [1700000000.5, 1700000001.25, 1700000002.75]})
+    optimize_dtypes(df, float32_atol={"TEMP": 1e-3})
+    assert df["TEMP"].dtype == np.float32
+    assert df["EPOCH"].dtype == np.float64
+
+
+def test_integers_downcast_losslessly():
+    df = pd.DataFrame({"N": [1, 2, 300]})
+    optimize_dtypes(df)
+    assert df["N"].dtype == np.int16
+    assert df["N"].tolist() == [1, 2, 300]
+
+
+def test_mixed_datetime_formats_are_not_dropped():
+    rows = "".join(f"2024-01-01 {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d},{i}\n" for i in range(3000))
+    raw = ("STD_DT,V\n" + rows + "2024/01/03 10:00,1\n").encode()
+    df, report = read_csv_fast(raw)
+    assert df["STD_DT"].notna().all()
+    assert df["STD_DT"].iloc[-1] == pd.Timestamp("2024-01-03 10:00")
+    assert report["datetime_unparsed"] == {}
+
+
+def test_unparseable_datetime_values_keep_column_as_text():
+    rows = "".join(f"2024-01-01 00:00:{i % 60:02d},{i}\n" for i in range(3000))
+    raw = ("STD_DT,V\n" + rows + "2024-01-02T00:00:00+09:00,1\nnot a date,2\n").encode()
+    df, report = read_csv_fast(raw)
+    assert not pd.api.types.is_datetime64_any_dtype(df["STD_DT"].dtype)
+    assert df["STD_DT"].astype(str).iloc[-1] == "not a date"
+    assert report["datetime_unparsed"]["STD_DT"] >= 1
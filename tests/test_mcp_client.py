@@ -0,0 +1,54 @@
+import asyncio
+
+import httpx
+import pytest
+
+from modules.mcp.client.client import AsyncMCPClient
+
+
+def _call(handler, tool="s/eda_profile", retries=2):
+    async def run():
+        mcp = AsyncMCPClient(servers={"s": "http://tools"}, retries=retries)
+        mcp._clients["s"] = httpx.AsyncClient(base_url="http://tools", transport=httpx.MockTransport(handler))
+        async with mcp:
+            return await mcp.call(tool, {"dataset_id": "d"})
+    return asyncio.run(run())
+
+
+def test_read_timeout_is_not_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise httpx.ReadTimeout("slow", request=request)
+
+    with pytest.raises(RuntimeError, match="network error"):
+        _call(handler)
+    assert len(calls) == 1
+
+
+def test_504_is_not_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(504)
+
+    with pytest.raises(RuntimeError, match="504"):
+        _call(handler, "s/rag_index")
+    assert len(calls) == 1
+
+
+def test_connect_error_and_503_are_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise httpx.ConnectError("refused", request=request)
+        if len(calls) == 2:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"ok": True})
+
+    assert _call(handler) == {"ok": True}
+    assert len(calls) == 3
@@ -0,0 +1,33 @@
+from modules.chatbot.query_router import QueryRouter
+
+ALL = ("rag", "csv", "eda")
+
+
+def _route(query, available=ALL):
+    return QueryRouter(enabled=True).route(query, available)
+
+
+def test_data_questions_with_generic_words_keep_data_context():
+    for query in ("압력 추이를 설명해줘", "온도 센서가 어떤 패턴을 보여?", "두 TAG의 평균을 비교해줘"):
+        decision = _route(query)
+        assert decision.intent != "general", query
+        assert decision.use("csv"), query
+
+
+def test_single_syllable_keywords_match_whole_words_only():
+    decision = _route("배열과 리스트 차이")
+    assert decision.intent != "dataset"
+    assert "열" not in decision.matched
+    assert _route("행이 몇 개야?").intent == "dataset"
+    assert _route("열 평균 알려줘").intent == "dataset"
+
+
+def test_general_rule_needs_classifier_agreement():
+    decision = _route("정규화와 표준화 차이점")
+    assert decision.intent == "general"
+    assert decision.stages == ()
+    assert _route("plotly와 matplotlib 차이점", available=("eda",)).intent == "general"
+
+
+def test_general_rule_without_data_stays_general():
+    assert _route("altair 렌더링 온도 패턴", available=()).intent == "general"
@@ -0,0 +1,111 @@
+import asyncio
+
+import httpx
+import pytest
+
+from api.upstream import CircuitBreaker, Upstream, UpstreamUnavailable
+
+
+def _upstream(handler, breaker=None) -> Upstream:
+    u = Upstream("test", "http://upstream", breaker=breaker)
+    u._client = httpx.AsyncClient(base_url=u.base_url, transport=httpx.MockTransport(handler))
+    return u
+
+
+def _half_open() -> CircuitBreaker:
+    b = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    b.record_failure()
+    assert b.state == "half_open"
+    return b
+
+
+def test_read_timeout_is_not_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise httpx.ReadTimeout("slow", request=request)
+
+    u = _upstream(handler)
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(u.request("POST", "/tools/eda_profile", retries=2))
+    assert len(calls) == 1
+
+
+def test_connect_error_and_503_are_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise httpx.ConnectError("refused", request=request)
+        if len(calls) == 2:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"ok": True})
+
+    u = _upstream(handler)
+    r = asyncio.run(u.request("POST", "/tools/eda_profile", retries=2))
+    assert r.status_code == 200
+    assert len(calls) == 3
+
+
+def test_504_is_not_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(504)
+
+    u = _upstream(handler)
+    r = asyncio.run(u.request("POST", "/tools/anomaly_detect", retries=2))
+    assert r.status_code == 504
+    assert len(calls) == 1
+
+
+def test_cancelled_probe_is_released():
+    async def run():
+        started = asyncio.Event()
+
+        async def handler(request):
+            started.set()
+            await asyncio.sleep(10)
+            return httpx.Response(200)
+
+        b = _half_open()
+        u = _upstream(handler, b)
+        task = asyncio.ensure_future(u.request("GET", "/health"))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return b
+
+    b = asyncio.run(run())
+    assert b.allow()
+
+
+def test_unexpected_error_in_probe_releases_breaker():
+    def handler(request):
+        raise ValueError("boom")
+
+    b = _half_open()
+    u = _upstream(handler, b)
+    with pytest.raises(ValueError):
+        asyncio.run(u.request("GET", "/health"))
+    assert b.allow()
+
+
+def test_stream_uses_breaker_accounting():
+    def handler(request):
+        return httpx.Response(500, content=b"down")
+
+    async def run(u):
+        async with u.stream("POST", "/tools/chat_with_context/stream") as r:
+            return r.status_code
+
+    b = CircuitBreaker(failure_threshold=1, reset_timeout=60.0)
+    u = _upstream(handler, b)
+    assert asyncio.run(run(u)) == 500
+    assert b.state == "open"
+    with pytest.raises(UpstreamUnavailable):
+        asyncio.run(run(u))